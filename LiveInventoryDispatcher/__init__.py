@@ -3,31 +3,70 @@ import json
 import azure.functions as func
 import logging as logger
 
+from LiveInventoryDispatcher.config import Config
+from LiveInventoryDispatcher.common_utils.parallel import run_messages
+from LiveInventoryDispatcher.common_utils.stage_spans import server_timing
+from LiveInventoryDispatcher.common_utils.inventory_cache import inventory_cache_stats
+from LiveInventoryDispatcher.utils.data_access_layer.sql_db.instrumentation import statement_metrics
 from LiveInventoryDispatcher.db_dispatcher.json_loader import DataDispatcher
+from LiveInventoryDispatcher.orm.li_inventory import LIInventory
+
+statement_metrics.configure(slow_query_ms=Config.SLOW_QUERY_MS)
+
+
+def dispatch_message(x: dict) -> dict:
+    """
+    Dispatch the extractor file of one vendor message, runs in a pool thread in `thread` execution mode
+    """
+    logger.debug(f"PROCESSING - Dispatching data for vendor_id: {x.get('vendor_id')} and vendor_code(s): {x.get('item_codes')}")
+    data_dispatcher = DataDispatcher(vendor_id=x.get('vendor_id'),
+                                     item_codes=x.get('item_codes'),
+                                     extractor_file_path=x.get('extractor_file_path')).execute()
+    logger.debug(f"SUCCESS - Dispatched data for vendor_id: {x.get('vendor_id')} and vendor_code(s): {x.get('item_codes')}")
+    return {
+        "vendor_id": data_dispatcher.kwargs.get('vendor_id'),
+        "total number of item dispatched": len(data_dispatcher.update_data),
+        "priority_sync": bool(data_dispatcher.kwargs.get('is_priority')),
+        "ondemand_sync": bool(data_dispatcher.kwargs.get('internal_id_override_list')),
+        "requested_vendor_code_length": len(data_dispatcher.kwargs.get('item_codes')),
+        "stages": data_dispatcher.summary.get('stages')
+    }
+
+
+def lookup_inventory(internal_ids: list) -> func.HttpResponse:
+    """
+    Inventory rows of the internal_ids, served by the inventory cache (common_utils/inventory_cache.py)
+    """
+    try:
+        rows = LIInventory().get_by_internal_ids(internal_ids)
+    except (TypeError, ValueError) as ex:
+        return func.HttpResponse(f"internal_ids must be integers: {ex}", status_code=400)
+    cache_stats = inventory_cache_stats()
+    logger.info(f"inventory cache: {cache_stats}", extra={'custom_dimensions': cache_stats})
+    return func.HttpResponse(json.dumps(rows, default=str), mimetype='application/json')
 
 
 def main(req: func.HttpRequest) -> func.HttpResponse:
     logging.info('dispatcher function is called')
+    statement_metrics.reset()
     message = json.loads(str(req.get_body(), encoding='utf-8'))
+    if isinstance(message, dict) and message.get('internal_ids'):
+        # inventory lookup of the ERP, e.g. {"internal_ids": [1, 2]}
+        return lookup_inventory(message['internal_ids'])
     dispatcher_sync_status = []
-    for i, x in enumerate(message):
-        try:
-            logger.debug(f"PROCESSING - Dispatching data for vendor_id: {x.get('vendor_id')} and vendor_code(s): {x.get('item_codes')}")
-            data_dispatcher = DataDispatcher(vendor_id=x.get('vendor_id'),
-                                             item_codes=x.get('item_codes'),
-                                             extractor_file_path=x.get('extractor_file_path')).execute()
-            logger.debug(f"SUCCESS - Dispatched data for vendor_id: {x.get('vendor_id')} and vendor_code(s): {x.get('item_codes')}")
-            dispatcher_sync_status.append({
-                "vendor_id": data_dispatcher.kwargs.get('vendor_id'),
-                "total number of item dispatched": len(data_dispatcher.update_data),
-                "priority_sync": bool(data_dispatcher.kwargs.get('is_priority')),
-                "ondemand_sync": bool(data_dispatcher.kwargs.get('internal_id_override_list')),
-                "requested_vendor_code_length": len(data_dispatcher.kwargs.get('item_codes'))
-            })
-        except Exception as ex:
+    outcomes = run_messages(dispatch_message, message, mode=Config.EXECUTION_MODE,
+                            max_workers=Config.PARALLEL_MAX_WORKERS, timeout=Config.MESSAGE_TIMEOUT)
+    for x, outcome in zip(message, outcomes):
+        if outcome.error is not None:
             dispatcher_sync_status.append({})
-            logger.error(ex, exc_info=True)
+            logger.error(outcome.error, exc_info=outcome.error)
+        else:
+            dispatcher_sync_status.append(outcome.result)
+    statement_metrics.log_summary('dispatcher')
+    cache_stats = inventory_cache_stats()
+    logger.info(f"inventory cache: {cache_stats}", extra={'custom_dimensions': cache_stats})
     if dispatcher_sync_status:
-        return func.HttpResponse(str(dispatcher_sync_status))
+        return func.HttpResponse(str(dispatcher_sync_status),
+                                 headers={'Server-Timing': server_timing(x.get('stages') for x in dispatcher_sync_status)})
     else:
-        return func.HttpResponse( "problem while dispatcher", status_code=200 )
\ No newline at end of file
+        return func.HttpResponse( "problem while dispatcher", status_code=200 )
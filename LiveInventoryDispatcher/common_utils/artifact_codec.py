@@ -0,0 +1,204 @@
+"""
+this module holds the codec for the intermediate artifacts handed over between
+fetcher, extractor and dispatcher
+
+Supported formats:
+    json        - legacy, uncompressed JSON document
+    ndjson.gz   - gzip compressed, one JSON record per line
+    columnar.gz - gzip compressed, one JSON array per column
+
+Compressed artifacts start with a header line which names the format, so readers
+never have to be told what they are reading. Anything without the gzip magic bytes
+is read as a legacy JSON document, which lets every stage switch formats on its own. The
+header is also recognised without the gzip wrapper, for blobs the transport already
+decompressed because of their Content-Encoding.
+
+A fetcher artifact may also be a spill manifest, a small document listing the parts a
+checkpointed pagination wrote page by page (see spill_manifest); the reader streams the parts.
+"""
+from typing import Any, Dict, List, Optional, Tuple, Union
+import gzip
+import logging as logger
+import time
+
+from LiveInventoryDispatcher.common_utils import json_codec
+
+ARTIFACT_FORMAT_JSON = "json"
+ARTIFACT_FORMAT_NDJSON_GZ = "ndjson.gz"
+ARTIFACT_FORMAT_COLUMNAR_GZ = "columnar.gz"
+
+ARTIFACT_FORMATS = (ARTIFACT_FORMAT_JSON, ARTIFACT_FORMAT_NDJSON_GZ, ARTIFACT_FORMAT_COLUMNAR_GZ)
+
+# file extension, content type and content encoding stored along with each format
+ARTIFACT_FORMAT_META = {
+    ARTIFACT_FORMAT_JSON: {'extension': '.json', 'content_type': 'application/json',
+                           'content_encoding': None},
+    ARTIFACT_FORMAT_NDJSON_GZ: {'extension': '.ndjson.gz', 'content_type': 'application/x-ndjson',
+                                'content_encoding': 'gzip'},
+    ARTIFACT_FORMAT_COLUMNAR_GZ: {'extension': '.columnar.gz', 'content_type': 'application/json',
+                                  'content_encoding': 'gzip'},
+}
+
+GZIP_MAGIC = b'\x1f\x8b'
+HEADER_KEY = '__li_artifact__'
+SPILL_MANIFEST_KEY = '__li_spill_parts__'
+GZIP_COMPRESS_LEVEL = 6
+# every header line starts like this, whichever JSON backend wrote it
+HEADER_PREFIX = b'{"' + HEADER_KEY.encode('utf-8') + b'"'
+
+
+class UC_ArtifactCodecException(Exception):
+    pass
+
+
+def _as_records(data: Any) -> Any:
+    """Stages may hand over an already serialized JSON document, parse it back to records."""
+    if isinstance(data, (bytes, str)):
+        return json_codec.loads(data)
+    return data
+
+
+def _is_record_list(records: Any) -> bool:
+    return isinstance(records, list) and all(isinstance(record, dict) for record in records)
+
+
+def _to_columns(records: List[Dict]) -> Dict[str, Any]:
+    """
+    Pivot a list of records to one list of values per column.
+    Rows that do not carry a column are listed under 'missing' so that decoding
+    gives back exactly the records that were encoded.
+    """
+    columns = []
+    seen = set()
+    for record in records:
+        for key in record:
+            if key not in seen:
+                seen.add(key)
+                columns.append(key)
+
+    data = {column: [] for column in columns}
+    missing = {}
+    for index, record in enumerate(records):
+        for column in columns:
+            if column in record:
+                data[column].append(record[column])
+            else:
+                data[column].append(None)
+                missing.setdefault(column, []).append(index)
+    return {'count': len(records), 'columns': columns, 'data': data, 'missing': missing}
+
+
+def _from_columns(body: Dict[str, Any]) -> List[Dict]:
+    columns = body['columns']
+    data = body['data']
+    missing = {column: set(indexes) for column, indexes in body.get('missing', {}).items()}
+    if not missing:
+        return [dict(zip(columns, values)) for values in zip(*(data[column] for column in columns))] \
+            if columns else [{} for _ in range(body.get('count', 0))]
+
+    records = []
+    for index in range(body['count']):
+        records.append({column: data[column][index] for column in columns
+                        if index not in missing.get(column, ())})
+    return records
+
+
+def _split_header(text: bytes) -> Tuple[Optional[str], bytes]:
+    """kind named by the header line of an artifact and the body after it, (None, text) without header"""
+    text = text.lstrip()
+    if not text.startswith(HEADER_PREFIX):
+        return None, text
+    header_line, _, body = text.partition(b"\n")
+    return json_codec.loads(header_line).get(HEADER_KEY), body
+
+
+def encode_artifact(data: Any, artifact_format: str = ARTIFACT_FORMAT_JSON) -> Tuple[bytes, Dict[str, Any]]:
+    """
+    Encode stage output to bytes in the requested format.
+
+    :param data: records (list of dict), any JSON serializable object or an already serialized JSON string
+    :param artifact_format: one of ARTIFACT_FORMATS
+    :return: encoded bytes and stats (format, raw/encoded size, compression ratio, encode time in ms)
+    """
+    if artifact_format not in ARTIFACT_FORMATS:
+        raise UC_ArtifactCodecException(f"Unknown artifact format '{artifact_format}'")
+
+    start = time.perf_counter()
+    if artifact_format == ARTIFACT_FORMAT_JSON:
+        if isinstance(data, bytes):
+            raw = data
+        elif isinstance(data, str):
+            raw = data.encode('utf-8')
+        else:
+            raw = json_codec.dumps(data)
+        encoded = raw
+    else:
+        records = _as_records(data)
+        if artifact_format == ARTIFACT_FORMAT_COLUMNAR_GZ and _is_record_list(records):
+            body = json_codec.dumps(_to_columns(records))
+            lines = [json_codec.dumps({HEADER_KEY: 'columnar'}), body]
+        elif isinstance(records, list):
+            lines = [json_codec.dumps({HEADER_KEY: 'ndjson', 'count': len(records)})]
+            lines.extend(json_codec.dumps(record) for record in records)
+        else:
+            # a single document (e.g. the empty FTP payload) is kept as it is
+            lines = [json_codec.dumps({HEADER_KEY: 'json'}), json_codec.dumps(records)]
+        raw = b"\n".join(lines)
+        encoded = gzip.compress(raw, compresslevel=GZIP_COMPRESS_LEVEL)
+
+    stats = {
+        'format': artifact_format,
+        'raw_bytes': len(raw),
+        'encoded_bytes': len(encoded),
+        'compression_ratio': round(len(raw) / len(encoded), 2) if encoded else 1.0,
+        'encode_ms': round((time.perf_counter() - start) * 1000, 2),
+    }
+    return encoded, stats
+
+
+def decode_artifact(payload: Union[bytes, str]) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Decode an artifact written by any stage, the format is detected from the payload itself.
+
+    :param payload: raw artifact content
+    :return: decoded data and stats (detected format, encoded size, decode time in ms)
+    """
+    start = time.perf_counter()
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+    encoded_bytes = len(payload)
+
+    compressed = payload.startswith(GZIP_MAGIC)
+    text = gzip.decompress(payload) if compressed else payload
+    kind, body = _split_header(text)
+    if kind == 'ndjson':
+        data = [json_codec.loads(line) for line in body.split(b"\n") if line]
+    elif kind == 'columnar':
+        data = _from_columns(json_codec.loads(body))
+    elif kind == 'json':
+        data = json_codec.loads(body)
+    else:
+        # legacy JSON document, or gzip compressed JSON written by something else
+        kind = ARTIFACT_FORMAT_JSON
+        data = json_codec.loads(text)
+    # labelled by what was read, e.g. ndjson for an ndjson.gz blob decompressed by the transport
+    artifact_format = kind + '.gz' if compressed else kind
+
+    stats = {
+        'format': artifact_format,
+        'encoded_bytes': encoded_bytes,
+        'decode_ms': round((time.perf_counter() - start) * 1000, 2),
+    }
+    logger.debug(f"decoded {artifact_format} artifact: {stats}")
+    return data, stats
+
+
+def spill_manifest(part_paths: List[str]) -> Dict[str, List[str]]:
+    """
+    artifact standing for the records of the listed parts, in order
+    """
+    return {SPILL_MANIFEST_KEY: list(part_paths)}
+
+
+def is_spill_manifest(data: Any) -> bool:
+    return isinstance(data, dict) and SPILL_MANIFEST_KEY in data
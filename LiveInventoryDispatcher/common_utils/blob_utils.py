@@ -2,31 +2,126 @@
 this module holds all function regarding blob storage
 """
 from LiveInventoryExtractor.config import Config
-from azure.storage.blob import BlobServiceClient
-from typing import Union
+from LiveInventoryDispatcher.common_utils import json_codec
+from typing import TYPE_CHECKING, Any, Union
 import logging as logger
 import os
-import json
+import threading
+import queue
 import uuid
 
+if TYPE_CHECKING:
+    # the blob SDK is imported on first use, runs with is_blob = false never load it
+    from azure.storage.blob import BlobServiceClient
 
-def connect_blob() -> Union[None, BlobServiceClient]:
-    blob_service_client = None
-    try:
-        conn_str = Config.AZURE_STORAGE_CONNECTION_STRING
-        blob_service_client = BlobServiceClient.from_connection_string(conn_str)
-    except Exception as e:
-        logger.error(e, exc_info=True)
-    return blob_service_client
+# process-wide blob service client, created on first use and shared by every write
+_blob_service_client = None
+_blob_client_lock = threading.Lock()
+
+
+def connect_blob() -> Union[None, 'BlobServiceClient']:
+    """
+    this function returns the process-wide blob service client, creating it on first use.
+    The client keeps its connection pool alive between calls, so every write after the
+    first one skips connection string parsing and the TLS handshake
+    :return: blob service client or None if the client could not be created
+    """
+    global _blob_service_client
+    if _blob_service_client is not None:
+        return _blob_service_client
+
+    with _blob_client_lock:
+        if _blob_service_client is None:
+            try:
+                from azure.storage.blob import BlobServiceClient
+
+                conn_str = Config.AZURE_STORAGE_CONNECTION_STRING
+                _blob_service_client = BlobServiceClient.from_connection_string(
+                    conn_str,
+                    max_single_put_size=Config.BLOB_MAX_SINGLE_PUT_SIZE,
+                    max_block_size=Config.BLOB_MAX_BLOCK_SIZE
+                )
+            except Exception as e:
+                logger.error(e, exc_info=True)
+    return _blob_service_client
+
+
+def reset_blob_client() -> None:
+    """
+    this function drops the cached blob service client so that the next call to connect_blob
+    builds a new one, e.g. after pointing AZURE_STORAGE_CONNECTION_STRING to a local emulator
+    """
+    global _blob_service_client
+    with _blob_client_lock:
+        _blob_service_client = None
+
+
+def upload_blob_data(container: str, blob_name: str, data: Union[str, bytes],
+                     content_type: str = None, content_encoding: str = None) -> None:
+    """
+    this function uploads data to the given container and blob name.
+    Payloads bigger than BLOB_MAX_SINGLE_PUT_SIZE are split into blocks of BLOB_MAX_BLOCK_SIZE
+    and the blocks are uploaded over BLOB_MAX_CONCURRENCY parallel connections
+    :param container: container (and virtual directory) to upload to
+    :param blob_name: name of the blob
+    :param data: payload to upload
+    :param content_type: optional content type stored with the blob
+    :param content_encoding: optional content encoding stored with the blob, e.g. gzip
+    :return:
+    """
+    blob_service_client = connect_blob()
+    if not blob_service_client:
+        raise Exception(
+            "Data file path does not exist or is inaccessible"
+        )
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+
+    blob_client = blob_service_client.get_blob_client(
+        container=container,
+        blob=blob_name
+    )
+    content_settings = None
+    if content_type or content_encoding:
+        from azure.storage.blob import ContentSettings
+
+        content_settings = ContentSettings(content_type=content_type, content_encoding=content_encoding)
+    blob_client.upload_blob(data, length=len(data), overwrite=True,
+                            max_concurrency=Config.BLOB_MAX_CONCURRENCY,
+                            content_settings=content_settings)
+
+
+def download_blob_data(container: str, blob_name: str) -> bytes:
+    """
+    this function downloads a blob as raw bytes, content encoding is left to the caller
+    :param container: container (and virtual directory) to download from
+    :param blob_name: name of the blob
+    :return: blob content
+    """
+    blob_service_client = connect_blob()
+    if not blob_service_client:
+        raise Exception(
+            "Data file path does not exist or is inaccessible"
+        )
+    blob_client = blob_service_client.get_blob_client(
+        container=container,
+        blob=blob_name
+    )
+    return blob_client.download_blob(max_concurrency=Config.BLOB_MAX_CONCURRENCY).readall()
 
 
 def upload_file_blob(file_name, data) -> bool:
     """
     this function upload data to the blob
+    empty payloads are skipped, there is nothing worth keeping in them
     :param filename:
     :param data:
     :return:
     """
+    if not data:
+        logger.debug(f"skipping upload of empty {file_name} artifact")
+        return True
+
     try:
         random_uuid = uuid.uuid1()
         data_file_path = os.path.join(
@@ -35,19 +130,94 @@ def upload_file_blob(file_name, data) -> bool:
         data_file_dir = Config.data_file_path
         if not data_file_dir:
             raise Exception("data file path dir not defined")
-        blob_service_client = connect_blob()
-        if not blob_service_client:
-            raise Exception(
-                "Data file path does not exist or is inaccessible"
-            )
         container = Config.BLOB_CONTAINER_NAME + Config.BLOB_NAME + data_file_dir
-        blob_client = blob_service_client.get_blob_client(
-            container=container,
-            blob=data_file_path
-        )
-        blob_client.upload_blob(str(data))
+        if not isinstance(data, (str, bytes)):
+            data = json_codec.dumps(data)
+        upload_blob_data(container, data_file_path, data)
         return True
     except Exception as exe:
         logger.error(exe)
         logger.error(f"failed to upload data to the blob", exc_info=True)
         return False
+
+
+class BlobUploadQueue:
+    """
+    Background queue for artifacts nobody downstream waits for, e.g. invalid vendor codes.
+
+    Uploads are handed over to a daemon thread so that they leave the critical path of the caller.
+    The function entry point must call `flush` before returning, since the host may freeze the
+    worker process as soon as the response is sent.
+    """
+
+    def __init__(self, workers: int = 1) -> None:
+        self.workers = workers
+        self._queue = queue.Queue()
+        self._threads = []
+        self._pending = 0
+        self._condition = threading.Condition()
+
+    def _start(self) -> None:
+        with self._condition:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            for _ in range(self.workers - len(self._threads)):
+                thread = threading.Thread(target=self._run, name="blob-upload", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self) -> None:
+        while True:
+            file_name, data = self._queue.get()
+            try:
+                upload_file_blob(file_name, data)
+            finally:
+                with self._condition:
+                    self._pending -= 1
+                    self._condition.notify_all()
+
+    def submit(self, file_name: str, data: Any) -> bool:
+        """
+        Queue an artifact for upload. Empty artifacts are dropped right away.
+        :return: True if the artifact was queued
+        """
+        if not data:
+            logger.debug(f"skipping upload of empty {file_name} artifact")
+            return False
+        with self._condition:
+            self._pending += 1
+        self._start()
+        self._queue.put((file_name, data))
+        return True
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Block until every queued artifact is uploaded or the timeout expires.
+        :return: True if the queue was drained
+        """
+        with self._condition:
+            drained = self._condition.wait_for(lambda: self._pending == 0, timeout=timeout)
+        if not drained:
+            logger.warning(f"{self._pending} blob upload(s) still pending after {timeout} seconds")
+        return drained
+
+
+upload_queue = BlobUploadQueue(workers=Config.BLOB_UPLOAD_WORKERS)
+
+
+def upload_file_blob_async(file_name, data) -> bool:
+    """
+    this function queues data for a background upload to the blob
+    :param file_name:
+    :param data:
+    :return: True if the data was queued
+    """
+    return upload_queue.submit(file_name, data)
+
+
+def flush_pending_uploads(timeout: float = None) -> bool:
+    """
+    this function waits for all the queued background uploads to finish
+    :param timeout: seconds to wait at most, None waits forever
+    :return: True if nothing is left to upload
+    """
+    return upload_queue.flush(timeout)
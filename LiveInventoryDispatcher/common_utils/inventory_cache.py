@@ -0,0 +1,224 @@
+"""
+Read-through cache of the inventory lookup by internal_id.
+
+QUERY_FETCH_DATA_FROM_INVENTORY_USING_INTERNAL_ID joins vendor_codes, inventory and vendors
+for every lookup, while ERP callers ask for the same hot products again and again between
+two syncs. The rows of an internal_id (one per vendor code, `status` 'Unavailable' when the
+vendor has no inventory row for it) are cached per process, keyed by the change counter
+`inventory_version.version` of the internal_id (kept up to date by the triggers in
+migrations/008_inventory_version.sql). A lookup reads the counters of its internal_ids, a
+primary key read, and serves the cached rows whose counter has not moved; only the others
+go through the join. Whichever process writes the inventory, the next lookup of every
+process sees the new rows.
+
+Entries are also dropped after `inventory_cache_ttl` seconds, at most `inventory_cache_size`
+internal_ids are kept, least recently used evicted first. DataDispatcher.dispatch drops the
+internal_ids it upserted from the cache of its own process.
+
+When the counter table does not exist the rows are read on every lookup, exactly like the
+query it wraps; so they are for a lookup whose counter read failed otherwise.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from psycopg2 import errors as pg_errors
+
+from LiveInventoryDispatcher.config import Config
+from LiveInventoryDispatcher.common_utils.db_queries import QUERY_FETCH_DATA_FROM_INVENTORY_USING_INTERNAL_ID, \
+    QUERY_FETCH_INVENTORY_VERSIONS
+
+logger = logging
+# set once the counter table turned out to be missing, so it is not queried on every lookup
+_versioning_unavailable = False
+
+
+class InventoryCache:
+    """
+    internal_id -> inventory rows at an inventory_version, bounded by size and age
+
+    :param max_size: internal_ids kept, the least recently used one is evicted beyond that
+    :type max_size: int
+
+    :param ttl: seconds an entry is served, 0 disables the cache
+    :type ttl: float
+
+    :param clock: monotonic time source in seconds
+    """
+
+    def __init__(self, max_size: int, ttl: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()  # internal_id -> (version, expires_at, rows)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.outdated = 0
+        self.expired = 0
+        self.evicted = 0
+        self.invalidated = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_size > 0
+
+    def get_many(self, versions: Dict[int, int]) -> Tuple[Dict[int, List[Dict[str, Any]]], List[int]]:
+        """
+        :param versions: internal_id -> its current inventory_version
+        :return: rows of the internal_ids cached at their current version, internal_ids to read
+                 from the database
+        """
+        found, missing = {}, []
+        now = self.clock()
+        with self._lock:
+            for internal_id, version in versions.items():
+                entry = self._entries.get(internal_id)
+                if entry is not None and entry[0] != version:
+                    del self._entries[internal_id]
+                    self.outdated += 1
+                    entry = None
+                elif entry is not None and entry[1] <= now:
+                    del self._entries[internal_id]
+                    self.expired += 1
+                    entry = None
+                if entry is None:
+                    missing.append(internal_id)
+                    self.misses += 1
+                else:
+                    self._entries.move_to_end(internal_id)
+                    found[internal_id] = entry[2]
+                    self.hits += 1
+        return found, missing
+
+    def put_many(self, rows_by_id: Dict[int, List[Dict[str, Any]]], versions: Dict[int, int]) -> None:
+        """
+        cache rows read from the database
+
+        :param versions: inventory_version of the internal_ids read before their rows, rows written
+                         in between are newer than their version and are just read again next time
+        """
+        if not self.enabled:
+            return
+        expires_at = self.clock() + self.ttl
+        with self._lock:
+            for internal_id, rows in rows_by_id.items():
+                self._entries[internal_id] = (versions[internal_id], expires_at, rows)
+                self._entries.move_to_end(internal_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+
+    def invalidate(self, internal_ids: Iterable[int]) -> None:
+        with self._lock:
+            for internal_id in internal_ids:
+                if self._entries.pop(internal_id, None) is not None:
+                    self.invalidated += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                    'outdated': self.outdated, 'expired': self.expired, 'evicted': self.evicted,
+                    'invalidated': self.invalidated}
+
+
+inventory_cache = InventoryCache(Config.INVENTORY_CACHE_SIZE, Config.INVENTORY_CACHE_TTL)
+
+
+def _key(internal_id: Any) -> int:
+    # internal_id is an integer column, callers may pass it as text
+    return int(internal_id)
+
+
+def fetch_inventory_versions(li_db, internal_ids: List[int]) -> Optional[Dict[int, int]]:
+    """
+    Read the inventory_version of the internal_ids
+
+    :return: internal_id -> counter value, 0 for an internal_id not written since the migration,
+             None when the counter table is not available.
+    """
+    global _versioning_unavailable
+    if _versioning_unavailable:
+        return None
+    try:
+        with li_db.transaction(auto_commit=True) as qryset:
+            result = qryset.execute_query(QUERY_FETCH_INVENTORY_VERSIONS, {'internal_ids': internal_ids})
+            rows = result.to_tuples() if result else []
+    except (pg_errors.UndefinedTable, pg_errors.UndefinedColumn) as ex:
+        logger.warning(f"inventory version is not available, inventory lookups will not be cached: {ex}")
+        _versioning_unavailable = True
+        return None
+    except Exception as ex:
+        # e.g. a dropped connection, the next lookup asks again
+        logger.warning(f"Could not read the inventory version, the lookup is read uncached: {ex}")
+        return None
+    versions = dict.fromkeys(internal_ids, 0)
+    versions.update((_key(internal_id), version) for internal_id, version in rows)
+    return versions
+
+
+def load_inventory_rows(li_db, internal_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Read the lookup rows of the internal_ids, an internal_id without vendor codes gets no rows
+    """
+    loaded = {internal_id: [] for internal_id in internal_ids}
+    with li_db.transaction(auto_commit=True) as qryset:
+        result = qryset.execute_query(QUERY_FETCH_DATA_FROM_INVENTORY_USING_INTERNAL_ID,
+                                      {'internal_ids': internal_ids})
+        for row in (result.to_list() if result else []):
+            loaded.setdefault(_key(row['internal_id']), []).append(row)
+    return loaded
+
+
+def fetch_inventory_by_internal_ids(li_db, internal_ids: Iterable[Any]) -> List[Dict[str, Any]]:
+    """
+    Inventory rows of the internal_ids, served from the cache while their version matches
+
+    :param li_db: data access layer to read from
+    :type li_db: PgSQLDAL
+
+    :param internal_ids: products to look up
+    :type internal_ids: iterable
+
+    :returns: rows of QUERY_FETCH_DATA_FROM_INVENTORY_USING_INTERNAL_ID, grouped by internal_id in
+              the order of `internal_ids`
+    :rtype: list
+    """
+    keys = list(dict.fromkeys(_key(internal_id) for internal_id in internal_ids))
+    if not keys:
+        return []
+    versions = fetch_inventory_versions(li_db, keys) if inventory_cache.enabled else None
+    if versions is None:
+        found = load_inventory_rows(li_db, keys)
+    else:
+        found, missing = inventory_cache.get_many(versions)
+        if missing:
+            loaded = load_inventory_rows(li_db, missing)
+            inventory_cache.put_many(loaded, versions)
+            found.update(loaded)
+        logger.debug(f"inventory lookup: {len(keys) - len(missing)} internal id(s) cached, {len(missing)} read")
+    # cached rows are shared between callers, hand out copies
+    return [dict(row) for internal_id in keys for row in found.get(internal_id, [])]
+
+
+def invalidate_internal_ids(internal_ids: Iterable[Any]) -> None:
+    """
+    Drop the cached rows of the internal_ids, e.g. after their inventory was upserted
+    """
+    inventory_cache.invalidate({_key(internal_id) for internal_id in internal_ids if internal_id is not None})
+
+
+def inventory_cache_stats() -> Dict[str, Any]:
+    """
+    hit / miss / eviction counters and size of the process cache
+    """
+    return inventory_cache.stats()
@@ -0,0 +1,130 @@
+"""
+this module is the JSON codec shared by every stage
+
+It works on bytes: responses are decoded from `response.content` (no charset detection,
+no intermediate str) and documents are encoded straight to UTF-8 bytes. `orjson` is used
+when it is installed, the standard library otherwise; both produce the same documents.
+
+Values JSON has no type for are encoded natively instead of through `default=str`:
+datetimes, dates and times as ISO 8601, UUID as string and sets as lists. Decimal is
+encoded as string, a float would lose digits of prices and quantities. Anything else
+still falls back to `str()`.
+
+Where orjson is stricter than the standard library its documents are redone with it:
+integers wider than 64 bits are encoded, and NaN / Infinity (which vendors sometimes
+send) are decoded, by the standard library. orjson itself writes a NaN or Infinity
+float as null, where the standard library writes the non standard NaN / Infinity.
+"""
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Union
+from uuid import UUID
+import json
+import logging as logger
+
+from LiveInventoryDispatcher.config import Config
+
+try:
+    import orjson
+except ImportError:  # optional, the standard library is used without it
+    orjson = None
+
+JSON_BACKEND_AUTO = "auto"
+JSON_BACKEND_ORJSON = "orjson"
+JSON_BACKEND_STDLIB = "stdlib"
+
+
+class UC_JSONCodecException(Exception):
+    pass
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+
+_STDLIB_ENCODER = json.JSONEncoder(default=_default, ensure_ascii=False, separators=(',', ':'))
+
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    return _STDLIB_ENCODER.encode(obj).encode('utf-8')
+
+
+def _stdlib_loads(data: Union[bytes, str]) -> Any:
+    return json.loads(data)
+
+
+# backend name -> (dumps, loads)
+BACKENDS = {JSON_BACKEND_STDLIB: (_stdlib_dumps, _stdlib_loads)}
+
+if orjson is not None:
+    # non str keys (e.g. internal ids) are accepted like the standard library does
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def _orjson_dumps(obj: Any) -> bytes:
+        try:
+            return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # e.g. an integer wider than 64 bits
+            return _stdlib_dumps(obj)
+
+    def _orjson_loads(data: Union[bytes, str]) -> Any:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # e.g. NaN / Infinity, or an integer wider than 64 bits
+            return _stdlib_loads(data)
+
+    BACKENDS[JSON_BACKEND_ORJSON] = (_orjson_dumps, _orjson_loads)
+
+
+def _select_backend(name: str) -> str:
+    if name not in (JSON_BACKEND_AUTO, JSON_BACKEND_ORJSON, JSON_BACKEND_STDLIB):
+        raise UC_JSONCodecException(f"Unknown json backend '{name}'")
+    if name == JSON_BACKEND_AUTO:
+        return JSON_BACKEND_ORJSON if JSON_BACKEND_ORJSON in BACKENDS else JSON_BACKEND_STDLIB
+    if name not in BACKENDS:
+        logger.warning(f"json backend {name} is configured but not installed, using the standard library")
+        return JSON_BACKEND_STDLIB
+    return name
+
+
+backend = _select_backend(Config.JSON_BACKEND)
+_dumps, _loads = BACKENDS[backend]
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    encode an object to a UTF-8 JSON document
+    """
+    return _dumps(obj)
+
+
+def dumps_text(obj: Any) -> str:
+    """
+    encode an object to a JSON document as str, for APIs that want text
+    """
+    return _dumps(obj).decode('utf-8')
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """
+    decode a JSON document given as bytes (preferred) or str
+    """
+    if isinstance(data, (bytearray, memoryview)):
+        data = bytes(data)
+    return _loads(data)
+
+
+def load_response(response: Any) -> Any:
+    """
+    decode the JSON body of a `requests` response from its raw bytes
+    """
+    return _loads(response.content)
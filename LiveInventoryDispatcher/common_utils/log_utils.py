@@ -0,0 +1,183 @@
+"""
+Logging helpers for hot paths that used to format whole payloads into every record.
+
+    summarize(payload)  counts plus a small sample of a list / dict / text payload
+    capped(value)       str() of any value cut at `log_payload_max_chars`
+    lazy(function)      message argument computed only when the record is emitted
+    get_logger(name)    logger facade with per logger sampling (`log_sample_every`) and
+                        `enabled(level)` to guard messages that are expensive to build
+
+All three argument wrappers render in `__str__`, so they have to be passed as
+%-style arguments (`logger.debug('Saving data: %s', summarize(rows))`), never inside
+an f-string: a record that is not emitted then costs nothing to format.
+"""
+from itertools import count
+from typing import Any, Callable, Dict
+import logging
+
+from LiveInventoryDispatcher.config import Config
+
+
+def _cut(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}... [{len(text) - max_chars} more chars]"
+
+
+class CappedText:
+    """
+    str() of a value, rendered on demand and cut at `max_chars`
+
+    :param value: anything, e.g. a LazyQuery or a response text
+    :param max_chars: defaults to LOG_PAYLOAD_MAX_CHARS
+    """
+    __slots__ = ('value', 'max_chars')
+
+    def __init__(self, value: Any, max_chars: int = None) -> None:
+        self.value = value
+        self.max_chars = max_chars or Config.LOG_PAYLOAD_MAX_CHARS
+
+    def __str__(self) -> str:
+        return _cut(str(self.value), self.max_chars)
+
+
+class PayloadSummary:
+    """
+    size of a payload and a sample of its first entries, rendered on demand
+
+    lists: `1200 item(s), first 3: [...]`, dicts: `dict of 40 key(s): {...}` with the first
+    entries only, text and bytes: `52311 chars: ...`, anything else as capped(repr)
+
+    :param payload: the data the record is about
+    :param sample: entries shown, defaults to LOG_PAYLOAD_SAMPLE
+    :param max_chars: cap of the rendered sample, defaults to LOG_PAYLOAD_MAX_CHARS
+    """
+    __slots__ = ('payload', 'sample', 'max_chars')
+
+    def __init__(self, payload: Any, sample: int = None, max_chars: int = None) -> None:
+        self.payload = payload
+        self.sample = Config.LOG_PAYLOAD_SAMPLE if sample is None else sample
+        self.max_chars = max_chars or Config.LOG_PAYLOAD_MAX_CHARS
+
+    def __str__(self) -> str:
+        payload = self.payload
+        if isinstance(payload, (list, tuple)):
+            text = f"{len(payload)} item(s)"
+            if payload and self.sample:
+                text += f", first {min(self.sample, len(payload))}: {list(payload[:self.sample])!r}"
+        elif isinstance(payload, dict):
+            head = dict(item for _, item in zip(range(self.sample), payload.items()))
+            text = f"dict of {len(payload)} key(s): {head!r}" + (" ..." if len(head) < len(payload) else "")
+        elif isinstance(payload, (str, bytes)):
+            text = f"{len(payload)} chars: {payload[:self.max_chars]!r}"
+        else:
+            text = repr(payload)
+        return _cut(text, self.max_chars)
+
+
+class LazyArgument:
+    """
+    message argument computed by `function(*args)` only when the record is emitted
+
+    :param function: called once per emitted record
+    """
+    __slots__ = ('function', 'args')
+
+    def __init__(self, function: Callable[..., Any], *args: Any) -> None:
+        self.function = function
+        self.args = args
+
+    def __str__(self) -> str:
+        return str(self.function(*self.args))
+
+
+def capped(value: Any, max_chars: int = None) -> CappedText:
+    return CappedText(value, max_chars)
+
+
+def summarize(payload: Any, sample: int = None, max_chars: int = None) -> PayloadSummary:
+    return PayloadSummary(payload, sample, max_chars)
+
+
+def lazy(function: Callable[..., Any], *args: Any) -> LazyArgument:
+    return LazyArgument(function, *args)
+
+
+class HotPathLogger:
+    """
+    facade over a named logger for code that logs on every record or statement
+
+    Records below WARNING are sampled: only every `sample_every`-th call of the logger
+    is emitted. Warnings and errors are never sampled.
+
+    :param name: logger name, usually the module `__name__`
+    :type name: str
+    :param sample_every: emit one of that many records below WARNING, 1 emits all of them
+    :type sample_every: int
+    """
+
+    def __init__(self, name: str, sample_every: int = 1) -> None:
+        self.logger = logging.getLogger(name)
+        self.sample_every = max(1, int(sample_every))
+        self._calls = count()
+
+    def enabled(self, level: int = logging.DEBUG) -> bool:
+        """
+        guard for messages that are expensive even to build, e.g. `if logger.enabled(): ...`
+        """
+        return self.logger.isEnabledFor(level)
+
+    def _log(self, level: int, msg: Any, args: tuple, kwargs: dict) -> None:
+        if not self.logger.isEnabledFor(level):
+            return
+        if level < logging.WARNING and self.sample_every > 1 and next(self._calls) % self.sample_every:
+            return
+        # report the caller of debug() / info() / ... as the origin of the record
+        kwargs.setdefault('stacklevel', 3)
+        self.logger.log(level, msg, *args, **kwargs)
+
+    def log(self, level: int, msg: Any, *args: Any, **kwargs: Any) -> None:
+        self._log(level, msg, args, kwargs)
+
+    def debug(self, msg: Any, *args: Any, **kwargs: Any) -> None:
+        self._log(logging.DEBUG, msg, args, kwargs)
+
+    def info(self, msg: Any, *args: Any, **kwargs: Any) -> None:
+        self._log(logging.INFO, msg, args, kwargs)
+
+    def warning(self, msg: Any, *args: Any, **kwargs: Any) -> None:
+        self._log(logging.WARNING, msg, args, kwargs)
+
+    warn = warning
+
+    def error(self, msg: Any, *args: Any, **kwargs: Any) -> None:
+        self._log(logging.ERROR, msg, args, kwargs)
+
+    def exception(self, msg: Any, *args: Any, **kwargs: Any) -> None:
+        kwargs.setdefault('exc_info', True)
+        self._log(logging.ERROR, msg, args, kwargs)
+
+    def critical(self, msg: Any, *args: Any, **kwargs: Any) -> None:
+        self._log(logging.CRITICAL, msg, args, kwargs)
+
+
+def sample_rates(setting: str) -> Dict[str, int]:
+    """
+    parse `log_sample_every`, e.g. `LiveInventoryDispatcher.orm=100, LiveInventoryDispatcher.common_utils.db_utils=10`
+    """
+    rates = {}
+    for entry in (setting or '').split(','):
+        name, _, every = entry.partition('=')
+        if name.strip() and every.strip():
+            rates[name.strip()] = int(every)
+    return rates
+
+
+def get_logger(name: str) -> HotPathLogger:
+    """
+    HotPathLogger of a module, sampled at the rate configured for the longest matching
+    logger name prefix in `log_sample_every`
+    """
+    rates = sample_rates(Config.LOG_SAMPLE_EVERY)
+    prefixes = [prefix for prefix in rates if name == prefix or name.startswith(prefix + '.')]
+    return HotPathLogger(name, rates[max(prefixes, key=len)] if prefixes else 1)
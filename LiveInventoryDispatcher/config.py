@@ -3,6 +3,7 @@ this module reads all config value from config.ini file
 """
 # importing necessary library
 import configparser
+import os
 from LiveInventoryDispatcher.constants import CONFIG_FILE_PATH
 
 # handler for config parser
@@ -24,13 +25,49 @@ class Config:
                "=https&sv=2021-06-08&sr=c&sig=eXydEpyYoS%2BgoMt037X4tkyd4lPJoKvmntJchLeEDtQ%3D"
     BLOB_CONTAINER_NAME = "stage/"
     BLOB_NAME = "live-inventory/"
-    IS_BLOB = True
-    AZURE_STORAGE_CONNECTION_STRING = "DefaultEndpointsProtocol=https;AccountName=savapi;AccountKey" \
-                                      "=U7AF6GQLjl584h3HON2OQnA0YZIN86y32Jq3yRb1DvOGZ0nIm+1u6syEwaqsls01WRkMzpFmshyJ" \
-                                      "+AStNWC0tQ==;EndpointSuffix=core.windows.net"
+    # the environment variable takes precedence so that a local storage emulator (e.g. Azurite) can be used
+    AZURE_STORAGE_CONNECTION_STRING = os.environ.get(
+        'AZURE_STORAGE_CONNECTION_STRING',
+        "DefaultEndpointsProtocol=https;AccountName=savapi;AccountKey"
+        "=U7AF6GQLjl584h3HON2OQnA0YZIN86y32Jq3yRb1DvOGZ0nIm+1u6syEwaqsls01WRkMzpFmshyJ"
+        "+AStNWC0tQ==;EndpointSuffix=core.windows.net")
 
     EXTRA = dict(config['extra'])
+    # artifacts go to blob storage, or to the local directories of [network_filepath] when false
+    IS_BLOB = EXTRA.get('is_blob', 'true').lower() == 'true'
     REQUEST_TIMEOUT = int(EXTRA.get('request_timeout'))
+    BLOB_MAX_CONCURRENCY = int(EXTRA.get('blob_max_concurrency', 4))
+    BLOB_MAX_BLOCK_SIZE = int(EXTRA.get('blob_max_block_size', 4 * 1024 * 1024))
+    BLOB_MAX_SINGLE_PUT_SIZE = int(EXTRA.get('blob_max_single_put_size', 8 * 1024 * 1024))
+    BLOB_UPLOAD_WORKERS = int(EXTRA.get('blob_upload_workers', 1))
+    # format of the artifacts handed over between the stages: json, ndjson.gz or columnar.gz
+    ARTIFACT_FORMAT = EXTRA.get('artifact_format', 'json')
+    # json backend of common_utils/json_codec.py: auto (orjson when installed), orjson or stdlib
+    JSON_BACKEND = EXTRA.get('json_backend', 'auto')
+    # statements slower than this (milliseconds) are logged with their full text
+    SLOW_QUERY_MS = float(EXTRA.get('slow_query_ms', 500))
+    # payloads in hot path log records are cut to this many characters / sample entries, see common_utils/log_utils.py
+    LOG_PAYLOAD_MAX_CHARS = int(EXTRA.get('log_payload_max_chars', 2000))
+    LOG_PAYLOAD_SAMPLE = int(EXTRA.get('log_payload_sample', 3))
+    # logger=N pairs, only every N-th record below WARNING of these loggers is emitted
+    LOG_SAMPLE_EVERY = EXTRA.get('log_sample_every', '')
+    # record the tracemalloc peak of every stage span (common_utils/stage_spans.py), costs memory and cpu
+    STAGE_SPAN_TRACEMALLOC = EXTRA.get('stage_span_tracemalloc', 'false').lower() == 'true'
+    # how the vendor messages of one invocation are run: sequential, thread or process
+    EXECUTION_MODE = EXTRA.get('dispatcher_execution_mode', 'sequential')
+    PARALLEL_MAX_WORKERS = int(EXTRA.get('parallel_max_workers', 4))
+    # seconds one vendor message may run in a pool before it is reported as failed
+    MESSAGE_TIMEOUT = float(EXTRA.get('message_timeout', 240))
+    # internal_ids whose inventory lookup rows are cached per process and for how many seconds, see
+    # common_utils/inventory_cache.py (needs migrations/008_inventory_version.sql), a ttl of 0 disables the cache
+    INVENTORY_CACHE_SIZE = int(EXTRA.get('inventory_cache_size', 10000))
+    INVENTORY_CACHE_TTL = float(EXTRA.get('inventory_cache_ttl', 300))
+    # options of the data access layer, see PgSQLDAL
+    DB_OPTIONS = {
+        'keep_alive': EXTRA.get('db_keep_alive', 'false').lower() == 'true',
+        'prepare_statements': EXTRA.get('db_prepare_statements', 'false').lower() == 'true',
+        'prepared_cache_size': int(EXTRA.get('db_prepared_cache_size', 64)),
+    }
     LOGGER_CONFIG = {'nativelogger': {
         'filehandler': {
             'maxbytes': 10485760,
@@ -1,4 +1,5 @@
 from LiveInventoryDispatcher.base.base import *
+from LiveInventoryDispatcher.common_utils.parallel import raise_if_timed_out
 
 
 class DispatcherBase(Base):
@@ -8,8 +9,13 @@ class DispatcherBase(Base):
         self.object_type = ObjectType.DISPATCHER
 
     def execute(self) -> Any:
-        return self.load_data() \
-                    .dispatch()
+        # the stages stay chained on their return values, each one timed by its own span;
+        # a message that timed out in a pool stops before its next stage
+        with self.stage_span('load_data'):
+            stage = self.load_data()
+        raise_if_timed_out()
+        with self.stage_span('dispatch'):
+            return stage.dispatch()
 
     @abstractmethod
     def load_data(self) -> Any:
@@ -3,6 +3,9 @@ from LiveInventoryDispatcher.orm.li_inventory import LIInventory
 from LiveInventoryDispatcher.orm.li_vendor_codes import LIVendorCodes
 from LiveInventoryDispatcher.orm.li_vendors import LIVendors
 from LiveInventoryDispatcher.schemas.schemas import InventorySchema
+from LiveInventoryDispatcher.config import Config
+from LiveInventoryDispatcher.common_utils.inventory_cache import invalidate_internal_ids
+from LiveInventoryDispatcher.common_utils.parallel import raise_if_timed_out
 
 
 class UC_DataDispatchError(Exception):
@@ -19,8 +22,10 @@ class DataDispatcher(DispatcherBase):
         try:
             self.logger.info("loading data from extractor")
             self.logger.debug("Reading extractor data")
-            with open(self.kwargs['extractor_file_path'], 'r') as data_file:
-                self.update_data = json.load(data_file)
+            self.update_data = self.read_artifact(
+                self.kwargs['extractor_file_path'],
+                data_file_dir=Config.NETWORK_CONFIG.get('extractor_data_directory_path')
+            )
         except Exception as ex:
             self.logger.error("Could not dispatch data", exc_info=True)
             self.logger.exception(ex)
@@ -60,6 +65,8 @@ class DataDispatcher(DispatcherBase):
                             "internal_id": y.get('internal_id'),
                         } for y in new_data])]
             self.update_data = new_data
+            # a message that timed out in a pool does not write any more
+            raise_if_timed_out()
             try:
                 # inserting the null value in case if the api does not give response for that field and row
                 inventory_instance = InventorySchema()
@@ -74,6 +81,9 @@ class DataDispatcher(DispatcherBase):
                 inventory.upsert(self.update_data, conflict_fields="vendor_code, vendor_id, internal_id")
             except Exception as err:
                 self.logger.exception(err, exc_info=True)
+            finally:
+                # also after a failed upsert, some of the rows may have been written
+                invalidate_internal_ids(item.get('internal_id') for item in self.update_data)
             # for data in self.update_data:
             #     self.logger.info(f"loading data for dispatcher {data}")
             #     data.update({'vendor_id': vendor_id})
@@ -84,6 +94,7 @@ class DataDispatcher(DispatcherBase):
 
             # update vendors_codes.last_fetch_date
             # update_last_fetch_date_vendor_codes_all(tuple([(x.get('vendor_id'), x.get('vendor_code'), x.get('internal_id')) for x in self.update_data]))
+            raise_if_timed_out()
             try:
                 # update_vendor_codes.update_fetch_date_vendor_codes(vendor_id, data['vendor_code'])
                 # escaping the vendors table(last fetch date) update on ondemand api call
@@ -4,15 +4,32 @@ import logging
 from LiveInventoryDispatcher.utils.data_access_layer.sql_db import DBEngineFactory
 from LiveInventoryDispatcher.config import Config
 from LiveInventoryDispatcher.common_utils.db_queries import QUERY_UPSERT_INVENTORY
+from LiveInventoryDispatcher.common_utils.db_utils import get_keyset_page, get_grouped_page, export_ndjson
+from LiveInventoryDispatcher.common_utils.inventory_cache import fetch_inventory_by_internal_ids
 
 logger = logging
-li_db = DBEngineFactory.get_db_engine(Config.DB_CONFIG, DBEngineFactory.POSTGRES)
+li_db = DBEngineFactory.get_db_engine(Config.DB_CONFIG, DBEngineFactory.POSTGRES, **Config.DB_OPTIONS)
 
 
 class LIInventory(LIOrmBase):
     __table_name__ = 'inventory'
     __schema__ = InventorySchema()
+    # order of the keyset listings, served by inventory_keyset_idx (migrations/002_inventory_keyset_index.sql).
+    # Rows without internal_id are not part of them.
+    __keyset_columns__ = ('internal_id', 'vendor_id', 'vendor_code')
 
+    def get_by_internal_ids(self, internal_ids) -> list:
+        """Return the rows of every vendor code of the internal_ids, with the vendor's inventory if any.
+
+        Served by the read-through cache of common_utils/inventory_cache.py.
+
+        :param internal_ids: internal ids to look up
+        :type internal_ids: iterable
+
+        :returns: rows of QUERY_FETCH_DATA_FROM_INVENTORY_USING_INTERNAL_ID
+        :rtype: list
+        """
+        return fetch_inventory_by_internal_ids(li_db, internal_ids)
 
     def upsertInventory(self, data):
         try:
@@ -23,3 +40,62 @@ class LIInventory(LIOrmBase):
         except Exception as ex:
             logger.error(f"Could not upsert for vendor_id = {data['vendor_id']}")
             raise logger.error(ex)
+
+    def keyset_page(self, cursor: str = None, per_page: int = 100) -> dict:
+        """Return one page of records ordered by (internal_id, vendor_id, vendor_code).
+
+        Unlike all(), the page is located by the cursor of the previous one instead of an OFFSET,
+        so deep pages cost what the first one costs. Rows are returned as read, without schema dump.
+
+        :param cursor: `next_cursor` of the previous page, None for the first page.
+        :type cursor: str
+
+        :param per_page: total number of records to fetch in a page.
+        :type per_page: int
+
+        :returns: records along with meta object with the cursor of the next page.
+        :rtype: dict
+
+        :raises InvalidCursorException: Raised when the cursor can not be decoded.
+        """
+        logger.info('Fetching %s page after cursor %s', self.get_table(), cursor)
+        rows, next_cursor = get_keyset_page(self.get_table(), self.__keyset_columns__, cursor, per_page)
+        meta = {'per_page': per_page, 'count': len(rows), 'cursor': cursor, 'next_cursor': next_cursor}
+        logger.debug('Prepared meta object: %s', meta)
+        return {'meta': meta, 'data': rows}
+
+    def netsuite_items_page(self, cursor: str = None, per_page: int = 100) -> dict:
+        """Return the records of one page of internal_ids, grouped per internal_id as allNetsuiteItems does.
+
+        :param cursor: `next_cursor` of the previous page, None for the first page.
+        :type cursor: str
+
+        :param per_page: internal_ids to fetch in a page.
+        :type per_page: int
+
+        :returns: items along with meta object with the cursor of the next page.
+        :rtype: dict
+
+        :raises InvalidCursorException: Raised when the cursor can not be decoded.
+        """
+        logger.info('Fetching %s items page after cursor %s', self.get_table(), cursor)
+        items, next_cursor = get_grouped_page(self.get_table(), self.__keyset_columns__[0],
+                                              self.__keyset_columns__[1:], cursor, per_page)
+        meta = {'per_page': per_page, 'count': len(items), 'cursor': cursor, 'next_cursor': next_cursor}
+        logger.debug('Prepared meta object: %s', meta)
+        return {'meta': meta, 'data': items}
+
+    def export_ndjson(self, out, cursor: str = None) -> dict:
+        """Write every record, in keyset order, to `out` as newline delimited JSON.
+
+        :param out: binary file object, e.g. open(path, 'wb') or a BytesIO uploaded as a blob.
+
+        :param cursor: cursor returned by an interrupted export to resume it, None for a full export.
+        :type cursor: str
+
+        :returns: number of records written and the cursor of the last one.
+        :rtype: dict
+        """
+        logger.info('Exporting %s as ndjson', self.get_table())
+        count, last_cursor = export_ndjson(self.get_table(), self.__keyset_columns__, out, cursor)
+        return {'count': count, 'last_cursor': last_cursor}
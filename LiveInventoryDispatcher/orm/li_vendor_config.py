@@ -5,7 +5,7 @@ from LiveInventoryDispatcher.common_utils.db_queries import QUERY_UPDATE_BEARER_
 import logging
 from LiveInventoryDispatcher.config import Config
 
-li_db = DBEngineFactory.get_db_engine(Config.DB_CONFIG, DBEngineFactory.POSTGRES)
+li_db = DBEngineFactory.get_db_engine(Config.DB_CONFIG, DBEngineFactory.POSTGRES, **Config.DB_OPTIONS)
 
 # get the global reference og logger
 logger = logging
@@ -6,7 +6,7 @@ import logging
 from LiveInventoryDispatcher.utils.data_access_layer.sql_db import DBEngineFactory
 from LiveInventoryDispatcher.config import Config
 
-li_db = DBEngineFactory.get_db_engine(Config.DB_CONFIG, DBEngineFactory.POSTGRES)
+li_db = DBEngineFactory.get_db_engine(Config.DB_CONFIG, DBEngineFactory.POSTGRES, **Config.DB_OPTIONS)
 
 # get the logger instance
 logger = logging
@@ -3,36 +3,56 @@ import json
 import azure.functions as func
 import logging as logger
 
+from LiveInventoryExtractor.config import Config
+from LiveInventoryExtractor.common_utils.parallel import run_messages
+from LiveInventoryExtractor.common_utils.stage_spans import server_timing
+from LiveInventoryExtractor.utils.data_access_layer.sql_db.instrumentation import statement_metrics
 from LiveInventoryExtractor.extractor.json_extractor import JSONExtractor
 
+statement_metrics.configure(slow_query_ms=Config.SLOW_QUERY_MS)
+
+
+def extract_message(x: dict) -> dict:
+    """
+    Extract the fetcher file of one vendor message, runs in a pool process in `process` execution mode
+    """
+    logger.debug(
+        f"PROCESSING - Fetcher for vendor_id: {x.get('vendor_id')} and vendor_code(s): {x.get('item_codes')}")
+    json_extractor = JSONExtractor(vendor_id=x.get('vendor_id'),
+                                   config_file_path=x.get('config_file_path'),
+                                   fetcher_file_path=x.get('fetcher_file_path'),
+                                   item_codes=x.get('item_codes'),
+                                   vendor_codes_error_status=x.get('vendor_codes_error_status'),
+                                   vendor_codes_version=x.get('vendor_codes_version'),
+                                   cached_item_codes=x.get('cached_item_codes'),
+                                   extractor_write_path=x.get('extractor_write_path')).execute()
+    logger.debug(
+        f"SUCCESS - Reading and processing fetcher for vendor_id: {x.get('vendor_id')} and vendor_code(s): {x.get('item_codes')}")
+    return {
+        "vendor_id": x.get('vendor_id'),
+        "item_codes": x.get('item_codes'),
+        "extractor_file_path": json_extractor.meta['extractor_data_file_path'],
+        "stages": json_extractor.summary.get('stages')
+    }
+
 
 def main(req: func.HttpRequest) -> func.HttpResponse:
     logging.info('extractor function is called')
+    statement_metrics.reset()
     message = json.loads(str(req.get_body(), encoding='utf-8'))
     #  the message should be list of dictionary
     result = []
-    for index, x in enumerate(message):
-        try:
-            logger.debug(
-                f"PROCESSING - Fetcher for vendor_id: {x.get('vendor_id')} and vendor_code(s): {x.get('item_codes')}")
-            json_extractor = JSONExtractor(vendor_id=x.get('vendor_id'),
-                                           config_file_path=x.get('config_file_path'),
-                                           fetcher_file_path=x.get('fetcher_file_path'),
-                                           item_codes=x.get('item_codes'),
-                                           vendor_codes_error_status=x.get('vendor_codes_error_status'),
-                                           extractor_write_path=x.get('extractor_write_path')).execute()
-            logger.debug(
-                f"SUCCESS - Reading and processing fetcher for vendor_id: {x.get('vendor_id')} and vendor_code(s): {x.get('item_codes')}")
-            json_extractor = {
-                "vendor_id": x.get('vendor_id'),
-                "item_codes": x.get('item_codes'),
-                "extractor_file_path": json_extractor.meta['extractor_data_file_path']
-            }
-        except Exception as ex:
-            logger.error(f'error: {ex}', exc_info=True)
-            json_extractor = {}
-        result.append(json_extractor)
+    outcomes = run_messages(extract_message, message, mode=Config.EXECUTION_MODE,
+                            max_workers=Config.PARALLEL_MAX_WORKERS, timeout=Config.MESSAGE_TIMEOUT)
+    for x, outcome in zip(message, outcomes):
+        if outcome.error is not None:
+            logger.error(f"error: {outcome.error} for vendor_id: {x.get('vendor_id')}", exc_info=outcome.error)
+            result.append({})
+        else:
+            result.append(outcome.result)
+    statement_metrics.log_summary('extractor')
     if result:
-        return func.HttpResponse(str(message))
+        return func.HttpResponse(str(message),
+                                 headers={'Server-Timing': server_timing(x.get('stages') for x in result)})
     else:
         return func.HttpResponse("problem while extractor", status_code=200)
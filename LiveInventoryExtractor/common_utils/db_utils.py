@@ -1,12 +1,14 @@
 """ Collections of most common db queries"""
-from typing import Any, Dict, List, Tuple
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple
 from LiveInventoryExtractor.config import Config
 from LiveInventoryExtractor.utils.data_access_layer.sql_db import DBEngineFactory
-import logging
+from LiveInventoryExtractor.common_utils import json_codec
+from LiveInventoryExtractor.common_utils.log_utils import capped, get_logger
+import base64
 
-li_db = DBEngineFactory.get_db_engine(Config.DB_CONFIG, DBEngineFactory.POSTGRES)
-# get the logger instance
-logger = logging
+li_db = DBEngineFactory.get_db_engine(Config.DB_CONFIG, DBEngineFactory.POSTGRES, **Config.DB_OPTIONS)
+# get the logger instance, executed statements are logged cut at log_payload_max_chars
+logger = get_logger(__name__)
 
 
 def insert_data(table: str, insert_data: dict, include=None, returning: bool = True) -> dict:
@@ -38,7 +40,7 @@ def insert_data(table: str, insert_data: dict, include=None, returning: bool = T
     try:
         with li_db.transaction(auto_commit=True) as qryset:
             resultset = qryset.execute_query(sql, values)
-            logger.debug(f'Executed Non Query {qryset.query}')
+            logger.debug('Executed Non Query %s', capped(qryset.query))
             return resultset.to_list()
     except Exception as e:
         logger.error('Error in insert_data execution.', exc_info=True)
@@ -73,7 +75,7 @@ def update_data(table: str, update_data: dict, row_identifier: str, row_value: A
     try:
         with li_db.transaction(auto_commit=True) as qryset:
             qryset.execute_non_query(sql, update_data)
-            logger.debug(f'Executed non Query {qryset.query}')
+            logger.debug('Executed non Query %s', capped(qryset.query))
     except Exception as e:
         logger.error('Error in update_data execution.', exc_info=True)
         raise e
@@ -99,7 +101,7 @@ def delete_rows(table: str, row_identifier: str, row_value: Any) -> None:
     try:
         with li_db.transaction(auto_commit=True) as qryset:
             qryset.execute_non_query(sql, delete_data)
-            logger.debug(f'Executed non Query {qryset.query}')
+            logger.debug('Executed non Query %s', capped(qryset.query))
     except Exception as e:
         logger.error('Error in delete_rows execution.', exc_info=True)
         raise e
@@ -125,8 +127,9 @@ def get_all(table: str, current_page: int, per_page: int) -> List[Dict[str, Any]
     sql = generate_get_all_sql(table, current_page, per_page)
     try:
         with li_db.transaction(auto_commit=True) as qryset:
-            resultset = qryset.execute_query(sql)
-            logger.debug(f'Executed Query {qryset.query}')
+            # rows are streamed from a server-side cursor, the page never sits twice in memory
+            resultset = qryset.stream_query(sql)
+            logger.debug('Executed Query %s', capped(qryset.query))
             return resultset.to_list()
     except Exception as e:
         logger.error('Error in get_all execution.', exc_info=True)
@@ -154,7 +157,7 @@ def get_one(table: str, row_value: Any, row_identifier: str) -> dict:
     try:
         with li_db.transaction(auto_commit=True) as qryset:
             resultset = qryset.execute_query(sql, (row_value,))
-            logger.debug(f'Executed Query {qryset.query}')
+            logger.debug('Executed Query %s', capped(qryset.query))
             return resultset.to_list()
     except Exception as e:
         logger.error('Error in get_one execution.', exc_info=True)
@@ -199,7 +202,7 @@ def generate_insert_sql(table: str, insert_data: dict, include, returning) -> st
         logger.debug('Returning param is set to False. Preparing INSERT without returning.')
         sql = ('INSERT INTO %s ( %s ) VALUES ( %s )' % (table, columns, placeholders))  # noqa: S608
 
-    logger.info(f'Generated SQL statement {sql}')
+    logger.info('Generated SQL statement %s', capped(sql))
     return sql
 
 
@@ -225,7 +228,7 @@ def generate_update_sql(table: str, update_data: dict, row_identifier: str) -> s
     set_placeholders = ', '.join([f'{key}=%({key})s' for key in update_data.keys()])
     where_clause = f' {row_identifier} =%({row_identifier})s'
     sql = 'UPDATE %s SET %s WHERE%s' % (table, set_placeholders, where_clause)  # noqa: S608
-    logger.info(f'Generated SQL statement {sql}')
+    logger.info('Generated SQL statement %s', capped(sql))
     return sql
 
 
@@ -237,13 +240,14 @@ def generate_bulk_update_sql(table: str, data: List, row_identifier: str) -> str
         :type update_data: dict
         :params row_identifier:where clause filter column name.
         :type row_identifier: str
-        :returns: Generated SQL Query string.
+        :returns: Generated SQL Query string, to be executed with `data` as parameters.
         :rtype: str
         """
-    logger.info('Generating SQL statement for bulk data update.')
+    logger.debug('Generating SQL statement for bulk data update.')
 
+    # values are bound as array parameters, the statement text does not grow with the batch
     set_placeholders = ', '.join([f'{key}=c2.{key}' for key in data.keys() if key not in row_identifier.split(',')])
-    select_placeholders = ', '.join([f'unnest(array{v}) as {k}' for k, v in data.items()])
+    select_placeholders = ', '.join([f'unnest(%({k})s) as {k}' for k in data.keys()])
     where_clause = " and ".join(f"c2.{val}=c1.{val}" for val in row_identifier.split(','))
 
     sql = """
@@ -252,10 +256,83 @@ def generate_bulk_update_sql(table: str, data: List, row_identifier: str) -> str
         from (select %s) as c2
         where %s;
     """ % (table, set_placeholders, select_placeholders, where_clause)
-    logger.info(f'Generated SQL statement {sql}')
+    logger.debug('Generated SQL statement %s', sql)
     return sql
 
 
+# batches bigger than this are staged with COPY in a temp table instead of array parameters
+BULK_UPDATE_COPY_THRESHOLD = 5000
+
+
+def bulk_update_by_keys(table: str, key_columns: Dict[str, str], set_columns: Dict[str, str], rows: List[tuple],
+                        set_expressions: Dict[str, str] = None, returning: List[str] = None) -> List[Dict[str, Any]]:
+    """Update many rows of a table in one set based statement joined on key columns.
+
+    Values are sent as typed array parameters unnested on the server, or for batches above
+    BULK_UPDATE_COPY_THRESHOLD are COPY-ed into a temp table first. Either way the join with
+    the target table happens in SQL and the statement text only depends on the columns.
+
+        eg::
+            UPDATE vendor_codes AS c1 SET error = c2.error, last_fetch_date = NOW()
+            FROM unnest(%s::int[], %s::text[], %s::boolean[]) AS c2 (vendor_id, vendor_code, error)
+            WHERE c1.vendor_id = c2.vendor_id AND c1.vendor_code = c2.vendor_code
+
+    :params table: table to update.
+    :type table: str
+
+    :params key_columns: join columns and their postgres type e.g:: {'vendor_id': 'int'}
+    :type key_columns: dict
+
+    :params set_columns: columns to update and their postgres type e.g:: {'error': 'boolean'}
+    :type set_columns: dict
+
+    :params rows: row values ordered as key_columns followed by set_columns.
+    :type rows: list
+
+    :params set_expressions: extra columns set to sql expressions e.g:: {'last_fetch_date': 'NOW()'}
+    :type set_expressions: dict
+
+    :params returning: columns of the updated rows to return.
+    :type returning: list
+
+    :returns: updated rows with the returning columns.
+    :rtype: list
+
+    :raises Exception: Raised when error occurs in update transaction.
+    """
+    if not rows:
+        return []
+
+    columns = list(key_columns) + list(set_columns)
+    types = {**key_columns, **set_columns}
+    assignments = [f'{column} = c2.{column}' for column in set_columns]
+    assignments += [f'{column} = {expression}' for column, expression in (set_expressions or {}).items()]
+    join = ' AND '.join(f'c1.{column} = c2.{column}' for column in key_columns)
+    returning_clause = ' RETURNING ' + ', '.join(f'c1.{column}' for column in returning) if returning else ''
+
+    try:
+        with li_db.transaction(auto_commit=True) as qryset:
+            if len(rows) > BULK_UPDATE_COPY_THRESHOLD:
+                staging = 'li_bulk_update_staging'
+                qryset.execute_non_query(
+                    f'CREATE TEMP TABLE {staging} ({", ".join(f"{c} {types[c]}" for c in columns)}) ON COMMIT DROP')
+                qryset.copy_rows(staging, columns, rows)
+                source = staging
+                params = None
+            else:
+                source = (f'unnest({", ".join(f"%s::{types[c]}[]" for c in columns)}) '
+                          f'AS c2_values ({", ".join(columns)})')
+                params = [list(values) for values in zip(*rows)]
+            sql = (f'UPDATE {table} AS c1 SET {", ".join(assignments)} '  # noqa: S608
+                   f'FROM (SELECT * FROM {source}) AS c2 WHERE {join}{returning_clause}')
+            resultset = qryset.execute_query(sql, params)
+            logger.debug('Executed Query %s', capped(qryset.query))
+            return resultset.to_list() if returning else []
+    except Exception as e:
+        logger.error('Error in bulk_update_by_keys execution.', exc_info=True)
+        raise e
+
+
 def generate_delete_sql(table: str, row_identifier: str) -> str:
     """Prepare delete SQL statement for given table with row indentifier as
         where clause.
@@ -274,7 +351,7 @@ def generate_delete_sql(table: str, row_identifier: str) -> str:
         """
     logger.info('Generating SQL statement for data deletion.')
     sql = f'DELETE FROM {table} WHERE {row_identifier} = %({row_identifier})s;'  # noqa: S608
-    logger.info(f'Generated SQL statement {sql}')
+    logger.info('Generated SQL statement %s', capped(sql))
     return sql
 
 
@@ -295,7 +372,7 @@ def generate_get_one_sql(table: str, row_identifier: str) -> str:
         """
     logger.info('Generating SQL statement getting one data point.')
     sql = f'SELECT * FROM {table} WHERE {row_identifier} = %s;'  # noqa: S608
-    logger.info(f'Generated SQL statement {sql}')
+    logger.info('Generated SQL statement %s', capped(sql))
     return sql
 
 
@@ -324,7 +401,7 @@ def generate_get_all_sql(table, current_page, per_page):
     else:
         sql = f'SELECT * FROM {table} OFFSET {current_page} LIMIT {per_page};'  # noqa: S608
 
-    logger.info(f'Generated SQL statement {sql}')
+    logger.info('Generated SQL statement %s', capped(sql))
     return sql
 
 
@@ -338,10 +415,10 @@ def execute_sql_query(query, params):
     try:
         with li_db.transaction() as query_set:
             query_set.execute_query(query, params)
-            logger.info(f'Executed Query {query_set.query}')
+            logger.debug('Executed Query %s', capped(query_set.query))
 
     except Exception as e:
-        logger.error(f'Error while executing {query_set.query}', exc_info=True)
+        logger.error('Error while executing %s', query_set.query, exc_info=True)
         raise e
 
 
@@ -355,10 +432,10 @@ def execute_sql_non_query(query, params=None):
     try:
         with li_db.transaction(auto_commit=True) as query_set:
             query_set.execute_query(query, params)
-            logger.info(f'Executed Query {query_set.query}')
+            logger.debug('Executed Query %s', capped(query_set.query))
 
     except Exception as e:
-        logger.error(f'Error while executing {query_set.query}', exc_info=True)
+        logger.error('Error while executing %s', query_set.query, exc_info=True)
         raise e
     raise NotImplementedError
 
@@ -392,7 +469,7 @@ def upsert_data(table: str, insert_data: dict, include=None, returning: bool = T
     try:
         with li_db.transaction(auto_commit=True) as qryset:
             qryset.execute_non_query(sql, values)
-            logger.info(f'Executed Query {qryset.query}')
+            logger.debug('Executed Query %s', capped(qryset.query))
             # return resultset
     except Exception as e:
         logger.info(e)
@@ -436,29 +513,26 @@ def upsert_bulk_data(table: str, insert_data: list, include=None, returning: boo
 
     CHUNK_SIZE = 200
     split_body = chunks(insert_data, CHUNK_SIZE)
+    # generated statements by (columns, chunk width), reused for every chunk of the same shape:
+    # full chunks share one statement, the last chunk adds at most one more
+    statements = {}
 
     try:
         for items in split_body:
-            sql, cols = generate_bulk_upsert_sql(table, items, include, returning, conflict_fields)
-
-            value_list = []
-            cols = cols.split(', ')
-
-            ### For some xml vendors the keys of objects in an array are not in same order 
-            ### to that of columns set in insert statement. So, sorting their orders
-            for data in items:
-                value = []
-                for val in cols:
-                    value.append(data.get(val))
-                value_list.append(value)
-
             try:
                 with li_db.transaction(auto_commit=True) as qryset:
-                    # qryset.execute_non_query(sql, values)
-                    tuples = tuple(tuple(x) for x in value_list)
-                    qryset.execute_non_query(sql, tuples)
-                    logger.info(f'Executed Query {qryset.query}')
-                    # return resultset
+                    shape = (tuple(sorted(items[0].keys())), len(items))
+                    if shape not in statements:
+                        statements[shape] = generate_bulk_upsert_sql(table, items, include, returning,
+                                                                     conflict_fields)
+                    sql, cols = statements[shape]
+                    cols = cols.split(', ')
+
+                    ### For some xml vendors the keys of objects in an array are not in same order
+                    ### to that of columns set in insert statement. So, values are taken in column order
+                    values = [data.get(col) for data in items for col in cols]
+                    qryset.execute_non_query(sql, values)
+                    logger.debug('Executed Query %s', capped(qryset.query))
             except Exception as e:
                 logger.info(e)
                 logger.error('Error in upsert_data execution.', exc_info=True)
@@ -514,7 +588,7 @@ def generate_upsert_sql(table: str, insert_data: dict, include, returning) -> st
         logger.debug('Returning param is set to False. Preparing INSERT without returning.')
         sql = ('INSERT INTO %s ( %s ) VALUES ( %s )' % (table, columns, placeholders))  # noqa: S608
 
-    logger.info(f'Generated SQL statement {sql}')
+    logger.info('Generated SQL statement %s', capped(sql))
     return sql
 
 
@@ -543,9 +617,13 @@ def generate_bulk_upsert_sql(table: str, insert_data: list, include, returning,
         :returns: Generated SQL Query string and columns.
         :rtype: Tuple[str, str]
         """
-    logger.info('Generating SQL statement for data upsert.')
-    placeholders = ', '.join(['%s'] * len(insert_data))
-    columns = ', '.join(insert_data[0].keys())
+    logger.debug('Generating SQL statement for data upsert.')
+    # columns are sorted and every value gets its own placeholder, so that batches of the
+    # same width always produce the same statement text and can run prepared
+    column_names = sorted(insert_data[0].keys())
+    row_placeholder = '(' + ', '.join(['%s'] * len(column_names)) + ')'
+    placeholders = ', '.join([row_placeholder] * len(insert_data))
+    columns = ', '.join(column_names)
 
     try:
         if returning:
@@ -559,7 +637,7 @@ def generate_bulk_upsert_sql(table: str, insert_data: list, include, returning,
                     pre_res = [f'{keys} = EXCLUDED.' + keys for keys in returnset if keys != 'internal_id']
                 else:
                     pre_res = [f'{keys} = EXCLUDED.' + keys for keys in returnset]
-                returning_cols = ', '.join(set(pre_res))
+                returning_cols = ', '.join(sorted(set(pre_res)))
             else:
                 returning_cols = columns
 
@@ -569,13 +647,13 @@ def generate_bulk_upsert_sql(table: str, insert_data: list, include, returning,
 
         else:
             logger.debug('Returning param is set to False. Preparing INSERT without returning.')
-            sql = ('INSERT INTO %s ( %s ) VALUES ( %s )' % (table, columns, placeholders))  # noqa: S608
+            sql = ('INSERT INTO %s ( %s ) VALUES %s' % (table, columns, placeholders))  # noqa: S608
 
     except Exception as e:
         logger.error("Couldnot create statement for bulk upsert", exc_info=True)
         logger.error(e, exc_info=True)
 
-    logger.info(f'Generated SQL statement {sql}')
+    logger.debug('Generated SQL statement %s', sql)
     return sql, columns
 
     # logger.info('Generating SQL statement for data upsert.') if isinstance(insert_data, list): sql = ('INSERT INTO
@@ -619,7 +697,7 @@ def generate_get_all_internal_id_sql(table, current_page, per_page):
     else:
         sql = f'SELECT json_build_object({table}.internal_id, json_agg({table}. *)) FROM {table} group by {table}.internal_id OFFSET {current_page} LIMIT {per_page};'  # noqa: S608
 
-    logger.info(f'Generated SQL statement {sql}')
+    logger.info('Generated SQL statement %s', capped(sql))
     return sql
 
 
@@ -645,18 +723,276 @@ def get_all_netsuite_items(table: str, current_page: int, per_page: int) -> List
 
     try:
         with li_db.transaction(auto_commit=True) as qryset:
-            resultset = qryset.execute_query(sql)
-            logger.debug(f'Executed Query {qryset.query}')
-            return_set = resultset.to_list()
-            returnList = []
-            for items in return_set:
-                returnList.append(items.get('json_build_object'))
-            return returnList
+            resultset = qryset.stream_query(sql)
+            logger.debug('Executed Query %s', capped(qryset.query))
+            return resultset.to_columns().get('json_build_object', [])
     except Exception as e:
         logger.error('Error in get_all execution.', exc_info=True)
         raise e
 
 
+class InvalidCursorException(Exception):
+    pass
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Opaque pagination cursor pointing after the row with the given keyset values.
+
+    :params values: keyset values of the last row of a page, in the order of the listing's key columns
+    :type values: sequence
+
+    :returns: url safe token
+    :rtype: str
+    """
+    return base64.urlsafe_b64encode(json_codec.dumps(list(values))).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str], width: int) -> Optional[tuple]:
+    """Keyset values of a cursor returned by encode_cursor, None for the first page.
+
+    :params cursor: token handed out with the previous page
+    :type cursor: str
+
+    :params width: number of keyset values the listing expects
+    :type width: int
+
+    :raises InvalidCursorException: Raised when the token is malformed or belongs to another listing.
+    """
+    if not cursor:
+        return None
+    try:
+        values = json_codec.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except Exception as ex:
+        raise InvalidCursorException(f"Malformed cursor: {ex}")
+    if not isinstance(values, list) or len(values) != width:
+        raise InvalidCursorException("Cursor does not belong to this listing")
+    return tuple(values)
+
+
+def generate_keyset_sql(table: str, key_columns: Sequence[str], after: Optional[tuple],
+                        limit: Optional[int]) -> Tuple[str, list]:
+    """Prepare SELECT * ordered by the key columns, starting after the given keyset values.
+
+    Rows with a NULL key column are not part of the listing, a row value comparison can not place them.
+
+        eg::
+            `SELECT * FROM <table> WHERE internal_id IS NOT NULL AND vendor_id IS NOT NULL
+             AND vendor_code IS NOT NULL AND (internal_id, vendor_id, vendor_code) > (%s, %s, %s)
+             ORDER BY internal_id, vendor_id, vendor_code LIMIT %s`
+
+        :params table: table to fetch rows.
+        :type table: str
+
+        :params key_columns: columns ordering the listing, together unique in the table
+        :type key_columns: sequence
+
+        :param after: keyset values of the last row already read, None to start at the beginning
+        :type after: tuple
+
+        :param limit: rows to read, None for all of them
+        :type limit: int
+
+        :returns: Generated SQL Query string and its parameters.
+        :rtype: Tuple[str, list]
+        """
+    keys = ', '.join(key_columns)
+    not_null = ' AND '.join(f'{column} IS NOT NULL' for column in key_columns)
+    sql = f'SELECT * FROM {table} WHERE {not_null}'  # noqa: S608
+    params = []
+    if after is not None:
+        sql += f' AND ({keys}) > ({", ".join(["%s"] * len(key_columns))})'
+        params.extend(after)
+    sql += f' ORDER BY {keys}'
+    if limit is not None:
+        sql += ' LIMIT %s'
+        params.append(limit)
+    logger.info('Generated SQL statement %s', capped(sql))
+    return sql, params
+
+
+def iter_keyset_rows(table: str, key_columns: Sequence[str], after: Optional[tuple] = None,
+                     limit: Optional[int] = None, itersize: int = 2000) -> Iterator[Dict[str, Any]]:
+    """Stream rows in keyset order from a server-side cursor, `itersize` rows per round trip.
+
+    The transaction stays open until the generator is exhausted or closed.
+
+    :params table: table to fetch rows.
+    :type table: str
+
+    :params key_columns: columns ordering the listing, see generate_keyset_sql
+    :type key_columns: sequence
+
+    :param after: keyset values of the last row already read, None to start at the beginning
+    :type after: tuple
+
+    :param limit: rows to read, None for all of them
+    :type limit: int
+
+    :yields: row as dict
+    """
+    sql, params = generate_keyset_sql(table, key_columns, after, limit)
+    try:
+        with li_db.transaction(auto_commit=True) as qryset:
+            resultset = qryset.stream_query(sql, params, itersize=itersize)
+            logger.debug('Executed Query %s', capped(qryset.query))
+            yield from resultset.iter_rows()
+    except Exception as e:
+        logger.error('Error in iter_keyset_rows execution.', exc_info=True)
+        raise e
+
+
+def get_keyset_page(table: str, key_columns: Sequence[str], cursor: Optional[str],
+                    per_page: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Return one page of rows in keyset order and the cursor of the next page.
+
+    :params table: table to fetch rows.
+    :type table: str
+
+    :params key_columns: columns ordering the listing, see generate_keyset_sql
+    :type key_columns: sequence
+
+    :param cursor: cursor of the page, None for the first one
+    :type cursor: str
+
+    :param per_page: total number of records to fetch in a page.
+    :type per_page: int
+
+    :returns: rows and the cursor of the next page, None on the last page
+    :rtype: tuple
+
+    :raises InvalidCursorException: Raised when the cursor can not be decoded.
+    """
+    after = decode_cursor(cursor, width=len(key_columns))
+    # one row more than asked for tells whether there is a next page, errors are logged by iter_keyset_rows
+    rows = list(iter_keyset_rows(table, key_columns, after, per_page + 1, itersize=per_page + 1))
+    if len(rows) <= per_page:
+        return rows, None
+    rows = rows[:per_page]
+    return rows, encode_cursor([rows[-1][column] for column in key_columns])
+
+
+def generate_grouped_keyset_sql(table: str, group_column: str, order_columns: Sequence[str],
+                                after: Optional[tuple], limit: int) -> Tuple[str, list]:
+    """Prepare the rows of the next `limit` values of group_column, aggregated per value.
+
+    Only the page's values are grouped, unlike generate_get_all_internal_id_sql which
+    aggregates the whole table before applying OFFSET.
+
+        eg::
+            `WITH page AS (SELECT DISTINCT internal_id FROM <table> WHERE internal_id IS NOT NULL
+             AND internal_id > %s ORDER BY internal_id LIMIT %s)
+             SELECT t.internal_id, json_build_object(t.internal_id, json_agg(t.* ORDER BY t.vendor_id, t.vendor_code))
+             FROM <table> t JOIN page USING (internal_id) GROUP BY t.internal_id ORDER BY t.internal_id`
+
+        :params table: table to fetch rows.
+        :type table: str
+
+        :params group_column: column the rows are grouped by, the listing is ordered by it
+        :type group_column: str
+
+        :params order_columns: columns ordering the rows within a group
+        :type order_columns: sequence
+
+        :param after: (value, ) of the last group already read, None to start at the beginning
+        :type after: tuple
+
+        :param limit: groups per page
+        :type limit: int
+
+        :returns: Generated SQL Query string and its parameters.
+        :rtype: Tuple[str, list]
+        """
+    params = []
+    where = f'WHERE {group_column} IS NOT NULL'
+    if after is not None:
+        where += f' AND {group_column} > %s'
+        params.append(after[0])
+    params.append(limit)
+    order = ', '.join(f't.{column}' for column in order_columns)
+    sql = (f'WITH page AS (SELECT DISTINCT {group_column} FROM {table} {where} ORDER BY {group_column} LIMIT %s) '
+           f'SELECT t.{group_column}, json_build_object(t.{group_column}, json_agg(t.* ORDER BY {order})) '
+           f'FROM {table} t JOIN page USING ({group_column}) GROUP BY t.{group_column} '
+           f'ORDER BY t.{group_column}')  # noqa: S608
+    logger.info('Generated SQL statement %s', capped(sql))
+    return sql, params
+
+
+def get_grouped_page(table: str, group_column: str, order_columns: Sequence[str], cursor: Optional[str],
+                     per_page: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Return the rows of one page of group_column values, as {value: [rows]}, and the cursor of the next page.
+
+    :params table: table to fetch rows.
+    :type table: str
+
+    :params group_column: column the rows are grouped by, see generate_grouped_keyset_sql
+    :type group_column: str
+
+    :params order_columns: columns ordering the rows within a group
+    :type order_columns: sequence
+
+    :param cursor: cursor of the page, None for the first one
+    :type cursor: str
+
+    :param per_page: groups per page.
+    :type per_page: int
+
+    :returns: list of {value: [rows]} and the cursor of the next page, None on the last page
+    :rtype: tuple
+
+    :raises InvalidCursorException: Raised when the cursor can not be decoded.
+    """
+    sql, params = generate_grouped_keyset_sql(table, group_column, order_columns, decode_cursor(cursor, width=1),
+                                              per_page + 1)
+    try:
+        with li_db.transaction(auto_commit=True) as qryset:
+            resultset = qryset.stream_query(sql, params, itersize=per_page + 1)
+            logger.debug('Executed Query %s', capped(qryset.query))
+            rows = resultset.to_tuples()
+    except Exception as e:
+        logger.error('Error in get_grouped_page execution.', exc_info=True)
+        raise e
+    next_cursor = encode_cursor([rows[per_page - 1][0]]) if len(rows) > per_page else None
+    return [items for _, items in rows[:per_page]], next_cursor
+
+
+def export_ndjson(table: str, key_columns: Sequence[str], out: BinaryIO, cursor: Optional[str] = None,
+                  itersize: int = 5000) -> Tuple[int, Optional[str]]:
+    """Write every row after the cursor to `out` as newline delimited JSON, in keyset order.
+
+    Rows are streamed from a server-side cursor, memory use does not grow with the table.
+    An interrupted export is resumed with the cursor of the last row written.
+
+    :params table: table to export.
+    :type table: str
+
+    :params key_columns: columns ordering the export, see generate_keyset_sql
+    :type key_columns: sequence
+
+    :params out: binary file object to write to
+    :type out: BinaryIO
+
+    :param cursor: cursor to resume from, None for a full export
+    :type cursor: str
+
+    :returns: number of rows written and the cursor of the last one
+    :rtype: tuple
+    """
+    count = 0
+    last = None
+    try:
+        for row in iter_keyset_rows(table, key_columns, decode_cursor(cursor, width=len(key_columns)),
+                                    itersize=itersize):
+            out.write(json_codec.dumps(row))
+            out.write(b'\n')
+            count += 1
+            last = row
+    except Exception as e:
+        logger.error('Error in export_ndjson execution after %s rows.', count, exc_info=True)
+        raise e
+    logger.info('Exported %s rows of %s', count, table)
+    return count, encode_cursor([last[column] for column in key_columns]) if last is not None else cursor
+
+
 def generate_sql_get_disabled_vendors(**kwargs):
     """
     This function generates the sql query from given keyword arguments
@@ -0,0 +1,248 @@
+"""
+this module runs the vendor messages of one function invocation, one after the other or concurrently
+
+Execution modes:
+    sequential - messages are handled in order in the calling thread (default)
+    thread     - a thread pool, for I/O bound handlers (e.g. the dispatcher)
+    process    - a process pool, for CPU bound handlers (e.g. the extractor)
+
+Every message is isolated: a failing or timed out message is reported in its own outcome
+and never affects the others. The outcomes come back in the order of the messages.
+
+Pools are created once per process and reused by every invocation, so that pool threads keep
+their (kept alive) database connections instead of leaving them behind with a discarded pool.
+
+A message times out `timeout` seconds after a worker picked it up. A running message can not
+be interrupted, it is flagged instead: handlers call raise_if_timed_out() between their stages
+and before they write, which stops a flagged message with MessageTimeoutException.
+"""
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, MutableMapping, NamedTuple, Optional, Tuple
+import itertools
+import logging as logger
+import multiprocessing
+import threading
+import time
+
+from LiveInventoryExtractor.utils.data_access_layer.sql_db.instrumentation import statement_metrics
+
+EXECUTION_MODE_SEQUENTIAL = "sequential"
+EXECUTION_MODE_THREAD = "thread"
+EXECUTION_MODE_PROCESS = "process"
+
+EXECUTION_MODES = (EXECUTION_MODE_SEQUENTIAL, EXECUTION_MODE_THREAD, EXECUTION_MODE_PROCESS)
+
+# how often running messages are checked against the timeout
+POLL_SECONDS = 0.5
+
+
+class MessageTimeoutException(Exception):
+    pass
+
+
+class MessageOutcome(NamedTuple):
+    """
+    result of handling one message, `error` is set when the handler failed or timed out
+    """
+    result: Any = None
+    error: Optional[BaseException] = None
+    elapsed_ms: float = 0.0
+
+
+class _Pool(NamedTuple):
+    """
+    a reused pool, with the pickup times and timed out flags of its messages by token
+    (manager dicts shared with the pool processes in `process` mode)
+    """
+    executor: Any
+    started: MutableMapping[int, float]
+    timed_out: MutableMapping[int, bool]
+    manager: Any = None
+
+
+_pools: Dict[Tuple[str, int], _Pool] = {}
+_pools_lock = threading.Lock()
+_tokens = itertools.count()
+# token of the message the current thread runs, and the timed out flags it is looked up in
+_current = threading.local()
+
+
+def _get_pool(mode: str, max_workers: int) -> _Pool:
+    with _pools_lock:
+        pool = _pools.get((mode, max_workers))
+        if pool is None:
+            if mode == EXECUTION_MODE_PROCESS:
+                # spawned, not forked: the parent holds database connections and background threads
+                context = multiprocessing.get_context('spawn')
+                manager = context.Manager()
+                pool = _Pool(ProcessPoolExecutor(max_workers=max_workers, mp_context=context),
+                             manager.dict(), manager.dict(), manager)
+            else:
+                pool = _Pool(ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='li-message'), {}, {})
+            _pools[(mode, max_workers)] = pool
+        return pool
+
+
+def _discard_pool(mode: str, max_workers: int) -> None:
+    """
+    forget a pool that can not run messages any more, e.g. after a pool process died
+    """
+    with _pools_lock:
+        pool = _pools.pop((mode, max_workers), None)
+    if pool is not None:
+        pool.executor.shutdown(wait=False, cancel_futures=True)
+        if pool.manager is not None:
+            pool.manager.shutdown()
+
+
+def shutdown_pools() -> None:
+    for mode, max_workers in list(_pools):
+        _discard_pool(mode, max_workers)
+
+
+def _run_message(handler: Callable[[Any], Any], message: Any, token: int, started: MutableMapping[int, float],
+                 timed_out: MutableMapping[int, bool], in_child: bool) -> Any:
+    """
+    runs in a pool worker, in a pool process the statement metrics of the process are sent back with the result
+    """
+    started[token] = time.time()
+    _current.token, _current.timed_out = token, timed_out
+    if in_child:
+        statement_metrics.reset()
+    try:
+        if in_child:
+            return handler(message), statement_metrics.export()
+        return handler(message)
+    finally:
+        _current.token = _current.timed_out = None
+        if in_child:
+            statement_metrics.reset()
+
+
+def raise_if_timed_out() -> None:
+    """
+    Stop the message of the calling thread once it ran past the message timeout
+
+    :raises MessageTimeoutException: Raised when the message was reported as timed out.
+    """
+    token = getattr(_current, 'token', None)
+    if token is not None and _current.timed_out.get(token):
+        raise MessageTimeoutException(f"message {token} timed out, stopped before its next step")
+
+
+def _run_sequential(handler: Callable[[Any], Any], messages: List[Any],
+                    timeout: Optional[float]) -> List[MessageOutcome]:
+    outcomes = []
+    for message in messages:
+        start = time.monotonic()
+        try:
+            result = handler(message)
+            outcome = MessageOutcome(result=result)
+        except Exception as ex:
+            outcome = MessageOutcome(error=ex)
+        elapsed = time.monotonic() - start
+        if timeout and elapsed > timeout:
+            # a message can not be interrupted in the calling thread, it is only reported
+            logger.warning(f"message took {elapsed:.1f}s, longer than the message timeout of {timeout}s")
+        outcomes.append(outcome._replace(elapsed_ms=elapsed * 1000))
+    return outcomes
+
+
+def run_messages(handler: Callable[[Any], Any], messages: List[Any], mode: str = EXECUTION_MODE_SEQUENTIAL,
+                 max_workers: Optional[int] = None, timeout: Optional[float] = None) -> List[MessageOutcome]:
+    """
+    Handle every message with `handler` in the given execution mode
+
+    :param handler: function handling one message, must be a module level function in `process` mode
+    :type handler: callable
+
+    :param messages: messages to handle
+    :type messages: list
+
+    :param mode: one of `EXECUTION_MODES`
+    :type mode: str
+
+    :param max_workers: size of the pool, ignored in `sequential` mode
+    :type max_workers: int, optional
+
+    :param timeout: seconds a message may run, counted from when a worker picks it up. A message
+                    running longer is reported as failed with `MessageTimeoutException` and flagged,
+                    it stops at its next raise_if_timed_out() and its result is discarded.
+    :type timeout: float, optional
+
+    :return: one outcome per message, in the order of the messages
+    :rtype: list of MessageOutcome
+    """
+    if mode not in EXECUTION_MODES:
+        raise ValueError(f"Unknown execution mode {mode!r}, expected one of {EXECUTION_MODES}")
+    if mode == EXECUTION_MODE_SEQUENTIAL or len(messages) <= 1:
+        return _run_sequential(handler, messages, timeout)
+
+    max_workers = max(1, max_workers or len(messages))
+    pool = _get_pool(mode, max_workers)
+    in_child = mode == EXECUTION_MODE_PROCESS
+    submitted = time.time()
+    token_of: Dict[Future, int] = {}
+    for message in messages:
+        token = next(_tokens)
+        future = pool.executor.submit(_run_message, handler, message, token, pool.started, pool.timed_out, in_child)
+        token_of[future] = token
+
+    index_of: Dict[Future, int] = {future: index for index, future in enumerate(token_of)}
+    picked_up: Dict[Future, float] = {}
+    outcomes: List[Optional[MessageOutcome]] = [None] * len(messages)
+    pending = set(token_of)
+    broken = False
+    try:
+        while pending:
+            done, _ = wait(pending, timeout=POLL_SECONDS, return_when=FIRST_COMPLETED)
+            now = time.time()
+            for future in done:
+                pending.discard(future)
+                token = token_of[future]
+                elapsed_ms = (now - pool.started.pop(token, picked_up.get(future, submitted))) * 1000
+                try:
+                    result = future.result()
+                    if in_child:
+                        result, exported_metrics = result
+                        statement_metrics.merge(exported_metrics)
+                    outcomes[index_of[future]] = MessageOutcome(result=result, elapsed_ms=elapsed_ms)
+                except Exception as ex:
+                    broken = broken or isinstance(ex, BrokenProcessPool)
+                    outcomes[index_of[future]] = MessageOutcome(error=ex, elapsed_ms=elapsed_ms)
+
+            for future in list(pending):
+                if future not in picked_up:
+                    started = pool.started.get(token_of[future])
+                    if started is None:
+                        continue
+                    picked_up[future] = started
+                if timeout and now - picked_up[future] > timeout:
+                    pending.discard(future)
+                    _flag_timed_out(pool, future, token_of[future])
+                    outcomes[index_of[future]] = MessageOutcome(
+                        error=MessageTimeoutException(f"message {index_of[future]} timed out after {timeout}s"),
+                        elapsed_ms=(now - picked_up[future]) * 1000)
+    finally:
+        # left only when interrupted: queued messages are dropped, running ones flagged
+        for future in pending:
+            if not future.cancel():
+                _flag_timed_out(pool, future, token_of[future])
+        if broken:
+            _discard_pool(mode, max_workers)
+    return outcomes
+
+
+def _flag_timed_out(pool: _Pool, future: Future, token: int) -> None:
+    pool.timed_out[token] = True
+
+    def forget(_: Future) -> None:
+        try:
+            pool.timed_out.pop(token, None)
+            pool.started.pop(token, None)
+        except Exception:
+            # the manager of a discarded pool is gone
+            pass
+
+    future.add_done_callback(forget)
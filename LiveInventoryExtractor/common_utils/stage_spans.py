@@ -0,0 +1,151 @@
+"""
+Timing spans for the stage methods of Base (fetch_config, fetch_vendor_data, transform_data,
+load_data, dispatch, write).
+
+Each span records the wall time, the CPU time of the process, the bytes the stage read
+(vendor responses, config templates, input artifacts) and wrote (artifacts), and
+optionally the tracemalloc peak above what was allocated when the stage started. The
+spans of one object end up in its `summary['stages']`, are logged as one structured
+record per stage and are reported in the `Server-Timing` header of the function response.
+
+tracemalloc is process wide: when it is enabled (`stage_span_tracemalloc`) and vendor
+messages run in a thread pool, a peak covers whatever else ran at the same time.
+"""
+from contextlib import contextmanager
+from threading import Lock
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import logging
+import time
+import tracemalloc
+
+logger = logging
+
+
+class StageSpan:
+    """
+    measurements of one stage method
+    """
+    __slots__ = ('stage', 'wall_ms', 'cpu_ms', 'bytes_in', 'bytes_out', 'tracemalloc_peak_kb', 'error')
+
+    def __init__(self, stage: str) -> None:
+        self.stage = stage
+        self.wall_ms = 0.0
+        self.cpu_ms = 0.0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.tracemalloc_peak_kb = None
+        self.error = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        record = {'wall_ms': round(self.wall_ms, 3), 'cpu_ms': round(self.cpu_ms, 3),
+                  'bytes_in': self.bytes_in, 'bytes_out': self.bytes_out}
+        if self.tracemalloc_peak_kb is not None:
+            record['tracemalloc_peak_kb'] = self.tracemalloc_peak_kb
+        if self.error is not None:
+            record['error'] = self.error
+        return record
+
+
+class StageRecorder:
+    """
+    spans of the stages run by one fetcher, extractor or dispatcher
+
+    :param object_type: FETCHER, EXTRACTOR or DISPATCHER, used in the log records
+    :type object_type: str
+    :param vendor_id: vendor the object works for
+    :param trace_memory: record the tracemalloc peak of each stage
+    :type trace_memory: bool
+    """
+
+    def __init__(self, object_type: str, vendor_id: Any = None, trace_memory: bool = False) -> None:
+        self.object_type = object_type
+        self.vendor_id = vendor_id
+        self.trace_memory = trace_memory
+        self.spans: List[StageSpan] = []
+        # bytes are counted from the stage's own worker threads too (paginated fetches)
+        self._lock = Lock()
+        self._open: Optional[StageSpan] = None
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[StageSpan]:
+        """
+        time the body of the with block as `stage`, spans do not nest: an inner span
+        of the same recorder is folded into the outer one
+        """
+        if self._open is not None:
+            yield self._open
+            return
+
+        span = StageSpan(stage)
+        traced_start = 0
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            traced_start = tracemalloc.get_traced_memory()[0]
+        self._open = span
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield span
+        except Exception as ex:
+            span.error = type(ex).__name__
+            raise
+        finally:
+            span.wall_ms = (time.perf_counter() - wall_start) * 1000
+            span.cpu_ms = (time.process_time() - cpu_start) * 1000
+            if self.trace_memory:
+                span.tracemalloc_peak_kb = round((tracemalloc.get_traced_memory()[1] - traced_start) / 1024, 1)
+            self._open = None
+            self.spans.append(span)
+            self._log(span)
+
+    def add_bytes_in(self, size: Optional[int]) -> None:
+        if self._open is not None and size:
+            with self._lock:
+                self._open.bytes_in += size
+
+    def add_bytes_out(self, size: Optional[int]) -> None:
+        if self._open is not None and size:
+            with self._lock:
+                self._open.bytes_out += size
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        """
+        stage -> measurements, a stage run twice is reported under `<stage>#2`
+        """
+        stages = {}
+        for span in self.spans:
+            key = span.stage
+            run = 2
+            while key in stages:
+                key = f"{span.stage}#{run}"
+                run += 1
+            stages[key] = span.as_dict()
+        return stages
+
+    def _log(self, span: StageSpan) -> None:
+        record = {'object_type': self.object_type, 'vendor_id': self.vendor_id, 'stage': span.stage,
+                  **span.as_dict()}
+        logger.info(f"stage span {self.object_type.lower()} vendor_id: {self.vendor_id} stage: {span.stage} "
+                    f"wall_ms: {record['wall_ms']} cpu_ms: {record['cpu_ms']} bytes_in: {span.bytes_in} "
+                    f"bytes_out: {span.bytes_out}"
+                    + (f" tracemalloc_peak_kb: {span.tracemalloc_peak_kb}" if self.trace_memory else "")
+                    + (f" error: {span.error}" if span.error else ""),
+                    extra={'custom_dimensions': record})
+
+
+def server_timing(stage_sets: Iterable[Optional[Dict[str, Dict[str, Any]]]]) -> str:
+    """
+    `Server-Timing` header value of one or more `summary['stages']`, the wall time of
+    a stage is summed over the vendor messages of the invocation
+
+    :param stage_sets: `StageRecorder.as_dict()` of each object, None entries are skipped
+    :return: e.g. `fetch_config;dur=12.1, fetch_vendor_data;dur=840.3, write;dur=20.4`
+    """
+    totals: Dict[str, float] = {}
+    for stages in stage_sets:
+        for stage, record in (stages or {}).items():
+            stage = stage.split('#')[0]
+            totals[stage] = totals.get(stage, 0.0) + record.get('wall_ms', 0.0)
+    return ', '.join(f"{stage};dur={round(duration, 1)}" for stage, duration in totals.items())
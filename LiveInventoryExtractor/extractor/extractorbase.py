@@ -1,4 +1,5 @@
 from LiveInventoryExtractor.base.base import *
+from LiveInventoryExtractor.common_utils.parallel import raise_if_timed_out
 
 
 class ExtractorBase(Base):
@@ -8,9 +9,16 @@ class ExtractorBase(Base):
         self.object_type = ObjectType.EXTRACTOR
 
     def execute(self) -> any:
-        return self.fetch_config(). \
-                    transform_data(). \
-                    write(data_file_dir = self.kwargs['extractor_write_path'])
+        # the stages stay chained on their return values, each one timed by its own span;
+        # a message that timed out in a pool stops before its next stage
+        with self.stage_span('fetch_config'):
+            stage = self.fetch_config()
+        raise_if_timed_out()
+        with self.stage_span('transform_data'):
+            stage = stage.transform_data()
+        raise_if_timed_out()
+        with self.stage_span('write'):
+            return stage.write(data_file_dir = self.kwargs['extractor_write_path'])
 
     @abstractmethod
     def fetch_config(self) -> any:
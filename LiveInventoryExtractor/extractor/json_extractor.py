@@ -2,13 +2,18 @@ from LiveInventoryExtractor.utils.data_access_layer.sql_db import DBEngineFactor
 from LiveInventoryExtractor.extractor.extractorbase import *
 from LiveInventoryExtractor.base.base import UC_ConfigReadException
 from LiveInventoryExtractor.config import Config
-import json
 import copy
 from datetime import datetime
-from LiveInventoryExtractor.common_utils.db_queries import QUERY_FETCH_VENDOR_CODE_INTERNAL_ID_MAPPING
+from LiveInventoryExtractor.common_utils.vendor_code_snapshot import get_vendor_code_snapshot
+from LiveInventoryExtractor.common_utils.vendor_response_cache import load_cached_records, store_records
+from LiveInventoryExtractor.common_utils.artifact_codec import is_spill_manifest
 from flatten_dict import flatten
 
 
+# shared by every instance so that a kept alive connection is reused across invocations
+li_db = DBEngineFactory.get_db_engine(Config.DB_CONFIG, DBEngineFactory.POSTGRES, **Config.DB_OPTIONS)
+
+
 class UC_DataTransformError(Exception):
     pass
 
@@ -25,8 +30,8 @@ def safeget(dct, keys):
 class JSONExtractor(ExtractorBase):
     def __init__(self, **kwargs) -> None:
         super().__init__(**kwargs)
-        self.vendor_code_to_internal_id = None
-        self.li_db = DBEngineFactory.get_db_engine(Config.DB_CONFIG, DBEngineFactory.POSTGRES)
+        self.vendor_code_snapshot = None
+        self.li_db = li_db
 
     def fetch_config(self) -> any:
         try:
@@ -38,6 +43,8 @@ class JSONExtractor(ExtractorBase):
             self.vendor_id = self.kwargs.get('vendor_id')
             self.vendor_codes = self.kwargs.get('item_codes')
             self.vendor_codes_error_status = self.kwargs.get('vendor_codes_error_status')
+            self.vendor_codes_version = self.kwargs.get('vendor_codes_version')
+            self.cached_item_codes = self.kwargs.get('cached_item_codes') or []
             return self
         except Exception as ex:
             self.logger.error("Could not get configuration", exc_info=True)
@@ -49,8 +56,14 @@ class JSONExtractor(ExtractorBase):
             self.logger.info("Transforming data")
 
             self.logger.debug("Reading fetcher data")
-            with open(self.kwargs['fetcher_file_path'], 'r') as data_file:
-                vendor_data = json.load(data_file)
+            vendor_data = self.read_artifact(
+                self.kwargs['fetcher_file_path'],
+                data_file_dir=Config.NETWORK_CONFIG.get('fetcher_directory_path')
+            )
+            if is_spill_manifest(vendor_data):
+                # a checkpointed pagination handed over its spilled pages, read one page at a time
+                vendor_data = self.iter_spilled_records(
+                    vendor_data, data_file_dir=Config.NETWORK_CONFIG.get('fetcher_directory_path'))
 
             rsp_list_path = self.response_mapping_list.get('items_response')
             self.logger.debug("Starting field mapping")
@@ -82,6 +95,7 @@ class JSONExtractor(ExtractorBase):
                                  x.get('source_field') == 'cost']
                 currency_sign = currency_sign[0] if bool(currency_sign) else None
 
+                requested_vendor_codes = set(self.vendor_codes)
                 for item in vendor_data:
                     tmp_dict = {}
                     flatten_each_vendor_item = flatten(item, reducer='dot')
@@ -89,10 +103,10 @@ class JSONExtractor(ExtractorBase):
                         mapping_fld_name = self.field_mapping[fld]
                         if fld == 'multi_vendor_code':
                             fld = 'vendor_code'
-                            if item.get('DistributorItemIdentifier') in self.vendor_codes and type(
+                            if item.get('DistributorItemIdentifier') in requested_vendor_codes and type(
                                     int(item.get('DistributorItemIdentifier'))) == int:
                                 tmp_dict[fld] = item.get('DistributorItemIdentifier')
-                            elif item.get('ManufacturerItemIdentifier') in self.vendor_codes and type(
+                            elif item.get('ManufacturerItemIdentifier') in requested_vendor_codes and type(
                                     item.get('ManufacturerItemIdentifier')) == str:
                                 tmp_dict[fld] = item.get('ManufacturerItemIdentifier')
                             continue
@@ -250,43 +264,34 @@ class JSONExtractor(ExtractorBase):
 
                     self.data.append(each_item)
 
-                # execute the query here for selected vendor code self.vendor_codes get corresponding internal_id
-                with self.li_db.transaction(auto_commit=True) as query_set:
-                    data_query = query_set.execute_query(QUERY_FETCH_VENDOR_CODE_INTERNAL_ID_MAPPING, (self.vendor_id,))
-
-                    if data_query:
-                        self.vendor_code_to_internal_id = data_query.to_list()
-                    else:
-                        self.logger.info("No vendor sync candidates found - Looks like everything is uptodate")
+                # vendor_code -> internal_id mapping of the vendor, the fetcher passes on the version it validated
+                # the codes against so a cached snapshot is reused without reading vendor_codes again
+                self.vendor_code_snapshot = get_vendor_code_snapshot(self.li_db, self.vendor_id,
+                                                                     self.vendor_codes_version)
+                if not self.vendor_code_snapshot:
+                    self.logger.info("No vendor sync candidates found - Looks like everything is uptodate")
 
                 # Filter data to process only required vendor codes
+                requested_lower_vendor_codes = {item.lower() for item in self.vendor_codes}
                 self.data = [x for x in self.data if
-                             x.get('vendor_code') and x.get('vendor_code').lower() in [item.lower() for item in
-                                                                                       self.vendor_codes]]
-
-                # creating a hash object for vendor_code to internal id mapping
-                """
-                observed :[ {a:1}, {a:2},{b:3}]
-                expected: {a : [1,2], b:3}
-                """
-                vendor_code_to_internal_id_hash = {}
-                for item in self.vendor_code_to_internal_id:
-                    if item.get('vendor_code').lower() in vendor_code_to_internal_id_hash:
-                        temp_list_internal_ids = vendor_code_to_internal_id_hash.get(item.get('vendor_code').lower())
-                        temp_list_internal_ids.append(item.get('internal_id'))
-                        vendor_code_to_internal_id_hash.update({
-                            item.get('vendor_code').lower(): temp_list_internal_ids
-                        })
-                    else:
-                        vendor_code_to_internal_id_hash.update({
-                            item.get('vendor_code').lower(): [item.get('internal_id')]
-                        })
+                             x.get('vendor_code') and x.get('vendor_code').lower() in requested_lower_vendor_codes]
+
+                # codes the fetcher left out of the vendor call get the record stored by the sync that fetched them
+                fetched_lower_vendor_codes = {x.get('vendor_code').lower() for x in self.data}
+                if self.cached_item_codes:
+                    cached_records = [record for record in load_cached_records(self.li_db, self.vendor_id,
+                                                                               self.cached_item_codes)
+                                      if record.get('vendor_code', '').lower() not in fetched_lower_vendor_codes]
+                    self.logger.info(f"{len(cached_records)} record(s) of {len(self.cached_item_codes)} cached "
+                                     f"item code(s) taken from the response cache")
+                    self.data.extend(cached_records)
 
                 temp_items = []
                 # iterate through each item
                 for item_data in self.data:
                     # get all the internal_id associated with each vendor_code
-                    vendor_code_internal_ids = vendor_code_to_internal_id_hash.get(item_data.get('vendor_code').lower())
+                    vendor_code_internal_ids = self.vendor_code_snapshot.get_internal_ids(item_data.get('vendor_code'),
+                                                                                          ignore_case=True)
                     # for vendor_code having one or more internal id
                     if len(vendor_code_internal_ids) > 0:
                         # iterate through each internal id for one vendor_code
@@ -342,7 +347,20 @@ class JSONExtractor(ExtractorBase):
                         # adding to the new list
                         new_dispatchable_data.append(each_record_copy)
 
-                self.data = json.dumps(new_dispatchable_data, default=str)
+                # one record per code the vendor just returned, for the syncs following shortly after. Records
+                # nulled for an error status are not stored, a later sync asks the vendor for the code again
+                fresh_records = {}
+                for each_record in new_dispatchable_data:
+                    lower_vendor_code = each_record.get('vendor_code').lower()
+                    if vendor_code_to_error_status_hash.get(lower_vendor_code) is True:
+                        continue
+                    if lower_vendor_code in fetched_lower_vendor_codes and lower_vendor_code not in fresh_records:
+                        fresh_records[lower_vendor_code] = {key: value for key, value in each_record.items()
+                                                            if key != 'internal_id'}
+                store_records(self.li_db, self.vendor_id, fresh_records.values())
+
+                # encoded once by write, datetimes included
+                self.data = new_dispatchable_data
             except Exception as ex:
                 self.logger.error("Could not transform data", exc_info=True)
                 self.logger.exception(ex)
@@ -5,20 +5,43 @@ Connection management and transaction is handled in this class with
 appropriate appropriate `QuerySet`.
 """
 
+import threading
+import time
 from contextlib import contextmanager
-from typing import Any, Dict, Generator
+from typing import Any, Dict, Generator, Optional
 
 import psycopg2
+from psycopg2.extensions import STATUS_READY
 
 from LiveInventoryExtractor.utils.data_access_layer.sql_db.dbdalbase import DBDALBase
+from LiveInventoryExtractor.utils.data_access_layer.sql_db.postgres.psqlprepared import DEFAULT_PREPARED_CACHE_SIZE, \
+    PreparedStatementCache
 from LiveInventoryExtractor.utils.data_access_layer.sql_db.postgres.psqlqueryset import PgSQlQuerySet
 
+# a kept alive connection idle for longer than this is checked before it is reused
+IDLE_CHECK_SECONDS = 60
+
+
+def _per_thread(name: str) -> property:
+    """Attribute of the DAL kept per thread, threads sharing one DAL never share a connection."""
+
+    def getter(self) -> Any:
+        return getattr(self._local, name, None)
+
+    def setter(self, value: Any) -> None:
+        setattr(self._local, name, value)
+
+    return property(getter, setter)
+
 
 class PgSQLDAL(DBDALBase):
     """Concrete `PgSQL DAL` class for all Postgres db operations. Connection
     management and transaction is handled in this class with appropriate
     appropriate `QuerySet`.
 
+    Connection, cursor and prepared statements are kept per thread, so one DAL can be
+    shared by the threads of a pool.
+
     :param dbparams: Dictionary with connection parameters required by `psycopg2.connect()`
     :type dbparams: dict, example
 
@@ -29,9 +52,28 @@ class PgSQLDAL(DBDALBase):
                         "password": "database_password",
                         "dbname" : "database_name",
             } ````
+
+    :param keep_alive: keep the connection open between transactions instead of reconnecting every time
+    :type keep_alive: bool, optional
+
+    :param prepare_statements: run repeated statements as server-side prepared statements,
+                               useful together with `keep_alive` only
+    :type prepare_statements: bool, optional
+
+    :param prepared_cache_size: prepared statements kept per connection
+    :type prepared_cache_size: int, optional
     """
 
-    def __init__(self, dbparams: Dict[str, Any]) -> None:
+    # connection state is thread local, a connection is closed when its thread ends
+    cursor = _per_thread('cursor')
+    connection = _per_thread('connection')
+    prepared = _per_thread('prepared')
+    _released_at = _per_thread('released_at')
+    # transactions of the thread open on the connection
+    _depth = _per_thread('depth')
+
+    def __init__(self, dbparams: Dict[str, Any], keep_alive: bool = False, prepare_statements: bool = False,
+                 prepared_cache_size: int = DEFAULT_PREPARED_CACHE_SIZE) -> None:
         """Concrete `PgSQL DAL` class for all Postgres db operations.
         Connection management and transaction is handled in this class with
         appropriate appropriate `QuerySet`.
@@ -46,23 +88,49 @@ class PgSQLDAL(DBDALBase):
                         "password": "database_password",
                         "dbname" : "database_name",
                     } ````
+
+        :param keep_alive: keep the connection open between transactions
+        :type keep_alive: bool, optional
+
+        :param prepare_statements: run repeated statements as server-side prepared statements
+        :type prepare_statements: bool, optional
+
+        :param prepared_cache_size: prepared statements kept per connection
+        :type prepared_cache_size: int, optional
         """
         super().__init__(dbparams)
-        self.cursor = None
-        self.connection = None
+        self._local = threading.local()
+        self.keep_alive = keep_alive
+        self.prepare_statements = prepare_statements
+        self.prepared_cache_size = prepared_cache_size
+
+    def _check_idle_connection(self) -> None:
+        """Drop a kept alive connection the server closed while it was idle."""
+        if self._released_at is None or time.monotonic() - self._released_at < IDLE_CHECK_SECONDS:
+            return
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            self.connection.rollback()
+        except psycopg2.Error:
+            self.disconnect()
 
     def connect(self) -> None:
         """Connects postgresql db server with given dbparams through `psycopg2`
-        driver."""
-        if not self.is_connection_active:
-            # Creating new connection if closed.
-            self.connection = psycopg2.connect(**self.dbparams)
+        driver. A kept alive connection is reused as long as it is open, and so is the
+        connection of an outer transaction that is still open."""
+        if self._depth:
+            if self.is_connection_active:
+                self.cursor = self.connection.cursor()  # type: ignore
+                return
+        elif self.keep_alive and self.is_connection_active:
+            self._check_idle_connection()
 
-        if not self.is_cursor_active:
-            # Creating new cursor if closed.
-            self.connection.cursor()  # type: ignore
+        if not (self.keep_alive and self.is_connection_active):
+            # Creating new connection, prepared statements belong to the connection.
+            self.connection = psycopg2.connect(**self.dbparams)  # type: ignore
+            self.prepared = PreparedStatementCache(self.prepared_cache_size) if self.prepare_statements else None
 
-        self.connection = psycopg2.connect(**self.dbparams)  # type: ignore
         self.cursor = self.connection.cursor()  # type: ignore
 
     @property
@@ -74,7 +142,7 @@ class PgSQLDAL(DBDALBase):
         :rtype: PgSQlQuerySet
         """
         self.connect()
-        return PgSQlQuerySet(self.cursor)  # type: ignore
+        return PgSQlQuerySet(self.cursor, self.connection, self.prepared)  # type: ignore
 
     @property
     def is_connection_active(self) -> bool:
@@ -97,6 +165,27 @@ class PgSQLDAL(DBDALBase):
 
         if self.connection:
             self.connection.close()
+        self.prepared = None
+
+    def release(self) -> None:
+        """Ends the use of the connection after a transaction. The connection is closed unless
+        it is kept alive, in which case whatever the transaction left uncommitted is rolled back.
+        Nothing is done while an outer transaction is still open on the connection."""
+        if self._depth:
+            return
+
+        if not self.keep_alive:
+            self.disconnect()
+            return
+
+        if self.is_cursor_active:
+            self.cursor.close()  # type: ignore
+        try:
+            if self.is_connection_active and self.connection.status != STATUS_READY:
+                self.connection.rollback()
+        except psycopg2.Error:
+            self.disconnect()
+        self._released_at = time.monotonic()
 
     def reconnect(self) -> None:
         """Re-connects to `PostgreSQL` by first disconnecting and then
@@ -107,15 +196,35 @@ class PgSQLDAL(DBDALBase):
         self.disconnect()
         self.connect()
 
+    def _savepoint(self) -> Optional[str]:
+        """Savepoint of the innermost open transaction of the thread, None for an outer transaction."""
+        depth = self._depth or 0
+        return f'li_dal_{depth - 1}' if depth > 1 else None
+
+    def _execute_savepoint(self, *statements: str) -> None:
+        with self.connection.cursor() as cursor:  # type: ignore
+            for statement in statements:
+                cursor.execute(statement)
+
     def commit(self) -> None:
-        """Perfroms database commit."""
+        """Perfroms database commit. Inside a nested transaction only its savepoint is released
+        (and set again), the outer transaction commits."""
         if self.connection:
-            self.connection.commit()
+            savepoint = self._savepoint()
+            if savepoint:
+                self._execute_savepoint(f'RELEASE SAVEPOINT {savepoint}', f'SAVEPOINT {savepoint}')
+            else:
+                self.connection.commit()
 
     def rollback(self) -> None:
-        """Performs database rollback."""
+        """Performs database rollback. Inside a nested transaction only the work done since its
+        savepoint is rolled back."""
         if self.connection:
-            self.connection.rollback()
+            savepoint = self._savepoint()
+            if savepoint:
+                self._execute_savepoint(f'ROLLBACK TO SAVEPOINT {savepoint}')
+            else:
+                self.connection.rollback()
 
     @contextmanager
     def transaction(self, auto_commit: bool = True) -> Generator[PgSQlQuerySet, bool, None]:
@@ -140,18 +249,44 @@ class PgSQLDAL(DBDALBase):
                 ```
 
         You don't have to manage connection open and close while using transaction.
+        With `keep_alive` the connection stays open for the next transaction. A transaction
+        opened inside another one of the same thread runs on the outer one's connection,
+        which is released when the outer transaction ends. It is a savepoint of the outer
+        transaction: its commit releases the savepoint and its rollback goes back to it, only
+        the outer transaction commits or rolls back the connection.
         """
 
+        depth = self._depth or 0
+        outer_cursor = self.cursor
         queryset = self.queryset
+        cursor = queryset.cursor
+        self._depth = depth + 1
+        savepoint = self._savepoint()
+        failed = False
         try:
+            if savepoint:
+                self._execute_savepoint(f'SAVEPOINT {savepoint}')
             yield queryset
         except Exception as e:
+            failed = True
             if auto_commit:
                 self.rollback()
 
             del queryset
             raise e
         finally:
-            if auto_commit:
+            if savepoint:
+                try:
+                    self._execute_savepoint(f'RELEASE SAVEPOINT {savepoint}')
+                except psycopg2.Error:
+                    # e.g. the connection broke, the error the transaction failed with is raised
+                    if not failed:
+                        raise
+            elif auto_commit:
                 self.commit()
-            self.disconnect()
+            self._depth = depth
+            if depth:
+                cursor.close()
+                self.cursor = outer_cursor
+            else:
+                self.release()
@@ -13,9 +13,11 @@ TODO:
 """
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List
+from typing import TYPE_CHECKING, Any, Dict, List
 
-import pandas as pd
+if TYPE_CHECKING:
+    # pandas is only needed by `to_df`, importing it costs most of a cold start
+    import pandas as pd
 
 
 class ResultSet(ABC):
@@ -42,7 +44,7 @@ class ResultSet(ABC):
         pass
 
     @abstractmethod
-    def to_df(self) -> pd.DataFrame:
+    def to_df(self) -> 'pd.DataFrame':
         """Abstract method to parse cursor data to `pandas.DataFrame`"""
         pass
 
@@ -2,45 +2,59 @@ import json
 import azure.functions as func
 import logging
 from LiveInventoryFetcher.scheduler.vendor_scheduler import EXTRACTOR_FILE_PATH
+from LiveInventoryFetcher.config import Config
 from LiveInventoryFetcher.orm import li_vendors
-from LiveInventoryFetcher.fetcher import RESTJSONFetcher
-from LiveInventoryFetcher.fetcher.csv_fetcher import CSVFetcher
-from LiveInventoryFetcher.fetcher.ftp_fetcher import FTPFetcher
-from LiveInventoryFetcher.fetcher.rest_xml_fetcher import RESTXMLFetcher
+from LiveInventoryFetcher.common_utils.blob_utils import flush_pending_uploads
+from LiveInventoryFetcher.common_utils.stage_spans import server_timing
+from LiveInventoryFetcher.utils.data_access_layer.sql_db.instrumentation import statement_metrics
 
 logger = logging
+statement_metrics.configure(slow_query_ms=Config.SLOW_QUERY_MS)
 
 
-def main(req: func.HttpRequest) -> func.HttpResponse:
-    logging.info('fetcher function is called')
+def fetch_message(x: dict) -> dict:
+    """
+    Fetch the vendor data of one scheduler command and write the fetcher file
+
+    :return: message for the extractor, empty when the fetch failed
+    """
     rest_fetcher = None
-    x = json.loads(str(req.get_body(), encoding='utf-8'))
     logger.info(f"Syncing vendor_id: {x.get('vendor_id')} vendor_codes: {x.get('item_codes')}")
     try:
+        # the fetcher of a connection type is imported on its first use (xmltodict, ftplib, ...),
+        # a cold start only pays for the fetcher it runs
         if x.get('connection_type') == "xml":
+            from LiveInventoryFetcher.fetcher.rest_xml_fetcher import RESTXMLFetcher
             rest_fetcher = RESTXMLFetcher(vendor_id=x.get('vendor_id'), config_file_path=x.get('config_file_path'),
                                           fetcher_write_path=x.get('fetcher_write_path'),
                                           item_codes=x.get('item_codes'),
-                                          template_values=x.get('template_values')).execute()
+                                          template_values=x.get('template_values'),
+                                          retry_attempt=x.get('retry_attempt', 0),
+                                          retry_ids=x.get('retry_ids')).execute()
         elif x.get('connection_type') == "csv":
+            from LiveInventoryFetcher.fetcher.csv_fetcher import CSVFetcher
             rest_fetcher = CSVFetcher(vendor_id=x.get('vendor_id'), config_file_path=x.get('config_file_path'),
                                       data_file_path=x.get('data_file_path'),
                                       fetcher_write_path=x.get('fetcher_write_path'),
                                       item_codes=x.get('item_codes'),
                                       template_values=x.get('template_values')).execute()
         elif (x.get('connection_type') == "ftp/csv") or (x.get('connection_type') == "ftp/txt"):
+            from LiveInventoryFetcher.fetcher.ftp_fetcher import FTPFetcher
             rest_fetcher = FTPFetcher(vendor_id=x.get('vendor_id'), config_file_path=x.get('config_file_path'),
                                       data_file_path=x.get('data_file_path'),
                                       fetcher_write_path=x.get('fetcher_write_path'),
                                       item_codes=x.get('item_codes'),
                                       template_values=x.get('template_values')).execute()
         else:
+            from LiveInventoryFetcher.fetcher.rest_json_fetcher import RESTJSONFetcher
             logger.debug(
                 f"PROCESSING - Making REST fetcher Making API request for: {x.get('vendor_id')}, vendor_code(s): {x.get('item_codes')}")
             rest_fetcher = RESTJSONFetcher(vendor_id=x.get('vendor_id'), config_file_path=x.get('config_file_path'),
                                            fetcher_write_path=x.get('fetcher_write_path'),
                                            item_codes=x.get('item_codes'),
-                                           template_values=x.get('template_values')).execute()
+                                           template_values=x.get('template_values'),
+                                           retry_attempt=x.get('retry_attempt', 0),
+                                           retry_ids=x.get('retry_ids')).execute()
 
             logger.debug(
                 f"SUCCESS - Making API request for: {x.get('vendor_id')}, vendor_code(s): {x.get('item_codes')}")
@@ -56,19 +70,34 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         logger.error(f"FAILURE - Failed fetching data for: {x.get('vendor_id')},"
                      f" vendor_code(s): {x.get('item_codes')} and generate fetcher file", exc_info=True)
 
-    if rest_fetcher:
-        fetcher_result = {
-                "vendor_id": x.get('vendor_id'),
-                "config_file_path": x.get('config_file_path'),
-                "fetcher_file_path": rest_fetcher.meta['fetcher_data_file_path'],
-                "item_codes": x.get('item_codes'),
-                "vendor_codes_error_status": rest_fetcher.vendor_codes_error_status,
-                "extractor_write_path": EXTRACTOR_FILE_PATH
-        }
-    else:
-        fetcher_result = {}
+    # background uploads (e.g. invalid vendor codes) ran alongside the vendor table update,
+    # make sure they are done before the host gets a chance to freeze this worker
+    flush_pending_uploads(timeout=Config.REQUEST_TIMEOUT)
+
+    if not rest_fetcher:
+        return {}
+    return {
+            "vendor_id": x.get('vendor_id'),
+            "config_file_path": x.get('config_file_path'),
+            "fetcher_file_path": rest_fetcher.meta['fetcher_data_file_path'],
+            "item_codes": x.get('item_codes'),
+            "vendor_codes_error_status": rest_fetcher.vendor_codes_error_status,
+            "vendor_codes_version": rest_fetcher.vendor_codes_version,
+            "cached_item_codes": rest_fetcher.cached_item_codes,
+            "extractor_write_path": EXTRACTOR_FILE_PATH,
+            "stages": rest_fetcher.summary.get('stages')
+    }
+
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info('fetcher function is called')
+    statement_metrics.reset()
+    x = json.loads(str(req.get_body(), encoding='utf-8'))
+    fetcher_result = fetch_message(x)
+    statement_metrics.log_summary('fetcher')
 
     if not fetcher_result:
         return func.HttpResponse({}, status_code=200)
 
-    return func.HttpResponse(json.dumps(fetcher_result))
+    return func.HttpResponse(json.dumps(fetcher_result),
+                             headers={'Server-Timing': server_timing([fetcher_result['stages']])})
@@ -1,11 +1,15 @@
 from abc import ABC, abstractmethod
 from enum import Enum
-from typing import Any
+from typing import Any, Dict, Iterator
 from LiveInventoryFetcher.config import Config
-from LiveInventoryFetcher.common_utils.blob_utils import connect_blob
+from LiveInventoryFetcher.common_utils.blob_utils import connect_blob, upload_blob_data, download_blob_data
+from LiveInventoryFetcher.common_utils import json_codec
+from LiveInventoryFetcher.common_utils.artifact_codec import ARTIFACT_FORMAT_META, SPILL_MANIFEST_KEY, \
+    encode_artifact, decode_artifact
+from LiveInventoryFetcher.common_utils.stage_spans import StageRecorder
+from contextlib import contextmanager
 import os
 import uuid
-import json
 import logging
 import requests
 
@@ -38,6 +42,8 @@ class Base(ABC):
         self.kwargs = kwargs
         self.data = None  # Member variable to store payload
         self.meta = {}  # Member variable to store meta data about payload and the object
+        self.summary = {}  # Member variable to store the execution summary, see stage_span for 'stages'
+        self.stage_recorder = None  # timing spans of the stage methods, created by the first stage_span
         # get the logger instance
         self.logger = logging
 
@@ -49,10 +55,41 @@ class Base(ABC):
         """
         pass
 
+    @contextmanager
+    def stage_span(self, stage: str):
+        """
+        time one stage method (wall time, cpu time, bytes in/out, tracemalloc peak) and keep
+        the measurements of all stages so far in summary['stages']
+        :param stage: name of the stage method
+        """
+        if self.stage_recorder is None:
+            self.stage_recorder = StageRecorder(self.object_type.value, self.kwargs.get('vendor_id'),
+                                                trace_memory=Config.STAGE_SPAN_TRACEMALLOC)
+        try:
+            with self.stage_recorder.span(stage) as span:
+                yield span
+        finally:
+            self.summary['stages'] = self.stage_recorder.as_dict()
+
+    def count_bytes_in(self, size: int) -> None:
+        """
+        add bytes read from a vendor, the config store or an artifact to the running stage span
+        """
+        if self.stage_recorder is not None:
+            self.stage_recorder.add_bytes_in(size)
+
+    def count_bytes_out(self, size: int) -> None:
+        """
+        add bytes written (artifacts) to the running stage span
+        """
+        if self.stage_recorder is not None:
+            self.stage_recorder.add_bytes_out(size)
+
     def read_config(self) -> Any:
         try:
             with requests.get(self.kwargs.get('config_file_path')) as config_file:
-                self.config_template = json.loads(config_file.text)
+                self.count_bytes_in(len(config_file.content))
+                self.config_template = json_codec.load_response(config_file)
 
         except Exception as ex:
             raise UC_ConfigReadException(ex)
@@ -88,25 +125,84 @@ class Base(ABC):
 
         # Write the vendor data to file
         try:
-            file_name = uuid.uuid1()
-            if Config.IS_BLOB:
-                data_file_path = os.path.join(
-                    str(file_name) + ".json"
-                )
-
-                container = Config.BLOB_CONTAINER_NAME + Config.BLOB_NAME + data_file_dir
-                blob_client = blob_service_client.get_blob_client(
-                    container=container,
-                    blob=data_file_path
-                )
-                blob_client.upload_blob(str(self.data))
-            else:
-                data_file_path = os.path.join(data_file_dir, str(file_name) + ".json")
-                with open(data_file_path, 'w') as outfile:
-                    outfile.write(self.data)
+            artifact_format = kwargs.get('artifact_format', Config.ARTIFACT_FORMAT)
+            format_meta = ARTIFACT_FORMAT_META[artifact_format]
+            payload, stats = encode_artifact(self.data, artifact_format)
+            self.logger.info(f"{self.object_type.value.lower()} artifact encoded: {stats}")
+            data_file_path = self.store_payload(data_file_dir, payload, format_meta)
 
             # Save the write path
             self.meta[self.object_type.value.lower() + "_data_file_path"] = data_file_path
+            self.meta[self.object_type.value.lower() + "_artifact_stats"] = stats
             return self
         except Exception as ex:
             raise UC_DataException(ex)
+
+    def store_payload(self, data_file_dir: str, payload: bytes, format_meta: Dict[str, Any],
+                      file_name: str = None) -> str:
+        """
+        put an encoded payload into the blob container or the local directory
+        :param data_file_dir: directory (blob folder) of the stage
+        :param payload: encoded bytes
+        :param format_meta: ARTIFACT_FORMAT_META entry of the payload's format
+        :param file_name: name without extension, an existing payload of that name is replaced; a new uuid by default
+        :return: path the payload is read back from with load_payload
+        """
+        file_name = file_name or str(uuid.uuid1())
+        self.count_bytes_out(len(payload))
+        if Config.IS_BLOB:
+            data_file_path = os.path.join(file_name + format_meta['extension'])
+
+            container = Config.BLOB_CONTAINER_NAME + Config.BLOB_NAME + data_file_dir
+            upload_blob_data(container, data_file_path, payload,
+                             content_type=format_meta['content_type'],
+                             content_encoding=format_meta['content_encoding'])
+        else:
+            data_file_path = os.path.join(data_file_dir, file_name + format_meta['extension'])
+            with open(data_file_path, 'wb') as outfile:
+                outfile.write(payload)
+        return data_file_path
+
+    def load_payload(self, data_file_path: str, data_file_dir: str = None) -> bytes:
+        """
+        raw bytes of a payload written by store_payload, by this stage or the previous one
+        """
+        if os.path.exists(data_file_path) or not Config.IS_BLOB:
+            with open(data_file_path, 'rb') as infile:
+                payload = infile.read()
+        else:
+            container = Config.BLOB_CONTAINER_NAME + Config.BLOB_NAME + (data_file_dir or "")
+            payload = download_blob_data(container, data_file_path)
+        self.count_bytes_in(len(payload))
+        return payload
+
+    def iter_spilled_records(self, manifest: Dict[str, Any], data_file_dir: str = None) -> Iterator[Any]:
+        """
+        records of the parts listed in a spill manifest (see artifact_codec.spill_manifest), one part in memory at a time
+        """
+        for part_path in manifest[SPILL_MANIFEST_KEY]:
+            try:
+                records, stats = decode_artifact(self.load_payload(part_path, data_file_dir))
+            except Exception as ex:
+                raise UC_DataException(ex)
+            self.logger.debug(f"spilled part {part_path} decoded: {stats}")
+            yield from records
+
+    def read_artifact(self, data_file_path: str, data_file_dir: str = None) -> Any:
+        """
+        read the artifact written by the previous stage, whatever format it was written in
+        :param data_file_path: path returned by the previous stage
+        :param data_file_dir: directory the previous stage wrote to, used to locate the blob
+        :return: decoded data
+        """
+        if data_file_path is None:
+            raise UC_DataException("Data file path is None")
+
+        try:
+            data, stats = decode_artifact(self.load_payload(data_file_path, data_file_dir))
+        except Exception as ex:
+            raise UC_DataException(ex)
+
+        self.logger.info(f"{self.object_type.value.lower()} artifact decoded: {stats}")
+        self.meta["input_artifact_stats"] = stats
+        return data
@@ -0,0 +1,197 @@
+"""
+this module compiles the `vendor_code_validation` rules of a vendor config
+
+A rule looks like::
+
+    {"type": "numeric", "condition": "<= 12"}
+    {"type": "regex", "pattern": "^[A-Z0-9-]+$", "condition": "> 3 and < 20"}
+
+`condition` is a comparison (or several joined with `and` / `or`) applied to the length
+of the vendor code, `type` restricts the rule to codes of a given shape. Rules used to be
+evaluated with `eval(f"{len(code)} {condition}")` for every code; they are now parsed once
+into python predicates, and applied to a whole code list in one pass where the length
+conditions are evaluated once per distinct code length.
+"""
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import json
+import operator
+import re
+
+OPERATORS = {
+    '<=': operator.le,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '>': operator.gt,
+}
+
+# code shapes a rule can be restricted to, `regex` takes the rule's `pattern`
+TYPE_PATTERNS = {
+    'numeric': r'\d+',
+    'alpha': r'[A-Za-z]+',
+    'alphanumeric': r'[A-Za-z0-9]+',
+}
+
+_COMPARISON = re.compile(r'^\s*(?:len\s*)?(<=|>=|==|!=|<|>)\s*(-?\d+)\s*$')
+_OR = re.compile(r'\s+or\s+', re.IGNORECASE)
+_AND = re.compile(r'\s+and\s+', re.IGNORECASE)
+
+
+class ValidationRuleException(Exception):
+    pass
+
+
+def compile_condition(condition: str) -> Callable[[int], bool]:
+    """
+    Parse a length condition such as `<= 12` or `> 3 and < 20` into a predicate
+
+    :param condition: comparisons on the code length, joined with `and` / `or` (`and` binds tighter)
+    :type condition: str
+
+    :return: predicate taking the length of a code
+    :rtype: callable
+    """
+    if not isinstance(condition, str) or not condition.strip():
+        raise ValidationRuleException(f"Invalid vendor_code_validation condition: {condition!r}")
+
+    alternatives = []
+    for alternative in _OR.split(condition.strip()):
+        comparisons = []
+        for comparison in _AND.split(alternative):
+            match = _COMPARISON.match(comparison)
+            if match is None:
+                raise ValidationRuleException(f"Invalid vendor_code_validation condition: {condition!r}")
+            comparisons.append((OPERATORS[match.group(1)], int(match.group(2))))
+        alternatives.append(tuple(comparisons))
+
+    def predicate(length: int) -> bool:
+        return any(all(compare(length, value) for compare, value in comparisons) for comparisons in alternatives)
+
+    return predicate
+
+
+class ValidationRule:
+    """
+    One compiled `vendor_code_validation` rule
+
+    :param rule: rule as found in the vendor config
+    :type rule: dict
+    """
+
+    __slots__ = ('rule', 'type', 'length_check', 'type_check')
+
+    def __init__(self, rule: Dict[str, Any]) -> None:
+        if not isinstance(rule, dict):
+            raise ValidationRuleException(f"Invalid vendor_code_validation rule: {rule!r}")
+        self.rule = rule
+        self.type = rule.get('type')
+        condition = rule.get('condition')
+        self.length_check = compile_condition(condition) if condition is not None else None
+
+        if self.type is None or self.type == 'any':
+            self.type_check = None
+        elif self.type == 'regex':
+            try:
+                self.type_check = re.compile(rule['pattern']).search
+            except (KeyError, re.error) as ex:
+                raise ValidationRuleException(f"Invalid vendor_code_validation pattern: {ex}")
+        elif self.type in TYPE_PATTERNS:
+            self.type_check = re.compile(TYPE_PATTERNS[self.type]).fullmatch
+        else:
+            raise ValidationRuleException(f"Unknown vendor_code_validation type: {self.type!r}")
+
+    def applies_to(self, vendor_code: str) -> bool:
+        """
+        whether the code has the shape the rule is restricted to
+        """
+        return self.type_check is None or self.type_check(vendor_code) is not None
+
+    def check_length(self, length: int) -> bool:
+        return self.length_check is None or self.length_check(length)
+
+    def accepts(self, vendor_code: str) -> bool:
+        """
+        False only for a code the rule applies to and whose length fails the condition
+        """
+        return not self.applies_to(vendor_code) or self.check_length(len(vendor_code))
+
+    def __repr__(self) -> str:
+        return f'<ValidationRule {self.rule!r}>'
+
+
+@lru_cache(maxsize=128)
+def _compile_rules(rules_json: str) -> Tuple[ValidationRule, ...]:
+    rules = json.loads(rules_json)
+    if isinstance(rules, dict):
+        rules = [rules]
+    return tuple(ValidationRule(rule) for rule in rules)
+
+
+def compile_rules(rules: Any) -> Tuple[ValidationRule, ...]:
+    """
+    Compile the `vendor_code_validation` value of a vendor config, a single rule or a list of rules
+
+    Compiled rules are cached, the same config is parsed only once per process.
+
+    :rtype: tuple of ValidationRule
+    """
+    if not rules or rules is True:
+        # `true` switches on the hard-coded check of the REST JSON fetcher, there is nothing to compile
+        return ()
+    return _compile_rules(json.dumps(rules, sort_keys=True))
+
+
+def reject_codes(vendor_codes: Iterable[str], rules: Iterable[ValidationRule]) -> List[str]:
+    """
+    Codes rejected by any of the rules, in input order
+
+    Length conditions are evaluated once per distinct code length and rule.
+
+    :param vendor_codes: codes to validate
+    :type vendor_codes: iterable of str
+
+    :param rules: compiled rules
+    :type rules: iterable of ValidationRule
+
+    :rtype: list
+    """
+    rules = tuple(rules)
+    if not rules:
+        return []
+
+    length_results: Dict[Tuple[int, int], bool] = {}
+    rejected = []
+    for vendor_code in vendor_codes:
+        length = len(vendor_code)
+        for index, rule in enumerate(rules):
+            if not rule.applies_to(vendor_code):
+                continue
+            key = (index, length)
+            accepted = length_results.get(key)
+            if accepted is None:
+                accepted = length_results[key] = rule.check_length(length)
+            if not accepted:
+                rejected.append(vendor_code)
+                break
+    return rejected
+
+
+def first_matching_rules(vendor_codes: Iterable[str], rules: Iterable[ValidationRule]) -> List[Optional[int]]:
+    """
+    Index of the first rule whose length condition holds for each code, None when no rule holds
+
+    Used by fetchers which pick the request shape of an item by rule, the rule type is not checked.
+
+    :rtype: list
+    """
+    rules = tuple(rules)
+    by_length: Dict[int, Optional[int]] = {}
+    matches = []
+    for vendor_code in vendor_codes:
+        length = len(vendor_code)
+        if length not in by_length:
+            by_length[length] = next((index for index, rule in enumerate(rules) if rule.check_length(length)), None)
+        matches.append(by_length[length])
+    return matches
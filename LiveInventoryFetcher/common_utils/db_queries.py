@@ -1,6 +1,13 @@
 """Collection of complex and other business logic related li_db queries."""
 
+# range scan of vendors_next_due_at_idx, see migrations/003_sync_next_due_at.sql
 QUERY_FETCH_SYNC_CANDIDATE_FROM_VENDORS = (
+    "select vendor_id, config_path from vendors as v "
+    "where v.next_due_at <= NOW() and v.enabled != false;"
+)
+
+# same candidates without next_due_at, for a database the migration was not applied to
+QUERY_FETCH_SYNC_CANDIDATE_FROM_VENDORS_SCAN = (
     "select vendor_id, config_path from vendors as v "
     "where NOW() - v.last_fetch_date >= v.sync_interval and v.enabled != false;"
 )
@@ -11,7 +18,14 @@ QUERY_UPDATE_LAST_MOD_VENDORS = (
     "where vendor_id = %(vendor_id)s;"
 )
 
+# next_due_at of a vendor code is only set when its product is a priority one
 QUERY_FETCH_AND_PRIORITY_FETCH_SYNC_CANDIDATE_FROM_VENDORS_VENDORS_CODE_PRODUCTS = (
+    "select v.vendor_id , vc.vendor_code  from vendor_codes vc "
+    "inner join vendors v on vc.vendor_id  = v.vendor_id "
+    "where vc.next_due_at <= now() and v.enabled != false;"
+)
+
+QUERY_FETCH_AND_PRIORITY_FETCH_SYNC_CANDIDATE_FROM_VENDORS_VENDORS_CODE_PRODUCTS_SCAN = (
     "select v.vendor_id , vc.vendor_code  from vendor_codes vc "
     "inner join products p on vc.internal_id = p.internal_id "
     "inner join vendors v on vc.vendor_id  = v.vendor_id "
@@ -57,6 +71,26 @@ QUERY_FETCH_VENDORS_CONFIG = (
     "group by vendor_id;"
 )
 
+# vendor codes not fetched within the vendor's sync interval, or all of them on every
+# `full_refresh_every`-th regular sync of the vendor, see migrations/006_vendor_sync_cycle.sql
+QUERY_FETCH_VENDORS_CONFIG_STALE = (
+    "with cycle as ( "
+    "update vendors set sync_cycle = sync_cycle + 1 where vendor_id = %(vendor_id)s "
+    "returning sync_interval, sync_cycle %% %(full_refresh_every)s = 0 as full_refresh) "
+    "select "
+    "jsonb_build_object( "
+    "'vendor_id',vendor_id, "
+    "'config_file_path',%(config_file_path)s||vendor_id::text||'.json', "
+    "'fetcher_write_path', %(fetcher_write_path)s, "
+    "'item_codes',coalesce(json_agg(distinct vc.vendor_code::text) filter (where cycle.full_refresh "
+    "or vc.last_fetch_date is null or vc.last_fetch_date <= now() - cycle.sync_interval), '[]'::json), "
+    "'template_values',jsonb_object_agg(key_name, value)), "
+    "bool_or(cycle.full_refresh) as full_refresh, count(distinct vc.vendor_code) as vendor_code_count "
+    "from vendor_configs vconfig inner join vendor_codes vc using(vendor_id) cross join cycle "
+    "where vconfig.vendor_id = %(vendor_id)s "
+    "group by vendor_id;"
+)
+
 QUERY_FETCH_VENDORS_CONFIG_PRIORITY = (
     "select "
     "jsonb_build_object( "
@@ -133,6 +167,10 @@ QUERY_FETCH_VENDOR_CODE_INTERNAL_ID_MAPPING = (
     "select vendor_code, internal_id from vendor_codes where vendor_id=%s"
 )
 
+QUERY_FETCH_VENDOR_CODES_VERSION = (
+    "select version from vendor_codes_version where vendor_id = %(vendor_id)s"
+)
+
 QUERY_FETCH_DATA_FROM_INVENTORY_USING_INTERNAL_ID = (
     """
     select vc.internal_id, vc.vendor_code, vc.vendor_id,
@@ -168,3 +206,50 @@ QUERY_DELETE_OLD_RECORD_INVENTORY = (
     "delete from inventory i where (NOW() - case when (i.last_valid_inserted_updated is not NULL) then "
     "i.last_valid_inserted_updated else  i.created_on end >  %(invalid_record_age)s) and i.invalid = true;"
 )
+
+# vendor_response_cache, see migrations/005_vendor_response_cache.sql
+QUERY_FETCH_FRESH_VENDOR_RESPONSE_CODES = (
+    "select c.vendor_code from vendor_response_cache c inner join vendors v using (vendor_id) "
+    "where c.vendor_id = %(vendor_id)s and c.vendor_code = any(%(vendor_codes)s) "
+    "and c.fetched_at > now() - coalesce(v.response_cache_ttl, %(default_ttl)s * interval '1 second');"
+)
+
+QUERY_FETCH_VENDOR_RESPONSE_RECORDS = (
+    "select vendor_code, record from vendor_response_cache "
+    "where vendor_id = %(vendor_id)s and vendor_code = any(%(vendor_codes)s);"
+)
+
+QUERY_UPSERT_VENDOR_RESPONSE_RECORDS = (
+    "insert into vendor_response_cache (vendor_id, vendor_code, record, fetched_at) "
+    "select %(vendor_id)s, t.vendor_code, t.record::jsonb, now() "
+    "from unnest(%(vendor_codes)s::text[], %(records)s::text[]) as t(vendor_code, record) "
+    "on conflict (vendor_id, vendor_code) do update set record = excluded.record, fetched_at = excluded.fetched_at;"
+)
+
+# fetch_retry_ledger, see migrations/007_fetch_retry_ledger.sql
+QUERY_RECORD_FAILED_FETCH_BATCH = (
+    "insert into fetch_retry_ledger (vendor_id, item_codes, error_class, error, attempt, next_retry_at) "
+    "values (%(vendor_id)s, %(item_codes)s::text[], %(error_class)s, %(error)s, %(attempt)s, "
+    "now() + %(retry_delay)s * power(2, %(attempt)s - 1) * interval '1 second');"
+)
+
+# session level lock of a vendor's pagination checkpoint, see fetcher/pagination_checkpoint.py
+QUERY_TRY_LOCK_PAGINATION_CHECKPOINT = (
+    "select pg_try_advisory_lock(hashtext('pagination_checkpoint'), %(vendor_id)s);"
+)
+
+QUERY_UNLOCK_PAGINATION_CHECKPOINT = (
+    "select pg_advisory_unlock(hashtext('pagination_checkpoint'), %(vendor_id)s);"
+)
+
+QUERY_LEASE_DUE_FETCH_RETRIES = (
+    "update fetch_retry_ledger set claimed_until = now() + %(lease)s * interval '1 second' where retry_id in ("
+    "select retry_id from fetch_retry_ledger where next_retry_at <= now() "
+    "and (claimed_until is null or claimed_until <= now()) "
+    "order by next_retry_at limit %(limit)s for update skip locked) "
+    "returning retry_id, vendor_id, item_codes, error_class, attempt;"
+)
+
+QUERY_DELETE_FETCH_RETRIES = (
+    "delete from fetch_retry_ledger where retry_id = any(%(retry_ids)s::bigint[]);"
+)
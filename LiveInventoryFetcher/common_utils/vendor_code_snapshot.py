@@ -0,0 +1,164 @@
+"""
+Versioned snapshot of the vendor_codes of one vendor.
+
+The fetcher and the extractor both need the vendor_code -> internal_id mapping of the
+vendor being synced. A snapshot holds that mapping as dict/set indexes and is cached per
+process, keyed by the change counter `vendor_codes_version.version` of the vendor (kept up
+to date by the trigger in migrations/001_vendor_codes_version.sql). As long as the counter
+has not moved the cached snapshot is reused and vendor_codes is not read again.
+
+When the counter table does not exist the snapshot is loaded on every call, exactly like
+the queries it replaces; so it is for a call whose counter read failed otherwise.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+from psycopg2 import errors as pg_errors
+
+from LiveInventoryFetcher.config import Config
+from LiveInventoryFetcher.common_utils.db_queries import QUERY_FETCH_VENDOR_CODE_INTERNAL_ID_MAPPING, \
+    QUERY_FETCH_VENDOR_CODES_VERSION
+
+logger = logging
+
+
+class VendorCodeSnapshot:
+    """
+    vendor_code -> internal_ids of one vendor at a given vendor_codes version
+
+    :param vendor_id: vendor the snapshot belongs to
+    :type vendor_id: int
+
+    :param version: value of the vendor_codes change counter, None if unknown
+    :type version: int, optional
+
+    :param rows: (vendor_code, internal_id) tuples
+    :type rows: iterable
+    """
+
+    __slots__ = ('vendor_id', 'version', 'internal_ids', '_by_lower')
+
+    def __init__(self, vendor_id: int, version: Optional[int], rows: Iterable[tuple]) -> None:
+        self.vendor_id = vendor_id
+        self.version = version
+        self.internal_ids: Dict[str, List[Any]] = {}
+        self._by_lower: Dict[str, List[Any]] = {}
+        for vendor_code, internal_id in rows:
+            self.internal_ids.setdefault(vendor_code, []).append(internal_id)
+            self._by_lower.setdefault(vendor_code.lower(), []).append(internal_id)
+
+    def __contains__(self, vendor_code: str) -> bool:
+        return vendor_code in self.internal_ids
+
+    def __len__(self) -> int:
+        return len(self.internal_ids)
+
+    def get_internal_ids(self, vendor_code: str, ignore_case: bool = False) -> List[Any]:
+        """
+        internal_ids mapped to the vendor code, empty list for an unknown code
+        """
+        if ignore_case:
+            return self._by_lower.get(vendor_code.lower(), [])
+        return self.internal_ids.get(vendor_code, [])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        serializable form, e.g. to hand the snapshot over in a stage message
+        """
+        return {'vendor_id': self.vendor_id, 'version': self.version, 'internal_ids': self.internal_ids}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'VendorCodeSnapshot':
+        rows = ((vendor_code, internal_id) for vendor_code, internal_ids in data.get('internal_ids', {}).items()
+                for internal_id in internal_ids)
+        return cls(data.get('vendor_id'), data.get('version'), rows)
+
+
+_snapshots = OrderedDict()  # vendor_id -> VendorCodeSnapshot
+_lock = threading.Lock()
+# set once the counter table turned out to be missing, so it is not queried on every call
+_versioning_unavailable = False
+
+
+def fetch_vendor_codes_version(li_db, vendor_id: int) -> Optional[int]:
+    """
+    Read the vendor_codes change counter of the vendor
+
+    :return: counter value, 0 for a vendor whose codes never changed since the migration,
+             None when the counter table is not available.
+    """
+    global _versioning_unavailable
+    if _versioning_unavailable:
+        return None
+    try:
+        with li_db.transaction(auto_commit=True) as qryset:
+            result = qryset.execute_query(QUERY_FETCH_VENDOR_CODES_VERSION, {'vendor_id': vendor_id})
+            rows = result.to_tuples() if result else []
+    except (pg_errors.UndefinedTable, pg_errors.UndefinedColumn) as ex:
+        logger.warning(f"vendor_codes version is not available, snapshots will not be cached: {ex}")
+        _versioning_unavailable = True
+        return None
+    except Exception as ex:
+        # e.g. a dropped connection, the next call asks again
+        logger.warning(f"Could not read the vendor_codes version of vendor {vendor_id}, "
+                       f"the snapshot is loaded uncached: {ex}")
+        return None
+    return rows[0][0] if rows else 0
+
+
+def load_vendor_code_snapshot(li_db, vendor_id: int, version: Optional[int] = None) -> VendorCodeSnapshot:
+    """
+    Read the vendor_codes of the vendor into a new snapshot
+    """
+    with li_db.transaction(auto_commit=True) as qryset:
+        result = qryset.stream_query(QUERY_FETCH_VENDOR_CODE_INTERNAL_ID_MAPPING, (vendor_id,))
+        snapshot = VendorCodeSnapshot(vendor_id, version, result.iter_rows('tuple'))
+    logger.debug(f"Loaded {len(snapshot)} vendor codes of vendor {vendor_id} at version {version}")
+    return snapshot
+
+
+def get_vendor_code_snapshot(li_db, vendor_id: int, version: Optional[int] = None) -> VendorCodeSnapshot:
+    """
+    Snapshot of the vendor's codes, served from the process cache while the version matches
+
+    :param li_db: data access layer to read from
+    :type li_db: PgSQLDAL
+
+    :param vendor_id: vendor to get the codes of
+    :type vendor_id: int
+
+    :param version: vendor_codes version the caller already knows (e.g. passed on by the previous
+                    stage), the counter is read from the database when not given.
+    :type version: int, optional
+
+    :rtype: VendorCodeSnapshot
+    """
+    if version is None:
+        version = fetch_vendor_codes_version(li_db, vendor_id)
+
+    if version is not None:
+        with _lock:
+            snapshot = _snapshots.get(vendor_id)
+            if snapshot is not None and snapshot.version == version:
+                _snapshots.move_to_end(vendor_id)
+                return snapshot
+
+    snapshot = load_vendor_code_snapshot(li_db, vendor_id, version)
+    if version is not None:
+        with _lock:
+            _snapshots[vendor_id] = snapshot
+            _snapshots.move_to_end(vendor_id)
+            while len(_snapshots) > Config.VENDOR_CODE_SNAPSHOT_CACHE_SIZE:
+                _snapshots.popitem(last=False)
+    return snapshot
+
+
+def clear_vendor_code_snapshots() -> None:
+    """
+    Drop every cached snapshot
+    """
+    with _lock:
+        _snapshots.clear()
@@ -0,0 +1,130 @@
+"""
+Short lived cache of the normalized vendor records per (vendor_id, vendor_code).
+
+Priority, regular and on-demand syncs overlap: the same codes of a vendor are often asked
+for again a few seconds after the last call returned them. The extractor stores the record
+it built for every code the vendor returned (table vendor_response_cache,
+migrations/005_vendor_response_cache.sql); the fetcher leaves out of the vendor call the codes
+whose record is younger than the vendor's TTL, and passes them on as `cached_item_codes`
+for the extractor to add their stored records back.
+
+The cache is opt-in: it is off while `vendor_response_cache_ttl` is 0 (the default). The TTL
+is `vendors.response_cache_ttl`, or `vendor_response_cache_ttl` seconds when it is not set; a
+TTL of 0 asks the vendor for every code. Codes are matched case insensitively, like the
+extractor matches the vendor's codes to the requested ones. Records nulled for an error
+status are not stored. When the cache table does not exist every code is fetched from the
+vendor; any other database error only skips the cache for that call.
+"""
+
+import logging
+from typing import Any, Dict, Iterable, List, Tuple
+
+from psycopg2 import errors as pg_errors
+
+from LiveInventoryFetcher.config import Config
+from LiveInventoryFetcher.common_utils import json_codec
+from LiveInventoryFetcher.common_utils.db_queries import QUERY_FETCH_FRESH_VENDOR_RESPONSE_CODES, \
+    QUERY_FETCH_VENDOR_RESPONSE_RECORDS, QUERY_UPSERT_VENDOR_RESPONSE_RECORDS
+
+logger = logging
+
+# set once the cache table turned out to be missing, so it is not queried on every call
+_cache_unavailable = False
+
+
+def _cache_error(ex: Exception) -> None:
+    """
+    a missing cache table turns the cache off for the process, other errors only skip it for the call
+    """
+    global _cache_unavailable
+    if isinstance(ex, (pg_errors.UndefinedTable, pg_errors.UndefinedColumn)):
+        logger.warning(f"vendor response cache is not available, every code is fetched from the vendor: {ex}")
+        _cache_unavailable = True
+    else:
+        logger.warning(f"vendor response cache skipped: {ex}")
+
+
+def split_cached_item_codes(li_db, vendor_id: int, item_codes: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """
+    Split the item codes into the ones to ask the vendor for and the ones with a fresh cached record
+
+    :param li_db: data access layer to read from
+    :type li_db: PgSQLDAL
+
+    :param vendor_id: vendor the codes belong to
+    :type vendor_id: int
+
+    :param item_codes: codes the sync wants
+    :type item_codes: iterable
+
+    :return: (codes to fetch, cached codes), both in the order given
+    """
+    item_codes = list(item_codes)
+    if _cache_unavailable or not Config.VENDOR_RESPONSE_CACHE_TTL or not item_codes:
+        return item_codes, []
+    try:
+        with li_db.transaction(auto_commit=True) as qryset:
+            result = qryset.execute_query(QUERY_FETCH_FRESH_VENDOR_RESPONSE_CODES, {
+                'vendor_id': vendor_id,
+                'vendor_codes': sorted({item_code.lower() for item_code in item_codes}),
+                'default_ttl': Config.VENDOR_RESPONSE_CACHE_TTL,
+            })
+            fresh = {row[0] for row in (result.to_tuples() if result else [])}
+    except Exception as ex:
+        _cache_error(ex)
+        return item_codes, []
+    to_fetch = [item_code for item_code in item_codes if item_code.lower() not in fresh]
+    cached = [item_code for item_code in item_codes if item_code.lower() in fresh]
+    if cached:
+        logger.info(f"vendor_id: {vendor_id}: {len(cached)} of {len(item_codes)} item code(s) served from the "
+                    f"response cache")
+    return to_fetch, cached
+
+
+def load_cached_records(li_db, vendor_id: int, vendor_codes: Iterable[str]) -> List[Dict[str, Any]]:
+    """
+    Stored records of the codes, the fetcher already checked they are fresh
+
+    :return: one record per code found, codes no longer in the cache are left out
+    """
+    vendor_codes = sorted({vendor_code.lower() for vendor_code in vendor_codes})
+    if _cache_unavailable or not vendor_codes:
+        return []
+    try:
+        with li_db.transaction(auto_commit=True) as qryset:
+            result = qryset.execute_query(QUERY_FETCH_VENDOR_RESPONSE_RECORDS,
+                                          {'vendor_id': vendor_id, 'vendor_codes': vendor_codes})
+            rows = result.to_tuples() if result else []
+    except Exception as ex:
+        _cache_error(ex)
+        return []
+    return [json_codec.loads(record) if isinstance(record, (str, bytes)) else record for _, record in rows]
+
+
+def store_records(li_db, vendor_id: int, records: Iterable[Dict[str, Any]]) -> int:
+    """
+    Store the records the vendor just returned, one per vendor code, replacing older ones
+
+    :param records: normalized records, keyed by their `vendor_code`
+    :return: number of codes stored
+    """
+    if _cache_unavailable or not Config.VENDOR_RESPONSE_CACHE_TTL:
+        return 0
+    by_code = {}
+    for record in records:
+        vendor_code = record.get('vendor_code')
+        if vendor_code is not None:
+            by_code[str(vendor_code).lower()] = json_codec.dumps_text(record)
+    if not by_code:
+        return 0
+    try:
+        with li_db.transaction(auto_commit=True) as qryset:
+            qryset.execute_non_query(QUERY_UPSERT_VENDOR_RESPONSE_RECORDS, {
+                'vendor_id': vendor_id,
+                'vendor_codes': list(by_code.keys()),
+                'records': list(by_code.values()),
+            })
+    except Exception as ex:
+        _cache_error(ex)
+        return 0
+    return len(by_code)
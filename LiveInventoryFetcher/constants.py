@@ -1,6 +1,7 @@
 """
 this module contain all the fixed values regarding this project
 """
+import os
 
-# define the config file
-CONFIG_FILE_PATH = "config.ini"
+# define the config file, LI_CONFIG_FILE points a local run (e.g. the benchmarks) to another one
+CONFIG_FILE_PATH = os.environ.get('LI_CONFIG_FILE', "config.ini")
@@ -101,6 +101,7 @@ class CSVFetcher(FetcherBase):
                                             timeout=Config.REQUEST_TIMEOUT,
                                             auth=HTTPDigestAuth(req_header.get('username'),
                                                                 req_header.get('password')))
+                self.count_bytes_in(len(response.content))
                 self.response_info["vendor_id"] = self.kwargs.get('vendor_id')
                 self.response_info["response_code"] = response.status_code
                 if response.status_code not in range(200, 210):
@@ -127,7 +128,8 @@ class CSVFetcher(FetcherBase):
                 jsonArray = []
                 for row in csvReader:
                     jsonArray.append(row)
-            self.data = json.dumps(jsonArray)  # response.text
+            # records are handed to write as they are, the artifact codec encodes them once
+            self.data = jsonArray
         except Exception as ex:
             self.logger.error("The response is not a valid JSON", exc_info=True)
             raise CSVDataException("The received response is not a valid JSON")
@@ -1,4 +1,6 @@
+from typing import List
 from LiveInventoryFetcher.base.base import *
+from LiveInventoryFetcher.common_utils.fetch_retry_ledger import finish_retries, record_failed_batches
 
 
 class FetcherBase(Base):
@@ -6,9 +8,14 @@ class FetcherBase(Base):
     def __init__(self, **kwargs) -> None:
         super().__init__(**kwargs)
         self.object_type = ObjectType.FETCHER
-        self.summary = {}
         # declaration of variable that holds the list dictionary of error and error description status for each vendor
         self.vendor_codes_error_status = None
+        # vendor_codes version the vendor codes were validated against, passed on to the extractor
+        self.vendor_codes_version = None
+        # requested codes left out of the vendor call, their record is still fresh in the vendor response cache
+        self.cached_item_codes = []
+        # batches the vendor did not answer: item_codes, error_class and error, see common_utils/fetch_retry_ledger.py
+        self.failed_batches = []
 
     @abstractmethod
     def fetch_config(self) -> Any:
@@ -19,9 +26,43 @@ class FetcherBase(Base):
         pass
 
     def execute(self) -> Any:
-        return self.fetch_config(). \
-                    fetch_vendor_data(). \
-                    write(data_file_dir = self.kwargs['fetcher_write_path'])
+        # the stages stay chained on their return values, each one timed by its own span
+        with self.stage_span('fetch_config'):
+            stage = self.fetch_config()
+        # ledger batches leased for this retry, see common_utils/fetch_retry_ledger.py
+        retry_ids = self.kwargs.get('retry_ids') or []
+        try:
+            with self.stage_span('fetch_vendor_data'):
+                stage = stage.fetch_vendor_data()
+        finally:
+            # recorded also when the fetch gave up, the retry asks only for the failed codes
+            if self.failed_batches:
+                record_failed_batches(self.li_db, self.kwargs.get('vendor_id'), self.failed_batches,
+                                      self.kwargs.get('retry_attempt', 0) + 1, retry_ids)
+                retry_ids = []
+        with self.stage_span('write'):
+            stage = stage.write(data_file_dir = self.kwargs['fetcher_write_path'])
+        # a retry that crashed before this point keeps its lease and is taken again once it ends
+        finish_retries(self.li_db, retry_ids)
+        return stage
+
+    def record_failed_batch(self, item_codes: List[str], error_class: str, error: str = None,
+                            attempt: int = None) -> None:
+        """
+        Remember a batch the vendor did not answer, e.g. error_class 'HTTP 503' or 'ReadTimeout'
+
+        :param attempt: retry attempt of the batch when it is not the next one of this command
+        """
+        self.logger.warning(f"Batch of {len(item_codes)} item code(s) failed: {error_class} {error or ''}")
+        self.failed_batches.append({'item_codes': list(item_codes), 'error_class': error_class, 'error': error,
+                                    'attempt': attempt})
+
+    def succeeded_item_codes(self, item_codes: List[str]) -> List[str]:
+        """
+        The item codes that were not part of a failed batch
+        """
+        failed = {item_code for batch in self.failed_batches for item_code in batch['item_codes']}
+        return [item_code for item_code in item_codes or [] if item_code not in failed]
 
     def execution_summary(self)->Any:
         return self.summary
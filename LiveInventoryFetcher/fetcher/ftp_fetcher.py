@@ -129,6 +129,7 @@ class FTPFetcher(FetcherBase):
                         raise FTPFileNotFoundException(f'File {file_copy} not available in FTP server')
                     # ftp.retrbinary('RETR ' + filename, localfile.write, 1024)
                     res = ftp.retrbinary('RETR ' + file_copy, localfile.write)
+                    self.count_bytes_in(localfile.tell())
 
                     self.dispatch_ftp_response(200, None)
                     if not res.startswith('226 Transfer complete'):
@@ -0,0 +1,308 @@
+"""
+this module fetches every page of a paginated vendor API
+
+The `pagination_control` section of a vendor config describes the pagination::
+
+    "pagination_control": {
+        "style": "page",                    # page (default), offset or cursor
+        "max_concurrency": 4,               # pages fetched at the same time
+        "page_size": 100,                   # items per page, sent when request.page_size is set
+        "max_pages": 1000,                  # safety stop
+        "request": {
+            "param_location": "url",        # url (default), header or body (fields of the JSON body)
+            "page_number": "page",          # page style: parameter carrying the page number
+            "first_page": 1,
+            "offset": "offset",             # offset style: parameter carrying the offset
+            "page_size": "limit",           # parameter carrying the page size
+            "cursor": "cursor"              # cursor style: parameter carrying the cursor
+        },
+        "response": {
+            "param_location": "header",     # header or body
+            "total_pages": "X-Total-Pages", # header name / dotted body path of the page count
+            "total_items": "X-Total-Count", # or of the item count, divided by page_size
+            "items": "data",                # dotted body path of the items, the body itself if not set
+            "next_cursor": "meta.next"      # cursor style: dotted body path of the next cursor
+        }
+    }
+
+Page and offset pagination learn the total from the first page and fetch the remaining
+pages concurrently. Without a total the next page is prefetched while the current one is
+parsed, until a page comes back empty or short. Cursor pagination is sequential by nature.
+iter_pages yields the pages one by one and can start at a later page, which is how a
+checkpointed pull resumes (fetcher/pagination_checkpoint.py).
+
+A page the iteration reached and could not fetch is recorded in `failed_pages` (a page
+prefetched past the last one may fail, e.g. with 404, and is ignored). fetch_all raises
+PaginationException when any page failed, a catalog with missing pages is not a complete pull.
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import json
+import logging
+import math
+import threading
+
+from LiveInventoryFetcher.common_utils import json_codec
+
+logger = logging
+
+PAGINATION_STYLE_PAGE = "page"
+PAGINATION_STYLE_OFFSET = "offset"
+PAGINATION_STYLE_CURSOR = "cursor"
+
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_MAX_PAGES = 1000
+
+PARAM_LOCATION_URL = "url"
+PARAM_LOCATION_HEADER = "header"
+PARAM_LOCATION_BODY = "body"
+
+
+class PaginationException(Exception):
+    pass
+
+
+def _get_path(data: Any, path: Optional[str]) -> Any:
+    if not path:
+        return data
+    for key in path.split('.'):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+class PaginationEngine:
+    """
+    Fetches all pages described by a `pagination_control` config
+
+    :param pagination_control: `pagination_control` section of the vendor config
+    :type pagination_control: dict
+
+    :param fetch_page: makes the request for one page, takes the url parameters, headers and body of the
+                       page (see request_parts) and returns the response (`status_code`, `headers`, `text`)
+    :type fetch_page: callable
+
+    :param url_params: url parameters of every page request
+    :type url_params: dict, optional
+
+    :param headers: headers of every page request
+    :type headers: dict, optional
+
+    :param body: JSON body of every page request
+    :type body: str, optional
+    """
+
+    def __init__(self, pagination_control: Dict[str, Any],
+                 fetch_page: Callable[[Dict[str, Any], Dict[str, Any], str], Any],
+                 url_params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, Any]] = None,
+                 body: str = '{}') -> None:
+        self.control = pagination_control or {}
+        self.request = self.control.get('request') or {}
+        self.response = self.control.get('response') or {}
+        self.style = self.control.get('style', PAGINATION_STYLE_PAGE)
+        if self.style not in (PAGINATION_STYLE_PAGE, PAGINATION_STYLE_OFFSET, PAGINATION_STYLE_CURSOR):
+            raise PaginationException(f"Unknown pagination style {self.style!r}")
+        self.param_location = self.request.get('param_location', PARAM_LOCATION_URL)
+        if self.param_location not in (PARAM_LOCATION_URL, PARAM_LOCATION_HEADER, PARAM_LOCATION_BODY):
+            raise PaginationException(f"Unknown pagination_control.request.param_location {self.param_location!r}")
+        self.fetch_page = fetch_page
+        self.max_concurrency = max(1, int(self.control.get('max_concurrency', DEFAULT_MAX_CONCURRENCY)))
+        self.max_pages = int(self.control.get('max_pages', DEFAULT_MAX_PAGES))
+        self.page_size = int(self.control['page_size']) if self.control.get('page_size') else None
+        self.first_page = int(self.request.get('first_page', 1))
+        self.url_params = url_params or {}
+        self.headers = headers or {}
+        self.body = body
+        self.pages_fetched = 0
+        self.failed_pages = []
+        # pages are fetched from pool threads
+        self._lock = threading.Lock()
+
+    def page_params(self, index: int, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        pagination parameters of the page with the given 0-based index
+        """
+        params = {}
+        if self.page_size and self.request.get('page_size'):
+            params[self.request['page_size']] = self.page_size
+        if self.style == PAGINATION_STYLE_PAGE:
+            params[self.request.get('page_number', 'page')] = self.first_page + index
+        elif self.style == PAGINATION_STYLE_OFFSET:
+            if not self.page_size:
+                raise PaginationException("Offset pagination needs pagination_control.page_size")
+            params[self.request.get('offset', 'offset')] = index * self.page_size
+        elif cursor is not None:
+            params[self.request.get('cursor', 'cursor')] = cursor
+        return params
+
+    def request_parts(self, page_params: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any], str]:
+        """
+        url parameters, headers and body of a page request, the base ones of the request (`url_params`,
+        `headers`, `body`) with the page parameters added where request.param_location says
+        """
+        url_params, headers, body = self.url_params, self.headers, self.body
+        if self.param_location == PARAM_LOCATION_HEADER:
+            headers = dict(headers, **{name: str(value) for name, value in page_params.items()})
+        elif self.param_location == PARAM_LOCATION_BODY:
+            body = json.dumps(dict(json.loads(body or '{}'), **page_params))
+        else:
+            url_params = dict(url_params, **page_params)
+        return url_params, headers, body
+
+    def parse(self, response: Any) -> Tuple[List[Any], Optional[int], Optional[str]]:
+        """
+        items, total page count and next cursor of one page response
+        """
+        body = json_codec.load_response(response)
+        items = _get_path(body, self.response.get('items'))
+        if items is None:
+            items = []
+        elif not isinstance(items, list):
+            items = [items]
+
+        if self.response.get('param_location') == 'header':
+            def lookup(name):
+                return response.headers.get(name) if name else None
+        else:
+            def lookup(name):
+                return _get_path(body, name) if name else None
+
+        total_pages = lookup(self.response.get('total_pages'))
+        total_items = lookup(self.response.get('total_items'))
+        if total_pages is not None:
+            total_pages = int(total_pages)
+        elif total_items is not None and self.page_size:
+            total_pages = math.ceil(int(total_items) / self.page_size)
+        next_cursor = lookup(self.response.get('next_cursor')) if self.style == PAGINATION_STYLE_CURSOR else None
+        return items, total_pages, next_cursor
+
+    def _get(self, index: int, cursor: Optional[str] = None) -> Tuple[Optional[Any], Optional[str]]:
+        """
+        request one page, may run in a pool thread
+
+        :return: the response, and why the page failed (None when it did not)
+        """
+        try:
+            response = self.fetch_page(*self.request_parts(self.page_params(index, cursor)))
+        except Exception as ex:
+            # e.g. a timed out request, the page failed like one answered with an error status
+            return None, str(ex)
+        finally:
+            with self._lock:
+                self.pages_fetched += 1
+        if response is None:
+            return None, "no response"
+        if response.status_code not in range(200, 210):
+            return None, f"status: {response.status_code}"
+        return response, None
+
+    def _consume(self, index: int, outcome: Tuple[Optional[Any], Optional[str]]) -> Optional[Any]:
+        """
+        the response of a page the iteration reached, a failed one is recorded in failed_pages. Pages
+        requested ahead and never reached (past a short last page) are not, whatever they returned.
+        """
+        response, reason = outcome
+        if response is None:
+            self.failed_pages.append(index)
+            logger.error(f"Page {index + 1} could not be fetched, {reason}")
+        return response
+
+    def _is_last(self, items: List[Any]) -> bool:
+        return not items or (self.page_size is not None and len(items) < self.page_size)
+
+    def fetch_all(self) -> List[Any]:
+        """
+        Fetch every page and return their items, in page order
+
+        :rtype: list
+        :raises PaginationException: Raised when a page could not be fetched.
+        """
+        items = [item for _, page_items, _ in self.iter_pages() for item in page_items]
+        if self.failed_pages:
+            raise PaginationException(f"{len(self.failed_pages)} page(s) could not be fetched: "
+                                      f"{sorted(index + 1 for index in self.failed_pages)}")
+        return items
+
+    def iter_pages(self, start_index: int = 0, cursor: Optional[str] = None,
+                   stop_on_failure: bool = False) -> Iterator[Tuple[int, List[Any], Optional[str]]]:
+        """
+        Fetch the pages from `start_index` on, fetched like fetch_all does, and yield them in page order
+
+        :param start_index: 0-based index of the first page, e.g. the next page of a checkpoint
+        :param cursor: cursor style: cursor of the page at `start_index`
+        :param stop_on_failure: end at the first page that could not be fetched instead of skipping it,
+                                so that every page before the last one yielded is known to be complete
+        :return: (page index, items, cursor of the next page) tuples
+        :raises PaginationException: Raised when the first page could not be fetched.
+        """
+        first = self._consume(start_index, self._get(start_index, cursor))
+        if first is None:
+            raise PaginationException(f"Page {start_index + 1} could not be fetched")
+        items, total_pages, next_cursor = self.parse(first)
+        yield start_index, items, next_cursor
+
+        if self.style == PAGINATION_STYLE_CURSOR:
+            yield from self._iter_by_cursor(start_index + 1, next_cursor)
+        elif total_pages is not None:
+            yield from self._iter_known(start_index + 1, min(total_pages, self.max_pages), stop_on_failure)
+        elif not self._is_last(items):
+            yield from self._iter_speculative(start_index + 1)
+
+    def _iter_by_cursor(self, index: int, cursor: Optional[str]) -> Iterator[Tuple[int, List[Any], Optional[str]]]:
+        while cursor and index < self.max_pages:
+            response = self._consume(index, self._get(index, cursor))
+            if response is None:
+                break
+            page_items, _, cursor = self.parse(response)
+            yield index, page_items, cursor
+            index += 1
+
+    def _iter_known(self, start_index: int, total_pages: int,
+                    stop_on_failure: bool) -> Iterator[Tuple[int, List[Any], Optional[str]]]:
+        """
+        pages start_index..total_pages - 1, fetched concurrently and yielded in page order
+        """
+        if total_pages <= start_index:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, total_pages - start_index),
+                                thread_name_prefix='li-page') as executor:
+            futures = [(index, executor.submit(self._get, index)) for index in range(start_index, total_pages)]
+            try:
+                for index, future in futures:
+                    response = self._consume(index, future.result())
+                    if response is not None:
+                        yield index, self.parse(response)[0], None
+                    elif stop_on_failure:
+                        break
+            finally:
+                # pages not needed any more (a failure, or the caller stopped), their requests are not sent
+                for _, future in futures:
+                    future.cancel()
+
+    def _iter_speculative(self, start_index: int) -> Iterator[Tuple[int, List[Any], Optional[str]]]:
+        """
+        pages from start_index on while the total is unknown, the next page is requested before the current
+        one is parsed
+        """
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='li-page') as executor:
+            in_flight: List[Tuple[int, Future]] = [(start_index, executor.submit(self._get, start_index))]
+            next_index = start_index + 1
+
+            try:
+                while in_flight:
+                    index, future = in_flight.pop(0)
+                    if next_index < self.max_pages:
+                        in_flight.append((next_index, executor.submit(self._get, next_index)))
+                        next_index += 1
+                    response = self._consume(index, future.result())
+                    if response is None:
+                        break
+                    page_items = self.parse(response)[0]
+                    yield index, page_items, None
+                    if self._is_last(page_items):
+                        break
+            finally:
+                for _, future in in_flight:
+                    # pages past the end, their results are discarded
+                    future.cancel()
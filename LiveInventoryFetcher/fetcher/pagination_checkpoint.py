@@ -0,0 +1,174 @@
+"""
+Checkpoints of long paginated pulls (`pagination_checkpoint = true`).
+
+A paginated pull used to keep every page in memory until the last one came in, and a pull
+cut short by a failing page or the function timeout lost all of them and started over from
+the first page. With a checkpoint each page is spilled to the fetcher directory (or blob
+folder) as soon as it is parsed, and a small state document
+`pagination-checkpoint-<vendor_id>.json` records the page to continue from and the parts
+spilled so far. The fetcher hands the parts over as a spill manifest
+(artifact_codec.spill_manifest) which the extractor reads one part at a time.
+
+A pull that stops short hands over the pages it has and records its item codes in the
+fetch retry ledger; the retry resumes from the next page of the checkpoint. A checkpoint is
+only resumed by a retry (a command with a retry_attempt) of the same request and item codes
+(see request_fingerprint), and for `pagination_checkpoint_ttl` seconds; any other pull, and
+a finished or older checkpoint, starts from the first page.
+
+The checkpoint of a vendor is used by one pull at a time: checkpoint_lock holds a Postgres
+advisory lock of the vendor, on a connection of its own, while the pull runs. A pull that does not get it, because
+another pull of the vendor is running, fetches its pages without a checkpoint.
+"""
+
+import hashlib
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from LiveInventoryFetcher.config import Config
+from LiveInventoryFetcher.common_utils import json_codec
+from LiveInventoryFetcher.common_utils.db_queries import QUERY_TRY_LOCK_PAGINATION_CHECKPOINT, \
+    QUERY_UNLOCK_PAGINATION_CHECKPOINT
+from LiveInventoryFetcher.common_utils.artifact_codec import ARTIFACT_FORMAT_JSON, ARTIFACT_FORMAT_META, \
+    encode_artifact, decode_artifact
+from LiveInventoryFetcher.utils.data_access_layer.sql_db import DBEngineFactory
+
+logger = logging
+# the advisory lock belongs to the session, its connection stays open between the lock and the unlock
+lock_db = DBEngineFactory.get_db_engine(Config.DB_CONFIG, DBEngineFactory.POSTGRES,
+                                        **dict(Config.DB_OPTIONS, keep_alive=True))
+
+
+def request_fingerprint(*parts: Any) -> str:
+    """
+    digest of what makes two pulls the same pull, e.g. url, parameters, pagination_control and the
+    sorted item codes
+    """
+    return hashlib.sha1(json_codec.dumps(list(parts))).hexdigest()
+
+
+@contextmanager
+def checkpoint_lock(vendor_id: int) -> Iterator[bool]:
+    """
+    Lock the checkpoint of the vendor for the pull run in the with block
+
+    The lock is a session level advisory lock taken on a connection of its own (lock_db), kept
+    open until the block ends. No transaction stays open around the block, whatever the pull
+    writes is committed as it goes.
+
+    :yields: whether the lock was acquired, False while another pull of the vendor holds it
+    """
+    try:
+        with lock_db.transaction(auto_commit=True) as qryset:
+            result = qryset.execute_query(QUERY_TRY_LOCK_PAGINATION_CHECKPOINT, {'vendor_id': vendor_id})
+            locked = bool(result and result.to_tuples()[0][0])
+    except Exception as ex:
+        logger.warning(f"vendor_id: {vendor_id}: could not lock the pagination checkpoint: {ex}")
+        locked = False
+    try:
+        yield locked
+    finally:
+        if locked:
+            try:
+                with lock_db.transaction(auto_commit=True) as qryset:
+                    qryset.execute_query(QUERY_UNLOCK_PAGINATION_CHECKPOINT, {'vendor_id': vendor_id})
+            except Exception as ex:
+                logger.warning(f"vendor_id: {vendor_id}: could not unlock the pagination checkpoint, "
+                               f"it is unlocked with the connection: {ex}")
+        # the lock ends with the connection at the latest
+        lock_db.disconnect()
+
+
+class PaginationCheckpoint:
+    """
+    :param fetcher: fetcher spilling the pages, its store_payload / load_payload write and read the files
+    :type fetcher: FetcherBase
+
+    :param vendor_id: vendor of the pull, one checkpoint per vendor
+    :type vendor_id: int
+
+    :param fingerprint: request_fingerprint of the pull
+    :type fingerprint: str
+
+    :param data_file_dir: fetcher directory (blob folder)
+    :type data_file_dir: str
+
+    :param resume: whether the pull may resume a checkpoint, only retries do
+    :type resume: bool
+    """
+
+    def __init__(self, fetcher, vendor_id: int, fingerprint: str, data_file_dir: str, resume: bool = False) -> None:
+        self.fetcher = fetcher
+        self.vendor_id = vendor_id
+        self.fingerprint = fingerprint
+        self.data_file_dir = data_file_dir
+        self.resume = resume
+        self.file_name = f"pagination-checkpoint-{vendor_id}"
+        self.state = self._new_state()
+
+    def _new_state(self) -> Dict[str, Any]:
+        return {'fingerprint': self.fingerprint, 'next_index': 0, 'cursor': None, 'parts': [],
+                'complete': False, 'saved_at': None}
+
+    def _path(self) -> str:
+        file_name = self.file_name + ARTIFACT_FORMAT_META[ARTIFACT_FORMAT_JSON]['extension']
+        return file_name if Config.IS_BLOB else os.path.join(self.data_file_dir, file_name)
+
+    def load(self) -> Tuple[int, Optional[str]]:
+        """
+        Read the checkpoint of the vendor
+
+        :return: index and cursor of the page to start from, (0, None) when the pull starts over
+        """
+        if not self.resume:
+            logger.debug(f"vendor_id: {self.vendor_id}: not a retry, pagination starts from the first page")
+            return 0, None
+        try:
+            state, _ = decode_artifact(self.fetcher.load_payload(self._path(), self.data_file_dir))
+        except Exception as ex:
+            logger.debug(f"vendor_id: {self.vendor_id}: no pagination checkpoint: {ex}")
+            return 0, None
+
+        if not isinstance(state, dict) or state.get('fingerprint') != self.fingerprint:
+            logger.info(f"vendor_id: {self.vendor_id}: pagination checkpoint is of another request, starting over")
+        elif state.get('complete'):
+            logger.debug(f"vendor_id: {self.vendor_id}: last pull finished, starting over")
+        elif time.time() - (state.get('saved_at') or 0) > Config.PAGINATION_CHECKPOINT_TTL:
+            logger.info(f"vendor_id: {self.vendor_id}: pagination checkpoint expired, starting over")
+        else:
+            self.state = dict(self._new_state(), **state)
+            logger.info(f"vendor_id: {self.vendor_id}: resuming pagination at page {self.state['next_index'] + 1}, "
+                        f"{len(self.state['parts'])} spilled part(s) not handed over yet")
+        return self.state['next_index'], self.state['cursor']
+
+    def save(self) -> None:
+        self.state['saved_at'] = time.time()
+        payload, _ = encode_artifact(self.state, ARTIFACT_FORMAT_JSON)
+        self.fetcher.store_payload(self.data_file_dir, payload, ARTIFACT_FORMAT_META[ARTIFACT_FORMAT_JSON],
+                                   file_name=self.file_name)
+
+    def spill(self, index: int, records: List[Any], next_cursor: Optional[str] = None) -> None:
+        """
+        Write the records of a page and move the checkpoint past it
+        """
+        if records:
+            payload, _ = encode_artifact(records, Config.ARTIFACT_FORMAT)
+            self.state['parts'].append(self.fetcher.store_payload(self.data_file_dir, payload,
+                                                                  ARTIFACT_FORMAT_META[Config.ARTIFACT_FORMAT]))
+        self.state['next_index'] = index + 1
+        self.state['cursor'] = next_cursor
+        self.save()
+
+    def handover(self, complete: bool) -> List[str]:
+        """
+        Take the spilled parts for the extractor, a complete pull leaves a checkpoint that starts over
+
+        :return: paths of the parts, in page order
+        """
+        parts = self.state['parts']
+        self.state['parts'] = []
+        self.state['complete'] = complete
+        self.save()
+        return parts
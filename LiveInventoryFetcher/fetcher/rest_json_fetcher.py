@@ -1,20 +1,35 @@
 from LiveInventoryFetcher.base.base import Base, UC_ConfigReadException
 from LiveInventoryFetcher.fetcher.fetcherbase import FetcherBase
+from LiveInventoryFetcher.fetcher.pagination import PaginationEngine, PaginationException
+from LiveInventoryFetcher.fetcher.pagination_checkpoint import PaginationCheckpoint, checkpoint_lock, \
+    request_fingerprint
+from LiveInventoryFetcher.common_utils.artifact_codec import spill_manifest
+from LiveInventoryFetcher.common_utils import json_codec
+from LiveInventoryFetcher.common_utils.log_utils import capped
 from LiveInventoryFetcher.config import Config
-from LiveInventoryFetcher.common_utils.db_queries import QUERY_CHECK_IF_VENDOR_CODE_EXISTS_IN_VENDOR_CODES_TABLE
+from LiveInventoryFetcher.common_utils.vendor_code_snapshot import get_vendor_code_snapshot
+from LiveInventoryFetcher.common_utils.vendor_response_cache import split_cached_item_codes
+from LiveInventoryFetcher.common_utils.code_validation import ValidationRuleException, compile_rules, \
+    first_matching_rules
 from LiveInventoryFetcher.utils.data_access_layer.sql_db import DBEngineFactory
 import string
 import json
 import requests
-from LiveInventoryFetcher.common_utils.blob_utils import upload_file_blob
+from LiveInventoryFetcher.common_utils.blob_utils import upload_file_blob_async
 from flatten_dict import flatten, unflatten
 from LiveInventoryFetcher.orm.li_vendor_codes import LIVendorCodes
 from typing import List
 import copy
+import threading
+import time
 
 FETCHER_FILE_PATH = Config.NETWORK_CONFIG.get('fetcher_directory_path')
 
 
+# shared by every instance so that a kept alive connection is reused across invocations
+li_db = DBEngineFactory.get_db_engine(Config.DB_CONFIG, DBEngineFactory.POSTGRES, **Config.DB_OPTIONS)
+
+
 class RESTJSONFetcherArgsException(Exception):
     pass
 
@@ -52,13 +67,14 @@ class RESTJSONFetcher(FetcherBase):
         super().__init__(**kwargs)
         self.item_codes = []
         self.error_field_mapping = {}
-        self.li_db = DBEngineFactory.get_db_engine(Config.DB_CONFIG, DBEngineFactory.POSTGRES)
+        self.li_db = li_db
         self.response_info = {
             "vendor_id": None,
             "response_text": None,
             "response_code": None
         }
         self.summary['FailedBatches'] = 0
+        self._response_lock = threading.Lock()
         # Check if all the mandatory parameters are present
         mandatory_params = ['vendor_id', 'config_file_path',
                             'item_codes', 'template_values']
@@ -79,33 +95,34 @@ class RESTJSONFetcher(FetcherBase):
             self.error_field_mapping = {fld_map.get('destination_field'): fld_map.get('source_field') for fld_map in
                                         error_mapping_list}
 
-        invalid_vendor_codes = []
         # Load other values
         try:
             self.item_codes = self.kwargs.get('item_codes')
             template_values = self.kwargs.get('template_values')
             vendor_id = self.kwargs.get('vendor_id')
 
-            with self.li_db.transaction(auto_commit=True) as query_set:
-                query_check = query_set.execute_query(
-                    QUERY_CHECK_IF_VENDOR_CODE_EXISTS_IN_VENDOR_CODES_TABLE, {'vendor_id': vendor_id})
-                query_check_list = query_check.to_list()
-                valid_vendor_code_list = [
-                    item.get('vendor_code') for item in query_check_list]
-
-            for vendor_code in self.item_codes:
-                if vendor_code not in valid_vendor_code_list:
-                    self.logger.error(
-                        f"Vendor code: '{vendor_code}' not valid vendor code for vendor_id: '{vendor_id}' or not present in database")
-                    self.logger.info(
-                        f"Removing invalid vendor code '{vendor_code}' and formulating request")
-                    invalid_vendor_codes.append(vendor_code)
-                elif self.config_template.get("vendor_code_validation") is True and (
-                        vendor_code.count("-") > 1 or len(vendor_code) > 12):
-                    invalid_vendor_codes.append(vendor_code)
-
-            # uploading invalid vendor info into blob
-            upload_file_blob("invalid_vendor_codes", invalid_vendor_codes)
+            # vendor codes of the vendor, reused from the process cache while vendor_codes is unchanged
+            valid_vendor_codes = get_vendor_code_snapshot(self.li_db, vendor_id)
+            self.vendor_codes_version = valid_vendor_codes.version
+
+            invalid_vendor_codes = [vendor_code for vendor_code in self.item_codes
+                                    if vendor_code not in valid_vendor_codes]
+            if invalid_vendor_codes:
+                self.logger.error(
+                    f"Vendor code(s): {invalid_vendor_codes} not valid vendor code for vendor_id: '{vendor_id}' or not present in database")
+                self.logger.info(
+                    f"Removing {len(invalid_vendor_codes)} invalid vendor code(s) and formulating request")
+
+            if self.config_template.get("vendor_code_validation") is True:
+                rejected_vendor_codes = [vendor_code for vendor_code in self.item_codes
+                                         if vendor_code in valid_vendor_codes and (
+                                                 vendor_code.count("-") > 1 or len(vendor_code) > 12)]
+                if rejected_vendor_codes:
+                    self.logger.info(f"Vendor code(s) rejected by vendor_code_validation: {rejected_vendor_codes}")
+                invalid_vendor_codes.extend(rejected_vendor_codes)
+
+            # queue invalid vendor info for a background upload into blob, empty lists are skipped
+            upload_file_blob_async("invalid_vendor_codes", invalid_vendor_codes)
 
             self.item_codes = list(
                 set(self.item_codes) - set(invalid_vendor_codes))
@@ -113,18 +130,38 @@ class RESTJSONFetcher(FetcherBase):
             if self.item_codes is None or len(self.item_codes) == 0:
                 raise RESTJSONFetcherArgsException("No item_codes passed")
 
+            # codes whose record another sync got from the vendor moments ago are not asked for again,
+            # only when the request is built from the codes (not a whole catalogue or a paginated listing)
+            if self.__requests_by_item_code():
+                self.item_codes, self.cached_item_codes = split_cached_item_codes(self.li_db, vendor_id,
+                                                                                  self.item_codes)
+
             self.summary['RequestItemCodeCount'] = len(self.item_codes)
+            self.summary['CachedItemCodeCount'] = len(self.cached_item_codes)
             if template_values is None or len(template_values) == 0:
                 raise RESTJSONFetcherArgsException("No template_values passed")
 
         except Exception as ex:
             raise UC_ConfigReadException(ex, exc_info=True)
 
+        if not self.item_codes:
+            self.logger.info(f"Every item code of vendor_id: {vendor_id} is served from the response cache")
+            return self
+
         # Use the template_values and item_codes to construct the final config object
         self.request_config = self.__create_config(
             self.config_template, self.item_codes, template_values)
         return self
 
+    def __requests_by_item_code(self) -> bool:
+        """
+        Whether the vendor is asked for the item codes themselves: in the url, or in the body of a non GET request
+        """
+        url = self.config_template.get('api_request_template', {}).get('url', {})
+        if self.ITEM_CODE_STR in url.get('raw', ''):
+            return True
+        return self.config_template.get('items_list') is not None and url.get('method') != "GET"
+
     def make_api_call(self, req_method, req_url, body, req_header, req_url_params):
         """
         Helper function
@@ -138,14 +175,18 @@ class RESTJSONFetcher(FetcherBase):
                                     verify=False,
                                     timeout=Config.REQUEST_TIMEOUT,
                                     params=req_url_params)
-        self.response_info["vendor_id"] = self.kwargs.get('vendor_id')
-        self.response_info["response_code"] = response.status_code
+        self.count_bytes_in(len(response.content))
+        # pages of a paginated pull are fetched from pool threads
+        with self._response_lock:
+            self.response_info["vendor_id"] = self.kwargs.get('vendor_id')
+            self.response_info["response_code"] = response.status_code
+            if response.status_code not in range(200, 210):
+                self.response_info["response_text"] = response.reason
+                self.summary["FailedBatches"] += 1
         if response.status_code not in range(200, 210):
-            self.response_info["response_text"] = response.reason
             self.logger.error("API returned incorrect status code: {}".format(response.status_code))
             self.logger.error("API response body was: ")
-            self.logger.error(response.text)
-            self.summary["FailedBatches"] += 1
+            self.logger.error("%s", capped(response.text))
             # response = None # This will be checked by the caller
         return response
 
@@ -153,6 +194,11 @@ class RESTJSONFetcher(FetcherBase):
         """
         Make the API call and get the data from vendor API
         """
+        if not self.item_codes and self.cached_item_codes:
+            self.summary["ResponseItemCodeCount"] = 0
+            self.data = []
+            return self
+
         try:
             # 1. Prepare/Get data for the request
             self.logger.info("Fetching data from vendor API")
@@ -194,31 +240,31 @@ class RESTJSONFetcher(FetcherBase):
         try:
             # This block is to handle cases with pagination. eg: Nuvia
             if self.request_config.get('pagination_control', None) and req_body == '{}':
-                # We need multiple calls with pagination control, there's nothing to be sent in body
-                fetch_next_page = True
-                page_num = 1
-                total_pages = None
-                self.response_bodies = []
-                while (fetch_next_page):  # We'll loop till we go through all pages
-
-                    # Here we are handling sub-case where the page number has to be sent in url parameter
-                    if flat_request_config.get('pagination_control.request.param_location') == 'url':
-                        req_url_params[flat_request_config.get('pagination_control.request.page_number')] = page_num
-                    tmp_response = self.make_api_call(req_method, req_url,
-                                                      req_body, req_header, req_url_params)
-
-                    self.response_bodies += json.loads(tmp_response.text)
-
-                    # Here we are trying to get a read on how many pages in total are there
-                    # This could be done just once, but no harm reading it in each iteration
-                    if flat_request_config.get('pagination_control.response.param_location') == 'header':
-                        total_pages = tmp_response.headers.get(
-                            flat_request_config.get('pagination_control.response.total_pages'))
-                        total_pages = int(total_pages)
-                    if total_pages and page_num >= total_pages:
-                        fetch_next_page = False
-                    else:
-                        page_num += 1
+                # We need multiple calls with pagination control, there's nothing to be sent in body.
+                # The engine learns the page count from the first page and fetches the rest concurrently
+                def fetch_page(page_url_params, page_header, page_body):
+                    return self.make_api_call(req_method, req_url, page_body, page_header, page_url_params)
+
+                pagination = PaginationEngine(self.request_config.get('pagination_control'), fetch_page,
+                                              req_url_params, req_header, req_body)
+                if Config.PAGINATION_CHECKPOINT:
+                    # a retry only resumes the pull of the same code set
+                    fingerprint = request_fingerprint(req_method, req_url, req_url_params,
+                                                      self.request_config.get('pagination_control'),
+                                                      sorted(self.item_codes))
+                    with checkpoint_lock(self.kwargs.get('vendor_id')) as locked:
+                        if locked:
+                            return self.fetch_pages_checkpointed(pagination, fingerprint, items_response_path)
+                    self.logger.info("Pagination checkpoint is in use by another pull of the vendor, "
+                                     "fetching the pages without it")
+                try:
+                    self.response_bodies = pagination.fetch_all()
+                except PaginationException as ex:
+                    # a catalog with missing pages is not written, nor its item codes marked as fetched
+                    self.record_failed_batch(self.item_codes, type(ex).__name__, str(ex))
+                    raise APIDataException(f"Paginated pull incomplete: {ex}")
+                self.logger.info(f"Fetched {pagination.pages_fetched} page(s), "
+                                 f"{len(pagination.failed_pages)} failed")
 
             elif self.single_item_code_in_url:
                 # If this is the case where we have to send multiple requests
@@ -226,21 +272,33 @@ class RESTJSONFetcher(FetcherBase):
                 self.logger.info("Making multiple API requests with item code in url")
                 self.response_bodies = []
                 for item in self.item_codes:
-                    tmp_response = self.make_api_call(req_method, req_url.replace(self.ITEM_CODE_STR, item),
-                                                      req_body, req_header, req_url_params)
+                    try:
+                        tmp_response = self.make_api_call(req_method, req_url.replace(self.ITEM_CODE_STR, item),
+                                                          req_body, req_header, req_url_params)
+                    except requests.RequestException as ex:
+                        self.summary["FailedBatches"] += 1
+                        self.record_failed_batch([item], type(ex).__name__, str(ex))
+                        continue
                     if tmp_response.status_code == 404:
                         self.logger.warn("Item not found. The API returned 404")
+                    elif tmp_response.status_code not in range(200, 210):
+                        self.record_failed_batch([item], f"HTTP {tmp_response.status_code}", tmp_response.reason)
                     else:
-                        self.response_bodies.append(json.loads(tmp_response.text))
+                        self.response_bodies.append(json_codec.load_response(tmp_response))
             elif hasattr(self, "body_number"):
                 self.logger.info("Making multiple API Request")
                 self.response_bodies = []
-                for item in self.body_number:
+                for item, batch_item_codes in zip(self.body_number, self.body_item_codes):
                     body = json.dumps(item.get('data'))
-                    resp = self.make_api_call(req_method, req_url, body, req_header, req_url_params)
+                    try:
+                        resp = self.make_api_call(req_method, req_url, body, req_header, req_url_params)
+                    except requests.RequestException as ex:
+                        self.summary["FailedBatches"] += 1
+                        self.record_failed_batch(batch_item_codes, type(ex).__name__, str(ex))
+                        continue
 
                     if resp.status_code in range(200, 210):
-                        tmp_response_txt = json.loads(resp.text)
+                        tmp_response_txt = json_codec.load_response(resp)
                         if isinstance(tmp_response_txt, dict) and items_response_path is not None:
                             tmp_flat_data = self.response_mapper(
                                 tmp_response_txt)
@@ -258,21 +316,29 @@ class RESTJSONFetcher(FetcherBase):
                         self.logger.error(
                             "Could not get data from vendor API. API returned HTTP Status code: {}".format(
                                 resp.status_code), exc_info=True)
+                        self.record_failed_batch(batch_item_codes, f"HTTP {resp.status_code}", resp.reason)
             else:
                 self.logger.info("Making API Request")
-                self.response = requests.request(method=req_method,
-                                                 url=req_url,
-                                                 data=req_body,
-                                                 headers=req_header,
-                                                 verify=False,
-                                                 timeout=Config.REQUEST_TIMEOUT,
-                                                 params=req_url_params)
+                try:
+                    self.response = requests.request(method=req_method,
+                                                     url=req_url,
+                                                     data=req_body,
+                                                     headers=req_header,
+                                                     verify=False,
+                                                     timeout=Config.REQUEST_TIMEOUT,
+                                                     params=req_url_params)
+                except requests.RequestException as ex:
+                    self.record_failed_batch(self.item_codes, type(ex).__name__, str(ex))
+                    raise
+                self.count_bytes_in(len(self.response.content))
                 self.response_info["vendor_id"] = self.kwargs.get('vendor_id')
                 self.response_info["response_code"] = self.response.status_code
                 if self.response.status_code not in range(200, 210):
                     self.response_info["response_text"] = self.response.reason
                     self.logger.error("Could not get data from vendor API. API returned HTTP Status code: {}".format(
                         self.response.status_code))
+                    self.record_failed_batch(self.item_codes, f"HTTP {self.response.status_code}",
+                                             self.response.reason)
                     raise APIDataException(
                         "The response from vendor API is not valid")
 
@@ -280,7 +346,7 @@ class RESTJSONFetcher(FetcherBase):
 
             try:
                 if hasattr(self, 'response') and self.response.status_code in range(200, 210):
-                    tmp_response_txt = json.loads(self.response.text)
+                    tmp_response_txt = json_codec.load_response(self.response)
                 else:
                     tmp_response_txt = self.response_bodies
 
@@ -299,17 +365,7 @@ class RESTJSONFetcher(FetcherBase):
                             tmp_response.append(i)
                     tmp_flat_data = tmp_response
                 else:
-                    for data in tmp_response_txt:
-                        if data.get('product_code'):
-                            is_in_req = str(data.get('product_code'))
-                            if is_in_req in self.item_codes:
-                                tmp_flat = flatten(
-                                    data, reducer="dot", max_flatten_depth=4)
-                                tmp_flat_data.append(tmp_flat)
-                        else:
-                            tmp_flat = flatten(
-                                data, reducer="dot", max_flatten_depth=4)
-                            tmp_flat_data.append(tmp_flat)
+                    tmp_flat_data += self.flatten_response_items(tmp_response_txt)
 
             except ValueError as ex:
                 self.logger.error(ex)
@@ -321,18 +377,92 @@ class RESTJSONFetcher(FetcherBase):
             ## Update last fetch date of vendor_codes if it is not already updated while setting error codes
             if not self.error_field_mapping:
                 update_last_fetch_date = LIVendorCodes()
-                update_last_fetch_date.bulk_update_last_fetch_date_vendor_codes(self.kwargs.get('vendor_id'))
+                update_last_fetch_date.bulk_update_last_fetch_date_vendor_codes(
+                    self.kwargs.get('vendor_id'), self.succeeded_item_codes(self.item_codes))
 
             # TODO: This should ideally be a flattened JSON so that a generic implementation of extractor is easy
 
             self.summary["ResponseItemCodeCount"] = len(tmp_flat_data)
-            self.data = json.dumps(tmp_flat_data)  # response.text
+            # records are handed to write as they are, the artifact codec encodes them once
+            self.data = tmp_flat_data
         except Exception as ex:
             self.logger.error(
                 "Could not get data from the API request", exc_info=True)
             # raise APIDataException("Could not get data from the API")
         return self
 
+    def flatten_response_items(self, items: List) -> List:
+        """
+        Flatten the response items, leaving out the ones whose product_code was not requested
+        """
+        requested_item_codes = set(self.item_codes)
+        flat_items = []
+        for data in items:
+            if data.get('product_code'):
+                is_in_req = str(data.get('product_code'))
+                if is_in_req in requested_item_codes:
+                    flat_items.append(flatten(data, reducer="dot", max_flatten_depth=4))
+            else:
+                flat_items.append(flatten(data, reducer="dot", max_flatten_depth=4))
+        return flat_items
+
+    def fetch_pages_checkpointed(self, pagination: PaginationEngine, fingerprint: str,
+                                 items_response_path: str = None) -> Base:
+        """
+        Fetch the pages from the vendor's checkpoint on, spilling each one, see fetcher/pagination_checkpoint.py
+
+        The pull hands over what it has after PAGINATION_TIME_BUDGET seconds or at the first page that could
+        not be fetched, and records its item codes for a retry which resumes from the next page.
+        """
+        vendor_id = self.kwargs.get('vendor_id')
+        checkpoint = PaginationCheckpoint(self, vendor_id, fingerprint, self.kwargs['fetcher_write_path'],
+                                          resume=bool(self.kwargs.get('retry_attempt')))
+        start_index, cursor = checkpoint.load()
+        deadline = time.monotonic() + Config.PAGINATION_TIME_BUDGET
+        pages, record_count, out_of_time = 0, 0, False
+        error_status = {}
+
+        page_iter = pagination.iter_pages(start_index, cursor, stop_on_failure=True)
+        try:
+            for index, items, next_cursor in page_iter:
+                records = items if items_response_path is None else self.flatten_response_items(items)
+                if self.error_field_mapping and records:
+                    for key, values in (self.process_error_field_db(records) or {}).items():
+                        error_status.setdefault(key, []).extend(values)
+                checkpoint.spill(index, records, next_cursor)
+                pages += 1
+                record_count += len(records)
+                if time.monotonic() > deadline:
+                    out_of_time = True
+                    break
+        except PaginationException as ex:
+            self.record_failed_batch(self.item_codes, type(ex).__name__, str(ex))
+            raise
+        finally:
+            # cancels the pages still queued
+            page_iter.close()
+
+        complete = not out_of_time and not pagination.failed_pages
+        parts = checkpoint.handover(complete)
+        next_page = checkpoint.state['next_index'] + 1
+        self.logger.info(f"Fetched {pagination.pages_fetched} page(s) from page {start_index + 1}, "
+                         f"{len(pagination.failed_pages)} failed, {len(parts)} spilled part(s) handed over, "
+                         f"{'complete' if complete else f'to be resumed at page {next_page}'}")
+        if not complete:
+            reason = "time budget used up" if out_of_time else f"page {next_page} could not be fetched"
+            # a pull that moved on starts its retries over, the retry resumes where it stopped
+            self.record_failed_batch(self.item_codes, 'PaginationIncomplete', reason, attempt=1 if pages else None)
+        elif not self.error_field_mapping:
+            update_last_fetch_date = LIVendorCodes()
+            update_last_fetch_date.bulk_update_last_fetch_date_vendor_codes(
+                vendor_id, self.succeeded_item_codes(self.item_codes))
+
+        if self.error_field_mapping:
+            self.vendor_codes_error_status = error_status or None
+        self.summary["ResponseItemCodeCount"] = record_count
+        self.data = spill_manifest(parts)
+        return self
+
     def __create_config(self, config_template, item_codes, template_values) -> string:
         """
         Creates the config object based on the template and the inputs passed
@@ -382,25 +512,28 @@ class RESTJSONFetcher(FetcherBase):
 
             item_list = []
 
-            for item in item_codes:
+            # For Westcon, the first rule whose condition holds picks the identifier the item is sent with
+            if validation_vendor_code and isinstance(validation_vendor_code, list):
+                try:
+                    validation_rules = compile_rules(validation_vendor_code)
+                except ValidationRuleException as ex:
+                    self.logger.error(f"vendor_code_validation of vendor_id: '{self.kwargs.get('vendor_id')}' "
+                                      f"is ignored: {ex}")
+                    validation_rules = ()
+                matching_rules = first_matching_rules(item_codes, validation_rules)
+            else:
+                matching_rules = [None] * len(item_codes)
+
+            for item, matching_rule in zip(item_codes, matching_rules):
                 tmp_item_obj_str = item_obj_str.replace(
                     self.ITEM_CODE_STR, item)
-                # For Westcon
-                if validation_vendor_code and isinstance(validation_vendor_code, list):
-                    for idx, validation in enumerate(validation_vendor_code):
-                        validation_condition = validation.get('condition')
-                        check_condition = eval(
-                            f"{len(item)} {validation_condition}")
-                        if check_condition and idx == 0:
-                            tmp_item_obj_str = tmp_item_obj_str.split(",")[
-                                                   0] + "}"
-                            break
-                        elif check_condition and idx == 1:
-                            tmp_item_obj_str = "{" + \
-                                               tmp_item_obj_str.split(",")[1]
-                    item_list.append(json.loads(tmp_item_obj_str))
-                else:
-                    item_list.append(json.loads(tmp_item_obj_str))
+                if matching_rule == 0:
+                    tmp_item_obj_str = tmp_item_obj_str.split(",")[
+                                           0] + "}"
+                elif matching_rule == 1:
+                    tmp_item_obj_str = "{" + \
+                                       tmp_item_obj_str.split(",")[1]
+                item_list.append(json.loads(tmp_item_obj_str))
 
             def chunks(lst, n):
                 for i in range(0, len(lst), n):
@@ -411,6 +544,8 @@ class RESTJSONFetcher(FetcherBase):
             CHUNK_SIZE = 100
             if len(item_codes) > CHUNK_SIZE:
                 self.split_body = chunks(item_list, CHUNK_SIZE)
+                # item codes sent in each body, a failed body is retried with these
+                self.body_item_codes = list(chunks(item_codes, CHUNK_SIZE))
                 self.body_number = []
                 for items in self.split_body:
                     flat_config[items_list_path] = items
@@ -529,62 +664,22 @@ class RESTJSONFetcher(FetcherBase):
 
         try:
             vendor_id = self.kwargs.get('vendor_id')
+            final_obj = None
             if transformed_data:
                 # Filter out only those object which has vendor_code
-                transformed_data = list(filter(lambda p: (
-                        p.get('vendor_code') is not None and p.get('vendor_code') in self.kwargs.get('item_codes')),
-                                               transformed_data))
-
-                # Very Important part which filters duplicate vendor_code from the list and prevents unique constraint violation
-                new_data = []
-                _ = [new_data.append(x) for x in transformed_data if x.get('vendor_code') not in [
-                    y.get('vendor_code') for y in new_data]]
-                transformed_data = new_data
-
-                # FOR FUTURE REFERENCE:- Use below code if upsert query is used instead of update
-                # for items in transformed_data:
-                #     items.update({"vendor_id": vendor_id})
-
-                # fetched_vendor_codes = (obj.get("vendor_code") for obj in transformed_data)
-
-                update_vendor_codes = LIVendorCodes(transformed_data)
-                vendor_obj = update_vendor_codes.get_product_by_InternalId(vendor_id, 'vendor_id')
-
-                # FOR FUTURE REFERENCE:- Use below code if upsert query is used instead of update
-                # for item in transformed_data:
-                #     for obj in vendor_obj["data"]:
-                #         if item.get("vendor_code") in obj.get("vendor_code"):
-                #             item.update({"internal_id": obj.get("internal_id")})
-
-                _result = {}
+                item_codes = set(self.kwargs.get('item_codes') or [])
+                # Very Important part which filters duplicate vendor_code from the list, the first object wins
+                error_status = {}
                 for item in transformed_data:
-                    _result.update({item.get("vendor_code"): [item["error"], item["error_description"]]})
-
-                final_obj = {'vendor_id': [], "vendor_code": [], "error": [], "error_description": [],
-                             "internal_id": []}
-                for item in vendor_obj["data"]:
-                    if _result.get(item.get('vendor_code')) is not None and item.get('vendor_code'):
-                        item["error"] = _result.get(item['vendor_code'])[0] if _result.get(item['vendor_code']) and \
-                                                                               _result.get(item['vendor_code'])[
-                                                                                   0] is not None else True
-                        item["error_description"] = _result.get(item['vendor_code'])[1] if _result.get(
-                            item['vendor_code']) and _result.get(item['vendor_code'])[1] else 'Invalid Item Code'
-
-                        final_obj['vendor_id'].append(item['vendor_id'])
-                        final_obj["vendor_code"].append(item["vendor_code"])
-                        final_obj["error"].append(item["error"])
-                        final_obj["error_description"].append(item["error_description"])
-                        final_obj["internal_id"].append(item["internal_id"])
+                    vendor_code = item.get('vendor_code')
+                    if vendor_code is not None and vendor_code in item_codes and vendor_code not in error_status:
+                        error_status[vendor_code] = item
 
+                # error fields and last fetch date are set in one statement joined on (vendor_id, vendor_code),
+                # the vendor_codes rows of the vendor are never read into python
                 try:
-                    update_vendor_codes.load(partial=True)
-                    update_vendor_codes.bulk_update(final_obj, 'vendor_id,vendor_code,internal_id', vendor_id=vendor_id,
-                                                    vendor_codes=final_obj['vendor_code'])
-
-                    # FOR FUTURE REFERENCE:- Use below code if upsert query is used instead of update
-                    # update_vendor_codes.upsert(
-                    #     transformed_data, conflict_fields="vendor_id, vendor_code")
-
+                    update_vendor_codes = LIVendorCodes()
+                    final_obj = update_vendor_codes.update_error_status(vendor_id, list(error_status.values()))
                 except Exception as err:
                     self.logger.exception(err, exc_info=True)
 
@@ -1,17 +1,20 @@
 import string
 from LiveInventoryFetcher.utils.data_access_layer.sql_db import DBEngineFactory
 from LiveInventoryFetcher.base.base import Base, UC_ConfigReadException
-from LiveInventoryFetcher.common_utils.db_queries import QUERY_CHECK_IF_VENDOR_CODE_EXISTS_IN_VENDOR_CODES_TABLE
+from LiveInventoryFetcher.common_utils.vendor_code_snapshot import get_vendor_code_snapshot
+from LiveInventoryFetcher.common_utils.code_validation import ValidationRuleException, compile_rules, reject_codes
 from LiveInventoryFetcher.fetcher.fetcherbase import FetcherBase
 from LiveInventoryFetcher.config import Config
-from LiveInventoryFetcher.common_utils.blob_utils import upload_file_blob
+from LiveInventoryFetcher.common_utils.blob_utils import upload_file_blob_async
+from LiveInventoryFetcher.common_utils import json_codec
+from LiveInventoryFetcher.common_utils.log_utils import capped, summarize
 import xmltodict
 import xml.etree.ElementTree as ET
-import re
 import copy
 from LiveInventoryFetcher.orm.li_vendor_codes import LIVendorCodes
 
 import json
+import logging
 import requests
 from flatten_dict import flatten, unflatten
 
@@ -19,6 +22,10 @@ from flatten_dict import flatten, unflatten
 FETCHER_FILE_PATH = Config.NETWORK_CONFIG.get('fetcher_directory_path')
 
 
+# shared by every instance so that a kept alive connection is reused across invocations
+li_db = DBEngineFactory.get_db_engine(Config.DB_CONFIG, DBEngineFactory.POSTGRES, **Config.DB_OPTIONS)
+
+
 class RESTXMLFetcherArgsException(Exception):
     pass
 
@@ -36,7 +43,7 @@ def safeget(dct, keys):
         try:
             dct = dct[key]
         except KeyError:
-            print("DEBUG: Dictionary: {}\nKey:{}".format(dct, key))
+            logging.debug("safeget: key %s not found in %s", key, summarize(dct))
             return None
     return dct
 
@@ -44,7 +51,7 @@ def safeget(dct, keys):
 class RESTXMLFetcher(FetcherBase):
     def __init__(self, **kwargs) -> None:
         super().__init__(**kwargs)
-        self.li_db = DBEngineFactory.get_db_engine(Config.DB_CONFIG, DBEngineFactory.POSTGRES)
+        self.li_db = li_db
         self.request_in_api_request_template_query = False
         self.response = None
         self.response = None
@@ -55,6 +62,9 @@ class RESTXMLFetcher(FetcherBase):
             "response_code": None
         }
         self.multi_req_url_params = []
+        # item codes of each request in multi_req_url_params and body_number, a failed request is retried with these
+        self.multi_req_item_codes = []
+        self.body_item_codes = []
         self.response_bodies = []
         self.item_codes = []
         self.error_field_mapping = {}
@@ -80,35 +90,38 @@ class RESTXMLFetcher(FetcherBase):
             error_mapping_list = self.config_template.get("mapping").get("vendor_code_table")
             self.error_field_mapping = {fld_map.get('destination_field'): fld_map.get('source_field') for fld_map in error_mapping_list}
 
-        invalid_vendor_codes = []
         # Load other values
         try:
-            with self.li_db.transaction(auto_commit=True) as query_set:
-                query_check = query_set.execute_query(QUERY_CHECK_IF_VENDOR_CODE_EXISTS_IN_VENDOR_CODES_TABLE,
-                                                      {'vendor_id': vendor_id})
-                query_check_list = query_check.to_list()
-                valid_vendor_code_list = [item.get('vendor_code') for item in query_check_list]
+            # vendor codes of the vendor, reused from the process cache while vendor_codes is unchanged
+            valid_vendor_codes = get_vendor_code_snapshot(self.li_db, vendor_id)
+            self.vendor_codes_version = valid_vendor_codes.version
+
+            invalid_vendor_codes = [vendor_code for vendor_code in self.item_codes
+                                    if vendor_code not in valid_vendor_codes]
+            if invalid_vendor_codes:
+                self.logger.error(
+                    f"Vendor code(s): {invalid_vendor_codes} not valid vendor code for vendor_id: '{vendor_id}' or not present in database")
+                self.logger.info(f"Removing {len(invalid_vendor_codes)} invalid vendor code(s) and formulating request")
 
             validation_vendor_code = self.config_template.get("vendor_code_validation", None)
-            for vendor_code in self.item_codes:
-                check_numeric = re.search(r'^\d+$', vendor_code)
-                if vendor_code not in valid_vendor_code_list:
-                    self.logger.error(
-                        f"Vendor code: '{vendor_code}' not valid vendor code for vendor_id: '{vendor_id}' or not present in database")
-                    self.logger.info(f"Removing invalid vendor code '{vendor_code}' and formulating request")
-                    invalid_vendor_codes.append(vendor_code)
-                elif validation_vendor_code:
-                    validation_type = validation_vendor_code.get('type')
-                    validation_condition = validation_vendor_code.get('condition')
-                    if validation_type == "numeric" and check_numeric:
-                        check_expression = eval(f"{len(vendor_code)} {validation_condition}")
-                        if not check_expression:
-                            invalid_vendor_codes.append(vendor_code)
-
-            # uploading invalid vendor info into blob
-            upload_file_blob("invalid_vendor_codes", invalid_vendor_codes)
+            if validation_vendor_code:
+                try:
+                    validation_rules = compile_rules(validation_vendor_code)
+                except ValidationRuleException as ex:
+                    self.logger.error(f"vendor_code_validation of vendor_id: '{vendor_id}' is ignored: {ex}")
+                    validation_rules = ()
+                rejected_vendor_codes = reject_codes(
+                    (vendor_code for vendor_code in self.item_codes if vendor_code in valid_vendor_codes),
+                    validation_rules)
+                if rejected_vendor_codes:
+                    self.logger.info(f"Vendor code(s) rejected by vendor_code_validation: {rejected_vendor_codes}")
+                invalid_vendor_codes.extend(rejected_vendor_codes)
+
+            # queue invalid vendor info for a background upload into blob, empty lists are skipped
+            upload_file_blob_async("invalid_vendor_codes", invalid_vendor_codes)
 
             item_codes = list(set(self.item_codes) - set(invalid_vendor_codes))
+            self.item_codes = item_codes
             self.summary['RequestItemCodeCount'] = len(item_codes)
 
             template_values = self.kwargs.get('template_values')
@@ -187,25 +200,38 @@ class RESTXMLFetcher(FetcherBase):
                 self.summary['RunType'] : "Multi-request, Vendor Codes in request body. XML Response"
                 self.response_bodies = []
                 self.logger.info("Making multiple XML API Request")
-                for body in self.body_number:
-                    resp = self.make_api_call(req_method, req_url, body, req_header, req_url_params)
+                for body, batch_item_codes in zip(self.body_number, self.body_item_codes):
+                    try:
+                        resp = self.make_api_call(req_method, req_url, body, req_header, req_url_params)
+                    except requests.RequestException as ex:
+                        self.summary['FailedBatches'] += 1
+                        self.record_failed_batch(batch_item_codes, type(ex).__name__, str(ex))
+                        continue
                     if resp is None:
                         # This batch failed for some reason, log the error and continue
                         # Logging has already been done in the called function
                         self.logger.warn("Batch failed in mult-request sync")
                         self.summary['FailedBatches'] += 1
+                        self.record_failed_batch(batch_item_codes, f"HTTP {self.response_info['response_code']}",
+                                                 self.response_info['response_text'])
                         continue
-                    tmp_response_txt = json.dumps(xmltodict.parse(resp.text))
-                    self.response_bodies.append(tmp_response_txt)
+                    # parsed from the raw bytes, the XML declaration carries the encoding
+                    self.response_bodies.append(xmltodict.parse(resp.content))
 
             else:
                 # Case where item codes are part of body, and we have just one request
                 self.summary['RunType'] : "Single-request, Vendor Codes in URL Parameters. XML Response"
                 self.logger.info("Making xml API Request")
-                self.response = self.make_api_call(req_method, req_url, req_body, req_header, req_url_params)
+                try:
+                    self.response = self.make_api_call(req_method, req_url, req_body, req_header, req_url_params)
+                except requests.RequestException as ex:
+                    self.record_failed_batch(self.item_codes, type(ex).__name__, str(ex))
+                    raise
                 if self.response is None:
                     # This is a failure in case of single request sync, this should be treated as fatal
                     self.logger.error("Error fetching data from API")
+                    self.record_failed_batch(self.item_codes, f"HTTP {self.response_info['response_code']}",
+                                             self.response_info['response_text'])
         except Exception as ex:
             self.logger.error("Could not fetch data from API")
             self.logger.error("Code returned: ")
@@ -228,13 +254,15 @@ class RESTXMLFetcher(FetcherBase):
         ## Update last fetch date of vendor_codes if it is not already updated while setting error codes
         if not self.error_field_mapping:
             update_last_fetch_date = LIVendorCodes()
-            update_last_fetch_date.bulk_update_last_fetch_date_vendor_codes(self.kwargs.get('vendor_id'))
+            update_last_fetch_date.bulk_update_last_fetch_date_vendor_codes(
+                self.kwargs.get('vendor_id'), self.succeeded_item_codes(self.kwargs.get('item_codes')))
 
         if tmp_flat_data is not None:
             self.summary["ResponseItemCodeCount"] = len(tmp_flat_data)
         else:
             self.summary["ResponseItemCodeCount"] = 0
-        self.data = json.dumps(tmp_flat_data)
+        # records are handed to write as they are, the artifact codec encodes them once
+        self.data = tmp_flat_data if tmp_flat_data is not None else json_codec.dumps(None)
         
         return self
 
@@ -247,9 +275,7 @@ class RESTXMLFetcher(FetcherBase):
         try:
             tmp_flat_data = []
             if hasattr(self, 'response') and self.response is not None:
-                tmp = self.response.text
-                xml_text = json.dumps(xmltodict.parse(tmp))
-                json_text = json.loads(xml_text)
+                json_text = xmltodict.parse(self.response.content)
             else:
                 json_text = self.response_bodies
 
@@ -264,8 +290,7 @@ class RESTXMLFetcher(FetcherBase):
                 tmp_flat_data.append(json_text.get(data_list_path))
             elif isinstance(json_text, list) and data_list_path:
                 for data in json_text:
-                    tmp_json_data = json.loads(data)
-                    tmp_data = safeget(tmp_json_data, tmp_split_data_list_path)
+                    tmp_data = safeget(data, tmp_split_data_list_path)
                     for item in tmp_data:
                         tmp_flat_data.append(item)
             elif self.single_item is True:
@@ -324,13 +349,14 @@ class RESTXMLFetcher(FetcherBase):
                                     verify=False,
                                     timeout=Config.REQUEST_TIMEOUT,
                                     params=req_url_params)
+        self.count_bytes_in(len(response.content))
         self.response_info["vendor_id"] = self.kwargs.get('vendor_id')
         self.response_info["response_code"] = response.status_code
         if response.status_code not in range(200, 210):
             self.response_info["response_text"] = response.reason
             self.logger.error("API returned incorrect status code: {}".format(response.status_code))
             self.logger.error("API response body was: ")
-            self.logger.error(response.text)
+            self.logger.error("%s", capped(response.text))
             response = None  # This will be checked by the caller
         return response
 
@@ -339,12 +365,22 @@ class RESTXMLFetcher(FetcherBase):
         This method makes calls to the API for case where the items are included in the URL parameter
         """
         tmp_flat_data = []
-        for req_url_params in self.multi_req_url_params:
-            self.response = self.make_api_call(req_method, req_url, req_body, req_header, req_url_params)
+        for req_url_params, batch_item_codes in zip(self.multi_req_url_params, self.multi_req_item_codes):
+            try:
+                self.response = self.make_api_call(req_method, req_url, req_body, req_header, req_url_params)
+            except requests.RequestException as ex:
+                self.summary['FailedBatches'] += 1
+                self.record_failed_batch(batch_item_codes, type(ex).__name__, str(ex))
+                continue
+            if self.response is None:
+                self.summary['FailedBatches'] += 1
+                self.record_failed_batch(batch_item_codes, f"HTTP {self.response_info['response_code']}",
+                                         self.response_info['response_text'])
+                continue
 
-            tmp_response_txt = json.dumps(xmltodict.parse(self.response.text))
+            tmp_response_data = xmltodict.parse(self.response.content)
             try:
-                tmp_data = safeget(json.loads(tmp_response_txt), tmp_split_data_list_path)
+                tmp_data = safeget(tmp_response_data, tmp_split_data_list_path)
                 if not isinstance(tmp_data, list):
                     # This should be a list, but in case the response contains a single item
                     # This can be a dictionary, in that case we will put this dictionary in 
@@ -364,7 +400,7 @@ class RESTXMLFetcher(FetcherBase):
                 self.logger.warn("DEBUG Info:")
                 self.logger.warn("Request URL: {}".format(req_url))
                 self.logger.warn("Request URL parameters: {}".format(req_url_params))
-                self.logger.warn("Response text: {}".format(tmp_response_txt))
+                self.logger.warn("Response text: {}".format(self.response.text))
                 self.logger.warn("Error thrown by the code: {}".format(ex))
                 self.summary['FailedBatches'] += 1
 
@@ -393,6 +429,7 @@ class RESTXMLFetcher(FetcherBase):
                             else:
                                 req_url_params[obj['key']] = obj['value']
                     self.multi_req_url_params.append(req_url_params)
+                    self.multi_req_item_codes.append(list_of_codes)
                     list_of_codes = []
 
     def __create_config(self, config_template, item_codes, template_values) -> string:
@@ -434,6 +471,8 @@ class RESTXMLFetcher(FetcherBase):
             first_code = True
             line_number = 0
             self.body_number = []
+            self.body_item_codes = []
+            body_item_codes = []
             self.multi_body = False
             break_request = False
             if len(item_codes) > xml_payload_limit:
@@ -447,6 +486,7 @@ class RESTXMLFetcher(FetcherBase):
                 self.process_multibody_config(item_codes, xml_payload_limit, data_list_path, xml_payload, xml_req_body_manufacture, xml_req_body_distributor)
             elif xml_req_body:
                 for idx, item in enumerate(item_codes):
+                    body_item_codes.append(item)
                     if first_code or break_request:
                         tmp_item_obj_str = item_obj_str.replace(f'<<TPL_ITEM_CODE>>', item)
                         if xml_iterator:
@@ -463,6 +503,8 @@ class RESTXMLFetcher(FetcherBase):
                         tmp_item_obj_str = tmp_item_obj_str[:add_here] + xml_req_body + tmp_item_obj_str[add_here:]
                     if (idx != 0 and idx % xml_payload_limit == xml_payload_limit - 1) or item == item_codes[-1]:
                         self.body_number.append(tmp_item_obj_str)
+                        self.body_item_codes.append(body_item_codes)
+                        body_item_codes = []
                         break_request = True
                     else:
                         xml_req_body = config_template.get('xml_req_body', None)
@@ -510,6 +552,7 @@ class RESTXMLFetcher(FetcherBase):
                     else:  # Use Manufacturer Item Identifier
                         curr_req_node.append(ET.fromstring(xml_req_body_manufacture.replace("<<TPL_ITEM_CODE>>", item)))
                 self.body_number.append(ET.tostring(curr_req_node).decode())
+                self.body_item_codes.append(chunk)
                 if not self.multi_body:
                     self.multi_body = True
         except Exception as ex:
@@ -585,53 +628,22 @@ class RESTXMLFetcher(FetcherBase):
     def update_error_field_db(self, transformed_data) -> None:
         try:
             vendor_id = self.kwargs.get('vendor_id')
+            final_obj = None
             if transformed_data:
-                # # Filter out only those object which has vendor_code
-                transformed_data = list(filter(lambda p: (p.get('vendor_code') is not None and p.get('vendor_code') in self.kwargs.get('item_codes')), transformed_data))
-
-                # Very Important part which filters duplicate vendor_code from the list and prevents unique constraint violation
-                new_data = []
-                _ = [new_data.append(x) for x in transformed_data if x.get('vendor_code') not in [y.get('vendor_code') for y in new_data]]
-                transformed_data = new_data
-
-                # FOR FUTURE REFERENCE:- Use below code if upsert query is used instead of update
-                # for items in transformed_data:
-                #     items.update({"vendor_id": vendor_id})
-                
-                # FOR FUTURE REFERENCE:- Use below code if upsert query is used instead of update
-                # fetched_vendor_codes = (obj.get("vendor_code") for obj in transformed_data)
-
-                update_vendor_codes = LIVendorCodes(transformed_data)
-                vendor_obj = update_vendor_codes.get_product_by_InternalId(vendor_id, 'vendor_id')
-
-                # FOR FUTURE REFERENCE:- Use below code if upsert query is used instead of update
-                # for item in transformed_data:
-                #     for obj in vendor_obj["data"]:
-                #         if item.get("vendor_code") in obj.get("vendor_code"):
-                #             item.update({"internal_id": obj.get("internal_id")})
-
-                _result = {}
+                # Filter out only those object which has vendor_code
+                item_codes = set(self.kwargs.get('item_codes') or [])
+                # Very Important part which filters duplicate vendor_code from the list, the first object wins
+                error_status = {}
                 for item in transformed_data:
-                    _result.update({item.get("vendor_code"): [item["error"], item["error_description"]]})
-                
-                final_obj = {'vendor_id':[], "vendor_code": [], "error": [], "error_description": [], "internal_id": []}
-                for item in vendor_obj["data"]:
-                    if _result.get(item.get('vendor_code')) is not None and item.get('vendor_code'):
-                        item["error"] =  _result.get(item['vendor_code'])[0] if _result.get(item['vendor_code']) and _result.get(item['vendor_code'])[0] is not None else True
-                        item["error_description"] = _result.get(item['vendor_code'])[1] if _result.get(item['vendor_code']) and _result.get(item['vendor_code'])[1] else 'Invalid Item Code'
-
-                        final_obj['vendor_id'].append(item['vendor_id'])
-                        final_obj["vendor_code"].append(item["vendor_code"])
-                        final_obj["error"].append(item["error"])
-                        final_obj["error_description"].append(item["error_description"])
-                        final_obj["internal_id"].append(item["internal_id"])
+                    vendor_code = item.get('vendor_code')
+                    if vendor_code is not None and vendor_code in item_codes and vendor_code not in error_status:
+                        error_status[vendor_code] = item
 
+                # error fields and last fetch date are set in one statement joined on (vendor_id, vendor_code),
+                # the vendor_codes rows of the vendor are never read into python
                 try:
-                    update_vendor_codes.load(partial=True)
-                    update_vendor_codes.bulk_update(final_obj, 'vendor_id,vendor_code,internal_id', vendor_id=vendor_id, vendor_codes=final_obj['vendor_code'])
-                   
-                    # FOR FUTURE REFERENCE:- Use below code if upsert query is used instead of update
-                    #update_vendor_codes.upsert(transformed_data, conflict_fields="vendor_id, vendor_code")
+                    update_vendor_codes = LIVendorCodes()
+                    final_obj = update_vendor_codes.update_error_status(vendor_id, list(error_status.values()))
                 except Exception as err:
                     self.logger.exception(err, exc_info=True)
 
@@ -4,11 +4,12 @@ from LiveInventoryFetcher.utils.data_access_layer.sql_db import DBEngineFactory
 from LiveInventoryFetcher.common_utils.db_queries import QUERY_BULK_UPDATE_LAST_FETCHED_VENDOR_CODES, \
     QUERY_UPDATE_LAST_MOD_VENDOR_CODES, UPDATE_LAST_FETCH_DATE_OF_VENDOR_CODE_FOR_SINGLE_VENDOR
 from LiveInventoryFetcher.config import Config
-from LiveInventoryFetcher.common_utils.db_utils import generate_insert_sql, generate_bulk_update_sql
-from typing import Any
+from LiveInventoryFetcher.common_utils.db_utils import generate_insert_sql, generate_bulk_update_sql, \
+    bulk_update_by_keys
+from typing import Any, Dict, List
 import logging
 
-li_db = DBEngineFactory.get_db_engine(Config.DB_CONFIG, DBEngineFactory.POSTGRES)
+li_db = DBEngineFactory.get_db_engine(Config.DB_CONFIG, DBEngineFactory.POSTGRES, **Config.DB_OPTIONS)
 # get the global reference of logger
 logger = logging
 
@@ -38,7 +39,7 @@ class LIVendorCodes(LIOrmBase):
             with li_db.transaction(auto_commit=False) as qryset:
                 try:
                     qryset.execute_non_query(sql, row_value)
-                    logger.debug(f'Executed non Query {qryset.query}')
+                    logger.debug('Executed non Query %s', qryset.query)
 
                     qryset.execute_non_query(QUERY_BULK_UPDATE_LAST_FETCHED_VENDOR_CODES,
                                              {'vendor_codes': vendor_codes, 'vendor_id': vendor_id})
@@ -53,16 +54,58 @@ class LIVendorCodes(LIOrmBase):
             logger.error('Error in bulk_update_data execution')
             logger.error(e)
 
-    def bulk_update_last_fetch_date_vendor_codes(self, vendor_id: int):
+    def update_error_status(self, vendor_id: int, error_status: List[Dict[str, Any]]) -> Dict[str, list]:
+        """
+        Set error, error_description and last_fetch_date of the given vendor codes in one statement
+
+        :param vendor_id: Id of vendor the vendor codes belong to
+        :type vendor_id: int
+        :param error_status: objects with vendor_code, error and error_description, one per vendor code
+        :type error_status: list
+        :return: updated rows as column lists (vendor_id, vendor_code, error, error_description, internal_id)
+        :rtype: dict
+        """
+        rows = [
+            (vendor_id, item['vendor_code'],
+             item.get('error') if item.get('error') is not None else True,
+             item.get('error_description') or 'Invalid Item Code')
+            for item in error_status
+        ]
+        updated = bulk_update_by_keys(
+            self.get_table(),
+            key_columns={'vendor_id': 'int', 'vendor_code': 'text'},
+            set_columns={'error': 'boolean', 'error_description': 'text'},
+            rows=rows,
+            set_expressions={'last_fetch_date': 'NOW()'},
+            returning=['vendor_id', 'vendor_code', 'error', 'error_description', 'internal_id']
+        )
+        logger.info(f"SUCCESS - Updated error status and last fetched date of {len(updated)} vendor_codes "
+                    f"for vendor_id = {vendor_id}")
+
+        final_obj = {'vendor_id': [], "vendor_code": [], "error": [], "error_description": [], "internal_id": []}
+        for item in self.get_schema().dump(updated, many=True):
+            for key in final_obj:
+                final_obj[key].append(item.get(key))
+        return final_obj
+
+    def bulk_update_last_fetch_date_vendor_codes(self, vendor_id: int, vendor_codes: List[str] = None):
         """
         Update last_fetch_date for all vendor_codes  of a particular vendor
 
         :param vendor_id: Id of vendor whose vendor_codes's last_fetch_date needs to be updated
         :type vendor_id: int
+        :param vendor_codes: only update these vendor codes, e.g. the ones the vendor was asked for
+        :type vendor_codes: list, optional
         """
 
         try:
             with li_db.transaction(auto_commit=True) as query_set:
+                if vendor_codes is not None:
+                    query_set.execute_non_query(QUERY_BULK_UPDATE_LAST_FETCHED_VENDOR_CODES,
+                                                {'vendor_id': vendor_id, 'vendor_codes': list(vendor_codes)})
+                    logger.info(f"SUCCESS - Updated last fetched date for {len(vendor_codes)} vendor_codes "
+                                f"of vendor_id = {vendor_id}")
+                    return
                 query_set.execute_non_query(UPDATE_LAST_FETCH_DATE_OF_VENDOR_CODE_FOR_SINGLE_VENDOR,
                                             {'vendor_id': vendor_id})
                 logger.info(f"SUCCESS - Updated last fetched date for all vendor_codes of vendor_id = {vendor_id}")
@@ -97,7 +140,7 @@ class LIVendorCodes(LIOrmBase):
                 values = list(inventory_data.values())
                 with li_db.transaction(auto_commit=True) as query_set:
                     ans = query_set.execute_query(sql, values)
-                    logger.info(f"Executed query: {query_set.query}")
+                    logger.debug('Executed query: %s', query_set.query)
                     vendor_codes.append(ans.to_list()[0]['vendor_code'])
                     li_db.commit()
         except Exception as ex:
@@ -5,7 +5,7 @@ from LiveInventoryFetcher.common_utils.db_queries import QUERY_UPDATE_BEARER_TOK
 import logging
 from LiveInventoryFetcher.config import Config
 
-li_db = DBEngineFactory.get_db_engine(Config.DB_CONFIG, DBEngineFactory.POSTGRES)
+li_db = DBEngineFactory.get_db_engine(Config.DB_CONFIG, DBEngineFactory.POSTGRES, **Config.DB_OPTIONS)
 
 # get the global reference og logger
 logger = logging
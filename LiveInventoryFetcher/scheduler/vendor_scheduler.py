@@ -1,10 +1,23 @@
+from psycopg2 import errors as pg_errors
+
 from LiveInventoryFetcher.scheduler.schedulerbase import *
 from LiveInventoryFetcher.config import Config
+from LiveInventoryFetcher.common_utils.log_utils import summarize
+from LiveInventoryFetcher.common_utils.fetch_retry_ledger import lease_due_retries
 from LiveInventoryFetcher.utils.data_access_layer.sql_db import DBEngineFactory
 from LiveInventoryFetcher.common_utils.db_queries import QUERY_FETCH_SYNC_CANDIDATE_FROM_VENDORS, \
     QUERY_FETCH_VENDORS_CONFIG,  QUERY_FETCH_AND_PRIORITY_FETCH_SYNC_CANDIDATE_FROM_VENDORS_VENDORS_CODE_PRODUCTS, \
     QUERY_FETCH_VENDORS_CONFIG_PRIORITY,QUERY_GENERATE_ACCESS_TOKEN_CMD, QUERY_FETCH_VENDORS_CONNECTION_TYPE, \
-    QUERY_FETCH_FILTER_ALLOWED_CODES
+    QUERY_FETCH_FILTER_ALLOWED_CODES, QUERY_FETCH_SYNC_CANDIDATE_FROM_VENDORS_SCAN, \
+    QUERY_FETCH_AND_PRIORITY_FETCH_SYNC_CANDIDATE_FROM_VENDORS_VENDORS_CODE_PRODUCTS_SCAN, \
+    QUERY_FETCH_VENDORS_CONFIG_STALE, QUERY_UPDATE_LAST_MOD_VENDORS
+
+
+# shared by every instance so that a kept alive connection is reused across invocations
+li_db = DBEngineFactory.get_db_engine(Config.DB_CONFIG, DBEngineFactory.POSTGRES, **Config.DB_OPTIONS)
+# set once next_due_at turned out to be missing (migrations/003_sync_next_due_at.sql not applied),
+# the candidates are then selected by the scan queries
+_due_queue_unavailable = False
 
 
 class UC_VendorSchedulerError(Exception):
@@ -21,7 +34,7 @@ class VendorScheduler(SchedulerBase):
 
     def __init__(self, **kwargs) -> None:
         super().__init__(**kwargs)
-        self.li_db = DBEngineFactory.get_db_engine(Config.DB_CONFIG, DBEngineFactory.POSTGRES)
+        self.li_db = li_db
         self.access_token_cmds = []
         self.vendors_to_sync_cmds = []
         self.vendors_to_sync_priority_cmds = []
@@ -44,6 +57,26 @@ class VendorScheduler(SchedulerBase):
             self.vendor_internal_id_mappings_with_filter = self.fetch_vendors_for_internal_ids()
             self.vendors_to_sync = [row['vendor_id'] for row in self.vendor_internal_id_mappings_with_filter]
 
+    def fetch_due_rows(self, due_query: str, scan_query: str) -> list:
+        """
+        Rows of the due query, or of the equivalent scan query when next_due_at does not exist
+        :return: list of row dicts
+        """
+        global _due_queue_unavailable
+        if not _due_queue_unavailable:
+            try:
+                with self.li_db.transaction(auto_commit=True) as self.query_set:
+                    result_set = self.query_set.execute_query(due_query)
+                    return result_set.to_list() if result_set else []
+            except Exception as ex:
+                if not isinstance(ex, (pg_errors.UndefinedColumn, pg_errors.UndefinedTable)):
+                    raise
+                self.logger.warning(f"next_due_at is not available, sync candidates are selected by scan: {ex}")
+                _due_queue_unavailable = True
+        with self.li_db.transaction(auto_commit=True) as self.query_set:
+            result_set = self.query_set.execute_query(scan_query)
+            return result_set.to_list() if result_set else []
+
     def fetch_sync_candidates(self):
         """
         Check db for vendor_id to be synced
@@ -52,20 +85,19 @@ class VendorScheduler(SchedulerBase):
         try:
             self.logger.info("Gathering fetch sync data for vendors")
             self.logger.debug("Reading database for fetching sync candidate")
-            with self.li_db.transaction(auto_commit=True) as self.query_set:
-                vendors_to_sync_result_set = self.query_set.execute_query(QUERY_FETCH_SYNC_CANDIDATE_FROM_VENDORS)
-                if vendors_to_sync_result_set:
-                    vendors_to_sync_result_list = vendors_to_sync_result_set.to_list()
-                    vendors_to_sync_temp = [vendors_to_sync['vendor_id'] for vendors_to_sync in
-                                            vendors_to_sync_result_list]
-                    self.vendors_to_sync = vendors_to_sync_temp
-                else:
-                    self.logger.info("No vendor sync candidates found - Looks like everything is uptodate")
+            vendors_to_sync_result_list = self.fetch_due_rows(QUERY_FETCH_SYNC_CANDIDATE_FROM_VENDORS,
+                                                              QUERY_FETCH_SYNC_CANDIDATE_FROM_VENDORS_SCAN)
+            if vendors_to_sync_result_list:
+                vendors_to_sync_temp = [vendors_to_sync['vendor_id'] for vendors_to_sync in
+                                        vendors_to_sync_result_list]
+                self.vendors_to_sync = vendors_to_sync_temp
+            else:
+                self.logger.info("No vendor sync candidates found - Looks like everything is uptodate")
         except Exception as ex:
             self.logger.error("Could not get vendor sync candidates")
             self.logger.error(ex)
             raise UC_VendorSchedulerError("Could not get vendor sync candidates")
-        self.logger.info(f"vendors to sync: {self.vendors_to_sync}")
+        self.logger.info("vendors to sync: %s", summarize(self.vendors_to_sync))
         return self
 
     def fetch_sync_candidates_priority(self):
@@ -76,24 +108,23 @@ class VendorScheduler(SchedulerBase):
         try:
             self.logger.info("Gathering fetch sync data for priority vendor codes")
             self.logger.debug("Reading database for fetching priority sync candidate")
-            with self.li_db.transaction(auto_commit=True) as self.query_set:
-                vendors_to_sync_result_set = self.query_set.execute_query(
-                    QUERY_FETCH_AND_PRIORITY_FETCH_SYNC_CANDIDATE_FROM_VENDORS_VENDORS_CODE_PRODUCTS)
-                if vendors_to_sync_result_set:
-                    vendors_to_sync_result_list = vendors_to_sync_result_set.to_list()
-                    vendor_id_dict = {}
-                    for each in vendors_to_sync_result_list:
-                        if each['vendor_id'] not in vendor_id_dict.keys():
-                            vendor_id_dict[each['vendor_id']] = []
-                        vendor_id_dict[each['vendor_id']].append(each['vendor_code'])
-                    self.vendors_to_sync_priority = vendor_id_dict
-                else:
-                    self.logger.info("No priority vendor sync candidates found - Looks like everything is uptodate")
+            vendors_to_sync_result_list = self.fetch_due_rows(
+                QUERY_FETCH_AND_PRIORITY_FETCH_SYNC_CANDIDATE_FROM_VENDORS_VENDORS_CODE_PRODUCTS,
+                QUERY_FETCH_AND_PRIORITY_FETCH_SYNC_CANDIDATE_FROM_VENDORS_VENDORS_CODE_PRODUCTS_SCAN)
+            if vendors_to_sync_result_list:
+                vendor_id_dict = {}
+                for each in vendors_to_sync_result_list:
+                    if each['vendor_id'] not in vendor_id_dict.keys():
+                        vendor_id_dict[each['vendor_id']] = []
+                    vendor_id_dict[each['vendor_id']].append(each['vendor_code'])
+                self.vendors_to_sync_priority = vendor_id_dict
+            else:
+                self.logger.info("No priority vendor sync candidates found - Looks like everything is uptodate")
         except Exception as ex:
             self.logger.error("Could not get vendor codes of sync candidates")
             self.logger.error(ex)
             raise UC_VendorSchedulerError("Could not get vendor codes of sync candidates")
-        self.logger.info(f"fetch_sync_candidates_priority: {self.vendors_to_sync_priority}")
+        self.logger.info("fetch_sync_candidates_priority: %s", summarize(self.vendors_to_sync_priority))
         return self
 
     def generate_fetcher_sync_command(self):
@@ -104,18 +135,34 @@ class VendorScheduler(SchedulerBase):
         try:
             self.logger.info("Gathering config for sync candidates i.e. vendor_id ")
             self.logger.debug("Reading database for fetching config info sync candidate i.e. vendor_id")
+            # only the regular sync of due vendors narrows down to the stale codes, a sync of given
+            # vendor_ids or internal_ids takes the codes asked for
+            stale_only = Config.REGULAR_SYNC_SELECTION == 'stale' and not self.vendor_ids_to_sync \
+                and not self.internal_ids_to_sync
             with self.li_db.transaction(auto_commit=True) as query_set:
                 for vendor_id in self.vendors_to_sync:
-                    vendor_config_data_result_set = query_set.execute_query(QUERY_FETCH_VENDORS_CONFIG,
-                                                                            {'vendor_id': vendor_id,
-                                                                             'config_file_path': CONFIG_FILE_PATH,
-                                                                             'fetcher_write_path': FETCHER_FILE_PATH})
+                    vendor_config_data_result_set = query_set.execute_query(
+                        QUERY_FETCH_VENDORS_CONFIG_STALE if stale_only else QUERY_FETCH_VENDORS_CONFIG,
+                        {'vendor_id': vendor_id,
+                         'config_file_path': CONFIG_FILE_PATH,
+                         'fetcher_write_path': FETCHER_FILE_PATH,
+                         'full_refresh_every': max(1, Config.FULL_REFRESH_EVERY)})
                     vendor_conn_type = query_set.execute_query(QUERY_FETCH_VENDORS_CONNECTION_TYPE,
                                                                {'vendor_id': vendor_id})
                     vendor_conn_type_to_list = vendor_conn_type.to_list()
                     if vendor_config_data_result_set:
-                        self.vendors_to_sync_config_dict = vendor_config_data_result_set.to_list()[0][
-                            'jsonb_build_object']
+                        vendor_config_row = vendor_config_data_result_set.to_list()[0]
+                        self.vendors_to_sync_config_dict = vendor_config_row['jsonb_build_object']
+
+                        if stale_only:
+                            self.logger.info(
+                                f"vendor_id = {vendor_id}: {len(self.vendors_to_sync_config_dict['item_codes'])} of "
+                                f"{vendor_config_row['vendor_code_count']} vendor code(s) selected"
+                                f"{' (full refresh)' if vendor_config_row['full_refresh'] else ''}")
+                            if not self.vendors_to_sync_config_dict['item_codes']:
+                                # every code is fresh, the vendor is due again one sync interval from now
+                                query_set.execute_non_query(QUERY_UPDATE_LAST_MOD_VENDORS, {'vendor_id': vendor_id})
+                                continue
 
                         if self.internal_ids_to_sync:
                             self.vendors_to_sync_config_dict['item_codes'] = \
@@ -140,7 +187,7 @@ class VendorScheduler(SchedulerBase):
             self.logger.error("Could not get vendor config of sync candidates i.e. vendor_id")
             self.logger.error(ex)
             raise UC_VendorSchedulerError("Could not get vendor config of sync candidates i.e. vendor_id")
-        self.logger.info(f"generate_fetcher_sync_command: {self.vendors_to_sync_cmds}")
+        self.logger.info("generate_fetcher_sync_command: %s", summarize(self.vendors_to_sync_cmds))
 
         # vendor codes in self.vendor_internal_id_mappings_without_filter will be bypassed for ondemand sync
         return self.vendors_to_sync_cmds
@@ -181,9 +228,29 @@ class VendorScheduler(SchedulerBase):
             self.logger.error("Could not get vendor config of priority sync candidates i.e. vendor_code")
             self.logger.error(ex)
             raise UC_VendorSchedulerError("Could not get vendor config of priority sync candidates i.e. vendor_code")
-        self.logger.info(f"generate_fetcher_sync_priority_command: {self.vendors_to_sync_priority_cmds}")
+        self.logger.info("generate_fetcher_sync_priority_command: %s", summarize(self.vendors_to_sync_priority_cmds))
         return self.vendors_to_sync_priority_cmds
 
+    def generate_fetcher_retry_command(self):
+        """
+        Generate commands re-fetching only the item codes of failed fetcher batches whose retry is due
+        return: list(s) of commands for fetcher module, flagged with is_retry, the retry_attempt
+                and the retry_ids of the leased batches
+        """
+        retries = lease_due_retries(self.li_db, Config.FETCH_RETRY_BATCH)
+        if not retries:
+            return []
+        # the retried codes are built like a priority sync of the vendor's codes
+        self.vendors_to_sync_priority = {vendor_id: retry['item_codes'] for vendor_id, retry in retries.items()}
+        self.vendors_to_sync_priority_cmds = []
+        retry_cmds = self.generate_fetcher_sync_priority_command()
+        for command in retry_cmds:
+            command['is_retry'] = True
+            command['retry_attempt'] = retries[command['vendor_id']]['attempt']
+            command['retry_ids'] = retries[command['vendor_id']]['retry_ids']
+        self.logger.info("generate_fetcher_retry_command: %s", summarize(retry_cmds))
+        return retry_cmds
+
     def generate_access_token_cmd_for_sync_candidates(self):
         """
         Check db for vendor_id to sync and generate access token command if required
@@ -205,7 +272,7 @@ class VendorScheduler(SchedulerBase):
             self.logger.error("Could not generate access token command for sync candidates via vendor_id")
             self.logger.error(ex)
             raise UC_VendorSchedulerError("Could not generate access token command for sync candidates via vendor_id")
-        self.logger.info(f"generate_access_token_cmd_for_sync_candidates: {self.access_token_cmds}")
+        self.logger.info("generate_access_token_cmd_for_sync_candidates: %s", summarize(self.access_token_cmds))
         return self.access_token_cmds
 
     def fetch_vendors_for_internal_ids(self):
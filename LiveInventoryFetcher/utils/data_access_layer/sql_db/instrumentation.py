@@ -0,0 +1,245 @@
+"""Statement instrumentation for the data access layer.
+
+Every statement executed through a `QuerySet` is timed and recorded here, aggregated
+by query fingerprint. The full query text (with bound parameters) is rendered only
+for statements that are slower than the threshold or fail, never for the rest.
+
+Metrics are process wide, function entry points reset them when an invocation starts
+and export them when it ends.
+"""
+
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+logger = logging
+
+# statements slower than this are logged with their full text
+DEFAULT_SLOW_QUERY_MS = 500.0
+# slow/failed statements kept with their text for the export
+MAX_SAMPLES = 20
+# characters of a rendered statement kept in samples and logs
+MAX_QUERY_TEXT = 2000
+
+_WHITESPACE = re.compile(r'\s+')
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s|\$\d+')
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PARAM_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_VALUE_LISTS = re.compile(r'\(\?\)(?:\s*,\s*\(\?\))+')
+_ARRAY_LITERAL = re.compile(r'array\[[^\]]*\]', re.IGNORECASE)
+
+
+def fingerprint(query: Any) -> str:
+    """Normalise a statement so that executions differing only in values aggregate together.
+
+    :param query: SQL text (str or bytes)
+    :type query: str
+
+    :return: statement with literals, placeholders and value lists collapsed to `?`
+    :rtype: str
+    """
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', errors='replace')
+    query = _WHITESPACE.sub(' ', str(query)).strip()
+    query = _STRING_LITERAL.sub('?', query)
+    query = _PLACEHOLDER.sub('?', query)
+    query = _ARRAY_LITERAL.sub('array[?]', query)
+    query = _NUMBER_LITERAL.sub('?', query)
+    query = _PARAM_LIST.sub('(?)', query)
+    return _VALUE_LISTS.sub('(?), ...', query)
+
+
+def param_count(data: Optional[Sequence]) -> int:
+    """Number of parameters bound to a statement."""
+    if data is None:
+        return 0
+    try:
+        return len(data)
+    except TypeError:
+        return 1
+
+
+class LazyQuery:
+    """Query text rendered on demand.
+
+    Stored as `QuerySet.query` in place of the mogrified statement, so callers can keep
+    logging it with `logger.debug('... %s', qryset.query)` and the statement is formatted
+    only when the record is actually emitted.
+
+    :param query: SQL text
+    :type query: str
+
+    :param data: parameters bound to the query
+    :type data: any
+
+    :param render: function formatting query and data, e.g. `cursor.mogrify`
+    :type render: callable, optional
+    """
+
+    __slots__ = ('sql', 'data', '_render', '_text')
+
+    def __init__(self, query: str, data: Optional[Sequence] = None,
+                 render: Optional[Callable[[str, Any], Any]] = None) -> None:
+        self.sql = query
+        self.data = data
+        self._render = render
+        self._text = None
+
+    def __str__(self) -> str:
+        if self._text is None:
+            text = None
+            if self._render is not None:
+                try:
+                    text = self._render(self.sql, self.data)
+                except Exception:
+                    # e.g. the cursor is already closed, fall back to the bare statement
+                    text = None
+            if text is None:
+                text = f'{self.sql} -- {param_count(self.data)} parameter(s)'
+            if isinstance(text, bytes):
+                text = text.decode('utf-8', errors='replace')
+            self._text = text
+        return self._text
+
+    def __repr__(self) -> str:
+        return f'<LazyQuery {fingerprint(self.sql)[:80]}>'
+
+
+class StatementMetrics:
+    """Per fingerprint aggregate of executed statements.
+
+    :param slow_query_ms: threshold in milliseconds above which a statement is treated as slow
+    :type slow_query_ms: float
+    """
+
+    def __init__(self, slow_query_ms: float = DEFAULT_SLOW_QUERY_MS) -> None:
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self._stats = OrderedDict()
+        self._samples = []
+
+    def configure(self, slow_query_ms: Optional[float] = None) -> None:
+        """Change the slow statement threshold."""
+        if slow_query_ms is not None:
+            self.slow_query_ms = float(slow_query_ms)
+
+    def reset(self) -> None:
+        """Drop everything recorded so far, called at the start of every function invocation."""
+        with self._lock:
+            self._stats = OrderedDict()
+            self._samples = []
+
+    @staticmethod
+    def _empty_stats() -> Dict[str, Any]:
+        return {'calls': 0, 'errors': 0, 'slow': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0, 'params': 0}
+
+    def record(self, query: LazyQuery, elapsed_ms: float, rowcount: int = -1,
+               error: Optional[BaseException] = None) -> None:
+        """Record one executed statement.
+
+        :param query: executed query
+        :type query: LazyQuery
+
+        :param elapsed_ms: wall time in milliseconds
+        :type elapsed_ms: float
+
+        :param rowcount: rows returned or affected, -1 when unknown
+        :type rowcount: int
+
+        :param error: exception raised by the statement, if any
+        :type error: Exception, optional
+        """
+        key = fingerprint(query.sql)
+        params = param_count(query.data)
+        slow = elapsed_ms >= self.slow_query_ms
+
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = self._empty_stats()
+            stats['calls'] += 1
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            stats['params'] += params
+            if rowcount is not None and rowcount > 0:
+                stats['rows'] += rowcount
+            if error is not None:
+                stats['errors'] += 1
+            if slow:
+                stats['slow'] += 1
+
+        if error is None and not slow:
+            return
+
+        # only slow or failed statements pay for rendering the full text
+        text = str(query)[:MAX_QUERY_TEXT]
+        with self._lock:
+            if len(self._samples) < MAX_SAMPLES:
+                self._samples.append({
+                    'fingerprint': key, 'elapsed_ms': round(elapsed_ms, 2), 'rowcount': rowcount,
+                    'error': repr(error) if error is not None else None, 'query': text,
+                })
+        if error is not None:
+            logger.error('Statement failed after %.1f ms: %s', elapsed_ms, text)
+        else:
+            logger.warning('Slow statement took %.1f ms (threshold %.0f ms, rows %s): %s',
+                           elapsed_ms, self.slow_query_ms, rowcount, text)
+
+    def merge(self, exported: Dict[str, Any]) -> None:
+        """Add metrics exported by another process, e.g. a worker of a process pool.
+
+        :param exported: result of `export()` in the other process
+        :type exported: dict
+        """
+        with self._lock:
+            for statement in exported.get('statements', []):
+                stats = self._stats.get(statement['fingerprint'])
+                if stats is None:
+                    stats = self._stats[statement['fingerprint']] = self._empty_stats()
+                for field in ('calls', 'errors', 'slow', 'rows', 'params', 'total_ms'):
+                    stats[field] += statement[field]
+                stats['max_ms'] = max(stats['max_ms'], statement['max_ms'])
+            self._samples.extend(exported.get('samples', [])[:max(MAX_SAMPLES - len(self._samples), 0)])
+
+    def export(self) -> Dict[str, Any]:
+        """Snapshot of the recorded metrics.
+
+        :return: totals, per fingerprint statistics (slowest first) and slow/failed samples.
+        :rtype: dict
+        """
+        with self._lock:
+            statements = [dict(stats, fingerprint=key) for key, stats in self._stats.items()]
+            samples = list(self._samples)
+
+        for stats in statements:
+            stats['avg_ms'] = round(stats['total_ms'] / stats['calls'], 2)
+            stats['total_ms'] = round(stats['total_ms'], 2)
+            stats['max_ms'] = round(stats['max_ms'], 2)
+        statements.sort(key=lambda stats: stats['total_ms'], reverse=True)
+
+        return {
+            'calls': sum(stats['calls'] for stats in statements),
+            'errors': sum(stats['errors'] for stats in statements),
+            'slow': sum(stats['slow'] for stats in statements),
+            'total_ms': round(sum(stats['total_ms'] for stats in statements), 2),
+            'slow_query_ms': self.slow_query_ms,
+            'statements': statements,
+            'samples': samples,
+        }
+
+    def log_summary(self, invocation: str = '') -> Dict[str, Any]:
+        """Log the exported metrics as one record and return them."""
+        exported = self.export()
+        statements: List[Dict[str, Any]] = exported['statements']
+        logger.info('%s db statements: %s calls, %s slow, %s failed, %s ms total; top: %s',
+                    invocation, exported['calls'], exported['slow'], exported['errors'],
+                    exported['total_ms'],
+                    [(stats['fingerprint'][:120], stats['calls'], stats['total_ms']) for stats in statements[:5]])
+        return exported
+
+
+# process wide registry used by every queryset
+statement_metrics = StatementMetrics()
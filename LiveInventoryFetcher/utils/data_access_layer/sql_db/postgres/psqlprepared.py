@@ -0,0 +1,194 @@
+"""Server-side prepared statements for `PgSQL Queryset`.
+
+Statements are translated from `psycopg2` placeholders (`%s`, `%(name)s`) to
+positional parameters (`$1`, `$2`, ...), prepared once per connection with
+`PREPARE` and run with `EXECUTE` afterwards, so Postgres neither parses nor
+plans them again.
+"""
+
+import logging
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+
+import psycopg2
+from psycopg2.extensions import cursor as c
+
+logger = logging
+
+# prepared statements kept per connection
+DEFAULT_PREPARED_CACHE_SIZE = 64
+# a statement is prepared the n-th time it is seen, one-off statements are never prepared
+PREPARE_AFTER_EXECUTIONS = 2
+
+_PLACEHOLDER = re.compile(r'%%|%\((\w+)\)s|%s')
+
+
+def to_positional(query: str, data: Optional[Any]) -> Optional[Tuple[str, List[Any]]]:
+    """Rewrite a `psycopg2` query to positional parameters.
+
+    :param query: SQL text with `%s` or `%(name)s` placeholders
+    :type query: str
+
+    :param data: parameters of the query, sequence for `%s` and mapping for `%(name)s`
+    :type data: any
+
+    :return: statement with `$n` placeholders and the ordered parameter values, or None when
+             the query can not be prepared (mixed placeholders, missing parameters, row values).
+    :rtype: tuple
+    """
+    names: Dict[str, int] = {}
+    positional = [0]
+    is_mapping = isinstance(data, dict)
+    failed = []
+
+    def replace(match) -> str:
+        if match.group(0) == '%%':
+            return '%'
+        name = match.group(1)
+        if name is not None:
+            if not is_mapping:
+                failed.append(match.group(0))
+                return match.group(0)
+            if name not in names:
+                names[name] = len(names) + 1
+            return f'${names[name]}'
+        if is_mapping:
+            failed.append(match.group(0))
+            return match.group(0)
+        positional[0] += 1
+        return f'${positional[0]}'
+
+    statement = _PLACEHOLDER.sub(replace, query)
+    if failed:
+        return None
+
+    if is_mapping:
+        try:
+            values = [data[name] for name in names]
+        except KeyError:
+            return None
+    else:
+        values = list(data) if data is not None else []
+        if len(values) != positional[0]:
+            return None
+
+    # tuples are adapted as row values / IN lists, their shape is part of the statement text
+    if any(isinstance(value, tuple) for value in values):
+        return None
+    return statement, values
+
+
+class PreparedStatementCache:
+    """LRU of statements prepared on one connection, keyed by SQL text.
+
+    :param size: number of prepared statements kept, the least recently used one is
+                 deallocated when a new statement does not fit any more.
+    :type size: int
+    """
+
+    def __init__(self, size: int = DEFAULT_PREPARED_CACHE_SIZE) -> None:
+        self.size = size
+        self._statements = OrderedDict()  # sql -> statement name
+        self._seen = OrderedDict()  # sql -> executions while not prepared
+        self._unpreparable = set()
+        self._counter = 0
+        self.hits = 0
+        self.prepares = 0
+        self.evictions = 0
+        self.fallbacks = 0
+
+    def _name(self) -> str:
+        self._counter += 1
+        return f'li_stmt_{self._counter}'
+
+    def _should_prepare(self, query: str) -> bool:
+        seen = self._seen.pop(query, 0) + 1
+        if seen >= PREPARE_AFTER_EXECUTIONS:
+            return True
+        self._seen[query] = seen
+        if len(self._seen) > self.size * 4:
+            self._seen.popitem(last=False)
+        return False
+
+    def _prepare(self, cursor: Type[c], query: str, statement: str) -> Optional[str]:
+        """PREPARE the statement inside a savepoint so a failure leaves the transaction usable."""
+        name = self._name()
+        cursor.execute('SAVEPOINT li_prepare')
+        try:
+            if len(self._statements) >= self.size:
+                _, evicted = self._statements.popitem(last=False)
+                cursor.execute(f'DEALLOCATE {evicted}')
+                self.evictions += 1
+            cursor.execute(f'PREPARE {name} AS {statement}')
+        except psycopg2.Error as ex:
+            cursor.execute('ROLLBACK TO SAVEPOINT li_prepare')
+            cursor.execute('RELEASE SAVEPOINT li_prepare')
+            logger.debug('Statement can not be prepared, running it unprepared: %s', ex)
+            self._unpreparable.add(query)
+            return None
+        cursor.execute('RELEASE SAVEPOINT li_prepare')
+        self._statements[query] = name
+        self.prepares += 1
+        return name
+
+    def execute(self, cursor: Type[c], query: str, data: Optional[Sequence] = None) -> bool:
+        """Run the query as a prepared statement when possible.
+
+        :param cursor: cursor to execute on
+        :type cursor: psycopg2.cursor
+
+        :param query: SQL text with `psycopg2` placeholders
+        :type query: str
+
+        :param data: parameters of the query
+        :type data: any
+
+        :return: True if the query was executed, False if the caller has to execute it the usual way.
+        :rtype: bool
+        """
+        if query in self._unpreparable:
+            self.fallbacks += 1
+            return False
+
+        name = self._statements.get(query)
+        if name is None and not self._should_prepare(query):
+            return False
+
+        positional = to_positional(query, data)
+        if positional is None:
+            self._unpreparable.add(query)
+            self.fallbacks += 1
+            return False
+        statement, values = positional
+
+        if name is None:
+            name = self._prepare(cursor, query, statement)
+            if name is None:
+                self.fallbacks += 1
+                return False
+        else:
+            self._statements.move_to_end(query)
+            self.hits += 1
+
+        try:
+            if values:
+                cursor.execute(f'EXECUTE {name} ({", ".join(["%s"] * len(values))})', values)
+            else:
+                cursor.execute(f'EXECUTE {name}')
+        except psycopg2.Error:
+            # the statement may be gone from the server (e.g. DISCARD ALL), prepare it again next time
+            self._statements.pop(query, None)
+            raise
+        return True
+
+    def clear(self) -> None:
+        """Forget every statement, e.g. when the connection is replaced."""
+        self._statements.clear()
+        self._seen.clear()
+        self._unpreparable.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Cache counters."""
+        return {'prepared': len(self._statements), 'hits': self.hits, 'prepares': self.prepares,
+                'evictions': self.evictions, 'fallbacks': self.fallbacks}
@@ -4,28 +4,81 @@
 DB query should happens through this
 """
 
-from typing import Optional, Sequence, Type
+import io
+import time
+import uuid
+from typing import Any, Iterable, Optional, Sequence, Type
 
+from psycopg2.extensions import connection as conn
 from psycopg2.extensions import cursor as c
 
+from LiveInventoryFetcher.utils.data_access_layer.sql_db.postgres.psqlprepared import PreparedStatementCache
 from LiveInventoryFetcher.utils.data_access_layer.sql_db.postgres.psqlresultset import PgSQlResultSet
-from LiveInventoryFetcher.utils.data_access_layer.sql_db.querysetbase import QuerySet
+from LiveInventoryFetcher.utils.data_access_layer.sql_db.postgres.psqlstreamresultset import PgSQlStreamResultSet
+from LiveInventoryFetcher.utils.data_access_layer.sql_db.instrumentation import LazyQuery, statement_metrics
+from LiveInventoryFetcher.utils.data_access_layer.sql_db.querysetbase import QuerySet, UC_QuerySetException
+
+
+# rows fetched per round trip by server-side cursors
+DEFAULT_ITERSIZE = 2000
+
+
+def _copy_value(value: Any) -> str:
+    """Render a value for `COPY ... FROM STDIN` text format."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
 
 
 class PgSQlQuerySet(QuerySet):
     """Concrete `PgSQL Queryset` class for all query operations.
     :param:cursor: `psycopg2` cursor for query execution
     :type cursor: `<class 'psycopg2.extensions.cursor'>`
+
+    :param:connection: `psycopg2` connection the cursor belongs to, needed for server-side cursors
+    :type connection: `<class 'psycopg2.extensions.connection'>`, optional
+
+    :param:prepared: prepared statements of the connection, statements run unprepared when not given
+    :type prepared: `PreparedStatementCache`, optional
     """
 
-    def __init__(self, cursor: Type[c]) -> None:
+    def __init__(self, cursor: Type[c], connection: Optional[Type[conn]] = None,
+                 prepared: Optional[PreparedStatementCache] = None) -> None:
         """Constructor for `PgSQlQuerySet`
         :param:cursor: `psycopg2` cursor for query execution
         :type cursor: `<class 'psycopg2.extensions.cursor'>`
+
+        :param:connection: `psycopg2` connection the cursor belongs to, needed for server-side cursors
+        :type connection: `<class 'psycopg2.extensions.connection'>`, optional
+
+        :param:prepared: prepared statements of the connection, statements run unprepared when not given
+        :type prepared: `PreparedStatementCache`, optional
         """
         super().__init__(cursor)
+        self.connection = connection
+        self.prepared = prepared
         self.query = None
 
+    def _execute(self, cursor: Type[c], query: str, data: Optional[Sequence] = None,
+                 prepare: bool = True) -> None:
+        """Execute the statement on the given cursor and record it in `statement_metrics`.
+
+        Repeated statements go through the connection prepared statements when available.
+        `self.query` is set to a `LazyQuery`, the statement is rendered with its parameters
+        only when logged, or when it turns out slow or failing.
+        """
+        self.query = LazyQuery(query, data, cursor.mogrify)
+        start = time.perf_counter()
+        try:
+            if not (prepare and self.prepared is not None and self.prepared.execute(cursor, query, data)):
+                cursor.execute(query, data)
+        except Exception as ex:
+            statement_metrics.record(self.query, (time.perf_counter() - start) * 1000, error=ex)
+            raise
+        statement_metrics.record(self.query, (time.perf_counter() - start) * 1000, cursor.rowcount)
+
     def execute_non_query(self, query: str, data: Optional[Sequence] = None) -> None:
         """Method for executing result not returning query.
 
@@ -35,8 +88,7 @@ class PgSQlQuerySet(QuerySet):
         :param data: Data assocaited with the query. e.g: Data for delete statement.
         :type data: tuple, optional
         """
-        self.query = self.cursor.mogrify(query, data)
-        self.cursor.execute(query, data)
+        self._execute(self.cursor, query, data)
 
     def execute_query(self, query: str, data: Optional[Sequence] = None) -> PgSQlResultSet:
         """Method for executing result returning query.
@@ -50,6 +102,74 @@ class PgSQlQuerySet(QuerySet):
         :return: `PgSQlResultSet` query result.
         :rtype: PgSQlResultSet
         """
-        self.query = self.cursor.mogrify(query, data)
-        self.cursor.execute(query, data)
+        self._execute(self.cursor, query, data)
         return PgSQlResultSet(self.cursor)
+
+    def stream_query(self, query: str, data: Optional[Sequence] = None,
+                     itersize: int = DEFAULT_ITERSIZE, name: Optional[str] = None) -> PgSQlStreamResultSet:
+        """Method for executing result returning query on a server-side (named) cursor.
+
+        Rows stay on the server and are fetched `itersize` at a time while the result is consumed.
+        The result must be consumed before the transaction ends.
+
+        :param query: Query string to execute,
+        :type query: str
+
+        :param data: Data assocaited with the query.
+        :type data: tuple, optional
+
+        :param itersize: Number of rows fetched per round trip, defaults to DEFAULT_ITERSIZE
+        :type itersize: int, optional
+
+        :param name: Name of the server-side cursor, generated when not given.
+        :type name: str, optional
+
+        :return: `PgSQlStreamResultSet` query result.
+        :rtype: PgSQlStreamResultSet
+
+        :raises UC_QuerySetException: Raised when the queryset was created without its connection.
+        """
+        if self.connection is None:
+            raise UC_QuerySetException("Server-side cursor needs the queryset connection")
+
+        cursor = self.connection.cursor(name=name or f"li_stream_{uuid.uuid4().hex}")
+        cursor.itersize = itersize
+        # DECLARE can not run a prepared statement
+        self._execute(cursor, query, data, prepare=False)
+        return PgSQlStreamResultSet(cursor)
+
+    def copy_rows(self, table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> int:
+        """Method for loading rows into a table with `COPY ... FROM STDIN`.
+
+        Much cheaper than INSERT for large batches, e.g. to stage rows in a temp table.
+
+        :param table: table to copy into,
+        :type table: str
+
+        :param columns: columns the row values map to, in order.
+        :type columns: list
+
+        :param rows: row values
+        :type rows: iterable of sequences
+
+        :return: number of rows copied.
+        :rtype: int
+        """
+        buffer = io.StringIO()
+        count = 0
+        for row in rows:
+            buffer.write('\t'.join(_copy_value(value) for value in row))
+            buffer.write('\n')
+            count += 1
+        buffer.seek(0)
+
+        query = f'COPY {table} ({", ".join(columns)}) FROM STDIN'
+        self.query = LazyQuery(query, None)
+        start = time.perf_counter()
+        try:
+            self.cursor.copy_expert(query, buffer)
+        except Exception as ex:
+            statement_metrics.record(self.query, (time.perf_counter() - start) * 1000, error=ex)
+            raise
+        statement_metrics.record(self.query, (time.perf_counter() - start) * 1000, count)
+        return count
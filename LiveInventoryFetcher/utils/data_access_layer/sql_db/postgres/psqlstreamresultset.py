@@ -0,0 +1,232 @@
+"""Concrete `PgSQL Stream ResultSet` class for query results read through a
+server-side (named) cursor.
+
+Rows are fetched from the server `itersize` rows at a time, so large results
+never have to be held in memory at once.
+"""
+
+from collections import namedtuple
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Type, Union
+
+from psycopg2.extensions import cursor as c
+
+from LiveInventoryFetcher.utils.data_access_layer.sql_db.resultsetbase import ResultSet
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+ROW_SHAPE_DICT = 'dict'
+ROW_SHAPE_TUPLE = 'tuple'
+ROW_SHAPE_NAMEDTUPLE = 'namedtuple'
+
+
+class PgSQlStreamResultSet(ResultSet):
+    """`ResultSet` over a named `psycopg2` cursor.
+
+    The result can be consumed only once and only inside the transaction the query
+    was executed in, e.g:
+        ```
+        with db.transaction() as qryset:
+            for row in qryset.stream_query('SELECT * FROM vendor_codes').iter_rows('tuple'):
+                ...
+        ```
+
+    :param cursor: named `psycopg2` cursor the query is executed on.
+    :type cursor: psycopg2.cursor
+    """
+
+    def __init__(self, cursor: Type[c]) -> None:
+        super().__init__(cursor)
+        self._consumed = False
+        self._fetched = 0
+        self._description = None
+
+    @property
+    def columns(self) -> List[str]:
+        """Column names of the result. Available once the first chunk is fetched.
+
+        :return: list of column names
+        :rtype: list
+        """
+        if self._description is None:
+            return []
+        return [column[0] for column in self._description]
+
+    def _row_converter(self, shape: str) -> Callable[[List[tuple]], List[Any]]:
+        """Build the function turning a chunk of raw rows to the requested shape."""
+        if shape == ROW_SHAPE_TUPLE:
+            return lambda rows: rows
+
+        names = self.columns
+        if shape == ROW_SHAPE_DICT:
+            return lambda rows: [dict(zip(names, row)) for row in rows]
+        if shape == ROW_SHAPE_NAMEDTUPLE:
+            row_type = namedtuple('Row', names, rename=True)
+            return lambda rows: [row_type._make(row) for row in rows]
+        raise ValueError(f"Unknown row shape '{shape}'")
+
+    def iter_chunks(self, chunk_size: int = None, shape: str = ROW_SHAPE_DICT) -> Iterator[List[Any]]:
+        """Fetch the result chunk by chunk.
+
+        :param chunk_size: rows per chunk, defaults to the cursor `itersize`
+        :type chunk_size: int
+
+        :param shape: row shape, one of `dict`, `tuple` or `namedtuple`
+        :type shape: str
+
+        :yields: list of rows
+        """
+        if self._consumed:
+            raise RuntimeError("Streamed result set can be consumed only once")
+        self._consumed = True
+
+        chunk_size = chunk_size or self.cursor.itersize
+        convert = None
+        try:
+            while True:
+                rows = self.cursor.fetchmany(chunk_size)
+                if self._description is None:
+                    # description of a named cursor is known after the first fetch only
+                    self._description = self.cursor.description
+                if not rows:
+                    break
+                if convert is None:
+                    convert = self._row_converter(shape)
+                self._fetched += len(rows)
+                yield convert(rows)
+        finally:
+            self.close()
+
+    def iter_rows(self, shape: str = ROW_SHAPE_DICT) -> Iterator[Any]:
+        """Iterate over the result one row at a time.
+
+        :param shape: row shape, one of `dict`, `tuple` or `namedtuple`
+        :type shape: str
+
+        :yields: row
+        """
+        for chunk in self.iter_chunks(shape=shape):
+            yield from chunk
+
+    def pre_process(self) -> List[Dict[str, Any]]:
+        """Method to read the whole result as list of dictionaries."""
+        return [row for chunk in self.iter_chunks() for row in chunk]
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Method to parse streamed data to list dictionary.
+
+        :return: list of dictionaries
+        :rtype: list
+        """
+        return self.pre_process()
+
+    def to_tuples(self) -> List[tuple]:
+        """Method to read the whole result as list of tuples.
+
+        :return: list of tuples
+        :rtype: list
+        """
+        return [row for chunk in self.iter_chunks(shape=ROW_SHAPE_TUPLE) for row in chunk]
+
+    def to_namedtuples(self) -> List[tuple]:
+        """Method to read the whole result as list of namedtuples.
+
+        :return: list of namedtuples
+        :rtype: list
+        """
+        return [row for chunk in self.iter_chunks(shape=ROW_SHAPE_NAMEDTUPLE) for row in chunk]
+
+    def to_columns(self) -> Dict[str, List[Any]]:
+        """Method to read the whole result as column arrays.
+
+        :return: dictionary of column name to list of values.
+        :rtype: dict
+        """
+        result = None
+        for chunk in self.iter_chunks(shape=ROW_SHAPE_TUPLE):
+            if result is None:
+                result = {name: [] for name in self.columns}
+            for name, values in zip(self.columns, zip(*chunk)):
+                result[name].extend(values)
+        return result if result is not None else {name: [] for name in self.columns}
+
+    def iter_df(self, chunk_size: int = None) -> Iterator['pd.DataFrame']:
+        """Build one `pandas.DataFrame` per fetched chunk, pandas is imported on first use.
+
+        :param chunk_size: rows per DataFrame, defaults to the cursor `itersize`
+        :type chunk_size: int
+
+        :yields: pandas.DataFrame
+        """
+        import pandas as pd
+
+        for chunk in self.iter_chunks(chunk_size, shape=ROW_SHAPE_TUPLE):
+            yield pd.DataFrame.from_records(chunk, columns=self.columns)
+
+    def to_df(self, chunk_size: int = None) -> 'pd.DataFrame':
+        """Method to read the whole result to a `pandas.DataFrame`, built chunk by chunk.
+
+        :param chunk_size: rows per intermediate DataFrame, defaults to the cursor `itersize`
+        :type chunk_size: int
+
+        :return: streamed data parsed to pandas dataframe.
+        :rtype: pandas.DataFrame
+        """
+        import pandas as pd
+
+        frames = list(self.iter_df(chunk_size))
+        if not frames:
+            return pd.DataFrame(columns=self.columns)
+        return pd.concat(frames, ignore_index=True)
+
+    def close(self) -> None:
+        """Close the server-side cursor, rows not fetched yet are discarded."""
+        if not self.cursor.closed:
+            self.cursor.close()
+
+    @property
+    def raw(self) -> Union[None, tuple]:
+        """Property to get raw data from cursor, fetching the whole result.
+
+        :return: tuple of cursor description and list of row tuples.
+        :rtype: tuple
+        """
+        rows = self.to_tuples()
+        return self._description, rows
+
+    @property
+    def rowcount(self) -> int:
+        """Property to get the number of rows fetched so far.
+
+        :return: fetched row count
+        :rtype: int
+        """
+        return self._fetched
+
+    @property
+    def query(self) -> str:
+        """Property to get query executed in the given cursor.
+
+        :return: executed query in the given cursor
+        :rtype: str
+        """
+        return self.cursor.query
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over the rows as dictionaries."""
+        return self.iter_rows()
+
+    def __len__(self) -> int:
+        """Number of rows fetched so far, the total is known only once the result is consumed.
+
+        :return: row length in int
+        :rtype: int
+        """
+        return self._fetched
+
+    def __repr__(self):
+        """Repr.
+
+        #noqa: DAR201:
+        """
+        return f'<PgSQlStreamResultSet> for {self.query}'
@@ -14,6 +14,10 @@ from typing import Any, Optional, Sequence
 from LiveInventoryFetcher.utils.data_access_layer.sql_db.resultsetbase import ResultSet
 
 
+class UC_QuerySetException(Exception):
+    pass
+
+
 class QuerySet(ABC):
     """Abstract Base class for Database Query operations.
 
@@ -55,3 +59,18 @@ class QuerySet(ABC):
         :type data: any
         """
         pass
+
+    @abstractmethod
+    def stream_query(self, query: str, data: Optional[Sequence] = None, itersize: int = None) -> ResultSet:
+        """Abstract Method for executing result returning query whose rows are fetched while iterating.
+
+        :param query: Query string to execute,
+        :type query: str
+
+        :param data: Data associated with the query.
+        :type data: any
+
+        :param itersize: Number of rows fetched per round trip.
+        :type itersize: int
+        """
+        pass
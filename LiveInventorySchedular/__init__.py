@@ -1,22 +1,35 @@
 from LiveInventorySchedular.common_utils.connector import get_vendors_disabled
-from LiveInventorySchedular.scheduler.vendor_scheduler import VendorScheduler
+from LiveInventorySchedular.scheduler.vendor_scheduler import VendorScheduler, li_db
+from LiveInventorySchedular.common_utils.job_queue import JobQueue
 import json
 import azure.functions as func
 import logging
 from LiveInventorySchedular.token_generator import BearerTokenGenerator
+from LiveInventorySchedular.config import Config
+from LiveInventorySchedular.utils.data_access_layer.sql_db.instrumentation import statement_metrics
 
 logger = logging
+statement_metrics.configure(slow_query_ms=Config.SLOW_QUERY_MS)
 
 
 def main(req: func.HttpRequest) -> func.HttpResponse:
     logging.info('schedular function is called')
+    statement_metrics.reset()
     refresh_access_tokens()
     sync_priority, sync = VendorScheduler().execute()
+    # item codes of failed fetcher batches whose retry is due, flagged is_retry
+    sync_retry = VendorScheduler().generate_fetcher_retry_command()
 
     # flag for product with priority
     for item in sync_priority:
         item['is_priority'] = True
-    vendor_list = sync_priority + sync
+    vendor_list = sync_priority + sync_retry + sync
+    if Config.JOB_QUEUE_ENABLED and vendor_list:
+        # workers pick the commands up from li_jobs, the Logic App gets the enqueue summary only
+        queued = JobQueue(li_db).enqueue(vendor_list)
+        statement_metrics.log_summary('schedular')
+        return func.HttpResponse(json.dumps(queued))
+    statement_metrics.log_summary('schedular')
     if vendor_list:
         return func.HttpResponse(json.dumps(vendor_list))
     else:
@@ -8,7 +8,7 @@ from LiveInventorySchedular.common_utils.db_utils import generate_sql_get_disabl
 from LiveInventorySchedular.common_utils.db_queries import QUERY_DELETE_OLD_RECORD_INVENTORY
 import logging
 
-li_db = DBEngineFactory.get_db_engine(Config.DB_CONFIG, DBEngineFactory.POSTGRES)
+li_db = DBEngineFactory.get_db_engine(Config.DB_CONFIG, DBEngineFactory.POSTGRES, **Config.DB_OPTIONS)
 
 # get the logger instance
 logger = logging
@@ -26,7 +26,7 @@ def get_vendors_disabled(select_key, identifier, identifier_keys, identifier_typ
 
         with li_db.transaction(auto_commit=True) as query_set:
             result_set = query_set.execute_query(get_row_vendor_config_GENERATED_SQL)
-            logger.debug(f'Executed Query {query_set.query}')
+            logger.debug('Executed Query %s', query_set.query)
             return_set = result_set.to_list()
             return return_set
     except Exception as exc:
@@ -39,7 +39,7 @@ def update_last_fetch_date_vendor_codes_all(data):
         sql = "update vendor_codes set last_fetch_date = now() where (vendor_id, vendor_code, internal_id) in %(data)s;"
         with li_db.transaction(auto_commit=True) as query_set:
             query_set.execute_query(sql, {'data': data})
-            logger.debug(f'Executed Query {query_set.query}')
+            logger.debug('Executed Query %s', query_set.query)
             return True
     except Exception:
         logger.error('Error in Error in dispatching the last fetch date to the vendor_code table', exc_info=True)
@@ -59,7 +59,7 @@ def delete_old_record_inventory():
             query_set.execute_non_query(QUERY_DELETE_OLD_RECORD_INVENTORY, {
                 'invalid_record_age': Config.TIME_INTERVAL_DELETE_INVALID_RECORD_INVENTORY
             })
-            logger.info(f'Executed Query {query_set.query}')
+            logger.debug('Executed Query %s', query_set.query)
             logger.info(f'successfully deleted the invalid old item from inventory table')
 
     except Exception as ex:
@@ -1,6 +1,13 @@
 """Collection of complex and other business logic related li_db queries."""
 
+# range scan of vendors_next_due_at_idx, see migrations/003_sync_next_due_at.sql
 QUERY_FETCH_SYNC_CANDIDATE_FROM_VENDORS = (
+    "select vendor_id, config_path from vendors as v "
+    "where v.next_due_at <= NOW() and v.enabled != false;"
+)
+
+# same candidates without next_due_at, for a database the migration was not applied to
+QUERY_FETCH_SYNC_CANDIDATE_FROM_VENDORS_SCAN = (
     "select vendor_id, config_path from vendors as v "
     "where NOW() - v.last_fetch_date >= v.sync_interval and v.enabled != false;"
 )
@@ -11,7 +18,14 @@ QUERY_UPDATE_LAST_MOD_VENDORS = (
     "where vendor_id = %(vendor_id)s;"
 )
 
+# next_due_at of a vendor code is only set when its product is a priority one
 QUERY_FETCH_AND_PRIORITY_FETCH_SYNC_CANDIDATE_FROM_VENDORS_VENDORS_CODE_PRODUCTS = (
+    "select v.vendor_id , vc.vendor_code  from vendor_codes vc "
+    "inner join vendors v on vc.vendor_id  = v.vendor_id "
+    "where vc.next_due_at <= now() and v.enabled != false;"
+)
+
+QUERY_FETCH_AND_PRIORITY_FETCH_SYNC_CANDIDATE_FROM_VENDORS_VENDORS_CODE_PRODUCTS_SCAN = (
     "select v.vendor_id , vc.vendor_code  from vendor_codes vc "
     "inner join products p on vc.internal_id = p.internal_id "
     "inner join vendors v on vc.vendor_id  = v.vendor_id "
@@ -57,6 +71,26 @@ QUERY_FETCH_VENDORS_CONFIG = (
     "group by vendor_id;"
 )
 
+# vendor codes not fetched within the vendor's sync interval, or all of them on every
+# `full_refresh_every`-th regular sync of the vendor, see migrations/006_vendor_sync_cycle.sql
+QUERY_FETCH_VENDORS_CONFIG_STALE = (
+    "with cycle as ( "
+    "update vendors set sync_cycle = sync_cycle + 1 where vendor_id = %(vendor_id)s "
+    "returning sync_interval, sync_cycle %% %(full_refresh_every)s = 0 as full_refresh) "
+    "select "
+    "jsonb_build_object( "
+    "'vendor_id',vendor_id, "
+    "'config_file_path',%(config_file_path)s||vendor_id::text||'.json', "
+    "'fetcher_write_path', %(fetcher_write_path)s, "
+    "'item_codes',coalesce(json_agg(distinct vc.vendor_code::text) filter (where cycle.full_refresh "
+    "or vc.last_fetch_date is null or vc.last_fetch_date <= now() - cycle.sync_interval), '[]'::json), "
+    "'template_values',jsonb_object_agg(key_name, value)), "
+    "bool_or(cycle.full_refresh) as full_refresh, count(distinct vc.vendor_code) as vendor_code_count "
+    "from vendor_configs vconfig inner join vendor_codes vc using(vendor_id) cross join cycle "
+    "where vconfig.vendor_id = %(vendor_id)s "
+    "group by vendor_id;"
+)
+
 QUERY_FETCH_VENDORS_CONFIG_PRIORITY = (
     "select "
     "jsonb_build_object( "
@@ -133,6 +167,10 @@ QUERY_FETCH_VENDOR_CODE_INTERNAL_ID_MAPPING = (
     "select vendor_code, internal_id from vendor_codes where vendor_id=%s"
 )
 
+QUERY_FETCH_VENDOR_CODES_VERSION = (
+    "select version from vendor_codes_version where vendor_id = %(vendor_id)s"
+)
+
 QUERY_FETCH_DATA_FROM_INVENTORY_USING_INTERNAL_ID = (
     """
     select vc.internal_id, vc.vendor_code, vc.vendor_id,
@@ -168,3 +206,82 @@ QUERY_DELETE_OLD_RECORD_INVENTORY = (
     "delete from inventory i where (NOW() - case when (i.last_valid_inserted_updated is not NULL) then "
     "i.last_valid_inserted_updated else  i.created_on end >  %(invalid_record_age)s) and i.invalid = true;"
 )
+
+# li_jobs, see migrations/004_li_jobs.sql and common_utils/job_queue.py
+QUERY_ENQUEUE_JOB = (
+    "insert into li_jobs (dedupe_key, payload, priority, max_attempts) "
+    "values (%(dedupe_key)s, %(payload)s, %(priority)s, %(max_attempts)s) "
+    "on conflict (dedupe_key) where status in ('queued', 'running') do nothing "
+    "returning job_id;"
+)
+
+QUERY_REQUEUE_EXPIRED_JOBS = (
+    "update li_jobs set "
+    "status = case when attempts >= max_attempts then 'failed' else 'queued' end, "
+    "last_error = 'lease of ' || coalesce(leased_by, '?') || ' expired', "
+    "leased_by = null, lease_expires_at = null, visible_at = now(), modified_on = now() "
+    "where status = 'running' and lease_expires_at < now() "
+    "returning job_id, status;"
+)
+
+QUERY_LEASE_JOBS = (
+    "update li_jobs as j set "
+    "status = 'running', attempts = j.attempts + 1, leased_by = %(worker_id)s, "
+    "lease_expires_at = now() + %(visibility_timeout)s * interval '1 second', "
+    "heartbeat_at = now(), modified_on = now() "
+    "from (select job_id from li_jobs where status = 'queued' and visible_at <= now() "
+    "order by priority desc, visible_at limit %(batch_size)s for update skip locked) as ready "
+    "where j.job_id = ready.job_id "
+    "returning j.job_id, j.dedupe_key, j.payload, j.attempts, j.max_attempts;"
+)
+
+QUERY_HEARTBEAT_JOB = (
+    "update li_jobs set "
+    "lease_expires_at = now() + %(visibility_timeout)s * interval '1 second', heartbeat_at = now() "
+    "where job_id = %(job_id)s and status = 'running' and leased_by = %(worker_id)s "
+    "returning job_id;"
+)
+
+QUERY_COMPLETE_JOB = (
+    "update li_jobs set status = 'done', result = %(result)s, last_error = null, "
+    "leased_by = null, lease_expires_at = null, modified_on = now() "
+    "where job_id = %(job_id)s and status = 'running' and leased_by = %(worker_id)s "
+    "returning job_id;"
+)
+
+QUERY_FAIL_JOB = (
+    "update li_jobs set "
+    "status = case when attempts >= max_attempts then 'failed' else 'queued' end, "
+    "visible_at = now() + %(retry_delay)s * power(2, attempts - 1) * interval '1 second', "
+    "last_error = %(error)s, leased_by = null, lease_expires_at = null, modified_on = now() "
+    "where job_id = %(job_id)s and status = 'running' and leased_by = %(worker_id)s "
+    "returning job_id, status;"
+)
+
+QUERY_PURGE_FINISHED_JOBS = (
+    "delete from li_jobs where status in ('done', 'failed') "
+    "and modified_on < now() - %(retention)s * interval '1 second';"
+)
+
+QUERY_COUNT_JOBS_BY_STATUS = (
+    "select status, count(*) as jobs from li_jobs group by status;"
+)
+
+# fetch_retry_ledger, see migrations/007_fetch_retry_ledger.sql
+QUERY_RECORD_FAILED_FETCH_BATCH = (
+    "insert into fetch_retry_ledger (vendor_id, item_codes, error_class, error, attempt, next_retry_at) "
+    "values (%(vendor_id)s, %(item_codes)s::text[], %(error_class)s, %(error)s, %(attempt)s, "
+    "now() + %(retry_delay)s * power(2, %(attempt)s - 1) * interval '1 second');"
+)
+
+QUERY_LEASE_DUE_FETCH_RETRIES = (
+    "update fetch_retry_ledger set claimed_until = now() + %(lease)s * interval '1 second' where retry_id in ("
+    "select retry_id from fetch_retry_ledger where next_retry_at <= now() "
+    "and (claimed_until is null or claimed_until <= now()) "
+    "order by next_retry_at limit %(limit)s for update skip locked) "
+    "returning retry_id, vendor_id, item_codes, error_class, attempt;"
+)
+
+QUERY_DELETE_FETCH_RETRIES = (
+    "delete from fetch_retry_ledger where retry_id = any(%(retry_ids)s::bigint[]);"
+)
@@ -0,0 +1,150 @@
+"""
+Ledger of the fetcher batches that failed, and the codes due for a retry.
+
+A chunked fetch asks the vendor for its item codes in batches. When a batch fails (an HTTP
+error status, a timeout, a dropped connection) the fetcher goes on with the other batches
+and records the failed one with its item codes and error class (table fetch_retry_ledger,
+migrations/007_fetch_retry_ledger.sql). Only the codes that were answered get their
+last_fetch_date set. Each scheduler run leases the batches whose retry is due and issues
+one fetcher command per vendor with just those codes and the retry_ids of the batches; the
+fetcher deletes the batches once the retry finished, and a retry that never finished is taken
+again when its lease of `fetch_retry_lease` seconds ends. A retry that fails again is recorded
+with the next attempt number, `fetch_retry_delay * 2 ** (attempt - 1)` seconds later, until
+`fetch_retry_max_attempts` is reached; the codes are then left to the next regular sync.
+A checkpointed pagination that stopped short after making progress is recorded as
+attempt 1 again, so that a long pull keeps resuming as long as it moves on.
+
+When the ledger table does not exist failures are only counted, as before. Other database
+errors are logged and the ledger is skipped for that call.
+"""
+
+import logging
+from typing import Any, Dict, Iterable
+
+from psycopg2 import errors as pg_errors
+
+from LiveInventorySchedular.config import Config
+from LiveInventorySchedular.common_utils.db_queries import QUERY_RECORD_FAILED_FETCH_BATCH, QUERY_LEASE_DUE_FETCH_RETRIES, \
+    QUERY_DELETE_FETCH_RETRIES
+
+logger = logging
+
+# set once the ledger table turned out to be missing, so it is not queried on every call
+_ledger_unavailable = False
+
+
+def _ledger_error(ex: Exception) -> None:
+    """
+    a missing ledger table turns the ledger off for the process, other errors only skip it for the call
+    """
+    global _ledger_unavailable
+    if isinstance(ex, (pg_errors.UndefinedTable, pg_errors.UndefinedColumn)):
+        logger.warning(f"fetch retry ledger is not available, failed batches are not retried: {ex}")
+        _ledger_unavailable = True
+    else:
+        logger.error(f"fetch retry ledger skipped: {ex}")
+
+
+def record_failed_batches(li_db, vendor_id: int, failed_batches: Iterable[Dict[str, Any]], attempt: int,
+                          retry_ids: Iterable[int] = ()) -> int:
+    """
+    Record the failed batches of one fetch for a retry
+
+    :param li_db: data access layer to write to
+    :type li_db: PgSQLDAL
+
+    :param vendor_id: vendor the batches were sent to
+    :type vendor_id: int
+
+    :param failed_batches: dicts with the item_codes, error_class and error of each failed batch,
+                           and optionally the attempt of the batch when it is not `attempt`
+    :type failed_batches: iterable
+
+    :param attempt: retry attempt the batches would be, 1 for a failure of a regular fetch
+    :type attempt: int
+
+    :param retry_ids: leased batches the fetch retried, deleted together with the recording
+    :type retry_ids: iterable
+
+    :return: number of batches recorded, 0 once the codes are out of attempts
+    """
+    retry_ids = list(retry_ids)
+    failed_batches = [dict(batch, attempt=batch.get('attempt') or attempt)
+                      for batch in failed_batches if batch.get('item_codes')]
+    if _ledger_unavailable:
+        return 0
+    if not failed_batches:
+        finish_retries(li_db, retry_ids)
+        return 0
+    exhausted = [batch for batch in failed_batches if batch['attempt'] > Config.FETCH_RETRY_MAX_ATTEMPTS]
+    if exhausted:
+        logger.warning(f"vendor_id: {vendor_id}: {len(exhausted)} failed batch(es) are out of retries, "
+                       f"left to the next sync")
+        failed_batches = [batch for batch in failed_batches if batch not in exhausted]
+    if not failed_batches and not retry_ids:
+        return 0
+    try:
+        with li_db.transaction(auto_commit=True) as qryset:
+            if retry_ids:
+                qryset.execute_non_query(QUERY_DELETE_FETCH_RETRIES, {'retry_ids': retry_ids})
+            for batch in failed_batches:
+                qryset.execute_non_query(QUERY_RECORD_FAILED_FETCH_BATCH, {
+                    'vendor_id': vendor_id,
+                    'item_codes': list(batch['item_codes']),
+                    'error_class': batch['error_class'],
+                    'error': (batch.get('error') or '')[:2000] or None,
+                    'attempt': batch['attempt'],
+                    'retry_delay': Config.FETCH_RETRY_DELAY,
+                })
+    except Exception as ex:
+        # the leased batches stay, they are retried once their lease ends
+        _ledger_error(ex)
+        return 0
+    if not failed_batches:
+        return 0
+    logger.info(f"vendor_id: {vendor_id}: {len(failed_batches)} failed batch(es) recorded for retry attempt(s) "
+                f"{sorted({batch['attempt'] for batch in failed_batches})}: "
+                f"{sorted({batch['error_class'] for batch in failed_batches})}")
+    return len(failed_batches)
+
+
+def lease_due_retries(li_db, limit: int) -> Dict[int, Dict[str, Any]]:
+    """
+    Lease the batches whose retry is due, merged per vendor, for `fetch_retry_lease` seconds
+
+    :param limit: batches taken at most
+    :return: vendor_id -> item_codes to re-fetch, the attempt the re-fetch is and the retry_ids to
+             finish once it is done
+    """
+    if _ledger_unavailable:
+        return {}
+    try:
+        with li_db.transaction(auto_commit=True) as qryset:
+            result = qryset.execute_query(QUERY_LEASE_DUE_FETCH_RETRIES,
+                                          {'limit': limit, 'lease': Config.FETCH_RETRY_LEASE})
+            rows = result.to_list() if result else []
+    except Exception as ex:
+        _ledger_error(ex)
+        return {}
+    retries = {}
+    for row in rows:
+        retry = retries.setdefault(row['vendor_id'], {'item_codes': [], 'attempt': 0, 'retry_ids': []})
+        retry['item_codes'].extend(code for code in row['item_codes'] if code not in retry['item_codes'])
+        retry['attempt'] = max(retry['attempt'], row['attempt'])
+        retry['retry_ids'].append(row['retry_id'])
+    return retries
+
+
+def finish_retries(li_db, retry_ids: Iterable[int]) -> None:
+    """
+    Delete leased batches whose retry went through
+    """
+    retry_ids = list(retry_ids)
+    if _ledger_unavailable or not retry_ids:
+        return
+    try:
+        with li_db.transaction(auto_commit=True) as qryset:
+            qryset.execute_non_query(QUERY_DELETE_FETCH_RETRIES, {'retry_ids': retry_ids})
+    except Exception as ex:
+        # left leased, they are retried once more when the lease ends
+        _ledger_error(ex)
@@ -0,0 +1,233 @@
+"""
+Postgres backed queue of vendor sync jobs (table li_jobs, migrations/004_li_jobs.sql).
+
+The scheduler enqueues one job per fetcher command; workers (LiveInventoryWorker) lease
+ready jobs with FOR UPDATE SKIP LOCKED, so any number of them can drain the queue side by
+side without blocking on each other or running a job twice. A leased job stays invisible
+for `job_visibility_timeout` seconds; the worker extends the lease with heartbeats while
+the job runs and then marks it done, or failed to be retried after an exponential delay.
+A lease that runs out (the worker died or was frozen) puts the job back in the queue.
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+
+from LiveInventorySchedular.config import Config
+from LiveInventorySchedular.common_utils.db_queries import QUERY_ENQUEUE_JOB, QUERY_REQUEUE_EXPIRED_JOBS, \
+    QUERY_LEASE_JOBS, QUERY_HEARTBEAT_JOB, QUERY_COMPLETE_JOB, QUERY_FAIL_JOB, QUERY_PURGE_FINISHED_JOBS, \
+    QUERY_COUNT_JOBS_BY_STATUS
+
+logger = logging
+
+
+class LostLeaseException(Exception):
+    pass
+
+
+class Job:
+    """
+    one leased li_jobs row
+
+    :param job_id: li_jobs.job_id
+    :param dedupe_key: vendor and kind of sync, see job_key
+    :param payload: fetcher command of the scheduler
+    :param attempts: leases taken so far, this one included
+    :param max_attempts: leases after which a failing job is given up
+    """
+    __slots__ = ('job_id', 'dedupe_key', 'payload', 'attempts', 'max_attempts')
+
+    def __init__(self, job_id: int, dedupe_key: str, payload: Dict[str, Any], attempts: int,
+                 max_attempts: int) -> None:
+        self.job_id = job_id
+        self.dedupe_key = dedupe_key
+        self.payload = payload
+        self.attempts = attempts
+        self.max_attempts = max_attempts
+
+    def __repr__(self) -> str:
+        return f"Job({self.job_id}, {self.dedupe_key!r}, attempt {self.attempts}/{self.max_attempts})"
+
+
+def job_key(command: Dict[str, Any]) -> str:
+    """
+    dedupe key of a fetcher command: the vendor and whether it is a priority sync, a retry or a regular one
+    """
+    kind = 'priority' if command.get('is_priority') else 'retry' if command.get('is_retry') else 'sync'
+    return f"{command.get('vendor_id')}:{kind}"
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class JobQueue:
+    """
+    enqueue, lease, heartbeat and settle li_jobs rows
+
+    :param li_db: data access layer of the queue table
+    :type li_db: PgSQLDAL
+
+    :param worker_id: name of the leasing worker, unique per process
+    :type worker_id: str, optional
+
+    :param visibility_timeout: seconds a lease lasts without heartbeat
+    :type visibility_timeout: float, optional
+    """
+
+    def __init__(self, li_db, worker_id: Optional[str] = None, visibility_timeout: Optional[float] = None) -> None:
+        self.li_db = li_db
+        self.worker_id = worker_id or default_worker_id()
+        self.visibility_timeout = visibility_timeout or Config.JOB_VISIBILITY_TIMEOUT
+
+    def enqueue(self, commands: Iterable[Dict[str, Any]]) -> Dict[str, List[Any]]:
+        """
+        Add a job per command, a command whose vendor already has a queued or running job
+        of the same kind is skipped
+
+        :return: job ids of the new jobs and keys of the skipped commands
+        """
+        enqueued, skipped = [], []
+        with self.li_db.transaction(auto_commit=True) as query_set:
+            for command in commands:
+                key = job_key(command)
+                result_set = query_set.execute_query(QUERY_ENQUEUE_JOB, {
+                    'dedupe_key': key,
+                    'payload': json.dumps(command),
+                    'priority': 1 if command.get('is_priority') else 0,
+                    'max_attempts': Config.JOB_MAX_ATTEMPTS,
+                })
+                rows = result_set.to_list() if result_set else []
+                if rows:
+                    enqueued.append(rows[0]['job_id'])
+                else:
+                    skipped.append(key)
+        logger.info(f"enqueued {len(enqueued)} job(s), skipped {len(skipped)} already queued or running: {skipped}")
+        return {'enqueued': enqueued, 'skipped': skipped}
+
+    def requeue_expired(self) -> int:
+        """
+        Queue the running jobs whose lease ran out again, or fail them when out of attempts
+        """
+        with self.li_db.transaction(auto_commit=True) as query_set:
+            result_set = query_set.execute_query(QUERY_REQUEUE_EXPIRED_JOBS)
+            rows = result_set.to_list() if result_set else []
+        if rows:
+            logger.warning(f"lease expired for job(s): {[(row['job_id'], row['status']) for row in rows]}")
+        return len(rows)
+
+    def lease(self, batch_size: int = 1) -> List[Job]:
+        """
+        Take up to `batch_size` ready jobs, highest priority and longest waiting first
+        """
+        self.requeue_expired()
+        with self.li_db.transaction(auto_commit=True) as query_set:
+            result_set = query_set.execute_query(QUERY_LEASE_JOBS, {
+                'worker_id': self.worker_id,
+                'visibility_timeout': self.visibility_timeout,
+                'batch_size': batch_size,
+            })
+            rows = result_set.to_list() if result_set else []
+        return [Job(row['job_id'], row['dedupe_key'], row['payload'], row['attempts'], row['max_attempts'])
+                for row in rows]
+
+    def heartbeat(self, job: Job) -> None:
+        """
+        Extend the lease of the job by the visibility timeout
+
+        :raises LostLeaseException: Raised when the job is no longer leased by this worker.
+        """
+        with self.li_db.transaction(auto_commit=True) as query_set:
+            result_set = query_set.execute_query(QUERY_HEARTBEAT_JOB, {
+                'job_id': job.job_id, 'worker_id': self.worker_id, 'visibility_timeout': self.visibility_timeout})
+            rows = result_set.to_list() if result_set else []
+        if not rows:
+            raise LostLeaseException(f"{job} is no longer leased by {self.worker_id}")
+
+    def complete(self, job: Job, result: Any = None) -> bool:
+        """
+        Mark the job done
+
+        :return: False when the lease was lost in the meantime and the job was left as it is
+        """
+        with self.li_db.transaction(auto_commit=True) as query_set:
+            result_set = query_set.execute_query(QUERY_COMPLETE_JOB, {
+                'job_id': job.job_id, 'worker_id': self.worker_id, 'result': json.dumps(result, default=str)})
+            return bool(result_set.to_list() if result_set else [])
+
+    def fail(self, job: Job, error: str) -> Optional[str]:
+        """
+        Queue the job again after `job_retry_delay * 2 ** (attempts - 1)` seconds, or fail it
+        for good when it is out of attempts
+
+        :return: new status of the job, None when the lease was lost in the meantime
+        """
+        with self.li_db.transaction(auto_commit=True) as query_set:
+            result_set = query_set.execute_query(QUERY_FAIL_JOB, {
+                'job_id': job.job_id, 'worker_id': self.worker_id, 'error': error[:2000],
+                'retry_delay': Config.JOB_RETRY_DELAY})
+            rows = result_set.to_list() if result_set else []
+        return rows[0]['status'] if rows else None
+
+    def purge_finished(self, retention: Optional[float] = None) -> None:
+        """
+        Delete done and failed jobs older than `retention` seconds (`job_retention`)
+        """
+        with self.li_db.transaction(auto_commit=True) as query_set:
+            query_set.execute_non_query(QUERY_PURGE_FINISHED_JOBS,
+                                        {'retention': retention or Config.JOB_RETENTION})
+
+    def counts(self) -> Dict[str, int]:
+        """
+        jobs per status
+        """
+        with self.li_db.transaction(auto_commit=True) as query_set:
+            result_set = query_set.execute_query(QUERY_COUNT_JOBS_BY_STATUS)
+            return {row['status']: row['jobs'] for row in (result_set.to_list() if result_set else [])}
+
+
+class Heartbeat:
+    """
+    Extends the lease of a job from a background thread while the job runs
+
+        eg::
+            with Heartbeat(queue, job) as heartbeat:
+                run(job.payload)
+            if heartbeat.lost: ...
+
+    :param queue: queue the job was leased from
+    :param job: the running job
+    :param interval: seconds between two heartbeats, a third of the visibility timeout by default
+    """
+
+    def __init__(self, queue: JobQueue, job: Job, interval: Optional[float] = None) -> None:
+        self.queue = queue
+        self.job = job
+        self.interval = interval or queue.visibility_timeout / 3
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{job.job_id}", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.queue.heartbeat(self.job)
+            except LostLeaseException as ex:
+                logger.error(ex)
+                self.lost = True
+                return
+            except Exception as ex:
+                # a missed beat is tolerated, the lease only runs out after the visibility timeout
+                logger.warning(f"heartbeat of {self.job} failed: {ex}")
+
+    def __enter__(self) -> 'Heartbeat':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._stop.set()
+        self._thread.join()
@@ -19,6 +19,46 @@ class Config:
     NETWORK_CONFIG = dict(config['network_filepath'])
     EXTRA = dict(config['extra'])
     TIME_INTERVAL_DELETE_INVALID_RECORD_INVENTORY = EXTRA.get('TIME_INTERVAL_DELETE_INVALID_RECORD_INVENTORY')
+    # statements slower than this (milliseconds) are logged with their full text
+    SLOW_QUERY_MS = float(EXTRA.get('slow_query_ms', 500))
+    # payloads in hot path log records are cut to this many characters / sample entries, see common_utils/log_utils.py
+    LOG_PAYLOAD_MAX_CHARS = int(EXTRA.get('log_payload_max_chars', 2000))
+    LOG_PAYLOAD_SAMPLE = int(EXTRA.get('log_payload_sample', 3))
+    # logger=N pairs, only every N-th record below WARNING of these loggers is emitted
+    LOG_SAMPLE_EVERY = EXTRA.get('log_sample_every', '')
+    # all: a regular sync asks for every vendor code; stale: only for the codes not fetched within the
+    # vendor's sync interval, all of them every FULL_REFRESH_EVERY-th sync (migrations/006_vendor_sync_cycle.sql)
+    REGULAR_SYNC_SELECTION = EXTRA.get('regular_sync_selection', 'all').lower()
+    FULL_REFRESH_EVERY = int(EXTRA.get('full_refresh_every', 6))
+    # failed fetcher batches are retried with only their item codes after fetch_retry_delay seconds,
+    # doubled per attempt, see common_utils/fetch_retry_ledger.py; 0 attempts turns the retries off
+    FETCH_RETRY_MAX_ATTEMPTS = int(EXTRA.get('fetch_retry_max_attempts', 3))
+    FETCH_RETRY_DELAY = float(EXTRA.get('fetch_retry_delay', 60))
+    # failed batches one scheduler run takes for a retry
+    FETCH_RETRY_BATCH = int(EXTRA.get('fetch_retry_batch', 500))
+    # seconds taken batches are hidden from the next runs, a retry not finished by then is taken again
+    FETCH_RETRY_LEASE = float(EXTRA.get('fetch_retry_lease', 900))
+    # enqueue the fetcher commands in li_jobs for LiveInventoryWorker instead of returning them,
+    # see common_utils/job_queue.py
+    JOB_QUEUE_ENABLED = EXTRA.get('job_queue', 'false').lower() == 'true'
+    # seconds a leased job stays invisible to other workers without heartbeat
+    JOB_VISIBILITY_TIMEOUT = float(EXTRA.get('job_visibility_timeout', 300))
+    JOB_MAX_ATTEMPTS = int(EXTRA.get('job_max_attempts', 3))
+    # seconds before the first retry of a failed job, doubled on every further attempt
+    JOB_RETRY_DELAY = float(EXTRA.get('job_retry_delay', 60))
+    # seconds done and failed jobs are kept
+    JOB_RETENTION = float(EXTRA.get('job_retention', 604800))
+    # seconds one worker invocation keeps leasing jobs
+    WORKER_MAX_SECONDS = float(EXTRA.get('worker_max_seconds', 480))
+    # seconds on-demand syncs are collected into one fetch per vendor, see LiveInventoryWorker/coalescer.py,
+    # 0 disables the window
+    ONDEMAND_COALESCE_WINDOW = float(EXTRA.get('ondemand_coalesce_window', 0))
+    # options of the data access layer, see PgSQLDAL
+    DB_OPTIONS = {
+        'keep_alive': EXTRA.get('db_keep_alive', 'false').lower() == 'true',
+        'prepare_statements': EXTRA.get('db_prepare_statements', 'false').lower() == 'true',
+        'prepared_cache_size': int(EXTRA.get('db_prepared_cache_size', 64)),
+    }
     LOGGER_CONFIG = {'nativelogger': {
         'filehandler': {
             'maxbytes': 10485760,
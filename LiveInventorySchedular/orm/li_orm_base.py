@@ -5,12 +5,12 @@ ORM base class for performing MRC database actions
 from abc import ABC, abstractmethod
 from typing import Any
 from marshmallow import fields, ValidationError, EXCLUDE
-import logging
+from LiveInventorySchedular.common_utils.log_utils import get_logger, summarize
 from LiveInventorySchedular.common_utils.db_utils import (insert_data, update_data, delete_rows, get_one, get_all,
                                                           upsert_data, upsert_bulk_data, get_all_netsuite_items)
 
-# get the logger instance
-logger = logging
+# get the logger instance, records about whole tables and payloads can be sampled (log_sample_every)
+logger = get_logger(__name__)
 
 
 class LIOrmBase(ABC):
@@ -107,8 +107,8 @@ class LIOrmBase(ABC):
         """
         self.check_src_data()
 
-        logger.info(f'Loading data to {self.get_table()} schema.')
-        logger.debug(f'Data for loading: {self.src_data}')
+        logger.info('Loading data to %s schema.', self.get_table())
+        logger.debug('Data for loading: %s', summarize(self.src_data))
         self.is_loaded = True
         try:
             if isinstance(self.src_data, list):
@@ -136,7 +136,7 @@ class LIOrmBase(ABC):
         """
         self.check_src_data()
 
-        logger.info(f'Dumping data of {self.get_table()}  schema.')
+        logger.info('Dumping data of %s  schema.', self.get_table())
         self.is_dumped = True
         try:
             if isinstance(self.src_data, list):
@@ -162,7 +162,7 @@ class LIOrmBase(ABC):
         :raises ValueError: Raised when update() is called before loading or dumping data.
         """
         self.check_src_data()
-        logger.debug(f'Saving data: {self.src_data}')
+        logger.debug('Saving data: %s', summarize(self.src_data))
 
         if isinstance(self.src_data, list) and len(self.src_data) > 0:
             logger.warning('Save for Multiple instances not implemented.')
@@ -263,14 +263,14 @@ class LIOrmBase(ABC):
         # page 1 = offset 0 (sql)
         current_page = current_page if current_page == 0 else current_page - 1
 
-        logger.info(f'Fetching all {self.get_table()}')
-        logger.debug(f'Fetching all {self.get_table()} with offset {current_page} and limit {per_page}')
+        logger.info('Fetching all %s', self.get_table())
+        logger.debug('Fetching all %s with offset %s and limit %s', self.get_table(), current_page, per_page)
 
         all_data = get_all(self.get_table(), current_page, per_page)
         # all_data = get(self.get_table(), current_page, per_page)
 
-        logger.info(f'Fetch complete for all {self.get_table()}.')
-        logger.debug(f'Fetch Complete with data {all_data}')
+        logger.info('Fetch complete for all %s.', self.get_table())
+        logger.debug('Fetch Complete with data %s', summarize(all_data))
         #: default page is 0 as per default offset .i.e. current_page = 0
         #: adding + 1 to current_page gives us UX readable page number starting from 1.
         #: adding +2 to current_page gives next page. i.e. readable page + 1.
@@ -282,11 +282,11 @@ class LIOrmBase(ABC):
             'next': pseudo_page + 1,
             'prev': pseudo_page - 1 if current_page > 0 else None
         }
-        logger.debug(f'Prepared meta object: {meta}')
+        logger.debug('Prepared meta object: %s', summarize(meta))
 
         dumped_data = self.get_schema().dump(all_data, many=True)
         data = {'meta': meta, 'data': dumped_data}
-        logger.debug(f'Dumping all {self.get_table()} with metadata: {data}')
+        logger.debug('Dumping all %s with metadata: %s', self.get_table(), summarize(data))
         return data
 
     def one(self, row_value: Any, identifier: str = 'id') -> dict:
@@ -301,7 +301,7 @@ class LIOrmBase(ABC):
         :returns: single schema dump.
         :rtype: dict
         """
-        logger.info(f'Fetching single {self.get_table()}.')
+        logger.info('Fetching single %s.', self.get_table())
         logger.debug(f'Fetching single {self.get_table()} with identifier '
                      f'"{identifier}" and value "{row_value}"')
 
@@ -310,7 +310,7 @@ class LIOrmBase(ABC):
                               row_identifier=identifier)
 
         if single_data:
-            logger.debug(f'Dumping single {self.get_table()} data: {single_data[0]}')
+            logger.debug('Dumping single %s data: %s', self.get_table(), summarize(single_data[0]))
             return self.get_schema().dump(single_data[0])
         else:
             logger.warning(f'No data was found for {self.get_table()} with identifier '
@@ -329,7 +329,7 @@ class LIOrmBase(ABC):
         :returns: single schema dump.
         :rtype: dict
         """
-        logger.info(f'Fetching single {self.get_table()}.')
+        logger.info('Fetching single %s.', self.get_table())
         logger.debug(f'Fetching single {self.get_table()} with identifier '
                      f'"{identifier}" and value "{row_value}"')
 
@@ -338,9 +338,9 @@ class LIOrmBase(ABC):
                            row_identifier=identifier)
 
         if all_data:
-            logger.debug(f'Dumping single {self.get_table()} data: {all_data}')
+            logger.debug('Dumping single %s data: %s', self.get_table(), summarize(all_data))
             dumped_data = self.get_schema().dump(all_data, many=True)
-            logger.debug(f'Dumping all {self.get_table()} with metadata: {all_data}')
+            logger.debug('Dumping all %s with metadata: %s', self.get_table(), summarize(all_data))
             return {'data': dumped_data}
         else:
             logger.warning(f'No data was found for {self.get_table()} with identifier '
@@ -359,7 +359,7 @@ class LIOrmBase(ABC):
         :returns: single schema dump.
         :rtype: dict
         """
-        logger.info(f'Fetching single {self.get_table()}.')
+        logger.info('Fetching single %s.', self.get_table())
         logger.debug(f'Fetching single {self.get_table()} with identifier '
                      f'"{identifier}" and value "{row_value}"')
 
@@ -368,9 +368,9 @@ class LIOrmBase(ABC):
                            row_identifier=identifier)
 
         if all_data:
-            logger.debug(f'Dumping single {self.get_table()} data: {all_data}')
+            logger.debug('Dumping single %s data: %s', self.get_table(), summarize(all_data))
             dumped_data = self.get_schema().dump(all_data, many=True)
-            logger.debug(f'Dumping all {self.get_table()} with metadata: {all_data}')
+            logger.debug('Dumping all %s with metadata: %s', self.get_table(), summarize(all_data))
             return {'data': dumped_data}
         else:
             logger.warning(f'No data was found for {self.get_table()} with identifier '
@@ -412,7 +412,7 @@ class LIOrmBase(ABC):
 
         logger.info('Executing upsert_data.')
         try:
-            logger.debug(f'Saving data: {self.src_data}')
+            logger.debug('Saving data: %s', summarize(self.src_data))
             upsert_bulk_data(self.get_table(), self.src_data, returning=True, conflict_fields=conflict_fields)
             # self.loaded_data = insert_data(self.get_table(), self.src_data,
             #                                include=self.get_dump_only_fields())[0]
@@ -420,7 +420,7 @@ class LIOrmBase(ABC):
 
         except Exception as ex:
             logger.info(ex)
-            logger.info(f'updating data for {self.loaded_data}')
+            logger.info('updating data for %s', summarize(self.loaded_data))
             pass
 
     def allNetsuiteItems(self, current_page: int, per_page: int) -> dict:  # noqa: A003
@@ -444,13 +444,13 @@ class LIOrmBase(ABC):
         # page 1 = offset 0 (sql)
         current_page = current_page if current_page == 0 else current_page - 1
 
-        logger.info(f'Fetching all {self.get_table()}')
-        logger.debug(f'Fetching all {self.get_table()} with offset {current_page} and limit {per_page}')
+        logger.info('Fetching all %s', self.get_table())
+        logger.debug('Fetching all %s with offset %s and limit %s', self.get_table(), current_page, per_page)
 
         all_data = get_all_netsuite_items(self.get_table(), current_page, per_page)
 
-        logger.info(f'Fetch complete for all {self.get_table()}.')
-        logger.debug(f'Fetch Complete with data {all_data}')
+        logger.info('Fetch complete for all %s.', self.get_table())
+        logger.debug('Fetch Complete with data %s', summarize(all_data))
         #: default page is 0 as per default offset .i.e. current_page = 0
         #: adding + 1 to current_page gives us UX readable page number starting from 1.
         #: adding +2 to current_page gives next page. i.e. readable page + 1.
@@ -463,9 +463,9 @@ class LIOrmBase(ABC):
             'next': pseudo_page + 1,
             'prev': pseudo_page - 1 if current_page > 0 else None
         }
-        logger.debug(f'Prepared meta object: {meta}')
+        logger.debug('Prepared meta object: %s', summarize(meta))
 
         dumped_data = self.get_schema().dump(all_data, many=True)
         data = {'meta': meta, 'data': all_data}
-        logger.debug(f'Dumping all {self.get_table()} with metadata: {data}')
+        logger.debug('Dumping all %s with metadata: %s', self.get_table(), summarize(data))
         return data
@@ -5,7 +5,7 @@ from LiveInventorySchedular.common_utils.db_queries import QUERY_UPDATE_BEARER_T
 import logging
 from LiveInventorySchedular.config import Config
 
-li_db = DBEngineFactory.get_db_engine(Config.DB_CONFIG, DBEngineFactory.POSTGRES)
+li_db = DBEngineFactory.get_db_engine(Config.DB_CONFIG, DBEngineFactory.POSTGRES, **Config.DB_OPTIONS)
 
 # get the global reference og logger
 logger = logging
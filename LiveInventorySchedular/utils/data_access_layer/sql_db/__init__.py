@@ -27,7 +27,7 @@ class DBEngineFactory:
     POSTGRES: ClassVar[int] = 1
 
     @staticmethod
-    def get_db_engine(config, engine_type: int) -> DBDALBase:
+    def get_db_engine(config, engine_type: int, **options) -> DBDALBase:
         """Factory static method to get appropirate DB DAL accroding to
         supplied engine type.
 
@@ -35,6 +35,7 @@ class DBEngineFactory:
                          as per db server type.
         :param engine_type: value to denote which server to connect to. For now only
                              `DBEngineFactory.POSTGRES` is available.
+        :param options: DAL options e.g. `keep_alive`, `prepare_statements`, `prepared_cache_size`
 
         :type config: dict
         :type engine_type: int
@@ -45,7 +46,7 @@ class DBEngineFactory:
         :rtype: DBDALBase
         """
         if engine_type == DBEngineFactory.POSTGRES:
-            return PgSQLDAL(config)
+            return PgSQLDAL(config, **options)
         else:
             raise ValueError(
                 'Only `DBEngineFactory.POSTGRES` is allowed as engine_type.')
@@ -4,15 +4,18 @@
 DB query results should be processed here.
 """
 
-from typing import Dict, List, Type, Any, Union
+from collections import namedtuple
+from typing import TYPE_CHECKING, Dict, Iterator, List, Type, Any, Union
 
-import pandas as pd
 import psycopg2
 from psycopg2.extensions import cursor as c
 
 
 from LiveInventorySchedular.utils.data_access_layer.sql_db.resultsetbase import ResultSet
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 class PgSQlResultSet(ResultSet):
     """Abstract base class for `Database ResultSet`. This class process the
@@ -37,22 +40,22 @@ class PgSQlResultSet(ResultSet):
         # self._raw_data could be none if not result returning query is executed as result returning
         # this conditional is for fail safe.
         if self._raw_data is not None:
-            cursor_data = self._raw_data
-            columns = cursor_data[0]
-            rows_data = cursor_data[1]
-
-            result = [
-                {
-                    columns[index][0]:column for
-                    index, column in enumerate(value)
-                }
-                for value in rows_data
-            ]
-
-            return result
+            names = self.columns
+            return [dict(zip(names, row)) for row in self._raw_data[1]]
         else:
             return []
 
+    @property
+    def columns(self) -> List[str]:
+        """Column names of the result in select order.
+
+        :return: list of column names, empty when the query returned no result.
+        :rtype: list
+        """
+        if self._raw_data is not None:
+            return [column[0] for column in self._raw_data[0]]
+        return []
+
     def to_list(self) -> List[Dict[str, Any]]:
         """Method to parse cursor data to list dictionary.
 
@@ -61,12 +64,52 @@ class PgSQlResultSet(ResultSet):
         """
         return self.pre_process()
 
-    def to_df(self) -> pd.DataFrame:
-        """Method to parse cursor data to `pandas.DataFrame`
+    def to_tuples(self) -> List[tuple]:
+        """Method to get cursor data as fetched, one tuple per row in `columns` order.
+
+        Cheapest row format, no per row object is built.
+        :return: list of tuples
+        :rtype: list
+        """
+        if self._raw_data is not None:
+            return list(self._raw_data[1])
+        return []
+
+    def to_namedtuples(self) -> List[tuple]:
+        """Method to parse cursor data to namedtuples, rows are accessible by attribute.
+
+        :return: list of namedtuples
+        :rtype: list
+        """
+        if self._raw_data is None:
+            return []
+        row = namedtuple('Row', self.columns, rename=True)
+        return [row._make(value) for value in self._raw_data[1]]
+
+    def to_columns(self) -> Dict[str, List[Any]]:
+        """Method to parse cursor data to column arrays.
+
+        :return: dictionary of column name to list of values.
+        :rtype: dict
+        """
+        names = self.columns
+        if not names:
+            return {}
+        rows_data = self._raw_data[1]
+        if not rows_data:
+            return {name: [] for name in names}
+        return dict(zip(names, map(list, zip(*rows_data))))
+
+    def to_df(self) -> 'pd.DataFrame':
+        """Method to parse cursor data to `pandas.DataFrame`, pandas is imported on first use.
         :return: cursor data parsed to pandas dataframe.
         :rtype: pandas.DataFrame
         """
-        return pd.DataFrame(self.to_list())
+        import pandas as pd
+
+        if self._raw_data is None:
+            return pd.DataFrame()
+        return pd.DataFrame.from_records(self._raw_data[1], columns=self.columns)
 
     def fetch_data(self) -> Union[None, tuple]:
         """Private method to fetch cursor description (columns data) and cursor
@@ -138,6 +181,10 @@ class PgSQlResultSet(ResultSet):
         else:
             return 0
 
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over the rows as dictionaries."""
+        return iter(self.pre_process())
+
     def __repr__(self):
         """Repr.
 
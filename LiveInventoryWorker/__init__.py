@@ -0,0 +1,32 @@
+import json
+import azure.functions as func
+import logging
+
+from LiveInventorySchedular.config import Config
+from LiveInventorySchedular.utils.data_access_layer.sql_db.instrumentation import statement_metrics
+from LiveInventoryWorker.coalescer import UC_OnDemandSyncException, ondemand_coalescer
+from LiveInventoryWorker.worker import Worker
+
+logger = logging
+
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info('worker function is called')
+    body = req.get_body()
+    message = json.loads(str(body, encoding='utf-8')) if body else {}
+    if isinstance(message, dict) and message.get('internal_ids'):
+        # on-demand sync, merged with the on-demand requests arriving at the same time
+        try:
+            result = ondemand_coalescer.sync(message['internal_ids'])
+        except UC_OnDemandSyncException as ex:
+            return func.HttpResponse(str(ex), status_code=400)
+        return func.HttpResponse(json.dumps({**result, 'coalescing': ondemand_coalescer.stats()}, default=str))
+
+    statement_metrics.reset()
+    worker = Worker()
+    summary = worker.run(Config.WORKER_MAX_SECONDS)
+    # a worker invocation also keeps li_jobs from growing without bound
+    worker.queue.purge_finished()
+    statement_metrics.log_summary('worker')
+    return func.HttpResponse(json.dumps({'worker_id': worker.queue.worker_id, **summary,
+                                         'queue': worker.queue.counts()}))
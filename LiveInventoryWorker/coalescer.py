@@ -0,0 +1,190 @@
+"""
+Single-flight coalescing of on-demand syncs by internal_id.
+
+Bursts of on-demand requests for overlapping products used to plan and run a full fetch
+each, calling the vendor APIs for the same vendor codes seconds apart. Here the first request
+opens a batch and waits `ondemand_coalesce_window` seconds; every request arriving in the
+meantime joins it. The batch is then planned once for the union of the internal_ids
+(VendorScheduler(internal_ids=...), one command per vendor with the union of its codes) and
+each vendor command runs once. A request whose internal_ids are all part of a batch that is
+already running joins that batch instead of opening a new one. All requests of a batch share
+its result.
+
+Coalescing happens within one process: concurrent invocations handled by the same worker.
+The window is slept on the request thread of the first request, so it is only applied when
+the worker handles invocations on several threads (PYTHON_THREADPOOL_THREAD_COUNT > 1);
+with one thread nothing could join and every request would just wait. It is 0 by default,
+requests then only join a batch that is already running.
+
+internal_ids are integers, ids sent as text ('1') are the same product as 1.
+"""
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+import logging
+
+from LiveInventorySchedular.config import Config
+
+logger = logging
+
+
+class UC_OnDemandSyncException(Exception):
+    pass
+
+
+def normalise_internal_ids(internal_ids: Iterable[Any]) -> Set[int]:
+    """
+    :raises UC_OnDemandSyncException: Raised when an internal_id is not an integer.
+    """
+    try:
+        return {int(internal_id) for internal_id in internal_ids}
+    except (TypeError, ValueError) as ex:
+        raise UC_OnDemandSyncException(f"internal_ids must be integers: {ex}")
+
+
+def effective_window(window: float) -> float:
+    """
+    the configured window, 0 when the worker runs one invocation at a time
+    """
+    try:
+        threads = int(os.environ.get('PYTHON_THREADPOOL_THREAD_COUNT') or 1)
+    except ValueError:
+        threads = 1
+    if window > 0 and threads <= 1:
+        logger.warning(f"ondemand_coalesce_window of {window}s ignored, "
+                       f"PYTHON_THREADPOOL_THREAD_COUNT is not above 1")
+        return 0.0
+    return window
+
+
+def plan_ondemand_sync(internal_ids: List[Any]) -> List[Dict[str, Any]]:
+    """
+    fetcher commands of the vendors carrying the internal_ids, restricted to their codes
+    """
+    from LiveInventorySchedular.scheduler.vendor_scheduler import VendorScheduler
+    return VendorScheduler(internal_ids=internal_ids).generate_fetcher_sync_command()
+
+
+def run_ondemand_command(command: Dict[str, Any]) -> Dict[str, Any]:
+    from LiveInventoryWorker.worker import run_job
+    return run_job(command)
+
+
+class _Batch:
+    """
+    internal_ids of the requests coalesced into one planned sync, and its outcome
+    """
+
+    def __init__(self) -> None:
+        self.internal_ids = set()
+        self.requests = 0
+        self.running = False
+        self.done = threading.Event()
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[BaseException] = None
+
+
+class OnDemandCoalescer:
+    """
+    :param window: seconds a batch collects requests before it is planned
+    :type window: float
+
+    :param plan: internal_ids -> fetcher commands, one per vendor
+    :type plan: callable
+
+    :param run: runs one fetcher command
+    :type run: callable
+    """
+
+    def __init__(self, window: float, plan: Callable[[List[Any]], List[Dict[str, Any]]] = plan_ondemand_sync,
+                 run: Callable[[Dict[str, Any]], Any] = run_ondemand_command) -> None:
+        self.window = window
+        self.plan = plan
+        self.run = run
+        self._lock = threading.Lock()
+        self._collecting: Optional[_Batch] = None
+        self._running: List[_Batch] = []
+        self.requests = 0
+        self.batches = 0
+        self.ids_requested = 0
+        self.ids_synced = 0
+        self.commands_run = 0
+
+    def sync(self, internal_ids: Iterable[Any]) -> Dict[str, Any]:
+        """
+        Sync the internal_ids, together with whatever requests are coalesced with this one
+
+        :return: per vendor results of the shared batch, and how long this request waited
+        :raises UC_OnDemandSyncException: Raised when an internal_id is not an integer.
+        :raises Exception: Raised when the batch could not be planned, vendor failures are reported per vendor.
+        """
+        start = time.perf_counter()
+        requested = normalise_internal_ids(internal_ids)
+        leader = False
+        with self._lock:
+            self.requests += 1
+            self.ids_requested += len(requested)
+            batch = next((running for running in self._running if requested <= running.internal_ids), None)
+            if batch is None:
+                if self._collecting is None:
+                    self._collecting = _Batch()
+                    leader = True
+                batch = self._collecting
+                batch.internal_ids |= requested
+            batch.requests += 1
+
+        if leader:
+            self._lead(batch)
+        batch.done.wait()
+        if batch.error is not None:
+            raise batch.error
+        return dict(batch.result, latency_ms=round((time.perf_counter() - start) * 1000, 1),
+                    coalesced_requests=batch.requests)
+
+    def _lead(self, batch: _Batch) -> None:
+        if self.window > 0:
+            time.sleep(self.window)
+        with self._lock:
+            self._collecting = None
+            batch.running = True
+            self._running.append(batch)
+            self.batches += 1
+            self.ids_synced += len(batch.internal_ids)
+        try:
+            commands = self.plan(sorted(batch.internal_ids))
+            vendors = {}
+            for command in commands:
+                try:
+                    vendors[command.get('vendor_id')] = self.run(command)
+                except Exception as ex:
+                    logger.error(f"FAILURE - on-demand sync of vendor_id: {command.get('vendor_id')}: {ex}",
+                                 exc_info=True)
+                    vendors[command.get('vendor_id')] = {'error': f"{type(ex).__name__}: {ex}"}
+            with self._lock:
+                self.commands_run += len(commands)
+            batch.result = {'internal_ids': sorted(batch.internal_ids), 'vendors': vendors}
+        except Exception as ex:
+            logger.error(f"Could not plan on-demand sync of internal_ids: {sorted(batch.internal_ids)}",
+                         exc_info=True)
+            batch.error = ex
+        finally:
+            with self._lock:
+                self._running.remove(batch)
+            batch.done.set()
+        logger.info(f"on-demand batch: {batch.requests} request(s), {len(batch.internal_ids)} internal id(s); "
+                    f"{self.stats()}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        requests per batch and internal ids requested per internal id synced, both 1.0 without coalescing
+        """
+        with self._lock:
+            return {
+                'requests': self.requests, 'batches': self.batches, 'commands_run': self.commands_run,
+                'requests_per_batch': round(self.requests / self.batches, 2) if self.batches else None,
+                'ids_requested_per_synced': round(self.ids_requested / self.ids_synced, 2) if self.ids_synced else None,
+            }
+
+
+ondemand_coalescer = OnDemandCoalescer(effective_window(Config.ONDEMAND_COALESCE_WINDOW))
@@ -0,0 +1,122 @@
+"""
+Worker of the li_jobs queue (LiveInventorySchedular/common_utils/job_queue.py).
+
+A worker leases one job at a time and runs its fetcher command through the fetcher, the
+extractor and the dispatcher in process, the way the Logic App chains the three functions.
+The lease is kept alive by heartbeats while the job runs. Workers share nothing but the
+queue table, so throughput grows with the number of worker processes: function invocations
+of LiveInventoryWorker started side by side, or standalone processes.
+
+usage:
+    python -m LiveInventoryWorker.worker --max-seconds 3600 --poll-seconds 10
+"""
+import argparse
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+from LiveInventorySchedular.config import Config
+from LiveInventorySchedular.common_utils.job_queue import Heartbeat, Job, JobQueue
+from LiveInventorySchedular.scheduler.vendor_scheduler import li_db
+
+logger = logging
+
+
+class UC_JobFailedError(Exception):
+    pass
+
+
+def run_job(command: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fetch, extract and dispatch the vendor data of one scheduler command
+
+    :return: summary of the three stages
+    :raises UC_JobFailedError: Raised when the fetcher did not produce a file.
+    """
+    from LiveInventoryFetcher import fetch_message
+    from LiveInventoryExtractor import extract_message
+    from LiveInventoryDispatcher import dispatch_message
+
+    fetched = fetch_message(command)
+    if not fetched:
+        raise UC_JobFailedError(f"Could not fetch data for vendor_id: {command.get('vendor_id')}")
+    extracted = extract_message(fetched)
+    dispatched = dispatch_message(extracted)
+    return {
+        'vendor_id': command.get('vendor_id'),
+        'dispatched': dispatched.get('total number of item dispatched'),
+        'stages': {'fetcher': fetched.get('stages'), 'extractor': extracted.get('stages'),
+                   'dispatcher': dispatched.get('stages')},
+    }
+
+
+class Worker:
+    """
+    Lease and run jobs until the queue is empty or the time is up
+
+    :param queue: queue to drain, a JobQueue on the scheduler's database by default
+    :type queue: JobQueue, optional
+
+    :param runner: runs the command of a job and returns its result, run_job by default
+    :type runner: callable, optional
+    """
+
+    def __init__(self, queue: Optional[JobQueue] = None,
+                 runner: Callable[[Dict[str, Any]], Any] = run_job) -> None:
+        self.queue = queue or JobQueue(li_db)
+        self.runner = runner
+        self.summary = {'done': 0, 'retried': 0, 'failed': 0, 'lost': 0}
+
+    def run_one(self, job: Job) -> None:
+        logger.info(f"PROCESSING - {job} leased by {self.queue.worker_id}")
+        with Heartbeat(self.queue, job) as heartbeat:
+            try:
+                result, error = self.runner(job.payload), None
+            except Exception as ex:
+                logger.error(f"FAILURE - {job}: {ex}", exc_info=True)
+                result, error = None, f"{type(ex).__name__}: {ex}"
+        if heartbeat.lost:
+            # another worker may run the job by now, it is left to that one
+            self.summary['lost'] += 1
+            return
+        if error is None:
+            settled = self.queue.complete(job, result)
+            self.summary['done' if settled else 'lost'] += 1
+            logger.info(f"SUCCESS - {job}")
+        else:
+            status = self.queue.fail(job, error)
+            self.summary[{'queued': 'retried', 'failed': 'failed'}.get(status, 'lost')] += 1
+
+    def run(self, max_seconds: float, poll_seconds: float = 0) -> Dict[str, int]:
+        """
+        :param max_seconds: no job is leased once this many seconds have passed
+        :param poll_seconds: wait this long for new jobs when the queue is empty, 0 returns right away
+        :return: jobs done, retried, failed and lost
+        """
+        deadline = time.monotonic() + max_seconds
+        while time.monotonic() < deadline:
+            jobs = self.queue.lease()
+            if not jobs:
+                if not poll_seconds:
+                    break
+                time.sleep(min(poll_seconds, max(0.0, deadline - time.monotonic())))
+                continue
+            for job in jobs:
+                self.run_one(job)
+        logger.info(f"worker {self.queue.worker_id}: {self.summary}")
+        return self.summary
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--max-seconds', type=float, default=Config.WORKER_MAX_SECONDS)
+    parser.add_argument('--poll-seconds', type=float, default=10, help="wait for new jobs, 0 exits on an empty queue")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    summary = Worker().run(args.max_seconds, args.poll_seconds)
+    print(json.dumps(summary))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark of the vendor_code_validation rule compiler.
+
+Validates a list of generated vendor codes with the per-code `eval` the fetchers used to
+run and with the compiled rules, checks both reject the same codes and reports the time
+each takes.
+
+usage:
+    python benchmarks/bench_code_validation.py --codes 100000
+"""
+import argparse
+import importlib.util
+import os
+import random
+import re
+import string
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_code_validation():
+    # loaded by path, importing the LiveInventoryFetcher package would set up the whole function app
+    path = os.path.join(ROOT, 'LiveInventoryFetcher', 'common_utils', 'code_validation.py')
+    spec = importlib.util.spec_from_file_location('code_validation', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# the form existing vendor configs use, `eval` can only run a single comparison
+RULE = {'type': 'numeric', 'condition': '<= 8'}
+
+
+def generate_codes(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    codes = []
+    for _ in range(count):
+        length = rng.randint(4, 16)
+        if rng.random() < 0.5:
+            codes.append(''.join(rng.choices(string.digits, k=length)))
+        else:
+            codes.append(''.join(rng.choices(string.ascii_uppercase + string.digits + '-', k=length)))
+    return codes
+
+
+def eval_rejected(codes: list, rule: dict) -> list:
+    rejected = []
+    for vendor_code in codes:
+        if rule.get('type') == 'numeric' and re.search(r'^\d+$', vendor_code):
+            if not eval(f"{len(vendor_code)} {rule.get('condition')}"):
+                rejected.append(vendor_code)
+    return rejected
+
+
+def timed(function, *args) -> tuple:
+    start = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--codes', type=int, default=100000)
+    args = parser.parse_args()
+
+    code_validation = load_code_validation()
+    codes = generate_codes(args.codes)
+
+    expected, eval_ms = timed(eval_rejected, codes, RULE)
+    rules, compile_ms = timed(code_validation.compile_rules, RULE)
+    rejected, compiled_ms = timed(code_validation.reject_codes, codes, rules)
+    assert rejected == expected, 'compiled rules reject different codes than eval'
+
+    print(f"{len(codes)} codes, {len(rejected)} rejected by {RULE}")
+    print(f"  eval per code:  {eval_ms:.1f} ms")
+    print(f"  compiled rules: {compiled_ms:.1f} ms (+ {compile_ms:.3f} ms to compile), "
+          f"{eval_ms / compiled_ms:.0f}x faster")
+
+
+if __name__ == '__main__':
+    main()
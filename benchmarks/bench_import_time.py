@@ -0,0 +1,141 @@
+"""
+Import-time benchmark of the four function entry points.
+
+Every entry point is imported in a fresh interpreter (what a cold start pays before
+`main` runs) with `-X importtime`, several times. The median wall time is checked
+against the budget of the entry point and the import cost is broken down per top
+level package, so a new eager import shows up by name.
+
+The run also fails when a module that is meant to load on first use only (pandas,
+the blob SDK, xmltodict) is imported by the entry point itself.
+
+The entry points read config.ini at import, run from the repository root or point
+LI_CONFIG_FILE at a config file.
+
+usage:
+    python benchmarks/bench_import_time.py --repeat 5 --top 15
+    python benchmarks/bench_import_time.py --entry-point LiveInventoryFetcher --budget-ms 800
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# median cold import in milliseconds per entry point, tighten them when an import gets cheaper
+BUDGETS_MS = {
+    'LiveInventoryFetcher': 600,
+    'LiveInventoryExtractor': 500,
+    'LiveInventoryDispatcher': 500,
+    'LiveInventorySchedular': 600,
+}
+
+# loaded on first use only, an entry point importing one of them eagerly fails the run
+LAZY_MODULES = ['pandas', 'azure.storage.blob', 'xmltodict']
+
+_PROBE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module({entry_point!r})
+elapsed_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({{'ms': elapsed_ms, 'eager': [name for name in {lazy!r} if name in sys.modules]}}))
+"""
+
+
+def parse_importtime(stderr: str) -> Dict[str, float]:
+    """
+    self time in milliseconds per top level package from the `-X importtime` output
+
+    :param stderr: stderr of the interpreter, lines `import time: self [us] | cumulative | name`
+    """
+    packages = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, _, name = line[len('import time:'):].split('|')
+            packages[name.strip().split('.')[0]] += int(self_us) / 1000
+        except ValueError:
+            continue
+    return packages
+
+
+def import_once(entry_point: str) -> Tuple[float, List[str], Dict[str, float]]:
+    """
+    import the entry point in a new interpreter
+
+    :return: wall time in ms, lazy modules that were imported anyway, self time per package
+    """
+    probe = _PROBE.format(entry_point=entry_point, lazy=LAZY_MODULES)
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', probe], cwd=ROOT_DIR,
+                               capture_output=True, text=True)
+    if completed.returncode != 0:
+        last_line = (completed.stderr.strip().splitlines() or [''])[-1]
+        raise RuntimeError(f"importing {entry_point} failed: {last_line}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    return result['ms'], result['eager'], parse_importtime(completed.stderr)
+
+
+def measure(entry_point: str, repeat: int) -> Dict[str, object]:
+    timings, eager, packages = [], set(), defaultdict(list)
+    for _ in range(repeat):
+        elapsed_ms, eager_modules, per_package = import_once(entry_point)
+        timings.append(elapsed_ms)
+        eager.update(eager_modules)
+        for name, self_ms in per_package.items():
+            packages[name].append(self_ms)
+    return {
+        'median_ms': statistics.median(timings),
+        'max_ms': max(timings),
+        'eager': sorted(eager),
+        'packages': {name: statistics.median(values) for name, values in packages.items()},
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entry-point', action='append', choices=sorted(BUDGETS_MS),
+                        help="entry point to measure, repeatable (default: all four)")
+    parser.add_argument('--repeat', type=int, default=5, help="fresh interpreters per entry point")
+    parser.add_argument('--top', type=int, default=10, help="packages listed per entry point")
+    parser.add_argument('--budget-ms', type=float, help="override the budget of every measured entry point")
+    parser.add_argument('--json', action='store_true', help="print the measurements as json")
+    args = parser.parse_args()
+
+    failures, report = [], {}
+    for entry_point in args.entry_point or list(BUDGETS_MS):
+        budget_ms = args.budget_ms or BUDGETS_MS[entry_point]
+        try:
+            result = measure(entry_point, args.repeat)
+        except RuntimeError as ex:
+            failures.append(str(ex))
+            continue
+        result['budget_ms'] = budget_ms
+        report[entry_point] = result
+        if result['median_ms'] > budget_ms:
+            failures.append(f"{entry_point}: median import {result['median_ms']:.1f} ms over the "
+                            f"{budget_ms:.0f} ms budget")
+        if result['eager']:
+            failures.append(f"{entry_point}: imports {', '.join(result['eager'])} at load time")
+
+        if not args.json:
+            print(f"{entry_point}: median {result['median_ms']:.1f} ms, max {result['max_ms']:.1f} ms "
+                  f"(budget {budget_ms:.0f} ms)")
+            top = sorted(result['packages'].items(), key=lambda item: item[1], reverse=True)[:args.top]
+            for name, self_ms in top:
+                print(f"    {name:<32} {self_ms:8.1f} ms")
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
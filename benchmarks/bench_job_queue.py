@@ -0,0 +1,129 @@
+"""
+Throughput and exactly-once check of the li_jobs queue against a local Postgres.
+
+`--jobs` jobs are enqueued through JobQueue and drained by 1, 2, 4, ... worker processes
+(`--workers`), each running LiveInventoryWorker's Worker with a simulated job that sleeps
+`--job-ms` instead of syncing a vendor. Per worker count it reports the drain time and the
+jobs per second, and fails when a job was run more than once or not done at the end.
+
+The database named by LI_BENCH_DSN gets a fresh li_jobs table (migrations/004_li_jobs.sql):
+its name must contain "bench" or "test".
+
+usage:
+    LI_BENCH_DSN="host=localhost dbname=li_bench user=postgres password=postgres" \\
+        python benchmarks/bench_job_queue.py --jobs 400 --job-ms 20 --workers 1 2 4 8
+"""
+import argparse
+import configparser
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import psycopg2  # noqa: E402
+from psycopg2.extensions import parse_dsn  # noqa: E402
+
+
+def bench_config(dsn: Dict[str, str], workdir: str) -> str:
+    """
+    config.ini of the repository pointed at the throwaway database
+    """
+    config = configparser.RawConfigParser()
+    config.optionxform = str
+    config.read(os.path.join(ROOT_DIR, 'config.ini'))
+    config['dbconfig'] = {key: dsn[key] for key in ('host', 'port', 'user', 'password', 'dbname') if key in dsn}
+    config['dbconfig']['application_name'] = 'li_job_queue_bench'
+    path = os.path.join(workdir, 'config.ini')
+    with open(path, 'w') as outfile:
+        config.write(outfile)
+    return path
+
+
+def prepare_database(dsn: Dict[str, str]) -> None:
+    connection = psycopg2.connect(**dsn)
+    try:
+        with connection.cursor() as cursor, open(os.path.join(ROOT_DIR, 'migrations', '004_li_jobs.sql')) as infile:
+            cursor.execute("DROP TABLE IF EXISTS li_jobs")
+            cursor.execute(infile.read())
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def simulated_job(job_ms: float):
+    def run(command: Dict[str, Any]) -> Dict[str, Any]:
+        time.sleep(job_ms / 1000)
+        return {'vendor_id': command['vendor_id'], 'pid': os.getpid()}
+    return run
+
+
+def worker_process(job_ms: float, results) -> None:
+    from LiveInventoryWorker.worker import Worker
+    results.put(Worker(runner=simulated_job(job_ms)).run(max_seconds=3600))
+
+
+def drain(jobs: int, workers: int, job_ms: float) -> Dict[str, Any]:
+    from LiveInventorySchedular.common_utils.job_queue import JobQueue
+    from LiveInventorySchedular.scheduler.vendor_scheduler import li_db
+
+    queue = JobQueue(li_db)
+    queue.enqueue({'vendor_id': vendor_id} for vendor_id in range(jobs))
+    # spawned, so that no worker inherits the connection the jobs were enqueued with
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    start = time.perf_counter()
+    processes = [context.Process(target=worker_process, args=(job_ms, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    summaries = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+
+    with li_db.transaction(auto_commit=True) as query_set:
+        rows = query_set.execute_query("select status, attempts from li_jobs").to_list()
+        query_set.execute_non_query("delete from li_jobs")
+    done = sum(summary['done'] for summary in summaries)
+    return {'workers': workers, 'seconds': elapsed, 'jobs_per_second': jobs / elapsed, 'done': done,
+            'statuses': dict(Counter(row['status'] for row in rows)),
+            'rerun': sum(1 for row in rows if row['attempts'] != 1)}
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', type=int, default=400)
+    parser.add_argument('--job-ms', type=float, default=20, help="duration of a simulated job")
+    parser.add_argument('--workers', nargs='+', type=int, default=[1, 2, 4, 8])
+    args = parser.parse_args(argv)
+
+    if not os.environ.get('LI_BENCH_DSN'):
+        parser.error("LI_BENCH_DSN is not set, it must name a throwaway Postgres database")
+    dsn = parse_dsn(os.environ['LI_BENCH_DSN'])
+    if not any(marker in dsn.get('dbname', '') for marker in ('bench', 'test')):
+        parser.error(f"refusing to use database {dsn.get('dbname')!r}, its name must contain 'bench' or 'test'")
+    # must be set before the first import of a package, they read their config at import
+    os.environ['LI_CONFIG_FILE'] = bench_config(dsn, tempfile.mkdtemp(prefix='li-job-queue-bench-'))
+    prepare_database(dsn)
+
+    failures = []
+    for workers in args.workers:
+        result = drain(args.jobs, workers, args.job_ms)
+        print(f"{workers:>3} worker(s): {result['seconds']:.2f} s, {result['jobs_per_second']:.1f} jobs/s, "
+              f"statuses {result['statuses']}")
+        if result['done'] != args.jobs or result['statuses'] != {'done': args.jobs}:
+            failures.append(f"{workers} worker(s): {result['done']} of {args.jobs} jobs done, {result['statuses']}")
+        if result['rerun']:
+            failures.append(f"{workers} worker(s): {result['rerun']} job(s) leased more than once")
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Benchmark of the JSON codec shared by the stages.
+
+Decodes and encodes payloads shaped like the ones moving between the stages with the
+previous text based calls (`json.loads(response.text)`, `json.dumps(default=str)`) and
+with every backend of `common_utils/json_codec.py` that is installed.
+
+Payloads:
+    rest_items     - flat vendor REST response, list of items
+    nested_xml     - deeply nested document as produced by xmltodict
+    extractor_rows - extractor records carrying datetimes
+
+usage:
+    python benchmarks/bench_json_codec.py --items 20000 --repeat 5
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from LiveInventoryFetcher.common_utils import json_codec  # noqa: E402
+
+
+def rest_items(count: int, rng: random.Random) -> list:
+    return [{
+        'product_code': f'CODE-{index}',
+        'description': f'Item {index} – révision {rng.randint(1, 9)}',
+        'quantity': rng.randint(0, 500),
+        'price': {'amount': round(rng.uniform(1, 2000), 2), 'currency': 'USD'},
+        'warehouses': [{'id': w, 'stock': rng.randint(0, 50)} for w in range(3)],
+    } for index in range(count)]
+
+
+def nested_xml(count: int, rng: random.Random) -> dict:
+    return {'soap:Envelope': {'soap:Body': {'PriceAvailabilityResponse': {'Items': {'Item': [{
+        '@id': str(index),
+        'ItemNumber': f'{rng.randint(100000, 999999)}',
+        'Availability': {'Branch': [{'@name': f'B{b}', 'Qty': str(rng.randint(0, 30))} for b in range(2)]},
+        'Price': {'#text': f'{rng.uniform(1, 500):.2f}', '@currency': 'USD'},
+    } for index in range(count)]}}}}}
+
+
+def extractor_rows(count: int, rng: random.Random) -> list:
+    now = datetime(2023, 1, 1)
+    return [{
+        'vendor_code': f'CODE-{index}', 'internal_id': rng.randint(1, 10 ** 6), 'cost': rng.uniform(1, 900),
+        'currency': 'USD', 'availability_count': rng.randint(0, 100), 'availability_status': True,
+        'next_availability_date': now + timedelta(days=rng.randint(0, 60)), 'modified_on': now,
+    } for index in range(count)]
+
+
+def best_ms(function, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    payloads = {'rest_items': rest_items(args.items, rng), 'nested_xml': nested_xml(args.items, rng),
+                'extractor_rows': extractor_rows(args.items, rng)}
+
+    print(f"backends installed: {sorted(json_codec.BACKENDS)}, selected: {json_codec.backend}")
+    for name, payload in payloads.items():
+        # what a vendor sends / the previous stage wrote
+        content = json.dumps(payload, default=str).encode('utf-8')
+        print(f"{name}: {len(content) / 1024:.0f} KiB")
+
+        decode = best_ms(lambda: json.loads(content.decode('utf-8')), args.repeat)
+        encode = best_ms(lambda: json.dumps(payload, default=str).encode('utf-8'), args.repeat)
+        print(f"  text (before)  decode {decode:8.1f} ms  encode {encode:8.1f} ms")
+
+        for backend, (dumps, loads) in sorted(json_codec.BACKENDS.items()):
+            assert loads(dumps(payload)) == loads(json_codec.BACKENDS['stdlib'][0](payload))
+            decode = best_ms(lambda: loads(content), args.repeat)
+            encode = best_ms(lambda: dumps(payload), args.repeat)
+            print(f"  {backend:<14} decode {decode:8.1f} ms  encode {encode:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark of the dispatcher's log records with payloads, before and after common_utils/log_utils.py.
+
+One dispatch of a vendor logs what LIOrmBase.load / upsert and upsert_bulk_data log for
+its rows. `eager` repeats the previous statements (f-strings formatting the whole
+`src_data` whether the record is emitted or not), `facade` the current ones (HotPathLogger,
+%-style arguments, summarize / capped). Records go through a formatting handler writing to
+os.devnull, so an emitted record costs what it costs in production minus the I/O.
+
+usage:
+    python benchmarks/bench_logging.py --rows 20000 --repeat 5 --level INFO
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from LiveInventoryDispatcher.common_utils.log_utils import HotPathLogger, capped, summarize  # noqa: E402
+
+TABLE = 'inventory'
+CHUNK_SIZE = 200
+COLUMNS = ['vendor_code', 'vendor_id', 'internal_id', 'cost', 'currency', 'availability_count',
+           'availability_status', 'next_availability_date', 'modified_on']
+
+
+def inventory_rows(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    now = datetime(2023, 1, 1)
+    return [{
+        'vendor_code': f'CODE-{index}', 'vendor_id': 9001, 'internal_id': rng.randint(1, 10 ** 6),
+        'cost': round(rng.uniform(1, 900), 2), 'currency': 'USD', 'availability_count': rng.randint(0, 100),
+        'availability_status': True, 'next_availability_date': now + timedelta(days=rng.randint(0, 60)),
+        'modified_on': now,
+    } for index in range(count)]
+
+
+def upsert_sql(width: int) -> str:
+    placeholders = ', '.join(['(' + ', '.join(['%s'] * len(COLUMNS)) + ')'] * width)
+    return (f"INSERT INTO {TABLE} ({', '.join(COLUMNS)}) VALUES {placeholders} "
+            f"ON CONFLICT (vendor_code, vendor_id, internal_id) DO UPDATE SET cost = EXCLUDED.cost")
+
+
+class Statement:
+    """
+    stands in for LazyQuery: the mogrified statement of one chunk, rendered on str()
+    """
+
+    def __init__(self, sql: str, rows: list) -> None:
+        self.sql = sql
+        self.rows = rows
+
+    def __str__(self) -> str:
+        return self.sql + ' -- ' + repr([[row[column] for column in COLUMNS] for row in self.rows])
+
+
+def dispatch_eager(rows: list, statements: dict) -> None:
+    logger = logging
+    # LIOrmBase.load
+    logger.info(f'Loading data to {TABLE} schema.')
+    logger.debug(f'Data for loading: {rows}')
+    # LIOrmBase.upsert
+    logger.info('Executing upsert_data.')
+    logger.debug(f'Saving data: {rows}')
+    # upsert_bulk_data
+    for start in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[start:start + CHUNK_SIZE]
+        if len(chunk) not in statements:
+            statements[len(chunk)] = upsert_sql(len(chunk))
+            logger.info(f'Generated SQL statement {statements[len(chunk)]}')
+        logger.debug('Executed Query %s', Statement(statements[len(chunk)], chunk))
+
+
+def dispatch_facade(rows: list, statements: dict, logger: HotPathLogger) -> None:
+    # LIOrmBase.load
+    logger.info('Loading data to %s schema.', TABLE)
+    logger.debug('Data for loading: %s', summarize(rows))
+    # LIOrmBase.upsert
+    logger.info('Executing upsert_data.')
+    logger.debug('Saving data: %s', summarize(rows))
+    # upsert_bulk_data
+    for start in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[start:start + CHUNK_SIZE]
+        if len(chunk) not in statements:
+            statements[len(chunk)] = upsert_sql(len(chunk))
+            logger.info('Generated SQL statement %s', capped(statements[len(chunk)]))
+        logger.debug('Executed Query %s', capped(Statement(statements[len(chunk)], chunk)))
+
+
+def best_ms(function, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000, help="rows dispatched for one vendor")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING'])
+    parser.add_argument('--sample-every', type=int, default=1, help="sampling of the facade logger")
+    args = parser.parse_args()
+
+    devnull = open(os.devnull, 'w')
+    handler = logging.StreamHandler(devnull)
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s %(message)s'))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(args.level)
+
+    rows = inventory_rows(args.rows)
+    facade = HotPathLogger('bench.dispatcher', args.sample_every)
+    eager_ms = best_ms(lambda: dispatch_eager(rows, {}), args.repeat)
+    facade_ms = best_ms(lambda: dispatch_facade(rows, {}, facade), args.repeat)
+    print(f"{args.rows} rows at {args.level}: eager {eager_ms:.1f} ms, facade {facade_ms:.1f} ms, "
+          f"speedup {eager_ms / max(facade_ms, 1e-6):.1f}x")
+    devnull.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark of the DAL prepared statement cache.
+
+Runs the same parameterized statements through PgSQLDAL with and without prepared
+statements on a kept alive connection, and reports wall time per statement together
+with the planning time Postgres reports for the plain and the prepared statement.
+
+usage:
+    LI_BENCH_DSN="host=localhost port=5432 dbname=li user=postgres password=postgres" \
+        python benchmarks/bench_prepared_statements.py --iterations 2000
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from LiveInventoryFetcher.utils.data_access_layer.sql_db.postgres.pgsqldal import PgSQLDAL  # noqa: E402
+from LiveInventoryFetcher.utils.data_access_layer.sql_db.postgres.psqlprepared import to_positional  # noqa: E402
+
+# statements shaped like the hot path ones, run against a temp table so the benchmark never touches real data
+SETUP = """
+CREATE TEMP TABLE IF NOT EXISTS bench_vendor_codes (
+    vendor_id int, vendor_code text, internal_id text, last_fetch_date timestamp,
+    PRIMARY KEY (vendor_id, vendor_code)
+);
+INSERT INTO bench_vendor_codes
+SELECT v % 20, 'CODE-' || v, 'ID-' || v, now() FROM generate_series(1, 20000) v
+ON CONFLICT DO NOTHING;
+ANALYZE bench_vendor_codes;
+"""
+
+STATEMENTS = {
+    'vendor_code_mapping': (
+        "select vc.vendor_code, vc.internal_id from bench_vendor_codes vc "
+        "where vc.vendor_id = %s and vc.last_fetch_date < now() order by vc.vendor_code limit 50",
+        lambda i: (i % 20,)
+    ),
+    'update_last_fetch': (
+        "update bench_vendor_codes set last_fetch_date = now() "
+        "where vendor_id = %(vendor_id)s and vendor_code = %(vendor_code)s",
+        lambda i: {'vendor_id': i % 20, 'vendor_code': f'CODE-{i}'}
+    ),
+}
+
+PLANNING_TIME = re.compile(r'Planning Time: ([\d.]+) ms')
+
+
+def dsn_params() -> dict:
+    dsn = os.environ.get('LI_BENCH_DSN')
+    if not dsn:
+        sys.exit("LI_BENCH_DSN is not set, e.g. 'host=localhost dbname=li user=postgres password=postgres'")
+    return {'dsn': dsn}
+
+
+def run(dal: PgSQLDAL, sql: str, params, iterations: int) -> list:
+    timings = []
+    with dal.transaction(auto_commit=False) as qryset:
+        qryset.execute_non_query(SETUP)
+        for i in range(iterations):
+            start = time.perf_counter()
+            qryset.execute_query(sql, params(i))
+            timings.append((time.perf_counter() - start) * 1000)
+        dal.rollback()
+    return timings
+
+
+def planning_time(sql: str, params) -> tuple:
+    """Planning time of the plain statement and of its prepared form after warm up."""
+    connection = psycopg2.connect(**dsn_params())
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(SETUP)
+            cursor.execute('EXPLAIN (ANALYZE, SUMMARY) ' + sql, params(1))
+            plain = float(PLANNING_TIME.search('\n'.join(row[0] for row in cursor.fetchall())).group(1))
+
+            statement, values = to_positional(sql, params(1))
+            cursor.execute('PREPARE bench AS ' + statement)
+            # Postgres switches to the generic plan after five executions
+            for _ in range(6):
+                cursor.execute('EXECUTE bench (' + ', '.join(['%s'] * len(values)) + ')', values)
+            cursor.execute('EXPLAIN (ANALYZE, SUMMARY) EXECUTE bench (' + ', '.join(['%s'] * len(values)) + ')',
+                           values)
+            prepared = float(PLANNING_TIME.search('\n'.join(row[0] for row in cursor.fetchall())).group(1))
+        connection.rollback()
+    finally:
+        connection.close()
+    return plain, prepared
+
+
+def summary(timings: list) -> str:
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    return f"mean {statistics.mean(timings):.3f} ms  p50 {statistics.median(timings):.3f} ms  p95 {p95:.3f} ms"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    for name, (sql, params) in STATEMENTS.items():
+        plain_dal = PgSQLDAL(dsn_params(), keep_alive=True)
+        prepared_dal = PgSQLDAL(dsn_params(), keep_alive=True, prepare_statements=True)
+        plain = run(plain_dal, sql, params, args.iterations)
+        prepared = run(prepared_dal, sql, params, args.iterations)
+        plain_planning, prepared_planning = planning_time(sql, params)
+
+        print(name)
+        print(f"  unprepared: {summary(plain)}  planning {plain_planning:.3f} ms")
+        print(f"  prepared:   {summary(prepared)}  planning {prepared_planning:.3f} ms")
+        print(f"  cache: {prepared_dal.prepared.stats()}")
+        plain_dal.disconnect()
+        prepared_dal.disconnect()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Local HTTP server answering like the vendors of `feeds.py`.
+
+    GET  /configs/<vendor_id>.json   vendor config template (read by Base.read_config)
+    POST /json/items                 chunked JSON body of item codes -> {"items": [...]}
+    GET  /json/paged?page=N          one page of items, X-Total-Pages header
+    POST /xml/techdata               Techdata multi-body request -> PnAResponse
+    GET  /xml/jenne?productList=a,b  Jenne item-in-url request -> ProductListResponse
+    GET  /files/feed.csv|feed.txt    the whole file
+
+The server binds to 127.0.0.1 on a free port and runs in a background thread.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from typing import Dict
+from urllib.parse import parse_qs, urlparse
+import json
+import re
+import xml.etree.ElementTree as ET
+
+from feeds import Feed, VENDOR_IDS, vendor_config
+
+_ITEM_IDENTIFIER = re.compile(r'<(?:Distributor|Manufacturer)ItemIdentifier>([^<]+)<')
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def feed(self) -> Feed:
+        return self.server.feed
+
+    def log_message(self, format, *args) -> None:
+        # request logging would be measured along with the stages
+        pass
+
+    def _send(self, body: bytes, content_type: str, status: int = 200, headers: Dict[str, str] = None) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path.startswith('/configs/'):
+            vendor_id = int(url.path.rsplit('/', 1)[-1].split('.')[0])
+            scenario = {v: k for k, v in VENDOR_IDS.items()}.get(vendor_id)
+            if scenario is None:
+                return self._send(b'{}', 'application/json', status=404)
+            config = vendor_config(scenario, self.server.base_url)
+            return self._send(json.dumps(config).encode('utf-8'), 'application/json')
+        if url.path == '/json/paged':
+            page = int(query.get('page', ['1'])[0])
+            body = json.dumps({'data': self.feed.json_page(page)}).encode('utf-8')
+            return self._send(body, 'application/json', headers={'X-Total-Pages': str(self.feed.total_pages)})
+        if url.path == '/xml/jenne':
+            codes = query.get('productList', [''])[0].split(',')
+            return self._send(self.feed.jenne_xml(codes), 'application/xml')
+        if url.path == '/files/feed.csv':
+            return self._send(self.feed.delimited(','), 'text/csv')
+        if url.path == '/files/feed.txt':
+            return self._send(self.feed.delimited('\t'), 'text/plain')
+        self._send(b'not found', 'text/plain', status=404)
+
+    def do_POST(self) -> None:
+        url = urlparse(self.path)
+        body = self._body()
+        if url.path == '/json/items':
+            codes = [item.get('product_code') for item in json.loads(body).get('items', [])]
+            return self._send(json.dumps(self.feed.json_items(codes)).encode('utf-8'), 'application/json')
+        if url.path == '/xml/techdata':
+            ET.fromstring(body)  # the request must be well formed, like at the vendor
+            codes = _ITEM_IDENTIFIER.findall(body.decode('utf-8'))
+            return self._send(self.feed.techdata_xml(codes), 'application/xml')
+        self._send(b'not found', 'text/plain', status=404)
+
+
+class FeedServer:
+    """
+    Serves one feed at a time, `feed` is swapped between the runs of the benchmark
+    """
+
+    def __init__(self) -> None:
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), FeedHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.feed = None
+        self.httpd.base_url = self.base_url
+        self.thread = Thread(target=self.httpd.serve_forever, name='feed-server', daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def serve(self, feed: Feed) -> None:
+        self.httpd.feed = feed
+
+    def config_url(self, vendor_id: int) -> str:
+        return f'{self.base_url}/configs/{vendor_id}.json'
+
+    def __enter__(self) -> 'FeedServer':
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,249 @@
+"""
+Synthetic vendor feeds and the vendor configs that read them.
+
+Every scenario is one vendor shape the fetchers support, with generated items and the
+config template the mock server hands to `Base.read_config`:
+
+    json_nested  - REST JSON, item codes posted in chunked bodies, nested warehouse arrays
+    json_paged   - REST JSON, GET with header pagination (`pagination_control`)
+    xml_techdata - REST XML, one request body per chunk of codes (Techdata multi-body)
+    xml_jenne    - REST XML, item codes in the `productList` url parameter (Jenne)
+    csv          - CSV file behind digest auth (CSVFetcher)
+    text         - tab separated text file, read by `transformer` (FTP vendors)
+
+Feeds are deterministic for a given scenario, size and seed.
+"""
+import csv
+import io
+import random
+from typing import Any, Dict, List
+from xml.sax.saxutils import escape
+
+SCENARIOS = ('json_nested', 'json_paged', 'xml_techdata', 'xml_jenne', 'csv', 'text')
+
+# vendor_id of each scenario in the throwaway database
+VENDOR_IDS = {scenario: 9001 + index for index, scenario in enumerate(SCENARIOS)}
+
+CONNECTION_TYPES = {'json_nested': 'json', 'json_paged': 'json', 'xml_techdata': 'xml', 'xml_jenne': 'xml',
+                    'csv': 'csv', 'text': 'ftp/txt'}
+
+PAGE_SIZE = 500
+XML_PAYLOAD_LIMIT = 100
+WAREHOUSES = 4
+
+
+def vendor_codes(scenario: str, size: int) -> List[str]:
+    """
+    codes of the vendor, numeric for Techdata so that the distributor identifier is used
+    """
+    if scenario == 'xml_techdata':
+        return [str(10000000 + index) for index in range(size)]
+    prefix = scenario.split('_')[-1].upper()[:4]
+    return [f'{prefix}-{index:07d}' for index in range(size)]
+
+
+class Feed:
+    """
+    items of one scenario and size, rendered in the format of the vendor
+
+    :param scenario: one of `SCENARIOS`
+    :type scenario: str
+
+    :param size: number of items
+    :type size: int
+    """
+
+    def __init__(self, scenario: str, size: int, seed: int = 7) -> None:
+        if scenario not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {scenario!r}, expected one of {SCENARIOS}")
+        self.scenario = scenario
+        self.size = size
+        self.codes = vendor_codes(scenario, size)
+        rng = random.Random(f'{scenario}-{size}-{seed}')
+        # one in fifty codes is unknown to the vendor
+        self.items = {code: self._item(code, rng) for code in self.codes if rng.random() >= 0.02}
+
+    @staticmethod
+    def _item(code: str, rng: random.Random) -> Dict[str, Any]:
+        return {
+            'code': code,
+            'price': round(rng.uniform(1, 5000), 2),
+            'stock': [rng.randint(0, 40) for _ in range(WAREHOUSES)],
+            'eta': f'2023-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+        }
+
+    # -- JSON ---------------------------------------------------------------------------
+    def json_item(self, code: str) -> Dict[str, Any]:
+        item = self.items.get(code)
+        if item is None:
+            return {'product_code': code, 'status': 'NOT_FOUND'}
+        return {
+            'product_code': code,
+            'status': 'OK',
+            'description': f'Synthetic item {code}',
+            'price': item['price'],
+            'currency': 'USD',
+            'warehouses': [{'id': f'WH{index}', 'stock': stock, 'eta': item['eta']}
+                           for index, stock in enumerate(item['stock'])],
+        }
+
+    def json_items(self, codes: List[str]) -> Dict[str, Any]:
+        return {'items': [self.json_item(code) for code in codes]}
+
+    def json_page(self, page: int) -> List[Dict[str, Any]]:
+        start = (page - 1) * PAGE_SIZE
+        return [self.json_item(code) for code in self.codes[start:start + PAGE_SIZE]]
+
+    @property
+    def total_pages(self) -> int:
+        return max(1, -(-self.size // PAGE_SIZE))
+
+    # -- XML ----------------------------------------------------------------------------
+    def techdata_xml(self, codes: List[str]) -> bytes:
+        lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<PnAResponse>']
+        for code in codes:
+            item = self.items.get(code)
+            if item is None:
+                lines.append(f'<Item><DistributorItemIdentifier>{code}</DistributorItemIdentifier>'
+                             f'<ErrorMessage>Item not found</ErrorMessage></Item>')
+                continue
+            branches = ''.join(f'<Branch><Id>{index}</Id><Qty>{stock}</Qty></Branch>'
+                               for index, stock in enumerate(item['stock']))
+            lines.append(f'<Item><DistributorItemIdentifier>{code}</DistributorItemIdentifier>'
+                         f'<ManufacturerItemIdentifier>MFR{code}</ManufacturerItemIdentifier>'
+                         f'<UnitPrice>{item["price"]:.2f}</UnitPrice><Currency>USD</Currency>'
+                         f'<TotalAvailable>{sum(item["stock"])}</TotalAvailable>'
+                         f'<Availability>{branches}</Availability><ErrorMessage>OK</ErrorMessage></Item>')
+        lines.append('</PnAResponse>')
+        return '\n'.join(lines).encode('utf-8')
+
+    def jenne_xml(self, codes: List[str]) -> bytes:
+        lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<ProductListResponse><Products>']
+        for code in codes:
+            item = self.items.get(code)
+            if item is None:
+                continue
+            lines.append(f'<Product><PartNumber>{escape(code)}</PartNumber><Price>{item["price"]:.2f}</Price>'
+                         f'<QuantityAvailable>{sum(item["stock"])}</QuantityAvailable>'
+                         f'<Description>Synthetic &amp; generated</Description></Product>')
+        lines.append('</Products></ProductListResponse>')
+        return '\n'.join(lines).encode('utf-8')
+
+    # -- files --------------------------------------------------------------------------
+    def delimited(self, delimiter: str) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=delimiter, lineterminator='\n')
+        writer.writerow(['PartNumber', 'Description', 'Price', 'Qty', 'Currency'])
+        for code, item in self.items.items():
+            writer.writerow([code, f'Synthetic item {code}', f'{item["price"]:,.2f}', sum(item['stock']), 'USD'])
+        return buffer.getvalue().encode('utf-8')
+
+
+def _header(api_key: str = '<<TPL_API_KEY>>') -> List[Dict[str, str]]:
+    return [{'key': 'Content-Type', 'value': 'application/json'}, {'key': 'X-Api-Key', 'value': api_key}]
+
+
+def _inventory_table(fields: Dict[str, str]) -> List[Dict[str, Any]]:
+    # source_field is the inventory column, destination_field the path in the vendor item
+    return [{'source_field': column, 'destination_field': path} for column, path in fields.items()]
+
+
+def vendor_config(scenario: str, base_url: str) -> Dict[str, Any]:
+    """
+    config template of the scenario's vendor, pointing at the mock server
+    """
+    if scenario == 'json_nested':
+        return {
+            'api_request_template': {
+                'url': {'raw': f'{base_url}/json/items', 'method': 'POST', 'query': []},
+                'header': _header(),
+            },
+            'data': {'items': [{'product_code': '<<TPL_ITEM_CODE>>'}]},
+            'items_list': 'data.items',
+            'items_response': 'items',
+            'mapping': {
+                'vendor_code_table': [{'source_field': 'vendor_code', 'destination_field': 'product_code'},
+                                      {'source_field': 'error_description', 'destination_field': 'status'}],
+                'message_when_no_error': ['OK'],
+                'inventory_table': _inventory_table({'vendor_code': 'product_code', 'cost': 'price',
+                                                     'currency': 'currency',
+                                                     'availability_count': 'warehouses.stock[i]'}),
+            },
+        }
+    if scenario == 'json_paged':
+        return {
+            'api_request_template': {
+                'url': {'raw': f'{base_url}/json/paged', 'method': 'GET', 'query': []},
+                'header': _header(),
+            },
+            'pagination_control': {
+                'style': 'page',
+                'page_size': PAGE_SIZE,
+                'max_concurrency': 4,
+                'request': {'param_location': 'url', 'page_number': 'page', 'page_size': 'per_page'},
+                'response': {'param_location': 'header', 'total_pages': 'X-Total-Pages', 'items': 'data'},
+            },
+            'mapping': {
+                'inventory_table': _inventory_table({'vendor_code': 'product_code', 'cost': 'price',
+                                                     'currency': 'currency',
+                                                     'availability_count': 'warehouses.stock[i]'}),
+            },
+        }
+    if scenario == 'xml_techdata':
+        return {
+            'api_request_template': {
+                'url': {'raw': f'{base_url}/xml/techdata', 'method': 'POST', 'query': []},
+                'header': [{'key': 'Content-Type', 'value': 'application/xml'}],
+            },
+            'xml_payload_format': 'xml_payload',
+            'xml_payload': '<PnARequest><Version>2.0</Version><Item><DistributorItemIdentifier><<TPL_ITEM_CODE>>'
+                           '</DistributorItemIdentifier></Item></PnARequest>',
+            'xml_req_body': '<Item><DistributorItemIdentifier><<TPL_ITEM_CODE>></DistributorItemIdentifier></Item>',
+            'xml_multi_req_body': True,
+            'xml_req_body_distributor': '<Item><DistributorItemIdentifier><<TPL_ITEM_CODE>>'
+                                        '</DistributorItemIdentifier></Item>',
+            'xml_req_body_manufacture': '<Item><ManufacturerItemIdentifier><<TPL_ITEM_CODE>>'
+                                        '</ManufacturerItemIdentifier></Item>',
+            'xml_payload_limit': XML_PAYLOAD_LIMIT,
+            'data_list_path': 'PnAResponse.Item',
+            'vendor_code_validation': {'type': 'numeric', 'condition': '<= 12'},
+            'mapping': {
+                'vendor_code_table': [{'source_field': 'vendor_code', 'destination_field': 'DistributorItemIdentifier'},
+                                      {'source_field': 'error_description', 'destination_field': 'ErrorMessage'}],
+                'message_when_no_error': ['OK'],
+                'inventory_table': _inventory_table({'vendor_code': 'multi_vendor_code', 'cost': 'UnitPrice',
+                                                     'currency': 'Currency',
+                                                     'availability_count': 'TotalAvailable'}),
+            },
+        }
+    if scenario == 'xml_jenne':
+        return {
+            'api_request_template': {
+                'url': {'raw': f'{base_url}/xml/jenne', 'method': 'GET',
+                        'query': [{'key': 'email', 'value': '<<TPL_API_KEY>>'},
+                                  {'key': 'productList', 'value': '<<TPL_ITEM_CODE>>'}]},
+                'header': [{'key': 'Accept', 'value': 'application/xml'}],
+            },
+            'xml_payload_limit': XML_PAYLOAD_LIMIT,
+            'data_list_path': 'ProductListResponse.Products.Product',
+            'mapping': {
+                'inventory_table': _inventory_table({'vendor_code': 'PartNumber', 'cost': 'Price',
+                                                     'availability_count': 'QuantityAvailable'}),
+            },
+        }
+    if scenario in ('csv', 'text'):
+        extension = 'csv' if scenario == 'csv' else 'txt'
+        return {
+            'api_request_template': {
+                'url': {'raw': f'{base_url}/files/feed.{extension}', 'method': 'GET', 'auth_required': True,
+                        'query': []},
+                'header': [{'key': 'username', 'value': 'bench'}, {'key': 'password', 'value': '<<TPL_API_KEY>>'}],
+            },
+            'delimiter': ',' if scenario == 'csv' else '\t',
+            'encoding': 'utf-8',
+            'mapping': {
+                'inventory_table': _inventory_table({'vendor_code': 'PartNumber', 'cost': 'Price',
+                                                     'currency': 'Currency', 'availability_count': 'Qty'}),
+            },
+        }
+    raise ValueError(f"Unknown scenario {scenario!r}")
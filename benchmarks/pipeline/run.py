@@ -0,0 +1,317 @@
+"""
+End-to-end benchmark of the pipeline stages on synthetic vendor feeds.
+
+Every scenario of `feeds.py` is served by a local mock vendor (`feed_server.py`) and run
+through the stages that handle it, against a throwaway Postgres database:
+
+    json_nested, json_paged  RESTJSONFetcher -> JSONExtractor.transform_data -> DataDispatcher.dispatch
+    xml_techdata, xml_jenne  RESTXMLFetcher  -> JSONExtractor.transform_data -> DataDispatcher.dispatch
+    csv                      CSVFetcher, transformer -> JSONExtractor.transform_data -> DataDispatcher.dispatch
+    text                     transformer     -> JSONExtractor.transform_data -> DataDispatcher.dispatch
+
+Per stage it reports the latency percentiles over the timed repeats, the throughput at the
+median and the peak of python allocations (tracemalloc, measured in a separate pass so it
+does not slow the timed ones). With a stored baseline the run fails when a stage got slower
+or bigger than the tolerance allows; the first run with `--update-baseline` stores it.
+Baselines are only comparable on the same machine and database.
+
+The database named by LI_BENCH_DSN is wiped: its name must contain "bench" or "test".
+
+usage:
+    LI_BENCH_DSN="host=localhost dbname=li_bench user=postgres password=postgres" \\
+        python benchmarks/pipeline/run.py --sizes 1000 10000 --repeat 5 [--update-baseline]
+"""
+from typing import Any, Callable, Dict, List, Optional
+import argparse
+import configparser
+import glob
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+PIPELINE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(os.path.dirname(PIPELINE_DIR))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, PIPELINE_DIR)
+
+import psycopg2  # noqa: E402
+from psycopg2.extensions import parse_dsn  # noqa: E402
+from psycopg2.extras import execute_values  # noqa: E402
+
+from feeds import CONNECTION_TYPES, SCENARIOS, VENDOR_IDS, Feed  # noqa: E402
+from feed_server import FeedServer  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(PIPELINE_DIR, 'baseline.json')
+TEMPLATE_VALUES = {'TPL_API_KEY': 'bench'}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    nearest-rank percentile
+    """
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def measure(setup: Callable[[], Any], stage: Callable[[Any], Any], items: int, repeat: int,
+            warmup: int) -> Dict[str, float]:
+    """
+    time `stage(setup())` `repeat` times after `warmup` untimed runs, then once more under tracemalloc
+    """
+    timings = []
+    for index in range(warmup + repeat):
+        subject = setup()
+        start = time.perf_counter()
+        stage(subject)
+        elapsed = (time.perf_counter() - start) * 1000
+        if index >= warmup:
+            timings.append(elapsed)
+
+    subject = setup()
+    tracemalloc.start()
+    try:
+        stage(subject)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    p50 = percentile(timings, 50)
+    return {
+        'items': items,
+        'p50_ms': round(p50, 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'p99_ms': round(percentile(timings, 99), 2),
+        'items_per_s': round(items / (p50 / 1000), 1) if p50 else None,
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+class Pipeline:
+    """
+    Runs the stages of one scenario, the imports happen once the local config is in place
+    """
+
+    def __init__(self, workdir: str, server: FeedServer, repeat: int, warmup: int, dispatch_limit: int) -> None:
+        from LiveInventoryFetcher.fetcher import RESTJSONFetcher
+        from LiveInventoryFetcher.fetcher.csv_fetcher import CSVFetcher
+        from LiveInventoryFetcher.fetcher.rest_xml_fetcher import RESTXMLFetcher
+        from LiveInventoryFetcher.transformer import transformer
+        from LiveInventoryExtractor.extractor.json_extractor import JSONExtractor
+        from LiveInventoryDispatcher.db_dispatcher.json_loader import DataDispatcher
+
+        self.fetchers = {'json': RESTJSONFetcher, 'xml': RESTXMLFetcher, 'csv': CSVFetcher}
+        self.transformer = transformer
+        self.extractor_class = JSONExtractor
+        self.dispatcher_class = DataDispatcher
+        self.workdir = workdir
+        self.server = server
+        self.repeat = repeat
+        self.warmup = warmup
+        self.dispatch_limit = dispatch_limit
+
+    def path(self, *parts: str) -> str:
+        return os.path.join(self.workdir, *parts)
+
+    def run(self, scenario: str, feed: Feed) -> Dict[str, Dict[str, float]]:
+        vendor_id = VENDOR_IDS[scenario]
+        config_url = self.server.config_url(vendor_id)
+        size = len(feed.codes)
+        results = {}
+
+        if scenario == 'text':
+            # FTP vendors: the file is downloaded once, the transformer output is the fetcher artifact
+            data_file = self.path('data', 'feed.txt')
+            with open(data_file, 'wb') as outfile:
+                outfile.write(feed.delimited('\t'))
+            results['transformer'] = measure(lambda: data_file,
+                                             lambda path: self.transformer(path, 'text', 'utf-8', '\t'),
+                                             size, self.repeat, self.warmup)
+            fetcher_file_path = self.path('fetcher', 'feed_text.json')
+            with open(fetcher_file_path, 'w') as outfile:
+                outfile.write(self.transformer(data_file, 'text', 'utf-8', '\t'))
+            error_status, codes_version = None, None
+        else:
+            fetcher_class = self.fetchers[CONNECTION_TYPES[scenario]]
+            kwargs = dict(vendor_id=vendor_id, config_file_path=config_url, item_codes=list(feed.codes),
+                          fetcher_write_path=self.path('fetcher'), template_values=dict(TEMPLATE_VALUES))
+            if scenario == 'csv':
+                kwargs['data_file_path'] = self.path('data', 'feed.csv')
+            fetched = []
+            results[fetcher_class.__name__] = measure(lambda: fetcher_class(**kwargs),
+                                                      lambda fetcher: fetched.append(fetcher.execute()),
+                                                      size, self.repeat, self.warmup)
+            fetcher = fetched[-1]
+            fetcher_file_path = fetcher.meta['fetcher_data_file_path']
+            error_status, codes_version = fetcher.vendor_codes_error_status, fetcher.vendor_codes_version
+            if scenario == 'csv':
+                results['transformer'] = measure(lambda: kwargs['data_file_path'],
+                                                 lambda path: self.transformer(path, 'csv', 'utf-8', ','),
+                                                 size, self.repeat, self.warmup)
+
+        def extractor():
+            return self.extractor_class(vendor_id=vendor_id, config_file_path=config_url,
+                                        fetcher_file_path=fetcher_file_path, item_codes=list(feed.codes),
+                                        vendor_codes_error_status=error_status, vendor_codes_version=codes_version,
+                                        extractor_write_path=self.path('extractor')).fetch_config()
+
+        results['JSONExtractor.transform_data'] = measure(extractor, lambda subject: subject.transform_data(),
+                                                          size, self.repeat, self.warmup)
+        extractor_file_path = extractor().transform_data().write(
+            data_file_dir=self.path('extractor')).meta['extractor_data_file_path']
+
+        if size > self.dispatch_limit:
+            print(f"  {scenario}/{size}: DataDispatcher.dispatch skipped, above --dispatch-limit {self.dispatch_limit}")
+            return results
+
+        def dispatcher():
+            return self.dispatcher_class(vendor_id=vendor_id, item_codes=list(feed.codes),
+                                         extractor_file_path=extractor_file_path).load_data()
+
+        results['DataDispatcher.dispatch'] = measure(dispatcher, lambda subject: subject.dispatch(),
+                                                     size, self.repeat, self.warmup)
+        return results
+
+
+def bench_config(dsn: Dict[str, str], workdir: str) -> str:
+    """
+    config.ini of the repository pointed at the throwaway database and local artifact directories
+    """
+    config = configparser.RawConfigParser()
+    config.optionxform = str
+    config.read(os.path.join(ROOT_DIR, 'config.ini'))
+    config['dbconfig'] = {key: dsn[key] for key in ('host', 'port', 'user', 'password', 'dbname') if key in dsn}
+    config['dbconfig']['application_name'] = 'li_pipeline_bench'
+    for key, directory in (('fetcher_directory_path', 'fetcher'), ('extractor_data_directory_path', 'extractor'),
+                           ('data_file_path', 'data')):
+        os.makedirs(os.path.join(workdir, directory), exist_ok=True)
+        config['network_filepath'][key] = os.path.join(workdir, directory)
+    config['extra']['is_blob'] = 'false'
+    path = os.path.join(workdir, 'config.ini')
+    with open(path, 'w') as outfile:
+        config.write(outfile)
+    return path
+
+
+def prepare_database(connection) -> None:
+    scripts = [os.path.join(PIPELINE_DIR, 'schema.sql')] + sorted(glob.glob(os.path.join(ROOT_DIR, 'migrations', '*.sql')))
+    with connection.cursor() as cursor:
+        for script in scripts:
+            with open(script) as infile:
+                cursor.execute(infile.read())
+        execute_values(cursor, "insert into vendors (vendor_id, vendor_name, connection_type) values %s",
+                       [(vendor_id, f'bench {scenario}', CONNECTION_TYPES[scenario])
+                        for scenario, vendor_id in VENDOR_IDS.items()])
+    connection.commit()
+
+
+def seed_vendor_codes(connection, scenario: str, codes: List[str]) -> None:
+    vendor_id = VENDOR_IDS[scenario]
+    # internal ids are unique per vendor and code
+    rows = [(vendor_id, code, vendor_id * 1000000 + index) for index, code in enumerate(codes)]
+    with connection.cursor() as cursor:
+        cursor.execute("delete from inventory where vendor_id = %s", (vendor_id,))
+        cursor.execute("delete from vendor_codes where vendor_id = %s", (vendor_id,))
+        execute_values(cursor, "insert into products (internal_id, product_name) values %s on conflict do nothing",
+                       [(internal_id, code) for _, code, internal_id in rows], page_size=5000)
+        execute_values(cursor, "insert into vendor_codes (vendor_id, vendor_code, internal_id) values %s",
+                       rows, page_size=5000)
+    connection.commit()
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float, min_ms: float) -> List[str]:
+    """
+    stages slower (median) or bigger (peak memory) than the baseline by more than the tolerance
+    """
+    regressions = []
+    for key, current in sorted(results.items()):
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        if current['p50_ms'] >= min_ms and current['p50_ms'] > previous['p50_ms'] * (1 + tolerance):
+            regressions.append(f"{key}: p50 {previous['p50_ms']} ms -> {current['p50_ms']} ms")
+        if current['peak_kib'] > previous['peak_kib'] * (1 + tolerance):
+            regressions.append(f"{key}: peak {previous['peak_kib']} KiB -> {current['peak_kib']} KiB")
+    return regressions
+
+
+def print_results(results: Dict[str, Dict]) -> None:
+    print(f"{'scenario/size/stage':<58} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'items/s':>12} {'peak KiB':>12}")
+    for key, row in results.items():
+        print(f"{key:<58} {row['p50_ms']:>10.1f} {row['p95_ms']:>10.1f} {row['p99_ms']:>10.1f} "
+              f"{row['items_per_s'] or 0:>12.0f} {row['peak_kib']:>12.0f}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--dispatch-limit', type=int, default=20000,
+                        help="skip DataDispatcher.dispatch above this many items, its duplicate check is quadratic")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--update-baseline', action='store_true', help="store the results as the baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown / growth, 0.25 = 25%%")
+    parser.add_argument('--min-ms', type=float, default=5.0, help="medians below this are too noisy to compare")
+    parser.add_argument('--output', help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    if not os.environ.get('LI_BENCH_DSN'):
+        parser.error("LI_BENCH_DSN is not set, it must name a throwaway Postgres database")
+    dsn = parse_dsn(os.environ['LI_BENCH_DSN'])
+    if not any(marker in dsn.get('dbname', '') for marker in ('bench', 'test')):
+        parser.error(f"refusing to wipe database {dsn.get('dbname')!r}, its name must contain 'bench' or 'test'")
+
+    workdir = tempfile.mkdtemp(prefix='li-pipeline-bench-')
+    # must be set before the first import of a stage, the packages read their config at import
+    os.environ['LI_CONFIG_FILE'] = bench_config(dsn, workdir)
+
+    connection = psycopg2.connect(**dsn)
+    results = {}
+    try:
+        prepare_database(connection)
+        with FeedServer() as server:
+            pipeline = Pipeline(workdir, server, args.repeat, args.warmup, args.dispatch_limit)
+            for size in args.sizes:
+                for scenario in args.scenarios:
+                    feed = Feed(scenario, size)
+                    seed_vendor_codes(connection, scenario, feed.codes)
+                    server.serve(feed)
+                    print(f"running {scenario} with {size} items")
+                    for stage, row in pipeline.run(scenario, feed).items():
+                        results[f'{scenario}/{size}/{stage}'] = row
+    finally:
+        connection.close()
+
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w') as outfile:
+            json.dump(results, outfile, indent=2)
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as infile:
+                baseline = json.load(infile)
+        baseline.update(results)
+        with open(args.baseline, 'w') as outfile:
+            json.dump(baseline, outfile, indent=2, sort_keys=True)
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}, run with --update-baseline to store one")
+        return 0
+    with open(args.baseline) as infile:
+        regressions = compare(results, json.load(infile), args.tolerance, args.min_ms)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
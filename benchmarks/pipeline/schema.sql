@@ -0,0 +1,67 @@
+-- Tables the stages touch, reduced to the columns they read and write.
+--
+-- Only for the throwaway database of the pipeline benchmark: the tables are dropped and
+-- recreated on every run. The migrations/ directory is applied on top.
+
+DROP TABLE IF EXISTS inventory, vendor_codes, vendor_configs, products, vendors, vendor_codes_version, li_jobs CASCADE;
+
+CREATE TABLE vendors (
+    vendor_id                 integer PRIMARY KEY,
+    vendor_name               text,
+    connection_type           text,
+    config_path               text,
+    enabled                   boolean     DEFAULT true,
+    sync_interval             interval    DEFAULT '1 hour',
+    last_fetch_date           timestamptz,
+    response_code             integer,
+    response_text             text,
+    token_required            boolean     DEFAULT false,
+    token_generated_timestamp timestamptz,
+    token_life_seconds        interval,
+    allows_vc_filter          boolean     DEFAULT false
+);
+
+CREATE TABLE products (
+    internal_id         integer PRIMARY KEY,
+    product_name        text,
+    product_description text,
+    product_sku         text,
+    priority            boolean     DEFAULT false,
+    sync_interval       interval    DEFAULT '1 hour',
+    created_on          timestamptz DEFAULT now(),
+    modified_on         timestamptz DEFAULT now()
+);
+
+CREATE TABLE vendor_configs (
+    vendor_id integer REFERENCES vendors,
+    key_name  text,
+    value     text,
+    PRIMARY KEY (vendor_id, key_name)
+);
+
+CREATE TABLE vendor_codes (
+    vendor_id         integer REFERENCES vendors,
+    vendor_code       text,
+    internal_id       integer REFERENCES products,
+    last_fetch_date   timestamptz,
+    error             boolean,
+    error_description text,
+    preferred         boolean,
+    PRIMARY KEY (vendor_id, vendor_code, internal_id)
+);
+
+CREATE TABLE inventory (
+    vendor_id                  integer,
+    vendor_code                text,
+    internal_id                integer,
+    cost                       double precision,
+    currency                   text,
+    next_availability_date     text,
+    availability_count         integer,
+    availability_status        boolean,
+    invalid                    boolean     DEFAULT false,
+    created_on                 timestamptz DEFAULT now(),
+    modified_on                timestamptz,
+    last_valid_inserted_updated timestamptz,
+    UNIQUE (vendor_code, vendor_id, internal_id)
+);
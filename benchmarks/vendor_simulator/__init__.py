@@ -0,0 +1,94 @@
+"""
+Local vendor simulator for load and fault testing of the fetchers.
+
+A scenario file (see scenarios/) lists simulated vendors, each with one of the shapes the
+config templates use, and the faults to inject. The simulator serves the vendors over
+HTTP (and FTP for `ftp` vendors) together with their config templates, so
+RESTJSONFetcher, RESTXMLFetcher, CSVFetcher, FTPFetcher and BearerTokenGenerator can be
+pointed at it offline: `config_file_path` is the vendor's /configs url and
+`template_values` are printed at start-up (`Simulator.describe`).
+
+usage:
+    cd benchmarks && python -m vendor_simulator vendor_simulator/scenarios/flaky.json --port 8099
+
+or from python::
+
+    with Simulator.from_file('benchmarks/vendor_simulator/scenarios/baseline.json') as simulator:
+        simulator.config_url(9101), simulator.vendors[9101].template_values()
+"""
+from typing import Any, Dict, Optional
+import json
+
+from .ftp_server import SimulatorFTPServer
+from .http_server import SimulatorHTTPServer
+from .vendors import SHAPE_FTP, SHAPES, CONNECTION_TYPES, SimulatedVendor, load_vendors
+
+
+class Simulator:
+    """
+    HTTP and FTP servers of one scenario, started as background threads
+
+    :param scenario: parsed scenario file
+    :type scenario: dict
+    """
+
+    def __init__(self, scenario: Dict[str, Any], host: str = '127.0.0.1', port: int = 0, ftp_port: int = 0,
+                 verbose: bool = False) -> None:
+        self.scenario = scenario
+        self.vendors = load_vendors(scenario)
+        self.ftp = None
+        if any(vendor.shape == SHAPE_FTP for vendor in self.vendors.values()):
+            self.ftp = SimulatorFTPServer(self.vendors, host, ftp_port)
+        self.http = SimulatorHTTPServer(self.vendors, host, port,
+                                        ftp_address=self.ftp.server_address[:2] if self.ftp else None,
+                                        verbose=verbose)
+        if self.ftp is not None:
+            self.ftp.record = self.http.record
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> 'Simulator':
+        with open(path) as infile:
+            return cls(json.load(infile), **kwargs)
+
+    @property
+    def base_url(self) -> str:
+        return self.http.base_url
+
+    def config_url(self, vendor_id: int) -> str:
+        return f'{self.base_url}/configs/{vendor_id}.json'
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return self.http.stats()
+
+    def describe(self) -> Dict[str, Any]:
+        """
+        what to pass to the fetchers for each vendor
+        """
+        return {str(vendor_id): {
+            'shape': vendor.shape,
+            'connection_type': CONNECTION_TYPES[vendor.shape],
+            'config_file_path': self.config_url(vendor_id),
+            'template_values': vendor.template_values(),
+            'item_codes': f'{vendor.catalog.size} codes, e.g. {vendor.catalog.codes()[:3]}',
+        } for vendor_id, vendor in self.vendors.items()}
+
+    def start(self) -> 'Simulator':
+        self.http.start()
+        if self.ftp is not None:
+            self.ftp.start()
+        return self
+
+    def stop(self) -> None:
+        for server in (self.http, self.ftp):
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+
+    def __enter__(self) -> 'Simulator':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+__all__ = ['Simulator', 'SimulatedVendor', 'SHAPES']
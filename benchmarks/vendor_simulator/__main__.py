@@ -0,0 +1,41 @@
+"""
+Run a vendor simulator scenario until interrupted.
+
+usage:
+    cd benchmarks && python -m vendor_simulator vendor_simulator/scenarios/baseline.json [--port 8099]
+"""
+import argparse
+import json
+import time
+
+from . import Simulator
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='vendor_simulator', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('scenario', help="scenario file")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--ftp-port', type=int, default=2121)
+    parser.add_argument('--stats-every', type=float, default=0, help="print the request stats every N seconds")
+    parser.add_argument('--verbose', action='store_true', help="log every request")
+    args = parser.parse_args()
+
+    simulator = Simulator.from_file(args.scenario, host=args.host, port=args.port, ftp_port=args.ftp_port,
+                                    verbose=args.verbose)
+    with simulator:
+        print(f"vendor simulator on {simulator.base_url}"
+              + (f", ftp on {args.host}:{simulator.ftp.server_address[1]}" if simulator.ftp else ""))
+        print(json.dumps(simulator.describe(), indent=2))
+        try:
+            while True:
+                time.sleep(args.stats_every or 3600)
+                if args.stats_every:
+                    print(json.dumps(simulator.stats()))
+        except KeyboardInterrupt:
+            print(json.dumps(simulator.stats(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
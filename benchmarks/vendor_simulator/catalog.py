@@ -0,0 +1,109 @@
+"""
+Deterministic inventory of a simulated vendor.
+
+The answer for a code only depends on the seed and the code, so a fetcher asking for the
+same codes twice, or in different chunks, gets the same data back.
+"""
+from typing import Any, Dict, List, Optional
+import csv
+import hashlib
+import io
+import random
+
+
+class Catalog:
+    """
+    :param vendor_id: vendor the catalog belongs to, part of the seed
+    :type vendor_id: int
+
+    :param size: number of codes the vendor carries (`codes()`, paginated listings and files)
+    :type size: int
+
+    :param unknown_rate: share of codes the vendor does not know
+    :type unknown_rate: float
+
+    :param numeric_codes: numeric codes (Techdata distributor identifiers) instead of part numbers
+    :type numeric_codes: bool
+    """
+
+    WAREHOUSES = 4
+
+    def __init__(self, vendor_id: int, size: int = 1000, unknown_rate: float = 0.02, seed: int = 7,
+                 numeric_codes: bool = False) -> None:
+        self.vendor_id = vendor_id
+        self.size = size
+        self.unknown_rate = unknown_rate
+        self.seed = seed
+        self.numeric_codes = numeric_codes
+
+    def codes(self) -> List[str]:
+        if self.numeric_codes:
+            return [str(10000000 + index) for index in range(self.size)]
+        return [f'V{self.vendor_id}-{index:07d}' for index in range(self.size)]
+
+    def _rng(self, code: str) -> random.Random:
+        digest = hashlib.blake2b(f'{self.seed}:{self.vendor_id}:{code}'.encode('utf-8'), digest_size=8).digest()
+        return random.Random(int.from_bytes(digest, 'big'))
+
+    def item(self, code: str) -> Optional[Dict[str, Any]]:
+        """
+        the vendor's data for a code, None for an unknown code
+        """
+        rng = self._rng(code)
+        if rng.random() < self.unknown_rate:
+            return None
+        return {
+            'code': code,
+            'price': round(rng.uniform(1, 5000), 2),
+            'currency': 'USD',
+            'stock': [rng.randint(0, 40) for _ in range(self.WAREHOUSES)],
+            'eta': f'2023-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+        }
+
+    # -- renderings ---------------------------------------------------------------------
+    def json_item(self, code: str) -> Dict[str, Any]:
+        item = self.item(code)
+        if item is None:
+            return {'product_code': code, 'status': 'NOT_FOUND'}
+        return {
+            'product_code': code,
+            'status': 'OK',
+            'price': item['price'],
+            'currency': item['currency'],
+            'warehouses': [{'id': f'WH{index}', 'stock': stock, 'eta': item['eta']}
+                           for index, stock in enumerate(item['stock'])],
+        }
+
+    def techdata_xml(self, codes: List[str]) -> bytes:
+        lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<PnAResponse>']
+        for code in codes:
+            item = self.item(code)
+            if item is None:
+                lines.append(f'<Item><DistributorItemIdentifier>{code}</DistributorItemIdentifier>'
+                             f'<ErrorMessage>Item not found</ErrorMessage></Item>')
+                continue
+            lines.append(f'<Item><DistributorItemIdentifier>{code}</DistributorItemIdentifier>'
+                         f'<UnitPrice>{item["price"]:.2f}</UnitPrice><Currency>{item["currency"]}</Currency>'
+                         f'<TotalAvailable>{sum(item["stock"])}</TotalAvailable><ErrorMessage>OK</ErrorMessage></Item>')
+        lines.append('</PnAResponse>')
+        return '\n'.join(lines).encode('utf-8')
+
+    def jenne_xml(self, codes: List[str]) -> bytes:
+        lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<ProductListResponse><Products>']
+        for code in codes:
+            item = self.item(code)
+            if item is not None:
+                lines.append(f'<Product><PartNumber>{code}</PartNumber><Price>{item["price"]:.2f}</Price>'
+                             f'<QuantityAvailable>{sum(item["stock"])}</QuantityAvailable></Product>')
+        lines.append('</Products></ProductListResponse>')
+        return '\n'.join(lines).encode('utf-8')
+
+    def delimited(self, delimiter: str = ',') -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=delimiter, lineterminator='\n')
+        writer.writerow(['PartNumber', 'Price', 'Qty', 'Currency'])
+        for code in self.codes():
+            item = self.item(code)
+            if item is not None:
+                writer.writerow([code, f'{item["price"]:.2f}', sum(item['stock']), item['currency']])
+        return buffer.getvalue().encode('utf-8')
@@ -0,0 +1,125 @@
+"""
+Fault injection of the simulated vendors.
+
+The `faults` section of a scenario (or of one vendor in it)::
+
+    "faults": {
+        "latency_ms": {"distribution": "lognormal", "median": 120, "sigma": 0.6, "max": 5000},
+        "error_rates": {"429": 0.05, "503": 0.02},   # share of requests answered with the status
+        "retry_after": 2,                             # Retry-After header of 429 / 503 answers
+        "slow_body": {"rate": 0.1, "bytes_per_second": 32768},
+        "malformed_rate": 0.01,                       # share of bodies cut in half
+        "stall_rate": 0.0,                            # share of requests answered after `stall_seconds`
+        "stall_seconds": 30
+    }
+
+Latency distributions: fixed (`value`), uniform (`low`, `high`), exponential (`mean`),
+lognormal (`median`, `sigma`), all in milliseconds and capped at `max`.
+"""
+from typing import Any, Dict, Iterator, Optional
+import math
+import random
+import threading
+
+DISTRIBUTIONS = ('fixed', 'uniform', 'exponential', 'lognormal')
+
+
+class FaultConfigException(Exception):
+    pass
+
+
+class FaultProfile:
+    """
+    Draws the faults of one vendor, the draws are reproducible for a given seed
+    """
+
+    def __init__(self, faults: Optional[Dict[str, Any]] = None, seed: int = 7) -> None:
+        self.faults = faults or {}
+        self._rng = random.Random(seed)
+        # handlers run in threads of the server
+        self._lock = threading.Lock()
+
+        latency = self.faults.get('latency_ms') or {}
+        self.distribution = latency.get('distribution', 'fixed' if latency else None)
+        if self.distribution is not None and self.distribution not in DISTRIBUTIONS:
+            raise FaultConfigException(f"Unknown latency distribution {self.distribution!r}, "
+                                       f"expected one of {DISTRIBUTIONS}")
+        self.latency = latency
+        self.error_rates = {int(status): float(rate) for status, rate in (self.faults.get('error_rates') or {}).items()}
+        if sum(self.error_rates.values()) > 1:
+            raise FaultConfigException("The error rates add up to more than 1")
+        self.retry_after = self.faults.get('retry_after')
+        self.slow_body = self.faults.get('slow_body') or {}
+        self.malformed_rate = float(self.faults.get('malformed_rate', 0))
+        self.stall_rate = float(self.faults.get('stall_rate', 0))
+        self.stall_seconds = float(self.faults.get('stall_seconds', 30))
+
+    def _random(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+    def delay_seconds(self) -> float:
+        """
+        time to wait before answering
+        """
+        if self._random() < self.stall_rate:
+            return self.stall_seconds
+        if self.distribution is None:
+            return 0.0
+        with self._lock:
+            if self.distribution == 'fixed':
+                value = float(self.latency.get('value', 0))
+            elif self.distribution == 'uniform':
+                value = self._rng.uniform(float(self.latency.get('low', 0)), float(self.latency.get('high', 0)))
+            elif self.distribution == 'exponential':
+                value = self._rng.expovariate(1 / float(self.latency.get('mean', 1)))
+            else:
+                value = self._rng.lognormvariate(math.log(float(self.latency.get('median', 1))),
+                                                 float(self.latency.get('sigma', 0.5)))
+        return min(value, float(self.latency.get('max', value))) / 1000
+
+    def error_status(self) -> Optional[int]:
+        """
+        status to answer with instead of the data, None for a normal answer
+        """
+        draw = self._random()
+        for status, rate in sorted(self.error_rates.items()):
+            if draw < rate:
+                return status
+            draw -= rate
+        return None
+
+    def is_malformed(self) -> bool:
+        return self._random() < self.malformed_rate
+
+    @staticmethod
+    def malform(body: bytes) -> bytes:
+        """
+        the body cut in half, what a dropped connection or a broken vendor serializer looks like
+        """
+        return body[:max(1, len(body) // 2)]
+
+    def body_chunks(self, body: bytes) -> Iterator[tuple]:
+        """
+        (chunk, seconds to wait after it), a slow body trickles at `bytes_per_second`
+        """
+        if self.slow_body and self._random() < float(self.slow_body.get('rate', 1)):
+            rate = max(1, int(self.slow_body.get('bytes_per_second', 16384)))
+            chunk_size = max(1, rate // 10)
+            for start in range(0, len(body), chunk_size):
+                yield body[start:start + chunk_size], chunk_size / rate
+        else:
+            yield body, 0.0
+
+
+def merge_faults(defaults: Optional[Dict[str, Any]], overrides: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    vendor faults on top of the scenario defaults, one level deep
+    """
+    merged = dict(defaults or {})
+    for key, value in (overrides or {}).items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = dict(merged[key], **value)
+        else:
+            merged[key] = value
+    return merged
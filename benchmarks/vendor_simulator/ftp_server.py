@@ -0,0 +1,167 @@
+"""
+FTP side of the simulator, enough of RFC 959 for `ftplib` as FTPFetcher uses it.
+
+A login with the credentials of an `ftp` vendor sees that vendor's file (zipped or not)
+in the root directory. Passive mode only. The vendor's faults apply to RETR: latency
+before the transfer, error rates as `421` (5xx / 429) answers, slow and cut bodies.
+"""
+from typing import Dict, Optional
+import socket
+import socketserver
+import threading
+import time
+
+from .vendors import SHAPE_FTP, SimulatedVendor
+
+DATA_TIMEOUT = 10
+
+
+class FTPSession(socketserver.StreamRequestHandler):
+
+    def setup(self) -> None:
+        super().setup()
+        self.vendor: Optional[SimulatedVendor] = None
+        self.user: Optional[str] = None
+        self.passive: Optional[socket.socket] = None
+
+    def reply(self, line: str) -> None:
+        self.wfile.write((line + '\r\n').encode('utf-8'))
+        self.wfile.flush()
+
+    def handle(self) -> None:
+        self.reply('220 vendor simulator ready')
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                break
+            command, _, argument = raw.decode('utf-8', 'replace').strip().partition(' ')
+            handler = getattr(self, f'ftp_{command.upper()}', None)
+            if handler is None:
+                self.reply(f'502 {command} not implemented')
+                continue
+            if command.upper() not in ('USER', 'PASS', 'QUIT') and self.vendor is None:
+                self.reply('530 Not logged in')
+                continue
+            if handler(argument) is False:
+                break
+        self._close_passive()
+
+    # -- session ------------------------------------------------------------------------
+    def ftp_USER(self, argument: str) -> None:
+        self.user = argument
+        self.reply('331 Password required')
+
+    def ftp_PASS(self, argument: str) -> None:
+        vendor = self.server.users.get(self.user)
+        if vendor is None or vendor.password != argument:
+            self.reply('530 Login incorrect')
+            return
+        self.vendor = vendor
+        self.reply('230 Logged in')
+
+    def ftp_QUIT(self, argument: str) -> bool:
+        self.reply('221 Goodbye')
+        return False
+
+    def ftp_SYST(self, argument: str) -> None:
+        self.reply('215 UNIX Type: L8')
+
+    def ftp_NOOP(self, argument: str) -> None:
+        self.reply('200 OK')
+
+    def ftp_TYPE(self, argument: str) -> None:
+        self.reply(f'200 Type set to {argument}')
+
+    def ftp_PWD(self, argument: str) -> None:
+        self.reply('257 "/" is the current directory')
+
+    def ftp_CWD(self, argument: str) -> None:
+        self.reply('250 OK')
+
+    def ftp_SIZE(self, argument: str) -> None:
+        body = self.vendor.ftp_files().get(argument.lstrip('/'))
+        self.reply(f'213 {len(body)}' if body is not None else '550 No such file')
+
+    # -- data connections ---------------------------------------------------------------------
+    def _close_passive(self) -> None:
+        if self.passive is not None:
+            self.passive.close()
+            self.passive = None
+
+    def _listen(self) -> int:
+        self._close_passive()
+        self.passive = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.passive.bind((self.server.server_address[0], 0))
+        self.passive.listen(1)
+        self.passive.settimeout(DATA_TIMEOUT)
+        return self.passive.getsockname()[1]
+
+    def ftp_PASV(self, argument: str) -> None:
+        port = self._listen()
+        host = self.server.server_address[0].replace('.', ',')
+        self.reply(f'227 Entering Passive Mode ({host},{port >> 8},{port & 0xff})')
+
+    def ftp_EPSV(self, argument: str) -> None:
+        self.reply(f'229 Entering Extended Passive Mode (|||{self._listen()}|)')
+
+    def _transfer(self, body: bytes) -> None:
+        if self.passive is None:
+            self.reply('425 Use PASV first')
+            return
+        self.reply('150 Opening data connection')
+        try:
+            connection, _ = self.passive.accept()
+        except socket.timeout:
+            self.reply('425 Data connection timed out')
+            return
+        finally:
+            self._close_passive()
+        with connection:
+            for chunk, pause in self.vendor.faults.body_chunks(body):
+                connection.sendall(chunk)
+                if pause:
+                    time.sleep(pause)
+        self.reply('226 Transfer complete')
+
+    def ftp_NLST(self, argument: str) -> None:
+        self._transfer(''.join(f'{name}\r\n' for name in self.vendor.ftp_files()).encode('utf-8'))
+
+    def ftp_LIST(self, argument: str) -> None:
+        lines = [f'-rw-r--r-- 1 ftp ftp {len(body)} Jan 01 00:00 {name}\r\n'
+                 for name, body in self.vendor.ftp_files().items()]
+        self._transfer(''.join(lines).encode('utf-8'))
+
+    def ftp_RETR(self, argument: str) -> None:
+        faults = self.vendor.faults
+        self.server.record(self.vendor.vendor_id, 'requests')
+        time.sleep(faults.delay_seconds())
+        status = faults.error_status()
+        if status is not None:
+            self.server.record(self.vendor.vendor_id, status)
+            self.reply('421 Service not available, simulated failure')
+            return
+        body = self.vendor.ftp_files().get(argument.lstrip('/'))
+        if body is None:
+            self.reply('550 No such file')
+            return
+        if faults.is_malformed():
+            self.server.record(self.vendor.vendor_id, 'malformed')
+            body = faults.malform(body)
+        self.server.record(self.vendor.vendor_id, 200)
+        self._transfer(body)
+
+
+class SimulatorFTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, vendors: Dict[int, SimulatedVendor], host: str = '127.0.0.1', port: int = 0,
+                 record=None) -> None:
+        super().__init__((host, port), FTPSession)
+        self.users = {vendor.username: vendor for vendor in vendors.values() if vendor.shape == SHAPE_FTP}
+        self.record = record or (lambda vendor_id, event: None)
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, name='vendor-simulator-ftp', daemon=True)
+        thread.start()
+        return thread
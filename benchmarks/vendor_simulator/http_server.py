@@ -0,0 +1,199 @@
+"""
+HTTP side of the simulator.
+
+    GET  /configs/<vendor_id>.json           config template of the vendor
+    POST /vendors/<id>/token                 bearer token (vendors with "token": true)
+    POST /vendors/<id>/items                 json_body
+    GET  /vendors/<id>/items/<code>          json_item_in_url
+    GET  /vendors/<id>/items?page=N          json_paginated, X-Total-Pages header
+    POST /vendors/<id>/pna                   xml_multi_body
+    GET  /vendors/<id>/products?productList= xml_item_in_url
+    GET  /vendors/<id>/feed.csv              csv_digest, HTTP digest authentication
+    GET  /stats                              requests and answers per vendor so far
+
+Faults apply to the vendor endpoints only, never to /configs or /stats.
+"""
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+import hashlib
+import json
+import re
+import secrets
+import time
+
+from .vendors import (SHAPE_CSV_DIGEST, SHAPE_JSON_BODY, SHAPE_JSON_ITEM_IN_URL, SHAPE_JSON_PAGINATED,
+                     SHAPE_XML_ITEM_IN_URL, SHAPE_XML_MULTI_BODY, SimulatedVendor)
+
+DIGEST_REALM = 'vendor-simulator'
+_VENDOR_PATH = re.compile(r'^/vendors/(\d+)/(.+)$')
+_ITEM_IDENTIFIER = re.compile(r'<(?:Distributor|Manufacturer)ItemIdentifier>([^<]+)<')
+_DIGEST_FIELD = re.compile(r'(\w+)=(?:"([^"]*)"|([^,\s]*))')
+
+
+def _md5(value: str) -> str:
+    return hashlib.md5(value.encode('utf-8')).hexdigest()
+
+
+class SimulatorHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    # -- answering ------------------------------------------------------------------------
+    def _send(self, status: int, body: bytes = b'', content_type: str = 'text/plain',
+              headers: Optional[Dict[str, str]] = None, vendor: Optional[SimulatedVendor] = None) -> None:
+        if vendor is not None:
+            self.server.record(vendor.vendor_id, status)
+            if status == 200 and vendor.faults.is_malformed():
+                body = vendor.faults.malform(body)
+                self.server.record(vendor.vendor_id, 'malformed')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        chunks = vendor.faults.body_chunks(body) if vendor is not None else [(body, 0.0)]
+        for chunk, pause in chunks:
+            self.wfile.write(chunk)
+            if pause:
+                self.wfile.flush()
+                time.sleep(pause)
+
+    def _json(self, status: int, document, vendor: SimulatedVendor = None, headers: Dict[str, str] = None) -> None:
+        self._send(status, json.dumps(document).encode('utf-8'), 'application/json', headers, vendor)
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    # -- digest authentication -----------------------------------------------------------------
+    def _digest_ok(self, vendor: SimulatedVendor) -> bool:
+        header = self.headers.get('Authorization') or ''
+        if not header.startswith('Digest '):
+            return False
+        fields = {key: quoted or bare for key, quoted, bare in _DIGEST_FIELD.findall(header[len('Digest '):])}
+        if fields.get('username') != vendor.username or fields.get('nonce') != self.server.nonce:
+            return False
+        ha1 = _md5(f"{vendor.username}:{DIGEST_REALM}:{vendor.password}")
+        ha2 = _md5(f"{self.command}:{fields.get('uri')}")
+        if fields.get('qop'):
+            expected = _md5(f"{ha1}:{fields['nonce']}:{fields.get('nc')}:{fields.get('cnonce')}:{fields['qop']}:{ha2}")
+        else:
+            expected = _md5(f"{ha1}:{fields['nonce']}:{ha2}")
+        return secrets.compare_digest(expected, fields.get('response', ''))
+
+    def _digest_challenge(self, vendor: SimulatedVendor) -> None:
+        self._send(401, b'authentication required', vendor=vendor, headers={
+            'WWW-Authenticate': f'Digest realm="{DIGEST_REALM}", qop="auth", nonce="{self.server.nonce}", '
+                                f'algorithm=MD5'})
+
+    # -- routing ------------------------------------------------------------------------------
+    def do_GET(self) -> None:
+        self._route(b'')
+
+    def do_POST(self) -> None:
+        self._route(self._body())
+
+    def _route(self, body: bytes) -> None:
+        url = urlparse(self.path)
+        if url.path == '/stats':
+            return self._json(200, self.server.stats())
+        if url.path.startswith('/configs/'):
+            vendor = self.server.vendors.get(int(url.path.rsplit('/', 1)[-1].split('.')[0] or 0))
+            if vendor is None:
+                return self._json(404, {'error': 'unknown vendor'})
+            return self._json(200, vendor.config(self.server.base_url, self.server.ftp_address))
+
+        match = _VENDOR_PATH.match(url.path)
+        vendor = self.server.vendors.get(int(match.group(1))) if match else None
+        if vendor is None:
+            return self._json(404, {'error': 'unknown endpoint'})
+        resource = match.group(2)
+        self.server.record(vendor.vendor_id, 'requests')
+
+        time.sleep(vendor.faults.delay_seconds())
+        status = vendor.faults.error_status()
+        if status is not None:
+            headers = {'Retry-After': str(vendor.faults.retry_after)} \
+                if vendor.faults.retry_after is not None and status in (429, 503) else None
+            return self._json(status, {'error': f'simulated {status}'}, vendor, headers)
+
+        if resource == 'token' and self.command == 'POST':
+            return self._json(200, vendor.issue_token(), vendor)
+        if not vendor.accepts_token(self.headers.get('Authorization')):
+            return self._json(401, {'error': 'invalid token'}, vendor)
+        self._answer(vendor, resource, parse_qs(url.query), body)
+
+    def _answer(self, vendor: SimulatedVendor, resource: str, query: Dict[str, list], body: bytes) -> None:
+        catalog = vendor.catalog
+        if vendor.shape == SHAPE_JSON_BODY and resource == 'items' and self.command == 'POST':
+            codes = [item.get('product_code') for item in json.loads(body or b'{}').get('items', [])]
+            return self._json(200, {'items': [catalog.json_item(code) for code in codes]}, vendor)
+
+        if vendor.shape == SHAPE_JSON_ITEM_IN_URL and resource.startswith('items/'):
+            code = resource[len('items/'):]
+            if catalog.item(code) is None:
+                return self._json(404, {'error': 'item not found'}, vendor)
+            return self._json(200, catalog.json_item(code), vendor)
+
+        if vendor.shape == SHAPE_JSON_PAGINATED and resource == 'items':
+            page = int(query.get('page', ['1'])[0])
+            page_size = int(query.get('per_page', [vendor.page_size])[0])
+            codes = catalog.codes()
+            total_pages = max(1, -(-len(codes) // page_size))
+            page_codes = codes[(page - 1) * page_size:page * page_size]
+            return self._json(200, {'data': [catalog.json_item(code) for code in page_codes]}, vendor,
+                              {'X-Total-Pages': str(total_pages), 'X-Total-Count': str(len(codes))})
+
+        if vendor.shape == SHAPE_XML_MULTI_BODY and resource == 'pna' and self.command == 'POST':
+            codes = _ITEM_IDENTIFIER.findall(body.decode('utf-8', 'replace'))
+            return self._send(200, catalog.techdata_xml(codes), 'application/xml', vendor=vendor)
+
+        if vendor.shape == SHAPE_XML_ITEM_IN_URL and resource == 'products':
+            codes = [code for code in query.get('productList', [''])[0].split(',') if code]
+            return self._send(200, catalog.jenne_xml(codes), 'application/xml', vendor=vendor)
+
+        if vendor.shape == SHAPE_CSV_DIGEST and resource == 'feed.csv':
+            if not self._digest_ok(vendor):
+                return self._digest_challenge(vendor)
+            return self._send(200, vendor.file_body(), 'text/csv', vendor=vendor)
+
+        self._json(404, {'error': f'{vendor.shape} has no {self.command} /{resource}'}, vendor)
+
+
+class SimulatorHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, vendors: Dict[int, SimulatedVendor], host: str = '127.0.0.1', port: int = 0,
+                 ftp_address: Optional[tuple] = None, verbose: bool = False) -> None:
+        super().__init__((host, port), SimulatorHandler)
+        self.vendors = vendors
+        self.ftp_address = ftp_address
+        self.verbose = verbose
+        self.nonce = secrets.token_hex(16)
+        self._counters = defaultdict(Counter)
+        self._lock = Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def record(self, vendor_id: int, event) -> None:
+        with self._lock:
+            self._counters[vendor_id][str(event)] += 1
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {str(vendor_id): dict(counter) for vendor_id, counter in self._counters.items()}
+
+    def start(self) -> Thread:
+        thread = Thread(target=self.serve_forever, name='vendor-simulator-http', daemon=True)
+        thread.start()
+        return thread
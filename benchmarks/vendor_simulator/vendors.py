@@ -0,0 +1,264 @@
+"""
+The simulated vendors of a scenario and the config templates that reach them.
+
+A vendor of a scenario file::
+
+    {
+        "vendor_id": 9101,
+        "shape": "json_body",          # one of SHAPES
+        "items": 10000,                # codes the vendor carries
+        "unknown_rate": 0.02,          # share of codes the vendor does not know
+        "chunk_size": 100,             # xml shapes: codes per request (xml_payload_limit)
+        "page_size": 500,              # json_paginated: items per page
+        "file_type": "csv",            # ftp: csv or text
+        "zip": false,                  # ftp: serve the file zipped
+        "token": false,                # require a bearer token from POST /vendors/<id>/token
+        "username": "vendor9101",      # credentials for digest auth, FTP and the token endpoint
+        "password": "secret9101",
+        "faults": {...}                # see faults.py, on top of the scenario defaults
+    }
+"""
+from typing import Any, Dict, List, Optional
+import io
+import secrets
+import zipfile
+
+from .catalog import Catalog
+from .faults import FaultProfile, merge_faults
+
+SHAPE_JSON_BODY = 'json_body'
+SHAPE_JSON_ITEM_IN_URL = 'json_item_in_url'
+SHAPE_JSON_PAGINATED = 'json_paginated'
+SHAPE_XML_MULTI_BODY = 'xml_multi_body'
+SHAPE_XML_ITEM_IN_URL = 'xml_item_in_url'
+SHAPE_CSV_DIGEST = 'csv_digest'
+SHAPE_FTP = 'ftp'
+
+SHAPES = (SHAPE_JSON_BODY, SHAPE_JSON_ITEM_IN_URL, SHAPE_JSON_PAGINATED, SHAPE_XML_MULTI_BODY,
+          SHAPE_XML_ITEM_IN_URL, SHAPE_CSV_DIGEST, SHAPE_FTP)
+
+# fetcher each shape is meant for, the `connection_type` of the vendor
+CONNECTION_TYPES = {
+    SHAPE_JSON_BODY: 'json', SHAPE_JSON_ITEM_IN_URL: 'json', SHAPE_JSON_PAGINATED: 'json',
+    SHAPE_XML_MULTI_BODY: 'xml', SHAPE_XML_ITEM_IN_URL: 'xml', SHAPE_CSV_DIGEST: 'csv', SHAPE_FTP: 'ftp/csv',
+}
+
+JSON_MAPPING = {
+    'vendor_code_table': [{'source_field': 'vendor_code', 'destination_field': 'product_code'},
+                          {'source_field': 'error_description', 'destination_field': 'status'}],
+    'message_when_no_error': ['OK'],
+    'inventory_table': [{'source_field': 'vendor_code', 'destination_field': 'product_code'},
+                        {'source_field': 'cost', 'destination_field': 'price'},
+                        {'source_field': 'currency', 'destination_field': 'currency'},
+                        {'source_field': 'availability_count', 'destination_field': 'warehouses.stock[i]'}],
+}
+
+FILE_MAPPING = {
+    'inventory_table': [{'source_field': 'vendor_code', 'destination_field': 'PartNumber'},
+                        {'source_field': 'cost', 'destination_field': 'Price'},
+                        {'source_field': 'currency', 'destination_field': 'Currency'},
+                        {'source_field': 'availability_count', 'destination_field': 'Qty'}],
+}
+
+
+class VendorSpecException(Exception):
+    pass
+
+
+class SimulatedVendor:
+    """
+    :param spec: the vendor entry of the scenario
+    :type spec: dict
+
+    :param default_faults: `faults` of the scenario, the vendor's own faults override them
+    :type default_faults: dict
+    """
+
+    def __init__(self, spec: Dict[str, Any], default_faults: Optional[Dict[str, Any]] = None, seed: int = 7) -> None:
+        if spec.get('shape') not in SHAPES:
+            raise VendorSpecException(f"Unknown vendor shape {spec.get('shape')!r}, expected one of {SHAPES}")
+        self.spec = spec
+        self.vendor_id = int(spec['vendor_id'])
+        self.shape = spec['shape']
+        self.catalog = Catalog(self.vendor_id, size=int(spec.get('items', 1000)),
+                               unknown_rate=float(spec.get('unknown_rate', 0.02)), seed=seed,
+                               numeric_codes=self.shape == SHAPE_XML_MULTI_BODY)
+        self.faults = FaultProfile(merge_faults(default_faults, spec.get('faults')), seed=seed + self.vendor_id)
+        self.chunk_size = int(spec.get('chunk_size', 100))
+        self.page_size = int(spec.get('page_size', 500))
+        self.file_type = spec.get('file_type', 'csv')
+        self.zip = bool(spec.get('zip', False))
+        # fixed credentials, so that vendor_configs rows written for a scenario keep working
+        self.username = spec.get('username', f'vendor{self.vendor_id}')
+        self.password = spec.get('password', f'secret{self.vendor_id}')
+        self.token_required = bool(spec.get('token', False))
+        self.tokens = set()
+        self._ftp_files = None
+
+    # -- what the fetchers are given --------------------------------------------------------
+    def template_values(self) -> Dict[str, str]:
+        """
+        `template_values` to pass to the fetcher (vendor_configs rows of the vendor)
+        """
+        values = {'username': self.username, 'password': self.password, 'TPL_API_KEY': self.password}
+        if self.token_required:
+            values['Authorization'] = 'Bearer <<requested from the token endpoint>>'
+        return values
+
+    def _headers(self, content_type: str) -> List[Dict[str, str]]:
+        headers = [{'key': 'Content-Type', 'value': content_type}]
+        if self.token_required:
+            headers.append({'key': 'Authorization', 'value': '<<Authorization>>'})
+        return headers
+
+    def config(self, base_url: str, ftp_address: Optional[tuple] = None) -> Dict[str, Any]:
+        """
+        config template of the vendor, as served to `Base.read_config`
+        """
+        url = f'{base_url}/vendors/{self.vendor_id}'
+        if self.shape == SHAPE_JSON_BODY:
+            config = {
+                'api_request_template': {'url': {'raw': f'{url}/items', 'method': 'POST', 'query': []},
+                                         'header': self._headers('application/json')},
+                'data': {'items': [{'product_code': '<<TPL_ITEM_CODE>>'}]},
+                'items_list': 'data.items',
+                'items_response': 'items',
+                'mapping': JSON_MAPPING,
+            }
+        elif self.shape == SHAPE_JSON_ITEM_IN_URL:
+            config = {
+                'api_request_template': {'url': {'raw': f'{url}/items/<<TPL_ITEM_CODE>>', 'method': 'GET',
+                                                 'query': []},
+                                         'header': self._headers('application/json')},
+                'mapping': JSON_MAPPING,
+            }
+        elif self.shape == SHAPE_JSON_PAGINATED:
+            config = {
+                'api_request_template': {'url': {'raw': f'{url}/items', 'method': 'GET', 'query': []},
+                                         'header': self._headers('application/json')},
+                'pagination_control': {
+                    'style': 'page', 'page_size': self.page_size, 'max_concurrency': 4,
+                    'request': {'param_location': 'url', 'page_number': 'page', 'page_size': 'per_page'},
+                    'response': {'param_location': 'header', 'total_pages': 'X-Total-Pages', 'items': 'data'},
+                },
+                'mapping': {'inventory_table': JSON_MAPPING['inventory_table']},
+            }
+        elif self.shape == SHAPE_XML_MULTI_BODY:
+            item = '<Item><DistributorItemIdentifier><<TPL_ITEM_CODE>></DistributorItemIdentifier></Item>'
+            config = {
+                'api_request_template': {'url': {'raw': f'{url}/pna', 'method': 'POST', 'query': []},
+                                         'header': self._headers('application/xml')},
+                'xml_payload_format': 'xml_payload',
+                'xml_payload': f'<PnARequest><Version>2.0</Version>{item}</PnARequest>',
+                'xml_req_body': item,
+                'xml_multi_req_body': True,
+                'xml_req_body_distributor': item,
+                'xml_req_body_manufacture': item.replace('Distributor', 'Manufacturer'),
+                'xml_payload_limit': self.chunk_size,
+                'data_list_path': 'PnAResponse.Item',
+                'mapping': {
+                    'vendor_code_table': [
+                        {'source_field': 'vendor_code', 'destination_field': 'DistributorItemIdentifier'},
+                        {'source_field': 'error_description', 'destination_field': 'ErrorMessage'}],
+                    'message_when_no_error': ['OK'],
+                    'inventory_table': [{'source_field': 'vendor_code', 'destination_field': 'multi_vendor_code'},
+                                        {'source_field': 'cost', 'destination_field': 'UnitPrice'},
+                                        {'source_field': 'currency', 'destination_field': 'Currency'},
+                                        {'source_field': 'availability_count', 'destination_field': 'TotalAvailable'}],
+                },
+            }
+        elif self.shape == SHAPE_XML_ITEM_IN_URL:
+            config = {
+                'api_request_template': {'url': {'raw': f'{url}/products', 'method': 'GET',
+                                                 'query': [{'key': 'email', 'value': '<<username>>'},
+                                                           {'key': 'productList', 'value': '<<TPL_ITEM_CODE>>'}]},
+                                         'header': self._headers('application/xml')},
+                'xml_payload_limit': self.chunk_size,
+                'data_list_path': 'ProductListResponse.Products.Product',
+                'mapping': {'inventory_table': [{'source_field': 'vendor_code', 'destination_field': 'PartNumber'},
+                                                {'source_field': 'cost', 'destination_field': 'Price'},
+                                                {'source_field': 'availability_count',
+                                                 'destination_field': 'QuantityAvailable'}]},
+            }
+        elif self.shape == SHAPE_CSV_DIGEST:
+            config = {
+                'api_request_template': {'url': {'raw': f'{url}/feed.csv', 'method': 'GET', 'auth_required': True,
+                                                 'query': []},
+                                         'header': [{'key': 'username', 'value': '<<username>>'},
+                                                    {'key': 'password', 'value': '<<password>>'}]},
+                'delimiter': ',',
+                'encoding': 'utf-8',
+                'mapping': FILE_MAPPING,
+            }
+        else:
+            host, port = ftp_address or ('127.0.0.1', 21)
+            config = {
+                'ftp-request-template': {'url': host},
+                'port': port,
+                'file_name': self.file_name(),
+                'file_type': self.file_type,
+                'csv_delimiter': ',' if self.file_type == 'csv' else '\t',
+                'encoding': 'utf-8',
+                'mapping': FILE_MAPPING,
+            }
+            if self.zip:
+                config['zip_file'] = self.file_name() + '.zip'
+                del config['file_name']
+
+        if self.token_required:
+            config['token_generator_template'] = {
+                'url': {'raw': f'{url}/token', 'method': 'POST', 'query': []},
+                'header': [{'key': 'Content-Type', 'value': 'application/x-www-form-urlencoded'}],
+                'token_data': {'x-www-url': [{'key': 'grant_type', 'value': 'client_credentials'},
+                                             {'key': 'client_id', 'value': '<<username>>'},
+                                             {'key': 'client_secret', 'value': '<<password>>'}]},
+            }
+            config['auth_key_update'] = 'Authorization'
+        return config
+
+    # -- what the vendor answers ----------------------------------------------------------
+    def file_name(self) -> str:
+        return f'V{self.vendor_id}.' + ('csv' if self.file_type == 'csv' else 'txt')
+
+    def file_body(self) -> bytes:
+        return self.catalog.delimited(',' if self.file_type == 'csv' or self.shape == SHAPE_CSV_DIGEST else '\t')
+
+    def ftp_files(self) -> Dict[str, bytes]:
+        """
+        files of the vendor's FTP directory, by name, rendered once
+        """
+        if self._ftp_files is None:
+            if not self.zip:
+                self._ftp_files = {self.file_name(): self.file_body()}
+            else:
+                buffer = io.BytesIO()
+                with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+                    archive.writestr(self.file_name(), self.file_body())
+                self._ftp_files = {self.file_name() + '.zip': buffer.getvalue()}
+        return self._ftp_files
+
+    def issue_token(self) -> Dict[str, Any]:
+        token = secrets.token_urlsafe(24)
+        self.tokens.add(token)
+        return {'access_token': token, 'token_type': 'Bearer', 'expires_in': 3600}
+
+    def accepts_token(self, authorization: Optional[str]) -> bool:
+        if not self.token_required:
+            return True
+        return bool(authorization) and authorization.split(' ', 1)[-1] in self.tokens
+
+
+def load_vendors(scenario: Dict[str, Any]) -> Dict[int, SimulatedVendor]:
+    """
+    vendors of a scenario by vendor_id
+    """
+    seed = int(scenario.get('seed', 7))
+    vendors = {}
+    for spec in scenario.get('vendors', []):
+        vendor = SimulatedVendor(spec, scenario.get('faults'), seed=seed)
+        if vendor.vendor_id in vendors:
+            raise VendorSpecException(f"vendor_id {vendor.vendor_id} is used twice")
+        vendors[vendor.vendor_id] = vendor
+    if not vendors:
+        raise VendorSpecException("The scenario has no vendors")
+    return vendors
@@ -0,0 +1,66 @@
+-- Change counter of vendor_codes per vendor.
+--
+-- The fetcher and the extractor cache the vendor_code -> internal_id mapping of a vendor
+-- (common_utils/vendor_code_snapshot.py) and reuse it while vendor_codes_version.version of
+-- the vendor is unchanged. The counter moves whenever a code of the vendor is added, removed
+-- or remapped; the error / last_fetch_date bookkeeping written on every sync does not move it.
+--
+-- The triggers run once per statement and read the changed rows from transition tables, so a
+-- bulk upsert of N codes moves the counter of its vendor once instead of N times. An update
+-- moves it only for vendors whose (vendor_code, internal_id) rows actually differ afterwards.
+
+CREATE TABLE IF NOT EXISTS vendor_codes_version (
+    vendor_id  integer PRIMARY KEY,
+    version    bigint      NOT NULL DEFAULT 0,
+    changed_on timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION bump_vendor_codes_version() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO vendor_codes_version AS v (vendor_id, version)
+        SELECT DISTINCT vendor_id, 1 FROM new_rows WHERE vendor_id IS NOT NULL ORDER BY vendor_id
+        ON CONFLICT (vendor_id) DO UPDATE SET version = v.version + 1, changed_on = now();
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO vendor_codes_version AS v (vendor_id, version)
+        SELECT DISTINCT vendor_id, 1 FROM old_rows WHERE vendor_id IS NOT NULL ORDER BY vendor_id
+        ON CONFLICT (vendor_id) DO UPDATE SET version = v.version + 1, changed_on = now();
+    ELSE
+        -- rows whose mapping columns are unchanged cancel out, the vendors of the others remain
+        INSERT INTO vendor_codes_version AS v (vendor_id, version)
+        SELECT DISTINCT vendor_id, 1 FROM (
+            (SELECT vendor_id, vendor_code, internal_id FROM old_rows
+             EXCEPT ALL
+             SELECT vendor_id, vendor_code, internal_id FROM new_rows)
+            UNION ALL
+            (SELECT vendor_id, vendor_code, internal_id FROM new_rows
+             EXCEPT ALL
+             SELECT vendor_id, vendor_code, internal_id FROM old_rows)
+        ) AS changed
+        WHERE vendor_id IS NOT NULL
+        ORDER BY vendor_id
+        ON CONFLICT (vendor_id) DO UPDATE SET version = v.version + 1, changed_on = now();
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- transition tables can not be combined with UPDATE OF, nor shared by several events
+DROP TRIGGER IF EXISTS vendor_codes_version_bump ON vendor_codes;
+DROP TRIGGER IF EXISTS vendor_codes_version_bump_insert ON vendor_codes;
+CREATE TRIGGER vendor_codes_version_bump_insert
+    AFTER INSERT ON vendor_codes
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_vendor_codes_version();
+
+DROP TRIGGER IF EXISTS vendor_codes_version_bump_update ON vendor_codes;
+CREATE TRIGGER vendor_codes_version_bump_update
+    AFTER UPDATE ON vendor_codes
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_vendor_codes_version();
+
+DROP TRIGGER IF EXISTS vendor_codes_version_bump_delete ON vendor_codes;
+CREATE TRIGGER vendor_codes_version_bump_delete
+    AFTER DELETE ON vendor_codes
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_vendor_codes_version();
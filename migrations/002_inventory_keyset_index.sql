@@ -0,0 +1,12 @@
+-- Index of the keyset read path of inventory.
+--
+-- LIInventory.keyset_page / netsuite_items_page / export_ndjson (orm/li_inventory.py) page
+-- inventory through common_utils/db_utils.py (get_keyset_page, get_grouped_page,
+-- export_ndjson) by its __keyset_columns__ (internal_id, vendor_id, vendor_code) > cursor,
+-- netsuite_items_page grouped by internal_id in the same order. The unique index on
+-- (vendor_code, vendor_id, internal_id) does not serve that order, without this index every
+-- page sorts the table.
+--
+-- On a live database run it outside a transaction as CREATE INDEX CONCURRENTLY.
+
+CREATE INDEX IF NOT EXISTS inventory_keyset_idx ON inventory (internal_id, vendor_id, vendor_code);
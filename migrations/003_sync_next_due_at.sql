@@ -0,0 +1,74 @@
+-- Due times of the scheduler's sync candidates.
+--
+-- The scheduler picked the vendors and the priority vendor codes to sync with
+-- NOW() - last_fetch_date >= sync_interval, which no index can answer: every tick scanned
+-- vendors and joined all of vendor_codes with products. next_due_at holds
+-- last_fetch_date + sync_interval, so the candidates are a range scan of the rows that are
+-- due (scheduler/vendor_scheduler.py). NULL, like the old expression, never matches: a
+-- vendor without last_fetch_date or sync_interval, and a vendor code of a product that is
+-- not a priority one.
+--
+-- Triggers keep the column current on every path that moves last_fetch_date, sync_interval,
+-- internal_id or products.priority, including a priority product inserted after its vendor codes.
+
+ALTER TABLE vendors ADD COLUMN IF NOT EXISTS next_due_at timestamptz;
+ALTER TABLE vendor_codes ADD COLUMN IF NOT EXISTS next_due_at timestamptz;
+
+CREATE OR REPLACE FUNCTION set_vendor_next_due_at() RETURNS trigger AS $$
+BEGIN
+    NEW.next_due_at := NEW.last_fetch_date + NEW.sync_interval;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS vendors_next_due_at ON vendors;
+CREATE TRIGGER vendors_next_due_at
+    BEFORE INSERT OR UPDATE OF last_fetch_date, sync_interval ON vendors
+    FOR EACH ROW EXECUTE FUNCTION set_vendor_next_due_at();
+
+CREATE OR REPLACE FUNCTION set_vendor_code_next_due_at() RETURNS trigger AS $$
+BEGIN
+    NEW.next_due_at := NEW.last_fetch_date + (
+        SELECT p.sync_interval FROM products p WHERE p.internal_id = NEW.internal_id AND p.priority = true
+    );
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS vendor_codes_next_due_at ON vendor_codes;
+CREATE TRIGGER vendor_codes_next_due_at
+    BEFORE INSERT OR UPDATE OF last_fetch_date, internal_id ON vendor_codes
+    FOR EACH ROW EXECUTE FUNCTION set_vendor_code_next_due_at();
+
+CREATE OR REPLACE FUNCTION refresh_priority_next_due_at() RETURNS trigger AS $$
+BEGIN
+    UPDATE vendor_codes AS vc
+    SET next_due_at = CASE WHEN NEW.priority = true THEN vc.last_fetch_date + NEW.sync_interval END
+    WHERE vc.internal_id = NEW.internal_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS products_priority_next_due_at ON products;
+CREATE TRIGGER products_priority_next_due_at
+    AFTER UPDATE OF priority, sync_interval ON products
+    FOR EACH ROW
+    WHEN (OLD.priority IS DISTINCT FROM NEW.priority OR OLD.sync_interval IS DISTINCT FROM NEW.sync_interval)
+    EXECUTE FUNCTION refresh_priority_next_due_at();
+
+-- a product inserted as priority after its vendor codes (OLD can not be used on INSERT)
+DROP TRIGGER IF EXISTS products_priority_next_due_at_insert ON products;
+CREATE TRIGGER products_priority_next_due_at_insert
+    AFTER INSERT ON products
+    FOR EACH ROW
+    WHEN (NEW.priority = true)
+    EXECUTE FUNCTION refresh_priority_next_due_at();
+
+-- existing rows, only next_due_at is written so none of the triggers above fire
+UPDATE vendors SET next_due_at = last_fetch_date + sync_interval;
+UPDATE vendor_codes AS vc SET next_due_at = vc.last_fetch_date + p.sync_interval
+FROM products p
+WHERE p.internal_id = vc.internal_id AND p.priority = true;
+
+CREATE INDEX IF NOT EXISTS vendors_next_due_at_idx ON vendors (next_due_at);
+CREATE INDEX IF NOT EXISTS vendor_codes_next_due_at_idx ON vendor_codes (next_due_at) WHERE next_due_at IS NOT NULL;
@@ -0,0 +1,39 @@
+-- Durable queue of vendor sync jobs.
+--
+-- With `job_queue = true` the scheduler enqueues its fetcher commands here instead of
+-- returning them to the Logic App, and any number of LiveInventoryWorker processes lease
+-- them (common_utils/job_queue.py). A lease is taken with FOR UPDATE SKIP LOCKED, so
+-- concurrent workers never block on or pick the same job, and lasts `job_visibility_timeout`
+-- seconds, extended by the worker's heartbeats. A job whose lease ran out (crashed or frozen
+-- worker) is queued again until it used up max_attempts.
+--
+-- At most one queued or running job exists per dedupe_key (vendor and kind of sync), so an
+-- overlapping scheduler run does not sync a vendor that is still waiting or being synced.
+
+CREATE TABLE IF NOT EXISTS li_jobs (
+    job_id           bigserial   PRIMARY KEY,
+    dedupe_key       text        NOT NULL,
+    payload          jsonb       NOT NULL,
+    priority         smallint    NOT NULL DEFAULT 0,
+    status           text        NOT NULL DEFAULT 'queued'
+                                 CHECK (status IN ('queued', 'running', 'done', 'failed')),
+    attempts         integer     NOT NULL DEFAULT 0,
+    max_attempts     integer     NOT NULL DEFAULT 3,
+    visible_at       timestamptz NOT NULL DEFAULT now(),
+    leased_by        text,
+    lease_expires_at timestamptz,
+    heartbeat_at     timestamptz,
+    last_error       text,
+    result           jsonb,
+    created_on       timestamptz NOT NULL DEFAULT now(),
+    modified_on      timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS li_jobs_active_dedupe_idx ON li_jobs (dedupe_key)
+    WHERE status IN ('queued', 'running');
+CREATE INDEX IF NOT EXISTS li_jobs_ready_idx ON li_jobs (priority DESC, visible_at)
+    WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS li_jobs_lease_idx ON li_jobs (lease_expires_at)
+    WHERE status = 'running';
+CREATE INDEX IF NOT EXISTS li_jobs_finished_idx ON li_jobs (modified_on)
+    WHERE status IN ('done', 'failed');
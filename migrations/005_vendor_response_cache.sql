@@ -0,0 +1,20 @@
+-- Short lived cache of normalized vendor records per (vendor, vendor code).
+--
+-- The priority, regular and on-demand syncs can ask a vendor for the same codes within
+-- seconds. The extractor stores the record it built for every code it got from the vendor
+-- (common_utils/vendor_response_cache.py); the fetcher leaves out the codes stored less than
+-- the vendor's TTL ago and the extractor adds their stored records back. vendor_code is kept
+-- lower case, the extractor matches codes case insensitively.
+--
+-- vendors.response_cache_ttl overrides the `vendor_response_cache_ttl` setting per vendor,
+-- '0 seconds' turns the cache off for a vendor.
+
+CREATE TABLE IF NOT EXISTS vendor_response_cache (
+    vendor_id   integer     NOT NULL,
+    vendor_code text        NOT NULL,
+    record      jsonb       NOT NULL,
+    fetched_at  timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (vendor_id, vendor_code)
+);
+
+ALTER TABLE vendors ADD COLUMN IF NOT EXISTS response_cache_ttl interval;
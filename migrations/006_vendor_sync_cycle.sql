@@ -0,0 +1,11 @@
+-- Stale only item selection of the regular vendor syncs (`regular_sync_selection = stale`).
+--
+-- A regular sync used to ask the vendor for every vendor code, also for the codes the
+-- priority and on-demand syncs refreshed minutes before. In stale mode the scheduler only
+-- takes the codes whose last_fetch_date is older than the vendor's sync_interval
+-- (QUERY_FETCH_VENDORS_CONFIG_STALE). sync_cycle counts the regular syncs of a vendor, every
+-- `full_refresh_every`-th one still takes all of its codes.
+
+ALTER TABLE vendors ADD COLUMN IF NOT EXISTS sync_cycle integer NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS vendor_codes_vendor_last_fetch_idx ON vendor_codes (vendor_id, last_fetch_date);
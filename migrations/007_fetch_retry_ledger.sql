@@ -0,0 +1,28 @@
+-- Failed fetcher batches, re-fetched by the scheduler's retry pass.
+--
+-- A batch of item codes the vendor failed to answer (HTTP error, timeout, connection error)
+-- used to be counted in the fetcher summary only, its codes then waited a whole
+-- sync_interval for the next sync. The fetchers now record every failed batch here with
+-- its item codes and error class (common_utils/fetch_retry_ledger.py). Each scheduler run
+-- takes the rows whose next_retry_at has passed and issues a fetcher command with only
+-- those codes. A retry that fails again is recorded with the next attempt number and a
+-- doubled delay, until `fetch_retry_max_attempts` is reached.
+--
+-- Taken rows are leased, not deleted: claimed_until hides them from the next scheduler runs
+-- for `fetch_retry_lease` seconds, and the fetcher deletes them once the retry finished. A
+-- retry lost on the way (scheduler, Logic App or fetcher crash) is taken again after its lease.
+
+CREATE TABLE IF NOT EXISTS fetch_retry_ledger (
+    retry_id      bigserial   PRIMARY KEY,
+    vendor_id     integer     NOT NULL,
+    item_codes    text[]      NOT NULL,
+    error_class   text        NOT NULL,
+    error         text,
+    attempt       integer     NOT NULL DEFAULT 1,
+    next_retry_at timestamptz NOT NULL,
+    created_on    timestamptz NOT NULL DEFAULT now()
+);
+
+ALTER TABLE fetch_retry_ledger ADD COLUMN IF NOT EXISTS claimed_until timestamptz;
+
+CREATE INDEX IF NOT EXISTS fetch_retry_ledger_due_idx ON fetch_retry_ledger (next_retry_at);
@@ -0,0 +1,131 @@
+-- Change counter of the inventory lookup rows per internal_id.
+--
+-- The dispatcher caches the rows of QUERY_FETCH_DATA_FROM_INVENTORY_USING_INTERNAL_ID per
+-- internal_id (common_utils/inventory_cache.py) and serves them while
+-- inventory_version.version of the internal_id is unchanged, in every process. The counter
+-- moves whenever the inventory of the internal_id is written, whenever one of its vendor
+-- codes is added, removed or remapped, and whenever the name of one of its vendors changes.
+--
+-- The triggers run once per statement and read the changed rows from transition tables, so a
+-- bulk upsert of N rows moves the counter of each of its internal_ids once.
+
+CREATE TABLE IF NOT EXISTS inventory_version (
+    internal_id bigint PRIMARY KEY,
+    version     bigint      NOT NULL DEFAULT 0,
+    changed_on  timestamptz NOT NULL DEFAULT now()
+);
+
+-- inventory: every written row moves the counter, the lookup returns modified_on
+CREATE OR REPLACE FUNCTION bump_inventory_version() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO inventory_version AS v (internal_id, version)
+        SELECT DISTINCT internal_id, 1 FROM new_rows WHERE internal_id IS NOT NULL ORDER BY internal_id
+        ON CONFLICT (internal_id) DO UPDATE SET version = v.version + 1, changed_on = now();
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO inventory_version AS v (internal_id, version)
+        SELECT DISTINCT internal_id, 1 FROM old_rows WHERE internal_id IS NOT NULL ORDER BY internal_id
+        ON CONFLICT (internal_id) DO UPDATE SET version = v.version + 1, changed_on = now();
+    ELSE
+        INSERT INTO inventory_version AS v (internal_id, version)
+        SELECT DISTINCT internal_id, 1 FROM (
+            SELECT internal_id FROM old_rows
+            UNION ALL
+            SELECT internal_id FROM new_rows
+        ) AS changed
+        WHERE internal_id IS NOT NULL
+        ORDER BY internal_id
+        ON CONFLICT (internal_id) DO UPDATE SET version = v.version + 1, changed_on = now();
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS inventory_version_bump_insert ON inventory;
+CREATE TRIGGER inventory_version_bump_insert
+    AFTER INSERT ON inventory
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_inventory_version();
+
+DROP TRIGGER IF EXISTS inventory_version_bump_update ON inventory;
+CREATE TRIGGER inventory_version_bump_update
+    AFTER UPDATE ON inventory
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_inventory_version();
+
+DROP TRIGGER IF EXISTS inventory_version_bump_delete ON inventory;
+CREATE TRIGGER inventory_version_bump_delete
+    AFTER DELETE ON inventory
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_inventory_version();
+
+-- vendor_codes: codes added, removed or remapped; the error / last_fetch_date bookkeeping
+-- written on every sync does not move the counter
+CREATE OR REPLACE FUNCTION bump_inventory_version_vendor_codes() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO inventory_version AS v (internal_id, version)
+        SELECT DISTINCT internal_id, 1 FROM new_rows WHERE internal_id IS NOT NULL ORDER BY internal_id
+        ON CONFLICT (internal_id) DO UPDATE SET version = v.version + 1, changed_on = now();
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO inventory_version AS v (internal_id, version)
+        SELECT DISTINCT internal_id, 1 FROM old_rows WHERE internal_id IS NOT NULL ORDER BY internal_id
+        ON CONFLICT (internal_id) DO UPDATE SET version = v.version + 1, changed_on = now();
+    ELSE
+        INSERT INTO inventory_version AS v (internal_id, version)
+        SELECT DISTINCT internal_id, 1 FROM (
+            (SELECT vendor_id, vendor_code, internal_id FROM old_rows
+             EXCEPT ALL
+             SELECT vendor_id, vendor_code, internal_id FROM new_rows)
+            UNION ALL
+            (SELECT vendor_id, vendor_code, internal_id FROM new_rows
+             EXCEPT ALL
+             SELECT vendor_id, vendor_code, internal_id FROM old_rows)
+        ) AS changed
+        WHERE internal_id IS NOT NULL
+        ORDER BY internal_id
+        ON CONFLICT (internal_id) DO UPDATE SET version = v.version + 1, changed_on = now();
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS inventory_version_vendor_codes_insert ON vendor_codes;
+CREATE TRIGGER inventory_version_vendor_codes_insert
+    AFTER INSERT ON vendor_codes
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_inventory_version_vendor_codes();
+
+DROP TRIGGER IF EXISTS inventory_version_vendor_codes_update ON vendor_codes;
+CREATE TRIGGER inventory_version_vendor_codes_update
+    AFTER UPDATE ON vendor_codes
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_inventory_version_vendor_codes();
+
+DROP TRIGGER IF EXISTS inventory_version_vendor_codes_delete ON vendor_codes;
+CREATE TRIGGER inventory_version_vendor_codes_delete
+    AFTER DELETE ON vendor_codes
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_inventory_version_vendor_codes();
+
+-- vendors: only a renamed vendor moves the counters of its internal_ids, the fetch dates
+-- written on every sync do not
+CREATE OR REPLACE FUNCTION bump_inventory_version_vendors() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO inventory_version AS v (internal_id, version)
+    SELECT DISTINCT vc.internal_id, 1
+    FROM old_rows o
+    JOIN new_rows n USING (vendor_id)
+    JOIN vendor_codes vc USING (vendor_id)
+    WHERE o.vendor_name IS DISTINCT FROM n.vendor_name AND vc.internal_id IS NOT NULL
+    ORDER BY vc.internal_id
+    ON CONFLICT (internal_id) DO UPDATE SET version = v.version + 1, changed_on = now();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS inventory_version_vendors_update ON vendors;
+CREATE TRIGGER inventory_version_vendors_update
+    AFTER UPDATE ON vendors
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_inventory_version_vendors();